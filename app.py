@@ -294,6 +294,92 @@ def create_app():
         for w in rapport.avertissements:
             click.echo(f"  [!] {w}")
 
+    @app.cli.command("erp-reprise-heures")
+    @click.option("--de", "premiere", required=True, metavar="AAAASS", help="Première semaine ERP.")
+    @click.option("--a", "derniere", required=True, metavar="AAAASS", help="Dernière semaine ERP.")
+    @click.option(
+        "--complet",
+        is_flag=True,
+        default=False,
+        help="Relit toutes les semaines, même celles déjà importées et inchangées.",
+    )
+    @click.option("--no-rtt", is_flag=True, default=False, help="N'effectue pas le recalcul RTT.")
+    @click.option(
+        "--semaines-par-page",
+        type=int,
+        default=13,
+        show_default=True,
+        help="Semaines lues et validées (commit) ensemble.",
+    )
+    def cmd_erp_reprise_heures(premiere, derniere, complet, no_rtt, semaines_par_page):
+        """Reprise des heures ERP sur plusieurs exercices, par pages (relançable après interruption)."""
+        from services.erp.sync_heures import reprendre_heures
+
+        try:
+            rapport = reprendre_heures(
+                premiere,
+                derniere,
+                recalculer_rtt=not no_rtt,
+                complet=complet,
+                semaines_par_page=semaines_par_page,
+            )
+        except Exception as e:
+            click.echo(f"[ERREUR] {e}", err=True)
+            click.echo("Les pages validées sont conservées : relancez la même commande pour reprendre.", err=True)
+            raise SystemExit(1)
+
+        click.echo(f"[REPRISE] Semaines ERP {premiere} → {derniere} ({len(rapport.semaines)} semaine(s))")
+        click.echo(f"  Semaines relues       : {len(rapport.semaines_modifiees)}")
+        click.echo(f"  Heures importées      : {rapport.nb_importes}")
+        click.echo(f"  Sans matricule app    : {rapport.nb_skipped_sans_user}")
+        click.echo(f"  RTT recalculé         : {'oui' if rapport.rtt_recalcule else 'non'}")
+        for w in rapport.avertissements:
+            click.echo(f"  [!] {w}")
+
+    @app.cli.command("erp-sync-stats")
+    @click.option("--nb", type=int, default=10, show_default=True,
+                  help="Exécutions par fenêtre de comparaison (et lignes d'historique affichées).")
+    @click.option("--type", "type_sync", type=click.Choice(["semaine", "exercice", "reprise"]), default=None,
+                  help="Limite l'historique à un type de synchro.")
+    def cmd_erp_sync_stats(nb, type_sync):
+        """Durées par phase des dernières synchros ERP et tendance (nb dernières vs nb précédentes)."""
+        from services.erp.telemetrie import PHASES, historique_sync_erp, tendances_sync_erp
+
+        executions = historique_sync_erp(limite=nb, type_sync=type_sync)
+        if not executions:
+            click.echo("Aucune synchro ERP enregistrée.")
+            return
+        click.echo(f"Dernières synchros ERP ({len(executions)}) — durées en secondes :")
+        click.echo(
+            f"  {'début':<16} {'type':<9} {'semaines':<13} {'statut':<8} {'total':>7} "
+            + " ".join(f"{p[:7]:>7}" for p in PHASES) + f" {'lignes':>7}"
+        )
+        for e in executions:
+            click.echo(
+                f"  {e.debut_le:%d/%m/%Y %H:%M} {e.type_sync:<9} {e.semaines or '-':<13} "
+                f"{e.statut + ('*' if e.dry_run else ''):<8} {e.duree_totale:7.2f} "
+                + " ".join(f"{getattr(e, f'duree_{p}'):7.2f}" for p in PHASES)
+                + f" {e.nb_lignes_erp:7d}"
+            )
+        click.echo("  (* aperçu sans écriture)")
+
+        for type_, t in tendances_sync_erp(nb).items():
+            if type_sync and type_ != type_sync:
+                continue
+            m, evo = t["moyennes"], t["evolution"]
+            def _fmt(cle, unite="s"):
+                valeur = m[cle]
+                if valeur is None:
+                    return f"{cle} -"
+                suffixe = f" ({evo[cle]:+.1f} %)" if evo.get(cle) is not None else ""
+                return f"{cle} {valeur:.2f} {unite}{suffixe}"
+            click.echo(f"Tendance {type_} (moyenne des {t['nb']} dernières réussies, évolution vs précédentes) :")
+            click.echo("  " + ", ".join(_fmt(c) for c in ("totale",) + PHASES))
+            click.echo(
+                f"  lignes TEMPAS {m['nb_lignes_erp']:.0f}, "
+                + _fmt("tempas_ms_par_1000_lignes", "ms / 1000 lignes")
+            )
+
     @app.cli.command("backup-db")
     @click.option("--forcer", is_flag=True, help="Ignore l'intervalle minimum entre sauvegardes.")
     @click.option("--raison", default="manuel-cli", help="Libellé de la sauvegarde.")
@@ -337,6 +423,82 @@ def create_app():
             f"{bilan['fin_exercice']} rappel(s) fin d'exercice."
         )
 
+    @app.cli.command("rtt-verifier")
+    @click.option(
+        "--corriger",
+        is_flag=True,
+        default=False,
+        help="Relance le recalcul RTT complet si des écarts sont trouvés.",
+    )
+    def cmd_rtt_verifier(corriger):
+        """Compare le RTT stocké (incrémental) à un recalcul complet de l'exercice actif."""
+        from services.rtt_hebdo import maj_rtt_allocations_hebdo, verifier_rtt_semaines
+        from services.solde import get_parametrage_actif
+
+        param = get_parametrage_actif()
+        if param is None:
+            click.echo("Aucun paramétrage actif.")
+            raise SystemExit(1)
+        ecarts = verifier_rtt_semaines(param)
+        if not ecarts:
+            click.echo("RTT cohérent : aucun écart.")
+            return
+        for e in ecarts:
+            click.echo(
+                f"user={e['user_id']}  alloué={e['rtt_alloue']}  attendu={e['rtt_attendu']}  "
+                f"semaines divergentes={len(e['semaines_divergentes'])}"
+            )
+        if corriger:
+            from services.verrous import VERROU_HEURES_RTT, execution_unique
+
+            with execution_unique(VERROU_HEURES_RTT, "rtt_complet") as execution:
+                if execution.rejointe:
+                    click.echo("Recalcul complet déjà lancé ailleurs : terminé pendant l'attente.")
+                    return
+                maj_rtt_allocations_hebdo(param)
+            click.echo(f"Recalcul complet effectué ({len(ecarts)} salarié(s) corrigé(s)).")
+        else:
+            raise SystemExit(1)
+
+    @app.cli.command("soldes-reconcilier")
+    @click.option(
+        "--corriger",
+        is_flag=True,
+        default=False,
+        help="Réécrit les soldes matérialisés (y compris les lignes manquantes).",
+    )
+    def cmd_soldes_reconcilier(corriger):
+        """Compare les soldes matérialisés (soldes_snapshot) au calcul direct de l'exercice actif."""
+        from models import db
+        from services.solde import reconcilier_soldes_snapshot
+
+        ecarts = reconcilier_soldes_snapshot(corriger=corriger)
+        for e in ecarts:
+            click.echo(f"user={e['user_id']}  {e['champ']}  stocké={e['stocke']}  attendu={e['attendu']}")
+        if corriger:
+            db.session.commit()
+            click.echo(f"Soldes matérialisés réécrits ({len(ecarts)} écart(s) corrigé(s)).")
+        elif ecarts:
+            raise SystemExit(1)
+        else:
+            click.echo("Soldes cohérents : aucun écart.")
+
+    @app.cli.command("absences-mensuelles")
+    @click.option(
+        "--complet",
+        is_flag=True,
+        default=False,
+        help="Recalcule tous les mois (et pas seulement ceux non couverts).",
+    )
+    def cmd_absences_mensuelles(complet):
+        """Calcule le cube mensuel des absences (reporting) sur tous les exercices."""
+        from models import db
+        from services.absences_mensuelles import reconstruire_absences_mensuelles
+
+        nb = reconstruire_absences_mensuelles(seulement_manquants=not complet)
+        db.session.commit()
+        click.echo(f"Cube des absences : {nb} mois recalculé(s).")
+
     return app
 
 
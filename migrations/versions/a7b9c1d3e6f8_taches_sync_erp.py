@@ -0,0 +1,43 @@
+"""Table taches_sync_erp (file des synchros ERP exécutées en arrière-plan).
+
+Revision ID: a7b9c1d3e6f8
+Revises: f6a8b0c2d5e7
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'a7b9c1d3e6f8'
+down_revision = 'f6a8b0c2d5e7'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if "taches_sync_erp" in inspector.get_table_names():
+        return
+    op.create_table('taches_sync_erp',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type_sync', sa.String(length=20), nullable=False),
+    sa.Column('parametres', sa.Text(), nullable=False),
+    sa.Column('statut', sa.String(length=20), nullable=False),
+    sa.Column('progression_faite', sa.Integer(), nullable=False),
+    sa.Column('progression_totale', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(length=500), nullable=True),
+    sa.Column('rapport', sa.Text(), nullable=True),
+    sa.Column('demande_par_id', sa.Integer(), nullable=True),
+    sa.Column('cree_le', sa.DateTime(), nullable=False),
+    sa.Column('debut_le', sa.DateTime(), nullable=True),
+    sa.Column('fin_le', sa.DateTime(), nullable=True),
+    sa.ForeignKeyConstraint(['demande_par_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_taches_sync_erp_statut', 'taches_sync_erp', ['statut'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_taches_sync_erp_statut', table_name='taches_sync_erp')
+    op.drop_table('taches_sync_erp')
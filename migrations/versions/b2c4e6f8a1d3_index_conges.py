@@ -0,0 +1,41 @@
+"""Index composites sur conges (soldes, chevauchements, calendrier).
+
+Revision ID: b2c4e6f8a1d3
+Revises: e7f8a9b0c1d2
+Create Date: 2026-10-18 00:00:00.000000
+
+Sans index, chaque calcul de solde, détection de chevauchement ou calcul RTT
+parcourt toute la table ``conges`` (historique de plusieurs exercices).
+1. ``ix_conges_user_statut_type_dates`` : requêtes par salarié
+   (somme_consommation, detecter_chevauchement, absences RTT).
+2. ``ix_conges_statut_dates`` : requêtes tous salariés sur une période
+   (conges_chevauchant, calendrier du tableau de bord RH).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b2c4e6f8a1d3'
+down_revision = 'e7f8a9b0c1d2'
+branch_labels = None
+depends_on = None
+
+
+_INDEX = {
+    "ix_conges_user_statut_type_dates": ["user_id", "statut", "type_conge", "date_debut", "date_fin"],
+    "ix_conges_statut_dates": ["statut", "date_debut", "date_fin"],
+}
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    existants = {i["name"] for i in inspector.get_indexes("conges")}
+    for nom, colonnes in _INDEX.items():
+        if nom not in existants:
+            op.create_index(nom, "conges", colonnes, unique=False)
+
+
+def downgrade():
+    for nom in reversed(list(_INDEX)):
+        op.drop_index(nom, table_name="conges")
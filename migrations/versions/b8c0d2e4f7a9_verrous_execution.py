@@ -0,0 +1,34 @@
+"""Table verrous_execution (exécution unique de la synchro ERP / recalcul RTT).
+
+Revision ID: b8c0d2e4f7a9
+Revises: a7b9c1d3e6f8
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'b8c0d2e4f7a9'
+down_revision = 'a7b9c1d3e6f8'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if "verrous_execution" in inspector.get_table_names():
+        return
+    op.create_table('verrous_execution',
+    sa.Column('nom', sa.String(length=50), nullable=False),
+    sa.Column('detenteur', sa.String(length=120), nullable=True),
+    sa.Column('cle', sa.String(length=100), nullable=True),
+    sa.Column('generation', sa.Integer(), nullable=False),
+    sa.Column('acquis_le', sa.DateTime(), nullable=True),
+    sa.Column('expire_le', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('nom')
+    )
+
+
+def downgrade():
+    op.drop_table('verrous_execution')
@@ -0,0 +1,45 @@
+"""Table rtt_semaines (RTT hebdomadaire stocké par salarié et semaine).
+
+Revision ID: c3d5e7f9a2b4
+Revises: b2c4e6f8a1d3
+Create Date: 2026-10-18 00:00:00.000000
+
+Permet le recalcul RTT incrémental : seules les semaines touchées par une
+saisie d'heures ou un congé validé sont recalculées. La table est remplie au
+premier recalcul complet (`flask rtt-verifier --corriger` ou synchro ERP).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'c3d5e7f9a2b4'
+down_revision = 'b2c4e6f8a1d3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if "rtt_semaines" in inspector.get_table_names():
+        return
+    op.create_table('rtt_semaines',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('parametrage_id', sa.Integer(), nullable=False),
+    sa.Column('date_lundi', sa.Date(), nullable=False),
+    sa.Column('heures', sa.Float(), nullable=False),
+    sa.Column('jours_absence', sa.Float(), nullable=False),
+    sa.Column('rtt', sa.Float(), nullable=False),
+    sa.Column('calcule_le', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['parametrage_id'], ['parametrage_annuel.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'parametrage_id', 'date_lundi', name='uq_rtt_semaines_user_param_lundi')
+    )
+    op.create_index('ix_rtt_semaines_param_user', 'rtt_semaines', ['parametrage_id', 'user_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_rtt_semaines_param_user', table_name='rtt_semaines')
+    op.drop_table('rtt_semaines')
@@ -0,0 +1,44 @@
+"""Table executions_sync_erp (historique des synchros ERP, durées par phase).
+
+Revision ID: c9d1e3f5a8b0
+Revises: b8c0d2e4f7a9
+Create Date: 2026-10-18 00:00:00.000000
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'c9d1e3f5a8b0'
+down_revision = 'b8c0d2e4f7a9'
+branch_labels = None
+depends_on = None
+
+_DUREES = ('totale', 'connexion', 'tempas', 'salaries', 'rapprochement', 'upsert', 'commit', 'rtt')
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if "executions_sync_erp" in inspector.get_table_names():
+        return
+    op.create_table('executions_sync_erp',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('type_sync', sa.String(length=20), nullable=False),
+    sa.Column('semaines', sa.String(length=20), nullable=True),
+    sa.Column('statut', sa.String(length=20), nullable=False),
+    sa.Column('dry_run', sa.Boolean(), nullable=False),
+    sa.Column('debut_le', sa.DateTime(), nullable=False),
+    *[sa.Column(f'duree_{phase}', sa.Float(), nullable=False) for phase in _DUREES],
+    sa.Column('nb_semaines_lues', sa.Integer(), nullable=False),
+    sa.Column('nb_lignes_erp', sa.Integer(), nullable=False),
+    sa.Column('nb_importes', sa.Integer(), nullable=False),
+    sa.Column('nb_avertissements', sa.Integer(), nullable=False),
+    sa.Column('message', sa.String(length=500), nullable=True),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_executions_sync_erp_debut_le', 'executions_sync_erp', ['debut_le'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_executions_sync_erp_debut_le', table_name='executions_sync_erp')
+    op.drop_table('executions_sync_erp')
@@ -0,0 +1,31 @@
+"""verrous_execution : issue de la dernière exécution (dernier_statut).
+
+Revision ID: d2e4f6a8b1c3
+Revises: c9d1e3f5a8b0
+Create Date: 2026-10-18 00:00:00.000000
+
+Un appelant qui a rejoint une exécution identique ne la considère terminée
+que si elle a réussi ; sinon il relance le traitement (services/verrous.py).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd2e4f6a8b1c3'
+down_revision = 'c9d1e3f5a8b0'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    cols = {c["name"] for c in inspector.get_columns("verrous_execution")}
+    if "dernier_statut" not in cols:
+        with op.batch_alter_table("verrous_execution", schema=None) as batch_op:
+            batch_op.add_column(sa.Column("dernier_statut", sa.String(length=20), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table("verrous_execution", schema=None) as batch_op:
+        batch_op.drop_column("dernier_statut")
@@ -0,0 +1,43 @@
+"""Table soldes_snapshot (consommations CP/RTT matérialisées).
+
+Revision ID: d4e6f8a0b3c5
+Revises: c3d5e7f9a2b4
+Create Date: 2026-10-18 00:00:00.000000
+
+Une ligne par (salarié, exercice), tenue à jour à chaque changement de congé.
+Table vide après migration : `calculer_solde` retombe sur le calcul direct
+jusqu'à `flask soldes-reconcilier --corriger` (ou le job nocturne).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'd4e6f8a0b3c5'
+down_revision = 'c3d5e7f9a2b4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if "soldes_snapshot" in inspector.get_table_names():
+        return
+    op.create_table('soldes_snapshot',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=False),
+    sa.Column('parametrage_id', sa.Integer(), nullable=False),
+    sa.Column('cp_consomme', sa.Float(), nullable=False),
+    sa.Column('cp_en_attente', sa.Float(), nullable=False),
+    sa.Column('rtt_consomme', sa.Float(), nullable=False),
+    sa.Column('rtt_en_attente', sa.Float(), nullable=False),
+    sa.Column('maj_le', sa.DateTime(), nullable=False),
+    sa.ForeignKeyConstraint(['parametrage_id'], ['parametrage_annuel.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('user_id', 'parametrage_id', name='uq_soldes_snapshot_user_param')
+    )
+
+
+def downgrade():
+    op.drop_table('soldes_snapshot')
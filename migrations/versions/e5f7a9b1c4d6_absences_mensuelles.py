@@ -0,0 +1,48 @@
+"""Cube mensuel des absences (absences_mensuelles + absences_mensuelles_mois).
+
+Revision ID: e5f7a9b1c4d6
+Revises: d4e6f8a0b3c5
+Create Date: 2026-10-18 00:00:00.000000
+
+Tables vides après migration : le reporting recalcule les mois non couverts
+depuis les congés jusqu'à `flask absences-mensuelles` (ou le job nocturne).
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'e5f7a9b1c4d6'
+down_revision = 'd4e6f8a0b3c5'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    tables = inspector.get_table_names()
+    if "absences_mensuelles" not in tables:
+        op.create_table('absences_mensuelles',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('mois', sa.Date(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('type_conge', sa.String(length=50), nullable=False),
+        sa.Column('nb_conges', sa.Integer(), nullable=False),
+        sa.Column('nb_debutes', sa.Integer(), nullable=False),
+        sa.Column('nb_jours', sa.Float(), nullable=False),
+        sa.Column('nb_heures_rtt', sa.Float(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('mois', 'user_id', 'type_conge', name='uq_absences_mensuelles_mois_user_type')
+        )
+    if "absences_mensuelles_mois" not in tables:
+        op.create_table('absences_mensuelles_mois',
+        sa.Column('mois', sa.Date(), nullable=False),
+        sa.Column('calcule_le', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('mois')
+        )
+
+
+def downgrade():
+    op.drop_table('absences_mensuelles_mois')
+    op.drop_table('absences_mensuelles')
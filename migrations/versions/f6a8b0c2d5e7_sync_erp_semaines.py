@@ -0,0 +1,38 @@
+"""Table sync_erp_semaines (empreintes ERP pour la synchro incrémentale).
+
+Revision ID: f6a8b0c2d5e7
+Revises: e5f7a9b1c4d6
+Create Date: 2026-10-18 00:00:00.000000
+
+Table vide après migration : la première synchro de l'exercice relit toutes
+les semaines puis enregistre leur empreinte.
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+revision = 'f6a8b0c2d5e7'
+down_revision = 'e5f7a9b1c4d6'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    conn = op.get_bind()
+    inspector = sa.inspect(conn)
+    if "sync_erp_semaines" in inspector.get_table_names():
+        return
+    op.create_table('sync_erp_semaines',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('semaine_erp', sa.String(length=6), nullable=False),
+    sa.Column('nb_lignes', sa.Integer(), nullable=False),
+    sa.Column('total_heures', sa.Float(), nullable=False),
+    sa.Column('signature', sa.Integer(), nullable=True),
+    sa.Column('synchronise_le', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('semaine_erp')
+    )
+
+
+def downgrade():
+    op.drop_table('sync_erp_semaines')
@@ -11,6 +11,13 @@ from models.jour_ferie import JourFerie
 from models.conge_exceptionnel_type import CongeExceptionnelType
 
 from models.heures_hebdo import HeuresHebdo
+from models.sync_erp_semaine import SyncErpSemaine
+from models.tache_sync_erp import TacheSyncErp
+from models.execution_sync_erp import ExecutionSyncErp
+from models.verrou_execution import VerrouExecution
+from models.rtt_semaine import RttSemaine
+from models.solde_snapshot import SoldeSnapshot
+from models.absence_mensuelle import AbsenceMensuelle, AbsenceMoisCalcule
 
 from models.interessement_periode import InteressementPeriode
 from models.interessement_regle import InteressementRegle
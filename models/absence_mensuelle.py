@@ -0,0 +1,50 @@
+from datetime import datetime, timezone
+
+from models import db
+
+
+class AbsenceMensuelle(db.Model):
+    """Cube mensuel des absences validées par (mois, salarié, type de congé).
+
+    Même sémantique que `services.reporting.generer_rapport` : jours ouvrables
+    du congé dans le mois (sans demi-journées), heures RTT au prorata des jours
+    du mois. ``nb_conges`` compte les congés qui chevauchent le mois,
+    ``nb_debutes`` ceux qui y commencent (pour compter chaque congé une seule
+    fois sur plusieurs mois). Tenu à jour par services/absences_mensuelles.py.
+    """
+
+    __tablename__ = "absences_mensuelles"
+
+    id = db.Column(db.Integer, primary_key=True)
+    mois = db.Column(db.Date, nullable=False)  # 1er jour du mois
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    type_conge = db.Column(db.String(50), nullable=False)
+    nb_conges = db.Column(db.Integer, nullable=False, default=0)
+    nb_debutes = db.Column(db.Integer, nullable=False, default=0)
+    nb_jours = db.Column(db.Float, nullable=False, default=0)
+    nb_heures_rtt = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint("mois", "user_id", "type_conge", name="uq_absences_mensuelles_mois_user_type"),
+    )
+
+    def __repr__(self):
+        return f"<AbsenceMensuelle {self.mois:%Y-%m} user={self.user_id} {self.type_conge} jours={self.nb_jours}>"
+
+
+class AbsenceMoisCalcule(db.Model):
+    """Mois dont les lignes `AbsenceMensuelle` sont complètes.
+
+    Un mois absent de cette table n'est pas lu dans le cube : le reporting le
+    recalcule depuis les congés. Une écriture de congé validé ou de jour férié
+    hors des routes retire le mois (filet de sécurité) ;
+    `reconstruire_absences_mensuelles` le recalcule.
+    """
+
+    __tablename__ = "absences_mensuelles_mois"
+
+    mois = db.Column(db.Date, primary_key=True)
+    calcule_le = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f"<AbsenceMoisCalcule {self.mois:%Y-%m}>"
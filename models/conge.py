@@ -51,5 +51,16 @@ class Conge(db.Model):
     valide_par_responsable = db.relationship("User", foreign_keys=[valide_par_responsable_id])
     valide_par = db.relationship("User", foreign_keys=[valide_par_id])
 
+    # Index composites alignés sur les filtres réels (cf. migration b2c4e6f8a1d3) :
+    # - par salarié : soldes (somme_consommation), chevauchement, absences RTT ;
+    # - par statut + période : conflits d'équipe, calendrier RH, congés en cours.
+    __table_args__ = (
+        db.Index(
+            "ix_conges_user_statut_type_dates",
+            "user_id", "statut", "type_conge", "date_debut", "date_fin",
+        ),
+        db.Index("ix_conges_statut_dates", "statut", "date_debut", "date_fin"),
+    )
+
     def __repr__(self):
         return f"<Conge {self.date_debut} - {self.date_fin} ({self.nb_jours_ouvrables}j) [{self.statut}]>"
@@ -0,0 +1,38 @@
+from datetime import datetime, timezone
+
+from models import db
+
+
+class ExecutionSyncErp(db.Model):
+    """Historique des synchros ERP avec la durée de chaque phase (services/erp/telemetrie.py).
+
+    Une ligne par exécution (semaine, exercice ou reprise ; aperçus compris).
+    Les durées sont en secondes ; ``nb_lignes_erp`` est le volume lu dans
+    TEMPAS. Sert au suivi des tendances (`flask erp-sync-stats`, écran heures
+    hebdo) : une dérive de latence ERP se voit d'une semaine à l'autre.
+    """
+
+    __tablename__ = "executions_sync_erp"
+
+    id = db.Column(db.Integer, primary_key=True)
+    type_sync = db.Column(db.String(20), nullable=False)
+    semaines = db.Column(db.String(20), nullable=True)  # AAAASS ou AAAASS-AAAASS
+    statut = db.Column(db.String(20), nullable=False)  # ok | erreur | rejointe
+    dry_run = db.Column(db.Boolean, nullable=False, default=False)
+    debut_le = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False, index=True)
+    duree_totale = db.Column(db.Float, nullable=False, default=0)
+    duree_connexion = db.Column(db.Float, nullable=False, default=0)
+    duree_tempas = db.Column(db.Float, nullable=False, default=0)
+    duree_salaries = db.Column(db.Float, nullable=False, default=0)
+    duree_rapprochement = db.Column(db.Float, nullable=False, default=0)
+    duree_upsert = db.Column(db.Float, nullable=False, default=0)
+    duree_commit = db.Column(db.Float, nullable=False, default=0)
+    duree_rtt = db.Column(db.Float, nullable=False, default=0)
+    nb_semaines_lues = db.Column(db.Integer, nullable=False, default=0)
+    nb_lignes_erp = db.Column(db.Integer, nullable=False, default=0)
+    nb_importes = db.Column(db.Integer, nullable=False, default=0)
+    nb_avertissements = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.String(500), nullable=True)
+
+    def __repr__(self):
+        return f"<ExecutionSyncErp {self.type_sync} {self.semaines} {self.statut} {self.duree_totale:.2f}s>"
@@ -0,0 +1,36 @@
+from datetime import datetime, timezone
+
+from models import db
+
+
+class RttSemaine(db.Model):
+    """RTT acquis par un salarié sur une semaine de l'exercice (calcul stocké).
+
+    Une ligne par (salarié, exercice, lundi) pour chaque semaine ayant des heures
+    saisies ou des absences, soit exactement le détail de `calculer_rtt_hebdo`.
+    `AllocationConge.rtt_heures_allouees` vaut la somme de `rtt` sur l'exercice :
+    une saisie d'heures ou un congé validé ne recalcule que ses semaines, puis
+    l'allocation est ajustée de l'écart (cf. services/rtt_hebdo.recalculer_semaines).
+    """
+
+    __tablename__ = "rtt_semaines"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    parametrage_id = db.Column(db.Integer, db.ForeignKey("parametrage_annuel.id"), nullable=False)
+    # Lundi de la semaine ISO concernée.
+    date_lundi = db.Column(db.Date, nullable=False)
+
+    # Heures saisies (0 si la semaine n'a que des absences).
+    heures = db.Column(db.Float, nullable=False, default=0)
+    jours_absence = db.Column(db.Float, nullable=False, default=0)
+    rtt = db.Column(db.Float, nullable=False, default=0)
+    calcule_le = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "parametrage_id", "date_lundi", name="uq_rtt_semaines_user_param_lundi"),
+        db.Index("ix_rtt_semaines_param_user", "parametrage_id", "user_id"),
+    )
+
+    def __repr__(self):
+        return f"<RttSemaine user={self.user_id} semaine_du={self.date_lundi} rtt={self.rtt}>"
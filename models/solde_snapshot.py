@@ -0,0 +1,35 @@
+from datetime import datetime, timezone
+
+from models import db
+
+
+class SoldeSnapshot(db.Model):
+    """Consommations CP/RTT matérialisées par (salarié, exercice).
+
+    Évite de rejouer les agrégats de `somme_consommation` (sommes + prorata des
+    congés à cheval) à chaque affichage de solde. Mise à jour dans la même
+    transaction que chaque changement de congé (services/conge_evenements.py) ;
+    toute autre écriture sur un congé supprime la ligne du salarié, et
+    `calculer_solde` retombe alors sur le calcul direct. Contrôlée par
+    `services.solde.reconcilier_soldes_snapshot`.
+    """
+
+    __tablename__ = "soldes_snapshot"
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=False)
+    parametrage_id = db.Column(db.Integer, db.ForeignKey("parametrage_annuel.id"), nullable=False)
+
+    # CP + Ancienneté en jours, RTT en heures (mêmes valeurs que somme_consommation).
+    cp_consomme = db.Column(db.Float, nullable=False, default=0)
+    cp_en_attente = db.Column(db.Float, nullable=False, default=0)
+    rtt_consomme = db.Column(db.Float, nullable=False, default=0)
+    rtt_en_attente = db.Column(db.Float, nullable=False, default=0)
+    maj_le = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    __table_args__ = (
+        db.UniqueConstraint("user_id", "parametrage_id", name="uq_soldes_snapshot_user_param"),
+    )
+
+    def __repr__(self):
+        return f"<SoldeSnapshot user={self.user_id} param={self.parametrage_id} cp={self.cp_consomme} rtt={self.rtt_consomme}>"
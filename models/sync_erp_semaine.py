@@ -0,0 +1,25 @@
+from datetime import datetime, timezone
+
+from models import db
+
+
+class SyncErpSemaine(db.Model):
+    """Empreinte ERP de chaque semaine déjà synchronisée (import incrémental).
+
+    Pour une semaine TEMPAS (AAAASS) : nombre de lignes, somme des heures et
+    signature (CHECKSUM_AGG) relevés lors du dernier import. La synchro de
+    l'exercice ne relit que les semaines dont l'empreinte ERP a changé
+    (services/erp/etat_sync.py).
+    """
+
+    __tablename__ = "sync_erp_semaines"
+
+    id = db.Column(db.Integer, primary_key=True)
+    semaine_erp = db.Column(db.String(6), nullable=False, unique=True)
+    nb_lignes = db.Column(db.Integer, nullable=False, default=0)
+    total_heures = db.Column(db.Float, nullable=False, default=0)
+    signature = db.Column(db.Integer, nullable=True)
+    synchronise_le = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+
+    def __repr__(self):
+        return f"<SyncErpSemaine {self.semaine_erp} lignes={self.nb_lignes} heures={self.total_heures}>"
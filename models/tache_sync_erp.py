@@ -0,0 +1,37 @@
+from datetime import datetime, timezone
+
+from models import db
+
+
+class TacheSyncErp(db.Model):
+    """Synchro ERP demandée depuis l'écran RH, exécutée en arrière-plan.
+
+    La route enfile la tâche et rend la main ; le planificateur
+    (services/erp/scheduler.py) l'exécute, met à jour la progression puis
+    stocke le rapport (JSON) que la page de suivi interroge.
+    """
+
+    __tablename__ = "taches_sync_erp"
+
+    id = db.Column(db.Integer, primary_key=True)
+    # "semaine" (synchroniser_semaine) ou "exercice" (synchroniser_exercice).
+    type_sync = db.Column(db.String(20), nullable=False)
+    # Paramètres de la synchro (JSON sérialisé, par simplicité SQLite).
+    parametres = db.Column(db.Text, nullable=False, default="{}")
+    # en_attente → en_cours → terminee | erreur
+    statut = db.Column(db.String(20), nullable=False, default="en_attente", index=True)
+    progression_faite = db.Column(db.Integer, nullable=False, default=0)
+    progression_totale = db.Column(db.Integer, nullable=False, default=0)
+    message = db.Column(db.String(500), nullable=True)
+    # Rapport de synchro (RapportSync / RapportSyncExercice) sérialisé en JSON.
+    rapport = db.Column(db.Text, nullable=True)
+
+    demande_par_id = db.Column(db.Integer, db.ForeignKey("users.id"), nullable=True)
+    cree_le = db.Column(db.DateTime, default=lambda: datetime.now(timezone.utc), nullable=False)
+    debut_le = db.Column(db.DateTime, nullable=True)
+    fin_le = db.Column(db.DateTime, nullable=True)
+
+    demande_par = db.relationship("User", foreign_keys=[demande_par_id])
+
+    def __repr__(self):
+        return f"<TacheSyncErp {self.id} {self.type_sync} {self.statut}>"
@@ -0,0 +1,27 @@
+from models import db
+
+
+class VerrouExecution(db.Model):
+    """Verrou d'exécution partagé entre processus (services/verrous.py).
+
+    Une ligne par traitement exclusif (ex. ``heures_rtt`` : synchro ERP et
+    recalcul RTT complet). ``detenteur`` est nul quand le verrou est libre ;
+    le détenteur prolonge ``expire_le`` (bail) tant qu'il travaille, un
+    processus arrêté perd donc le verrou à l'expiration du bail.
+    ``generation`` augmente à chaque acquisition : un appelant qui attend
+    sait ainsi que l'exécution en cours s'est terminée, et ``dernier_statut``
+    (``succes`` / ``erreur``, remis à nul à l'acquisition) si elle a abouti.
+    """
+
+    __tablename__ = "verrous_execution"
+
+    nom = db.Column(db.String(50), primary_key=True)
+    detenteur = db.Column(db.String(120), nullable=True)
+    cle = db.Column(db.String(100), nullable=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+    acquis_le = db.Column(db.DateTime, nullable=True)
+    expire_le = db.Column(db.DateTime, nullable=True)
+    dernier_statut = db.Column(db.String(20), nullable=True)
+
+    def __repr__(self):
+        return f"<VerrouExecution {self.nom} detenteur={self.detenteur} cle={self.cle}>"
@@ -8,6 +8,7 @@ from models.conge import Conge
 from models.user import User
 from services.notifications import notifier_rh_demande_transmise, notifier_conge_refuse, notifier_rh_nouvelle_demande
 from services.solde import calculer_solde
+from services.conge_evenements import conge_modifie, etat_conge
 from services.audit import log_action
 from services.delegation import (
     delegataires_de,
@@ -43,18 +44,10 @@ def dashboard():
 
     # Conflits équipe : pour chaque demande, qui d'autre dans l'équipe est absent
     # sur la période ? Restreint au périmètre de subordonnés effectifs.
-    from services.calcul_jours import conges_chevauchant
+    from services.calcul_jours import conflits_par_demande
     conflits_par_conge = {}
-    for c in demandes_attente:
-        if not subordonne_ids:
-            conflits_par_conge[c.id] = []
-            continue
-        conflits = conges_chevauchant(
-            c.date_debut, c.date_fin, exclure_user_id=c.user_id
-        )
-        # On ne garde que les collègues du périmètre du responsable.
-        conflits_filtres = [cc for cc in conflits if cc.user_id in subordonne_ids]
-        conflits_par_conge[c.id] = [
+    for conge_id, conflits in conflits_par_demande(demandes_attente, user_ids=subordonne_ids).items():
+        conflits_par_conge[conge_id] = [
             {
                 "salarie": (
                     f"{cc.utilisateur.prenom} {cc.utilisateur.nom}"
@@ -64,7 +57,7 @@ def dashboard():
                 "type_conge": cc.type_conge,
                 "statut": cc.statut,
             }
-            for cc in conflits_filtres
+            for cc in conflits
         ]
 
     today = date.today()
@@ -110,9 +103,11 @@ def _valider_un_conge_n1(conge):
     if not u or not peut_valider_pour(current_user, u):
         return False, f"Conge #{conge.id} : vous n'êtes pas habilité à valider pour ce salarié."
 
+    etat_avant = etat_conge(conge)
     conge.statut = "en_attente_rh"
     conge.valide_par_responsable_id = current_user.id
     conge.valide_par_responsable_le = datetime.now(timezone.utc)
+    conge_modifie(etat_avant, conge)
     log_action(
         "conge.valider_n1",
         cible_type="conge",
@@ -202,10 +197,12 @@ def refuser_lots():
         # Même périmètre que la validation : responsable direct OU suppléant actif.
         if not u or not peut_valider_pour(current_user, u):
             continue
+        etat_avant = etat_conge(conge)
         conge.statut = "refuse"
         conge.valide_par_responsable_id = current_user.id
         conge.valide_par_responsable_le = datetime.now(timezone.utc)
         conge.motif_refus = motif
+        conge_modifie(etat_avant, conge)
         log_action(
             "conge.refuser_n1",
             cible_type="conge",
@@ -235,10 +232,12 @@ def refuser_conge(conge_id):
         if not motif:
             flash("Le motif de refus est obligatoire.", "error")
             return render_template("responsable/refuser_conge.html", conge=conge)
+        etat_avant = etat_conge(conge)
         conge.statut = "refuse"
         conge.valide_par_responsable_id = current_user.id
         conge.valide_par_responsable_le = datetime.now(timezone.utc)
         conge.motif_refus = motif
+        conge_modifie(etat_avant, conge)
         log_action(
             "conge.refuser_n1",
             cible_type="conge",
@@ -316,6 +315,7 @@ def ajouter_conge_subordonne(user_id):
                 types_exceptionnels=types_exceptionnels,
             )
 
+        conge_modifie(None, result.conge)
         db.session.commit()
 
         notifier_rh_nouvelle_demande(result.conge)
@@ -22,6 +22,10 @@ from services.solde import (
     cloturer_exercice_et_reporter,
 )
 from services.jours_feries import get_jours_feries
+from services.calendrier_feries import invalider_calendrier_feries
+from services.conge_evenements import conge_modifie, etat_conge
+from services.parametrage_actif import invalider_parametrage_cache
+from services.erp import etat_sync  # noqa: F401 (invalidation des empreintes ERP sur écriture salarié/heures)
 from services.format_heures import format_heures_min, format_jours
 from services.notifications import notifier_conge_valide, notifier_conge_refuse
 from services.export import export_conges_excel, export_conges_equipe_excel, export_conges_pdf
@@ -127,13 +131,10 @@ def dashboard():
 
     # Pour chaque demande, prépare la liste des congés chevauchants (autres salariés)
     # afin que le RH visualise les conflits potentiels avant de valider.
-    from services.calcul_jours import conges_chevauchant
+    from services.calcul_jours import conflits_par_demande
     conflits_par_conge = {}
-    for c in demandes_attente:
-        conflits = conges_chevauchant(
-            c.date_debut, c.date_fin, exclure_user_id=c.user_id
-        )
-        conflits_par_conge[c.id] = [
+    for conge_id, conflits in conflits_par_demande(demandes_attente).items():
+        conflits_par_conge[conge_id] = [
             {
                 "salarie": (
                     f"{cc.utilisateur.prenom} {cc.utilisateur.nom}"
@@ -263,6 +264,7 @@ def ajouter_conge(user_id):
                 types_exceptionnels=types_exceptionnels,
             )
 
+        conge_modifie(None, result.conge)
         db.session.commit()
 
         # Création directe RH = validation immédiate : on notifie le salarié (B9).
@@ -302,6 +304,7 @@ def modifier_conge(conge_id):
             "nb_heures_rtt": conge.nb_heures_rtt,
         }
         ancien_type = conge.type_conge
+        etat_avant = etat_conge(conge)
         result = construire_conge(
             user,
             request.form,
@@ -349,6 +352,7 @@ def modifier_conge(conge_id):
                 types_exceptionnels=types_exceptionnels,
             )
 
+        conge_modifie(etat_avant, conge)
         db.session.commit()
 
         # Informe le salarié de la modification (en particulier d'un changement de type).
@@ -434,7 +438,9 @@ def supprimer_conge(conge_id):
             "statut": conge.statut,
         },
     )
+    etat_avant = etat_conge(conge)
     db.session.delete(conge)
+    conge_modifie(etat_avant, None)
     db.session.commit()
     flash("Congé supprimé.", "success")
     return redirect(url_for("rh.salarie_detail", user_id=user_id))
@@ -443,8 +449,8 @@ def _valider_un_conge_rh(conge):
     """Applique la validation niveau 2 (RH) à un congé. Retourne (ok, message).
 
     Effectue les contrôles bloquants (plafond exceptionnel), pose le statut,
-    écrit l'audit et empile la notification salarié. Ne commit pas : le caller
-    décide.
+    écrit l'audit, recalcule le RTT des semaines couvertes et empile la
+    notification salarié. Ne commit pas : le caller décide.
     """
     if conge.statut != "en_attente_rh":
         return False, f"Conge #{conge.id} : statut {conge.statut}, ignoré."
@@ -470,10 +476,12 @@ def _valider_un_conge_rh(conge):
                     f"Conge #{conge.id} : plafond annuel dépassé pour « {exc_type.libelle} »."
                 )
 
+    etat_avant = etat_conge(conge)
     conge.statut = "valide"
     conge.valide_par_id = current_user.id
     conge.valide_le = datetime.now(timezone.utc)
     conge.motif_refus = None
+    conge_modifie(etat_avant, conge)
     log_action(
         "conge.valider",
         cible_type="conge",
@@ -573,10 +581,12 @@ def refuser_conge(conge_id):
             flash("Le motif de refus est obligatoire.", "error")
             return render_template("rh/refuser_conge.html", conge=conge)
 
+        etat_avant = etat_conge(conge)
         conge.statut = "refuse"
         conge.valide_par_id = current_user.id
         conge.valide_le = datetime.now(timezone.utc)
         conge.motif_refus = motif
+        conge_modifie(etat_avant, conge)
         log_action(
             "conge.refuser",
             cible_type="conge",
@@ -623,10 +633,12 @@ def refuser_lots():
     for conge in conges:
         if conge.statut != "en_attente_rh":
             continue
+        etat_avant = etat_conge(conge)
         conge.statut = "refuse"
         conge.valide_par_id = current_user.id
         conge.valide_le = datetime.now(timezone.utc)
         conge.motif_refus = motif
+        conge_modifie(etat_avant, conge)
         log_action(
             "conge.refuser",
             cible_type="conge",
@@ -693,6 +705,7 @@ def parametrage():
                 param.rtt_types_absence_exclus = rtt_types_absence_exclus
 
             db.session.commit()
+            invalider_parametrage_cache()
             flash("Paramétrage enregistré.", "success")
             return redirect(url_for("rh.parametrage"))
         elif action == "generer_allocations":
@@ -731,8 +744,11 @@ def parametrage():
                 db.session.commit()
             except Exception:
                 db.session.rollback()
+                invalider_calendrier_feries()
                 flash("Erreur lors du chargement des jours fériés. Consultez les logs serveur.", "error")
                 return redirect(url_for("rh.parametrage"))
+            # Le calendrier en mémoire (comptage des jours ouvrables) doit refléter la table.
+            invalider_calendrier_feries()
 
             if count_added or count_updated:
                 msg = []
@@ -760,6 +776,7 @@ def parametrage():
                 jf = JourFerie(date_ferie=date_f, libelle=libelle, annee=date_f.year, auto_genere=False)
                 db.session.add(jf)
                 db.session.commit()
+                invalider_calendrier_feries()
                 flash("Jour férié ajouté.", "success")
             return redirect(url_for("rh.parametrage"))
 
@@ -775,6 +792,7 @@ def parametrage():
                 if jf:
                     db.session.delete(jf)
                     db.session.commit()
+                    invalider_calendrier_feries()
                     flash("Jour férié supprimé.", "success")
             return redirect(url_for("rh.parametrage"))
 
@@ -832,9 +850,11 @@ def cloture_exercice():
                 report_max_heures_rtt=plafond_rtt,
             )
         except DbSaveError:
+            invalider_parametrage_cache()
             raise
         except Exception:
             db.session.rollback()
+            invalider_parametrage_cache()
             flash("Erreur lors de la clôture. Aucune modification n'a été appliquée.", "error")
             return redirect(url_for("rh.cloture_exercice"))
 
@@ -854,6 +874,8 @@ def cloture_exercice():
             },
         )
         db.session.commit()
+        # Nouvel exercice actif : le cache processus doit le voir dès la requête suivante.
+        invalider_parametrage_cache()
 
         flash(
             f"Exercice clôturé. {res['nb_salaries']} salarié(s) traité(s) : "
@@ -1443,83 +1465,94 @@ def types_exceptionnels():
 @rh_bp.route("/sync-erp-heures", methods=["POST"])
 @rh_required
 def sync_erp_heures():
-    """Déclenche manuellement l'import des heures depuis l'ERP (semaine précédente ou choisie).
+    """Demande l'import des heures depuis l'ERP (semaine précédente ou choisie, ou exercice).
+
+    La synchro est enfilée et exécutée en arrière-plan par le planificateur
+    (services/erp/taches.py) : la route rend la main aussitôt et redirige vers
+    la page de suivi (progression puis rapport).
 
-    Bouton « Aperçu » (dry_run=1) : affiche le diff sans écrire en base, pour
-    que la RH valide avant d'écraser une saisie ERP existante.
+    Bouton « Aperçu » (dry_run=1) : le rapport liste le diff sans écrire en
+    base, pour que la RH valide avant d'écraser une saisie ERP existante.
     """
-    from services.erp.sync_heures import synchroniser_exercice, synchroniser_semaine
-    from services.erp.connexion import ErpNonConfigureError, erp_active
+    from services.erp.connexion import erp_active
+    from services.erp.scheduler import reveiller_taches_erp
+    from services.erp.taches import STATUT_EN_ATTENTE, creer_tache, executer_tache
 
     if not erp_active():
         flash("La connexion ERP n'est pas activée (ERP_DB_ENABLED non défini).", "error")
         return redirect(url_for("rh.heures_hebdo"))
 
-    depuis_exercice = request.form.get("depuis_debut_exercice") == "1"
     recalc = request.form.get("recalculer_rtt", "1") != "0"
     dry_run = request.form.get("dry_run") == "1"
-
-    try:
-        if depuis_exercice:
-            rapport = synchroniser_exercice(recalculer_rtt=recalc, dry_run=dry_run)
-        else:
-            semaine = (request.form.get("semaine_erp") or "").strip() or None
-            rapport = synchroniser_semaine(
-                semaine_erp=semaine, recalculer_rtt=recalc, dry_run=dry_run
-            )
-    except ErpNonConfigureError as e:
-        flash(str(e), "error")
-        return redirect(url_for("rh.heures_hebdo"))
-    except DbSaveError:
-        raise
-    except Exception as e:
-        flash(f"Erreur lors de la synchro ERP : {e}", "error")
-        return redirect(url_for("rh.heures_hebdo"))
-
-    if dry_run:
-        if depuis_exercice:
-            flash(
-                f"Aperçu exercice ({rapport.semaines[0]} → {rapport.semaines[-1]}) : "
-                f"{rapport.nb_importes} ligne(s) à importer.",
-                "info",
-            )
-        else:
-            flash(
-                f"Aperçu semaine {rapport.semaine_erp} : {rapport.nb_importes} ligne(s) à importer.",
-                "info",
-            )
-        for p in rapport.preview:
-            if p["action"] == "import":
-                anc = p.get("ancienne_valeur")
-                anc_str = f"{anc} h" if anc is not None else "nouveau"
-                semaine_info = p.get("semaine_erp", "")
-                prefixe = f"sem. {semaine_info} " if semaine_info else ""
-                flash(f"  {prefixe}matricule {p['matricule']} : {anc_str} → {p['heures_erp']} h", "info")
-        for w in rapport.avertissements:
-            flash(w, "warning")
-        if depuis_exercice:
-            return redirect(url_for("rh.heures_hebdo"))
-        return redirect(url_for("rh.heures_hebdo", lundi=rapport.date_lundi.isoformat()))
-
-    if depuis_exercice:
-        msg = (
-            f"ERP exercice ({rapport.semaines[0]} → {rapport.semaines[-1]}) : "
-            f"{rapport.nb_importes} lignes importées"
-            f"{', RTT recalculé' if rapport.rtt_recalcule else ''}."
+    if request.form.get("depuis_debut_exercice") == "1":
+        tache = creer_tache(
+            "exercice",
+            {"recalculer_rtt": recalc, "dry_run": dry_run, "complet": request.form.get("complet") == "1"},
+            demande_par_id=current_user.id,
         )
     else:
-        msg = (
-            f"ERP semaine {rapport.semaine_erp} : {rapport.nb_importes} lignes importées"
-            f"{', RTT recalculé' if rapport.rtt_recalcule else ''}."
+        semaine = (request.form.get("semaine_erp") or "").strip() or None
+        tache = creer_tache(
+            "semaine",
+            {"semaine_erp": semaine, "recalculer_rtt": recalc, "dry_run": dry_run},
+            demande_par_id=current_user.id,
         )
-    flash(msg, "success")
-    for w in rapport.avertissements:
-        flash(w, "warning")
 
-    if depuis_exercice:
-        return redirect(url_for("rh.heures_hebdo"))
-    # Redirige vers la semaine importée pour visualiser le résultat.
-    return redirect(url_for("rh.heures_hebdo", lundi=rapport.date_lundi.isoformat()))
+    if not reveiller_taches_erp() and tache.statut == STATUT_EN_ATTENTE:
+        # Pas de planificateur (flask run) : exécution immédiate, comme avant la file.
+        executer_tache(tache)
+    return redirect(url_for("rh.sync_erp_tache", tache_id=tache.id))
+
+
+def _resume_sync_erp(etat: dict) -> str | None:
+    """Message de bilan d'une synchro ERP terminée (ex-messages flash de la route)."""
+    r = etat["rapport"]
+    if not r:
+        return None
+    rtt = ", RTT recalculé" if r.get("rtt_recalcule") else ""
+    if etat["type_sync"] == "exercice":
+        if not r["semaines"]:
+            return None
+        periode = f"({r['semaines'][0]} → {r['semaines'][-1]})"
+        if r["dry_run"]:
+            return f"Aperçu exercice {periode} : {r['nb_importes']} ligne(s) à importer."
+        return (
+            f"ERP exercice {periode} : {len(r['semaines_modifiees'])} semaine(s) modifiée(s), "
+            f"{r['nb_importes']} lignes importées{rtt}."
+        )
+    if r["dry_run"]:
+        return f"Aperçu semaine {r['semaine_erp']} : {r['nb_importes']} ligne(s) à importer."
+    return f"ERP semaine {r['semaine_erp']} : {r['nb_importes']} lignes importées{rtt}."
+
+
+def _tache_sync_erp_ou_404(tache_id: int):
+    from flask import abort
+    from models.tache_sync_erp import TacheSyncErp
+
+    tache = db.session.get(TacheSyncErp, tache_id)
+    if tache is None:
+        abort(404)
+    return tache
+
+
+@rh_bp.route("/sync-erp-heures/taches/<int:tache_id>")
+@rh_required
+def sync_erp_tache(tache_id):
+    """Suivi d'une synchro ERP : progression (rafraîchie par le navigateur) puis rapport."""
+    from services.erp.taches import etat_tache
+
+    etat = etat_tache(_tache_sync_erp_ou_404(tache_id))
+    return render_template("rh/sync_erp_tache.html", tache=etat, resume=_resume_sync_erp(etat))
+
+
+@rh_bp.route("/sync-erp-heures/taches/<int:tache_id>/etat")
+@rh_required
+def sync_erp_tache_etat(tache_id):
+    """État JSON d'une synchro ERP (statut, progression, rapport) pour la page de suivi."""
+    from flask import jsonify
+    from services.erp.taches import etat_tache
+
+    return jsonify(etat_tache(_tache_sync_erp_ou_404(tache_id)))
 
 
 @rh_bp.route("/heures-hebdo", methods=["GET", "POST"])
@@ -1532,13 +1565,15 @@ def heures_hebdo():
     """
     from datetime import timedelta
     from services.rtt_hebdo import (
-        jours_absence_semaine,
+        jours_absence_semaine_lot,
         maj_rtt_allocations_hebdo,
+        recalculer_semaines,
         _lundi,
         seuil_hebdo_param,
         heures_par_jour_absence_param,
         types_absence_exclus_param,
     )
+    from services.saisie_heures import enregistrer_heures_manuelles
 
     param = get_parametrage_actif()
     if not param:
@@ -1559,35 +1594,39 @@ def heures_hebdo():
 
     if request.method == "POST":
         action = (request.form.get("action") or "save").strip() or "save"
-        saved_user_ids = []
+        valeurs = {}
 
         for s in salaries:
             hw_str = (request.form.get(f"u{s.id}_heures") or "").strip().replace(",", ".")
             if hw_str == "":
                 continue
             try:
-                heures = float(hw_str)
+                valeurs[(s.id, lundi)] = float(hw_str)
             except ValueError:
                 flash(f"Valeur invalide pour {s.prenom} {s.nom}.", "error")
                 return redirect(url_for("rh.heures_hebdo", lundi=lundi.isoformat()))
 
-            row = HeuresHebdo.query.filter_by(user_id=s.id, date_lundi=lundi).first()
-            if not row:
-                row = HeuresHebdo(user_id=s.id, date_lundi=lundi)
-                db.session.add(row)
-            row.heures_travaillees = round(max(0.0, heures), 2)
-            row.source = "manuel"
-            row.saisi_par_id = current_user.id
-            saved_user_ids.append(s.id)
-
+        # Saisies existantes lues en une requête, écriture groupée des seules cellules modifiées.
+        modifiees = enregistrer_heures_manuelles(valeurs, current_user.id)
+        # Seules les semaines saisies sont recalculées (allocation ajustée de l'écart).
+        recalculer_semaines(param, modifiees)
         db.session.commit()
-        flash("Heures hebdomadaires enregistrées." if saved_user_ids else "Aucune donnée à enregistrer.",
-              "success" if saved_user_ids else "info")
+        flash("Heures hebdomadaires enregistrées." if valeurs else "Aucune donnée à enregistrer.",
+              "success" if valeurs else "info")
 
+        # Recalcul complet (toutes semaines, tous salariés) : contrôle de cohérence.
         if action == "save_recalc":
+            from services.verrous import VERROU_HEURES_RTT, VerrouOccupeError, execution_unique
             try:
-                res = maj_rtt_allocations_hebdo(param)
-                flash(f"RTT recalculées pour {len(res)} salarié(s).", "success")
+                # Pas de second recalcul complet ni d'import ERP en parallèle (autre processus).
+                with execution_unique(VERROU_HEURES_RTT, "rtt_complet", attente_max=30) as execution:
+                    if execution.rejointe:
+                        flash("Recalcul RTT complet déjà en cours : terminé pendant l'attente.", "info")
+                    else:
+                        res = maj_rtt_allocations_hebdo(param)
+                        flash(f"RTT recalculées pour {len(res)} salarié(s).", "success")
+            except VerrouOccupeError:
+                flash("Une synchro ERP ou un recalcul RTT est en cours. Réessayez dans quelques minutes.", "warning")
             except DbSaveError:
                 raise
             except Exception:
@@ -1599,10 +1638,11 @@ def heures_hebdo():
     existing = HeuresHebdo.query.filter_by(date_lundi=lundi).all()
     by_user = {e.user_id: e for e in existing}
     exclus = types_absence_exclus_param(param)
-    absences = {s.id: jours_absence_semaine(s.id, lundi, exclus=exclus) for s in salaries}
+    absences = jours_absence_semaine_lot([s.id for s in salaries], lundi, exclus=exclus, param=param)
 
     from services.erp.connexion import erp_active
     from services.erp.scheduler import prochain_passage, scheduler_actif
+    from services.erp.telemetrie import PHASES, historique_sync_erp, tendances_sync_erp
 
     # Dernière synchro ERP : entrée la plus récente avec source='erp'.
     derniere_synchro_erp = (
@@ -1638,6 +1678,59 @@ def heures_hebdo():
         erp_prochain_passage_str=erp_prochain_passage_str,
         semaine_erp_courante=semaine_erp_courante,
         derniere_synchro_erp=derniere_synchro_erp,
+        erp_phases=PHASES,
+        erp_executions=historique_sync_erp(limite=8),
+        erp_tendances=tendances_sync_erp(),
+    )
+
+
+@rh_bp.route("/heures-hebdo/exercice", methods=["GET", "POST"])
+@rh_required
+def heures_hebdo_exercice():
+    """Grille annuelle des heures (salariés × semaines de l'exercice actif).
+
+    GET : grille chargée en quelques requêtes (cf. services/saisie_heures.grille_exercice).
+    POST (JSON ``{"cellules": [{"user_id", "lundi", "heures"}, ...]}``) : diff des
+    cellules modifiées, écrit en une transaction ; seules les semaines écrites
+    sont recalculées pour le RTT.
+    """
+    from flask import jsonify
+    from services.rtt_hebdo import recalculer_semaines, types_absence_exclus_param
+    from services.saisie_heures import enregistrer_heures_manuelles, grille_exercice, lire_cellules_grille, semaines_exercice
+
+    param = get_parametrage_actif()
+    if not param:
+        if request.method == "POST":
+            return jsonify({"error": "Aucun paramétrage actif."}), 400
+        flash("Aucun paramétrage actif. Configurez d'abord l'exercice.", "error")
+        return redirect(url_for("rh.parametrage"))
+
+    salaries = User.query.filter_by(actif=True).order_by(User.nom).all()
+
+    if request.method == "POST":
+        payload = request.get_json(silent=True) or {}
+        try:
+            valeurs = lire_cellules_grille(
+                payload.get("cellules"), [s.id for s in salaries], semaines_exercice(param),
+            )
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        modifiees = enregistrer_heures_manuelles(valeurs, current_user.id)
+        nb_semaines = recalculer_semaines(param, modifiees)
+        db.session.commit()
+        return jsonify({
+            "enregistrees": [{"user_id": uid, "lundi": l.isoformat()} for uid, l in modifiees],
+            "semaines_rtt": nb_semaines,
+        })
+
+    grille = grille_exercice(param, [s.id for s in salaries], types_absence_exclus_param(param))
+    return render_template(
+        "rh/heures_hebdo_exercice.html",
+        parametrage=param,
+        salaries=salaries,
+        semaines=grille["semaines"],
+        heures=grille["heures"],
+        absences=grille["absences"],
     )
 
 
@@ -6,6 +6,7 @@ from models import db
 from models.conge import Conge
 from models.user import User
 from services.solde import calculer_solde, get_allocation, get_parametrage_actif
+from services.conge_evenements import conge_modifie, etat_conge
 from services.export import export_conges_excel, export_conges_pdf
 
 salarie_bp = Blueprint("salarie", __name__)
@@ -38,6 +39,7 @@ def demander_conge():
             return render_template("salarie/demander_conge.html", solde=solde_info)
 
         db.session.add(result.conge)
+        conge_modifie(None, result.conge)
         db.session.commit()
 
         from services.notifications import (
@@ -91,7 +93,9 @@ def annuler_conge(conge_id):
     if conge.statut not in ("en_attente_responsable", "en_attente_rh"):
         flash("Seules les demandes en attente peuvent être annulées.", "warning")
         return redirect(url_for("salarie.accueil"))
+    etat_avant = etat_conge(conge)
     conge.statut = "annule"
+    conge_modifie(etat_avant, conge)
     db.session.commit()
     flash("Demande de congé annulée.", "success")
     return redirect(url_for("salarie.accueil"))
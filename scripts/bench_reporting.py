@@ -0,0 +1,136 @@
+"""Benchmark du reporting d'absentéisme (`services.reporting.generer_rapport`).
+
+Peuple une base SQLite en mémoire avec N salariés (un service pour 20) et Y années de
+congés validés (CP, RTT, maladie, ancienneté), puis chronomètre le rapport sur
+chaque année et sur la période complète : calcul depuis les congés, puis
+lecture du cube mensuel (services/absences_mensuelles.py) une fois calculé.
+
+Usage :
+
+    python scripts/bench_reporting.py                # 500 salariés × 5 ans
+    python scripts/bench_reporting.py --salaries 200 --annees 3 --repetitions 5
+
+Aucune base existante n'est touchée : l'URI est forcée sur ``sqlite:///:memory:``.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+# Permet de lancer le script depuis n'importe où en ajoutant la racine du projet au sys.path.
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+os.environ.setdefault("SECRET_KEY", "bench-reporting")
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+os.environ["SKIP_DB_CREATE_ALL"] = "1"
+
+TYPES = (("CP", 0.55), ("RTT", 0.25), ("Maladie", 0.15), ("Anciennete", 0.05))
+
+
+def _peupler(db, nb_salaries: int, annee_debut: int, nb_annees: int, graine: int) -> int:
+    from models.conge import Conge
+    from models.jour_ferie import JourFerie
+    from models.user import User
+    from services.calendrier_feries import invalider_calendrier_feries
+
+    rng = random.Random(graine)
+    nb_services = max(1, nb_salaries // 20)
+    db.session.execute(User.__table__.insert(), [
+        {"id": i + 1, "nom": f"Resp{i:02d}", "prenom": "Bench", "identifiant": f"resp{i}",
+         "mot_de_passe_hash": "-", "role": "responsable", "actif": True}
+        for i in range(nb_services)
+    ])
+    db.session.execute(User.__table__.insert(), [
+        {"id": nb_services + i + 1, "nom": f"Salarie{i:04d}", "prenom": "Bench",
+         "identifiant": f"sal{i}", "mot_de_passe_hash": "-", "role": "salarie",
+         "actif": i % 50 != 0, "responsable_id": i % nb_services + 1}
+        for i in range(nb_salaries)
+    ])
+    feries = []
+    for annee in range(annee_debut, annee_debut + nb_annees):
+        for mois, jour in ((1, 1), (5, 1), (5, 8), (7, 14), (8, 15), (11, 1), (11, 11), (12, 25)):
+            feries.append({"date_ferie": date(annee, mois, jour), "libelle": "Férié", "annee": annee})
+    db.session.execute(JourFerie.__table__.insert(), feries)
+
+    types, poids = zip(*TYPES)
+    lignes = []
+    premier = date(annee_debut, 1, 1)
+    nb_jours = (date(annee_debut + nb_annees, 1, 1) - premier).days
+    for uid in range(nb_services + 1, nb_services + nb_salaries + 1):
+        # ≈ 12 absences par an et par salarié, de 1 à 10 jours calendaires.
+        for _ in range(12 * nb_annees):
+            debut = premier + timedelta(days=rng.randrange(nb_jours))
+            type_conge = rng.choices(types, poids)[0]
+            lignes.append({
+                "user_id": uid, "date_debut": debut,
+                "date_fin": debut + timedelta(days=rng.randrange(10)),
+                "nb_jours_ouvrables": 1, "type_conge": type_conge,
+                "nb_heures_rtt": 7 if type_conge == "RTT" else 0, "statut": "valide",
+            })
+    db.session.execute(Conge.__table__.insert(), lignes)
+    db.session.commit()
+    invalider_calendrier_feries()
+    return len(lignes)
+
+
+def _chrono(fonction, repetitions: int) -> float:
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        fonction()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return meilleur
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--salaries", type=int, default=500)
+    parser.add_argument("--annees", type=int, default=5)
+    parser.add_argument("--annee-debut", type=int, default=2022)
+    parser.add_argument("--repetitions", type=int, default=3)
+    parser.add_argument("--graine", type=int, default=42)
+    args = parser.parse_args()
+
+    from app import create_app
+    from models import db
+    from services.absences_mensuelles import reconstruire_absences_mensuelles
+    from services.reporting import generer_rapport
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        t0 = time.perf_counter()
+        nb_conges = _peupler(db, args.salaries, args.annee_debut, args.annees, args.graine)
+        print(f"Base : {args.salaries} salariés, {nb_conges} congés sur {args.annees} an(s) "
+              f"(peuplement {time.perf_counter() - t0:.1f} s)")
+
+        debut_total = date(args.annee_debut, 1, 1)
+        fin_total = date(args.annee_debut + args.annees - 1, 12, 31)
+        t0 = time.perf_counter()
+        nb_mois = reconstruire_absences_mensuelles(debut_total, fin_total)
+        db.session.commit()
+        print(f"Cube mensuel : {nb_mois} mois calculés en {time.perf_counter() - t0:.1f} s")
+
+        periodes = [
+            (str(a), date(a, 1, 1), date(a, 12, 31))
+            for a in range(args.annee_debut, args.annee_debut + args.annees)
+        ]
+        periodes.append(("complet", debut_total, fin_total))
+        periodes.append(("partiel", date(args.annee_debut, 3, 15), date(args.annee_debut + 1, 9, 10)))
+        print(f"  {'période':>8} : {'congés':>12} {'cube':>12}")
+        for libelle, debut, fin in periodes:
+            rapport = generer_rapport(debut, fin)
+            brut = _chrono(lambda: generer_rapport(debut, fin, utiliser_cube=False), args.repetitions)
+            cube = _chrono(lambda: generer_rapport(debut, fin), args.repetitions)
+            nb = sum(s.nb_conges for s in rapport.par_type)
+            print(f"  {libelle:>8} : {brut * 1000:9.1f} ms {cube * 1000:9.1f} ms  "
+                  f"({nb} congés, taux {rapport.taux_absenteisme_global} %)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""Benchmark du noyau RTT hebdomadaire (`services.rtt_hebdo.calculer_rtt_semaines_lot`).
+
+Compare, sur N salariés × S semaines tirés au hasard (heures, jours d'absence),
+la boucle historique — une fonction scalaire appelée par semaine, totaux
+cumulés par salarié — au noyau en lot (tableaux parallèles, une passe), et
+vérifie que les résultats sont identiques au centième près.
+
+Usage :
+
+    python scripts/bench_rtt.py                      # 500 salariés × 52 semaines
+    python scripts/bench_rtt.py --salaries 1000 --semaines 104 --repetitions 10
+
+Aucune base n'est utilisée.
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+# Permet de lancer le script depuis n'importe où en ajoutant la racine du projet au sys.path.
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+
+def _rtt_semaine_scalaire(heures_reelles, jours_absence, seuil_hebdo, heures_par_jour, coef):
+    """`calculer_rtt_semaine` avant le noyau en lot (référence)."""
+    seuil_ajuste = max(0.0, float(seuil_hebdo) - float(jours_absence) * float(heures_par_jour))
+    surplus = max(0.0, float(heures_reelles) - seuil_ajuste)
+    return round(surplus * float(coef), 2)
+
+
+def _boucle(user_ids, heures, absences, seuil, heures_jour, coef):
+    rtt = []
+    totaux = {}
+    for uid, h, j in zip(user_ids, heures, absences):
+        r = _rtt_semaine_scalaire(h, j, seuil, heures_jour, coef)
+        rtt.append(r)
+        totaux[uid] = totaux.get(uid, 0.0) + r
+    return rtt, {uid: round(t, 2) for uid, t in totaux.items()}
+
+
+def _chrono(fonction, repetitions: int) -> float:
+    meilleur = float("inf")
+    for _ in range(repetitions):
+        t0 = time.perf_counter()
+        fonction()
+        meilleur = min(meilleur, time.perf_counter() - t0)
+    return meilleur
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--salaries", type=int, default=500)
+    parser.add_argument("--semaines", type=int, default=52)
+    parser.add_argument("--repetitions", type=int, default=20)
+    parser.add_argument("--graine", type=int, default=42)
+    args = parser.parse_args()
+
+    from services.rtt_hebdo import calculer_rtt_semaines_lot
+
+    rng = random.Random(args.graine)
+    user_ids, heures, absences = [], [], []
+    for uid in range(1, args.salaries + 1):
+        for _ in range(args.semaines):
+            user_ids.append(uid)
+            absences.append(rng.choices((0.0, 0.5, 1.0, 2.0, 5.0), (80, 5, 8, 4, 3))[0])
+            heures.append(round(rng.uniform(0, 45), 2) if absences[-1] < 5 else 0.0)
+    seuil, heures_jour, coef = 34.65, 7.0, 1.0
+    print(f"{args.salaries} salariés × {args.semaines} semaines = {len(heures)} semaines")
+
+    rtt_boucle, totaux_boucle = _boucle(user_ids, heures, absences, seuil, heures_jour, coef)
+    lot = calculer_rtt_semaines_lot(heures, absences, seuil, heures_jour, coef, user_ids=user_ids)
+    if lot.rtt != rtt_boucle or lot.totaux != totaux_boucle:
+        print("ÉCART entre la boucle et le noyau en lot !")
+        return 1
+
+    boucle = _chrono(lambda: _boucle(user_ids, heures, absences, seuil, heures_jour, coef), args.repetitions)
+    noyau = _chrono(
+        lambda: calculer_rtt_semaines_lot(heures, absences, seuil, heures_jour, coef, user_ids=user_ids),
+        args.repetitions,
+    )
+    print(f"  boucle par semaine : {boucle * 1000:8.2f} ms")
+    print(f"  noyau en lot       : {noyau * 1000:8.2f} ms  (× {boucle / noyau:.1f})")
+    print(f"  résultats identiques ({sum(lot.totaux.values()):.2f} h RTT au total)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,141 @@
+"""Benchmark de la synchro ERP → heures_hebdo sur un ERP de substitution.
+
+Génère une base TEMPAS / SALARIES SQLite (services/erp/simulateur.py) de N
+salariés × les semaines d'un exercice, peuple une base applicative SQLite en
+mémoire avec les salariés correspondants (matricules, allocations), puis
+chronomètre de bout en bout :
+
+  1. extraction seule (`heures_periode` sur tout l'exercice) ;
+  2. synchro complète de l'exercice sans RTT (extraction + import) ;
+  3. recalcul RTT des semaines importées (`recalculer_semaines`) ;
+  4. nouvelle synchro sans changement (empreintes seules) ;
+  5. synchro après modification d'une semaine dans TEMPAS.
+
+Usage :
+
+    python scripts/bench_sync_erp.py                       # 200 salariés × exercice 2026
+    python scripts/bench_sync_erp.py --salaries 500 --paralleles 3
+    python scripts/bench_sync_erp.py --base-erp /tmp/tempas.sqlite   # garde la base générée
+
+Aucune base existante n'est touchée : l'URI applicative est forcée sur
+``sqlite:///:memory:`` et la base ERP est créée dans un répertoire temporaire
+(sauf ``--base-erp``).
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+# Permet de lancer le script depuis n'importe où en ajoutant la racine du projet au sys.path.
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+
+os.environ.setdefault("SECRET_KEY", "bench-sync-erp")
+os.environ["SQLALCHEMY_DATABASE_URI"] = "sqlite:///:memory:"
+os.environ["SKIP_DB_CREATE_ALL"] = "1"
+
+
+def _peupler(db, nb_salaries: int, annee: int):
+    from models.parametrage import AllocationConge, ParametrageAnnuel
+    from models.user import User
+
+    param = ParametrageAnnuel(
+        debut_exercice=date(annee, 1, 1), fin_exercice=date(annee, 12, 31),
+        jours_conges_defaut=25, rtt_coef_surplus=1.0, actif=True,
+    )
+    db.session.add(param)
+    db.session.flush()
+    db.session.execute(User.__table__.insert(), [
+        {"id": i + 1, "nom": f"SALARIE{i:05d}", "prenom": "Bench", "identifiant": f"sal{i}",
+         "mot_de_passe_hash": "-", "role": "salarie", "actif": True, "matricule": f"{i + 1:06d}"}
+        for i in range(nb_salaries)
+    ])
+    db.session.execute(AllocationConge.__table__.insert(), [
+        {"user_id": i + 1, "parametrage_id": param.id, "jours_alloues": 25, "jours_anciennete": 0,
+         "jours_report": 0, "rtt_heures_allouees": 0, "rtt_heures_reportees": 0}
+        for i in range(nb_salaries)
+    ])
+    db.session.commit()
+    return param
+
+
+def _chrono(libelle: str, fonction):
+    t0 = time.perf_counter()
+    resultat = fonction()
+    print(f"  {libelle:<42} : {(time.perf_counter() - t0) * 1000:9.1f} ms")
+    return resultat
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--salaries", type=int, default=200)
+    parser.add_argument("--annee", type=int, default=2026)
+    parser.add_argument("--paralleles", type=int, default=1,
+                        help="Requêtes TEMPAS simultanées (synchro exercice).")
+    parser.add_argument("--graine", type=int, default=42)
+    parser.add_argument("--base-erp", default=None, help="Chemin de la base ERP générée (conservée).")
+    args = parser.parse_args()
+
+    repertoire = tempfile.TemporaryDirectory()
+    chemin_erp = args.base_erp or os.path.join(repertoire.name, "erp.sqlite")
+    os.environ["ERP_DB_ENABLED"] = "true"
+    os.environ["ERP_DB_SIMULATEUR"] = chemin_erp
+    os.environ["ERP_POOL_TAILLE"] = str(max(2, args.paralleles + 1))
+
+    from app import create_app
+    from models import db
+    from services.erp.connexion import erp_connexion, fermer_pool_erp
+    from services.erp.requetes import heures_periode
+    from services.erp.simulateur import generer_base_simulateur
+    from services.erp.sync_heures import _semaines_erp_exercice, synchroniser_exercice
+    from services.rtt_hebdo import recalculer_semaines
+
+    premier_lundi = date(args.annee, 1, 1) - timedelta(days=date(args.annee, 1, 1).weekday())
+    fin = date(args.annee, 12, 31)
+    nb_semaines = (fin - premier_lundi).days // 7 + 1
+
+    t0 = time.perf_counter()
+    nb_lignes = generer_base_simulateur(chemin_erp, args.salaries, nb_semaines, premier_lundi, args.graine)
+    print(f"ERP simulé : {args.salaries} salariés × {nb_semaines} semaines, {nb_lignes} lignes TEMPAS "
+          f"({time.perf_counter() - t0:.1f} s)")
+
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        param = _peupler(db, args.salaries, args.annee)
+        semaines = _semaines_erp_exercice(param, jusqu_a=fin)
+
+        def _extraire():
+            with erp_connexion() as conn:
+                return heures_periode(conn, semaines)
+
+        def _synchro(**kwargs):
+            return synchroniser_exercice(recalculer_rtt=False, jusqu_a=fin, paralleles=args.paralleles, **kwargs)
+
+        lignes = _chrono("extraction (heures_periode)", _extraire)
+        rapport = _chrono("synchro exercice (extraction + import)", lambda: _synchro(complet=True))
+        _chrono("recalcul RTT des semaines importées",
+                lambda: (recalculer_semaines(param, rapport.semaines_importees, jusqu_a=fin), db.session.commit()))
+        inchange = _chrono("synchro sans changement (empreintes)", _synchro)
+
+        conn_erp = sqlite3.connect(chemin_erp)
+        conn_erp.execute("UPDATE TEMPAS SET BECNREALIS = BECNREALIS + 0.5 WHERE rowid IN "
+                         "(SELECT rowid FROM TEMPAS WHERE BECSSAREAL = ? LIMIT 10)", (semaines[10],))
+        conn_erp.commit()
+        conn_erp.close()
+        modifie = _chrono("synchro après modification d'une semaine", _synchro)
+
+        print(f"  {len(lignes)} lignes agrégées, {rapport.nb_importes} heures importées ; "
+              f"sans changement : {len(inchange.semaines_modifiees)} semaine(s) relue(s) ; "
+              f"après modification : {modifie.semaines_modifiees}")
+        fermer_pool_erp()
+    repertoire.cleanup()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+"""Absences jour par jour d'un salarié sur un exercice, en bitmap compact (cache processus).
+
+Le calcul RTT et l'écran de saisie hebdomadaire reconstruisaient chacun un
+dict ``{date: fraction}`` en parcourant chaque congé jour par jour, avec les
+règles de demi-journée et les fériés réévalués à chaque fois. Ici, chaque jour
+de l'exercice occupe deux bits d'un ``bytearray`` (quatre jours par octet) :
+le nombre de demi-journées ouvrables d'absence, 0, 1 ou 2 (plafonné, comme le
+cumul à 1 jour par date du calcul historique). Un exercice tient en 92 octets
+par salarié ; les règles de bordure ne sont appliquées qu'à la construction.
+
+Cache : par exercice ``(debut, fin, types exclus)``, le bitmap de chaque
+salarié déjà lu (vide s'il n'a aucun congé), chargé en une requête pour un lot
+de salariés.
+
+Invalidation :
+- toute écriture ORM sur `Conge` oublie les bitmaps du salarié au flush, puis
+  de nouveau au commit ou au rollback de la session (une lecture concurrente
+  entre les deux a pu remettre l'ancien état en cache) ;
+- les fériés : un bitmap construit avec un autre index des jours ouvrables
+  (`index_jours_ouvres`, reconstruit après chaque modification des fériés)
+  est périmé et le cache est vidé à la lecture suivante.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass, field
+from datetime import date, timedelta
+
+from sqlalchemy import event, inspect as sa_inspect
+from sqlalchemy.orm import Session, object_session
+
+from models import db
+from models.conge import DEMI_APRES_MIDI, DEMI_MATIN, Conge
+from services.calendrier_feries import index_jours_ouvres
+
+# Exercices gardés en cache (l'actif, le précédent, quelques variantes d'exclusions).
+_NB_EXERCICES_MAX = 8
+# Clé de `Session.info` : salariés dont un congé a été écrit dans la transaction.
+_CLE_SESSION = "absences_bitmap_a_invalider"
+
+
+class BitmapAbsences:
+    """Demi-journées d'absence de chaque jour de ``[debut, fin]``, deux bits par jour."""
+
+    __slots__ = ("debut", "fin", "nb_conges", "_bits")
+
+    def __init__(self, debut: date, fin: date):
+        self.debut = debut
+        self.fin = fin
+        self.nb_conges = 0
+        self._bits = bytearray(((fin - debut).days + 4) // 4)
+
+    def __len__(self) -> int:
+        return (self.fin - self.debut).days + 1
+
+    @property
+    def taille_octets(self) -> int:
+        return len(self._bits)
+
+    def _lire(self, i: int) -> int:
+        return (self._bits[i >> 2] >> ((i & 3) << 1)) & 3
+
+    def _ajouter(self, i: int, demi_journees: int) -> None:
+        octet, decalage = i >> 2, (i & 3) << 1
+        valeur = min(2, ((self._bits[octet] >> decalage) & 3) + demi_journees)
+        self._bits[octet] = (self._bits[octet] & ~(3 << decalage)) | (valeur << decalage)
+
+    def ajouter_conge(self, date_debut: date, date_fin: date, demi_debut=None, demi_fin=None, index=None) -> None:
+        """Marque les jours ouvrables d'un congé (mêmes règles que le calcul ouvrable).
+
+        Un mono-jour avec une demi-journée vaut une demi-journée ; en multi-jours,
+        ``demi_debut="apres_midi"`` et ``demi_fin="matin"`` retirent chacun une
+        demi-journée à la bordure concernée.
+        """
+        index = index or index_jours_ouvres()
+        self.nb_conges += 1
+        premier = max(date_debut, self.debut)
+        dernier = min(date_fin, self.fin)
+        if dernier < premier:
+            return
+        i0 = (premier - self.debut).days
+        for k in range((dernier - premier).days + 1):
+            jour = premier + timedelta(days=k)
+            if not index.est_ouvre(jour):
+                continue
+            demi = 2
+            if date_debut == date_fin:
+                if demi_debut or demi_fin:
+                    demi = 1
+            elif jour == date_debut and demi_debut == DEMI_APRES_MIDI:
+                demi = 1
+            elif jour == date_fin and demi_fin == DEMI_MATIN:
+                demi = 1
+            self._ajouter(i0 + k, demi)
+
+    def demi_journees(self, d: date) -> int:
+        """0, 1 ou 2 demi-journées d'absence le jour ``d`` (0 hors de l'exercice)."""
+        if d < self.debut or d > self.fin:
+            return 0
+        return self._lire((d - self.debut).days)
+
+    def jours(self, date_debut: date, date_fin: date) -> float:
+        """Jours d'absence (par demi-journées) dans ``[date_debut, date_fin]`` ∩ exercice."""
+        a = (max(date_debut, self.debut) - self.debut).days
+        b = (min(date_fin, self.fin) - self.debut).days
+        return sum(self._lire(i) for i in range(a, b + 1)) / 2
+
+    def jours_par_semaine(self) -> dict[date, float]:
+        """``{lundi: jours d'absence}`` des seules semaines ayant une absence."""
+        semaines: dict[date, float] = {}
+        decalage_lundi = self.debut.weekday()
+        for o, octet in enumerate(self._bits):
+            if not octet:
+                continue
+            for k in range(4):
+                demi = (octet >> (k << 1)) & 3
+                if demi:
+                    i = (o << 2) + k
+                    lundi = self.debut + timedelta(days=i - (i + decalage_lundi) % 7)
+                    semaines[lundi] = semaines.get(lundi, 0.0) + demi / 2
+        return semaines
+
+    def fractions(self) -> dict[date, float]:
+        """``{date: 0,5 ou 1,0}`` des jours d'absence (forme historique du calcul RTT)."""
+        return {
+            self.debut + timedelta(days=(o << 2) + k): demi / 2
+            for o, octet in enumerate(self._bits) if octet
+            for k in range(4) if (demi := (octet >> (k << 1)) & 3)
+        }
+
+
+@dataclass
+class _Exercice:
+    bitmaps: dict[int, BitmapAbsences] = field(default_factory=dict)
+    complet: bool = False  # tous les salariés ayant un congé sur l'exercice sont chargés
+    perimes: set[int] = field(default_factory=set)  # salariés à recharger si complet
+
+
+_verrou = threading.Lock()
+# {(debut, fin, types exclus): _Exercice}, dans l'ordre d'insertion.
+_exercices: dict[tuple, _Exercice] = {}
+_index_cache = None  # index des jours ouvrables avec lequel les bitmaps ont été construits
+# Incrémentée à chaque invalidation : un chargement commencé avant n'est pas gardé.
+_generation = 0
+_stats = {"hits": 0, "misses": 0}
+
+
+def invalider_absences_bitmap(user_ids=None) -> None:
+    """Oublie les bitmaps des salariés donnés (tous si ``user_ids`` est None)."""
+    global _generation
+    with _verrou:
+        _generation += 1
+        if user_ids is None:
+            _exercices.clear()
+            return
+        for exercice in _exercices.values():
+            for uid in user_ids:
+                exercice.bitmaps.pop(uid, None)
+                if exercice.complet:
+                    exercice.perimes.add(uid)
+
+
+def statistiques_absences_bitmap() -> dict:
+    """Compteurs du processus et taille du cache (``bitmaps``, ``octets``)."""
+    with _verrou:
+        stats = dict(_stats)
+        bitmaps = [b for e in _exercices.values() for b in e.bitmaps.values()]
+    stats["exercices"] = len(_exercices)
+    stats["bitmaps"] = len(bitmaps)
+    stats["octets"] = sum(b.taille_octets for b in bitmaps)
+    return stats
+
+
+def _requete(debut: date, fin: date, exclus, user_ids=None):
+    q = db.session.query(
+        Conge.user_id, Conge.date_debut, Conge.date_fin,
+        Conge.demi_journee_debut, Conge.demi_journee_fin,
+    ).filter(
+        Conge.statut == "valide",
+        Conge.date_debut <= fin,
+        Conge.date_fin >= debut,
+    )
+    if exclus:
+        q = q.filter(~Conge.type_conge.in_(sorted(exclus)))
+    if user_ids is not None:
+        q = q.filter(Conge.user_id.in_(list(user_ids)))
+    return q
+
+
+def _construire(debut: date, fin: date, exclus, user_ids=None) -> dict[int, BitmapAbsences]:
+    """Bitmaps des salariés ayant un congé validé sur ``[debut, fin]`` (une requête)."""
+    index = index_jours_ouvres()
+    bitmaps: dict[int, BitmapAbsences] = {}
+    for uid, date_debut, date_fin, demi_debut, demi_fin in _requete(debut, fin, exclus, user_ids):
+        bitmap = bitmaps.get(uid)
+        if bitmap is None:
+            bitmap = bitmaps[uid] = BitmapAbsences(debut, fin)
+        bitmap.ajouter_conge(date_debut, date_fin, demi_debut, demi_fin, index=index)
+    return bitmaps
+
+
+def absences_periode(user_ids, debut: date, fin: date, exclus=()) -> dict[int, BitmapAbsences]:
+    """Bitmaps d'une période quelconque, hors cache (p.ex. semaine à cheval sur deux
+    exercices) : un par salarié demandé, en une requête."""
+    user_ids = list(user_ids)
+    bitmaps = _construire(debut, fin, exclus, user_ids)
+    return {uid: bitmaps.get(uid) or BitmapAbsences(debut, fin) for uid in user_ids}
+
+
+def _exercice(cle: tuple) -> _Exercice:
+    """Entrée du cache pour ``cle`` (sous verrou) ; vide le cache si les fériés ont changé."""
+    global _index_cache, _generation
+    index = index_jours_ouvres()
+    if index is not _index_cache:
+        _exercices.clear()
+        _index_cache = index
+        _generation += 1
+    exercice = _exercices.get(cle)
+    if exercice is None:
+        while len(_exercices) >= _NB_EXERCICES_MAX:
+            del _exercices[next(iter(_exercices))]
+        exercice = _exercices[cle] = _Exercice()
+    return exercice
+
+
+def bitmaps_absences(debut: date, fin: date, exclus=(), user_ids=None) -> dict[int, BitmapAbsences]:
+    """Bitmaps de l'exercice ``[debut, fin]`` (congés validés hors types ``exclus``).
+
+    Avec ``user_ids`` : un bitmap (éventuellement vide) par salarié demandé.
+    Sans : les salariés ayant au moins un congé validé chevauchant l'exercice.
+    Les salariés absents du cache sont chargés en une seule requête.
+    """
+    cle = (debut, fin, frozenset(exclus or ()))
+    if user_ids is not None:
+        user_ids = list(user_ids)
+    with _verrou:
+        exercice = _exercice(cle)
+        if user_ids is not None:
+            manquants = [uid for uid in user_ids if uid not in exercice.bitmaps]
+        elif exercice.complet:
+            manquants = list(exercice.perimes)
+        else:
+            manquants = None  # tout l'exercice à charger
+        resultat = dict(exercice.bitmaps)
+        generation = _generation
+        _stats["hits" if manquants == [] else "misses"] += 1
+
+    if manquants != []:
+        charges = _construire(debut, fin, cle[2], manquants)
+        for uid in manquants or ():
+            charges.setdefault(uid, BitmapAbsences(debut, fin))
+        if manquants is None:
+            resultat = charges
+        else:
+            resultat.update(charges)
+        with _verrou:
+            # Une invalidation pendant le chargement : on rend ce qui vient
+            # d'être lu sans le garder pour les lectures suivantes.
+            exercice = _exercice(cle)
+            if generation == _generation:
+                exercice.bitmaps.update(charges)
+                if manquants is None:
+                    exercice.complet = True
+                    exercice.perimes.clear()
+                else:
+                    exercice.perimes.difference_update(manquants)
+
+    if user_ids is not None:
+        return {uid: resultat[uid] for uid in user_ids}
+    return {uid: b for uid, b in resultat.items() if b.nb_conges}
+
+
+def bitmap_absences(user_id: int, debut: date, fin: date, exclus=()) -> BitmapAbsences:
+    """Bitmap d'un salarié sur l'exercice ``[debut, fin]`` (voir `bitmaps_absences`)."""
+    return bitmaps_absences(debut, fin, exclus, [user_id])[user_id]
+
+
+def _valeur_avant(etat, attribut):
+    historique = etat.attrs[attribut].history
+    if historique.deleted:
+        return historique.deleted[0]
+    return getattr(etat.object, attribut)
+
+
+_CHAMPS_ABSENCE = (
+    "statut", "date_debut", "date_fin", "demi_journee_debut", "demi_journee_fin", "type_conge", "user_id",
+)
+
+
+def _noter(target, user_ids: set) -> None:
+    invalider_absences_bitmap(user_ids)
+    session = object_session(target)
+    if session is not None:
+        session.info.setdefault(_CLE_SESSION, set()).update(user_ids)
+
+
+@event.listens_for(Conge, "after_insert")
+@event.listens_for(Conge, "after_delete")
+def _invalider_conge(mapper, connection, target):
+    _noter(target, {target.user_id})
+
+
+@event.listens_for(Conge, "after_update")
+def _invalider_conge_modifie(mapper, connection, target):
+    etat = sa_inspect(target)
+    if any(etat.attrs[c].history.has_changes() for c in _CHAMPS_ABSENCE):
+        _noter(target, {target.user_id, _valeur_avant(etat, "user_id")})
+
+
+@event.listens_for(Session, "after_commit")
+@event.listens_for(Session, "after_rollback")
+def _invalider_fin_transaction(session):
+    user_ids = session.info.pop(_CLE_SESSION, None)
+    if user_ids:
+        invalider_absences_bitmap(user_ids)
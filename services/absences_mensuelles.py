@@ -0,0 +1,211 @@
+"""Cube mensuel des absences validées (table ``absences_mensuelles``).
+
+Pré-agrège, par (mois, salarié, type de congé), ce que `generer_rapport`
+calcule depuis les congés : jours ouvrables, heures RTT au prorata, nombre de
+congés qui chevauchent le mois / qui y commencent. Le reporting somme ces
+lignes pour les mois entiers couverts (``absences_mensuelles_mois``) et ne
+relit les congés que pour les mois partiels ou non couverts.
+
+Mise à jour :
+- dans la transaction de chaque changement de congé validé (avant ou après),
+  via services/conge_evenements.py : les mois touchés sont recalculés ;
+- filet de sécurité : toute autre écriture ORM d'un congé validé ou d'un jour
+  férié retire les mois concernés de la couverture ;
+- `reconstruire_absences_mensuelles` (job nocturne, `flask absences-mensuelles`)
+  recalcule les mois non couverts.
+"""
+from __future__ import annotations
+
+from datetime import date, datetime, timedelta, timezone
+
+from sqlalchemy import and_, event, inspect as sa_inspect, or_
+
+from models import db
+from models.absence_mensuelle import AbsenceMensuelle, AbsenceMoisCalcule
+from models.conge import Conge
+from models.jour_ferie import JourFerie
+from models.parametrage import ParametrageAnnuel
+from services.calendrier_feries import index_jours_ouvres
+from services.consommation import STATUT_VALIDE
+
+# Mois recalculés par requête de congés lors d'une reconstruction.
+_MOIS_PAR_LOT = 12
+
+
+def premier_du_mois(d: date) -> date:
+    return d.replace(day=1)
+
+
+def mois_suivant(mois: date) -> date:
+    if mois.month == 12:
+        return date(mois.year + 1, 1, 1)
+    return date(mois.year, mois.month + 1, 1)
+
+
+def fin_du_mois(mois: date) -> date:
+    return mois_suivant(mois) - timedelta(days=1)
+
+
+def mois_entre(date_debut: date, date_fin: date) -> list[date]:
+    """1ers jours des mois qui chevauchent [date_debut, date_fin]."""
+    mois = []
+    m = premier_du_mois(date_debut)
+    while m <= date_fin:
+        mois.append(m)
+        m = mois_suivant(m)
+    return mois
+
+
+def mois_couverts(date_debut: date, date_fin: date) -> set[date]:
+    """Mois de [date_debut, date_fin] dont le cube est complet."""
+    return {
+        m for (m,) in db.session.query(AbsenceMoisCalcule.mois).filter(
+            AbsenceMoisCalcule.mois >= premier_du_mois(date_debut),
+            AbsenceMoisCalcule.mois <= date_fin,
+        )
+    }
+
+
+def _segments(mois: list[date]) -> list[tuple[date, date]]:
+    """Regroupe des mois triés en plages de dates contiguës."""
+    segments: list[tuple[date, date]] = []
+    for m in mois:
+        if segments and segments[-1][1] + timedelta(days=1) == m:
+            segments[-1] = (segments[-1][0], fin_du_mois(m))
+        else:
+            segments.append((m, fin_du_mois(m)))
+    return segments
+
+
+def _filtre_chevauchement(mois: list[date]):
+    """Clause SQL : congé qui chevauche au moins un des mois (triés)."""
+    return or_(*(
+        and_(Conge.date_debut <= fin, Conge.date_fin >= debut)
+        for debut, fin in _segments(mois)
+    ))
+
+
+def _agreger(conges, mois_cibles: set[date]) -> dict[tuple[date, int, str], list]:
+    """{(mois, user_id, type): [nb_conges, nb_debutes, nb_jours, nb_heures_rtt]}."""
+    index = index_jours_ouvres()
+    cube: dict[tuple[date, int, str], list] = {}
+    for user_id, type_conge, date_debut, date_fin, nb_heures_rtt in conges:
+        cle_type = type_conge or "Autre"
+        jours_total = max(1, index.compter(date_debut, date_fin)) if type_conge == "RTT" else 1
+        for m in mois_entre(date_debut, date_fin):
+            if m not in mois_cibles:
+                continue
+            jours = index.compter(max(date_debut, m), min(date_fin, fin_du_mois(m)))
+            ligne = cube.get((m, user_id, cle_type))
+            if ligne is None:
+                ligne = cube[(m, user_id, cle_type)] = [0, 0, 0.0, 0.0]
+            ligne[0] += 1
+            ligne[1] += date_debut >= m
+            ligne[2] += jours
+            if type_conge == "RTT":
+                ligne[3] += float(nb_heures_rtt or 0) * jours / jours_total
+    return cube
+
+
+def rafraichir_mois(mois) -> None:
+    """Recalcule le cube des mois donnés depuis les congés validés et les marque couverts.
+
+    Ne commit pas : le caller décide.
+    """
+    mois = sorted({premier_du_mois(m) for m in mois})
+    if not mois:
+        return
+    # Les écritures de congé en attente passent d'abord (et déclenchent le filet).
+    db.session.flush()
+    conges = db.session.query(
+        Conge.user_id, Conge.type_conge, Conge.date_debut, Conge.date_fin, Conge.nb_heures_rtt,
+    ).filter(Conge.statut == STATUT_VALIDE, _filtre_chevauchement(mois)).all()
+    cube = _agreger(conges, set(mois))
+
+    table = AbsenceMensuelle.__table__
+    couverture = AbsenceMoisCalcule.__table__
+    db.session.execute(table.delete().where(table.c.mois.in_(mois)))
+    db.session.execute(couverture.delete().where(couverture.c.mois.in_(mois)))
+    if cube:
+        db.session.execute(table.insert(), [
+            {
+                "mois": m, "user_id": user_id, "type_conge": type_conge,
+                "nb_conges": nb_conges, "nb_debutes": nb_debutes,
+                "nb_jours": float(nb_jours), "nb_heures_rtt": nb_heures_rtt,
+            }
+            for (m, user_id, type_conge), (nb_conges, nb_debutes, nb_jours, nb_heures_rtt) in cube.items()
+        ])
+    maintenant = datetime.now(timezone.utc)
+    db.session.execute(couverture.insert(), [{"mois": m, "calcule_le": maintenant} for m in mois])
+
+
+def reconstruire_absences_mensuelles(date_debut: date | None = None, date_fin: date | None = None,
+                                     seulement_manquants: bool = True) -> int:
+    """Recalcule le cube sur [date_debut, date_fin] (par défaut : tous les exercices).
+
+    ``seulement_manquants`` : ne traite que les mois non couverts. Renvoie le
+    nombre de mois recalculés. Ne commit pas.
+    """
+    if date_debut is None or date_fin is None:
+        bornes = db.session.query(
+            db.func.min(ParametrageAnnuel.debut_exercice), db.func.max(ParametrageAnnuel.fin_exercice),
+        ).one()
+        date_debut = date_debut or bornes[0]
+        date_fin = date_fin or bornes[1]
+        if date_debut is None or date_fin is None:
+            return 0
+    mois = mois_entre(date_debut, date_fin)
+    if seulement_manquants:
+        deja = mois_couverts(date_debut, date_fin)
+        mois = [m for m in mois if m not in deja]
+    for i in range(0, len(mois), _MOIS_PAR_LOT):
+        rafraichir_mois(mois[i:i + _MOIS_PAR_LOT])
+    return len(mois)
+
+
+def _retirer_couverture(connection, mois) -> None:
+    mois = sorted(set(mois))
+    if not mois:
+        return
+    table = AbsenceMensuelle.__table__
+    couverture = AbsenceMoisCalcule.__table__
+    connection.execute(couverture.delete().where(couverture.c.mois.in_(mois)))
+    connection.execute(table.delete().where(table.c.mois.in_(mois)))
+
+
+def _valeur_avant(etat, attribut):
+    historique = etat.attrs[attribut].history
+    if historique.deleted:
+        return historique.deleted[0]
+    return getattr(etat.object, attribut)
+
+
+@event.listens_for(Conge, "after_insert")
+@event.listens_for(Conge, "after_delete")
+def _invalider_mois_conge(mapper, connection, target):
+    if target.statut == STATUT_VALIDE and target.date_debut and target.date_fin:
+        _retirer_couverture(connection, mois_entre(target.date_debut, target.date_fin))
+
+
+@event.listens_for(Conge, "after_update")
+def _invalider_mois_conge_modifie(mapper, connection, target):
+    etat = sa_inspect(target)
+    champs = ("statut", "date_debut", "date_fin", "type_conge", "nb_heures_rtt", "user_id")
+    if not any(etat.attrs[c].history.has_changes() for c in champs):
+        return
+    mois = set()
+    for statut, debut, fin in (
+        (_valeur_avant(etat, "statut"), _valeur_avant(etat, "date_debut"), _valeur_avant(etat, "date_fin")),
+        (target.statut, target.date_debut, target.date_fin),
+    ):
+        if statut == STATUT_VALIDE and debut and fin:
+            mois.update(mois_entre(debut, fin))
+    _retirer_couverture(connection, mois)
+
+
+@event.listens_for(JourFerie, "after_insert")
+@event.listens_for(JourFerie, "after_update")
+@event.listens_for(JourFerie, "after_delete")
+def _invalider_mois_ferie(mapper, connection, target):
+    dates = {target.date_ferie, _valeur_avant(sa_inspect(target), "date_ferie")}
+    _retirer_couverture(connection, {premier_du_mois(d) for d in dates if d})
@@ -1,19 +1,15 @@
-from datetime import date, timedelta
-from models.jour_ferie import JourFerie
-from models.conge import Conge
+import heapq
+from bisect import bisect_right
 
+from sqlalchemy.orm import selectinload
 
-def get_dates_feries_set(date_debut, date_fin):
-    """Retourne un set des dates fériées entre deux dates."""
-    feries = JourFerie.query.filter(
-        JourFerie.date_ferie >= date_debut,
-        JourFerie.date_ferie <= date_fin,
-    ).all()
-    return {f.date_ferie for f in feries}
+from models.conge import Conge
+from services.calendrier_feries import feries_entre, index_jours_ouvres
 
 
-def _est_ouvrable(d, feries):
-    return d.weekday() < 5 and d not in feries
+def get_dates_feries_set(date_debut, date_fin):
+    """Retourne un set des dates fériées entre deux dates (calendrier en mémoire)."""
+    return feries_entre(date_debut, date_fin)
 
 
 def compter_jours_ouvrables(date_debut, date_fin):
@@ -21,17 +17,7 @@ def compter_jours_ouvrables(date_debut, date_fin):
     Exclut les week-ends (samedi, dimanche) et les jours fériés.
     Retour : int.
     """
-    if date_fin < date_debut:
-        return 0
-
-    feries = get_dates_feries_set(date_debut, date_fin)
-    jours = 0
-    current = date_debut
-    while current <= date_fin:
-        if _est_ouvrable(current, feries):
-            jours += 1
-        current += timedelta(days=1)
-    return jours
+    return index_jours_ouvres().compter(date_debut, date_fin)
 
 
 def compter_jours_ouvrables_avec_demi(date_debut, date_fin, demi_debut=None, demi_fin=None):
@@ -47,26 +33,7 @@ def compter_jours_ouvrables_avec_demi(date_debut, date_fin, demi_debut=None, dem
 
     Retour : float (potentiellement 0, 0.5, 1, 1.5, ...).
     """
-    if date_fin < date_debut:
-        return 0.0
-
-    feries = get_dates_feries_set(date_debut, date_fin)
-
-    # Mono-jour
-    if date_debut == date_fin:
-        if not _est_ouvrable(date_debut, feries):
-            return 0.0
-        if demi_debut in ("matin", "apres_midi") or demi_fin in ("matin", "apres_midi"):
-            return 0.5
-        return 1.0
-
-    # Multi-jours : on part du total plein puis on retire les bordures partielles.
-    total = float(compter_jours_ouvrables(date_debut, date_fin))
-    if demi_debut == "apres_midi" and _est_ouvrable(date_debut, feries):
-        total -= 0.5
-    if demi_fin == "matin" and _est_ouvrable(date_fin, feries):
-        total -= 0.5
-    return max(0.0, total)
+    return index_jours_ouvres().compter_avec_demi(date_debut, date_fin, demi_debut, demi_fin)
 
 
 def conges_chevauchant(
@@ -96,6 +63,60 @@ def conges_chevauchant(
     return q.order_by(Conge.date_debut).all()
 
 
+def conflits_par_demande(
+    demandes,
+    *,
+    user_ids=None,
+    statuts=("valide", "en_attente_responsable", "en_attente_rh"),
+):
+    """Congés actifs d'autres salariés qui chevauchent chaque demande, en une requête.
+
+    Version groupée de `conges_chevauchant` pour les tableaux de bord : charge
+    une fois les congés actifs de la fenêtre [min(date_debut), max(date_fin)]
+    des demandes, puis les répartit par balayage (demandes triées par début,
+    tas des congés en cours triés par fin).
+
+    Args:
+        demandes : congés à inspecter (typiquement les demandes en attente).
+        user_ids : restreint les conflits à ces salariés (périmètre d'un
+            responsable), directement dans la requête.
+        statuts : statuts considérés comme "actifs".
+
+    Retour : ``{conge_id: [Conge, ...]}`` trié par date de début, sans les
+    congés du demandeur ; `utilisateur` est déjà chargé.
+    """
+    demandes = list(demandes)
+    resultat = {d.id: [] for d in demandes}
+    if not demandes or (user_ids is not None and not user_ids):
+        return resultat
+
+    q = Conge.query.options(selectinload(Conge.utilisateur)).filter(
+        Conge.date_debut <= max(d.date_fin for d in demandes),
+        Conge.date_fin >= min(d.date_debut for d in demandes),
+        Conge.statut.in_(statuts),
+    )
+    if user_ids is not None:
+        q = q.filter(Conge.user_id.in_(list(user_ids)))
+    actifs = sorted(q.all(), key=lambda c: (c.date_debut, c.id))
+    debuts = [c.date_debut for c in actifs]
+
+    en_cours = []  # tas (date_fin, rang) des congés commencés
+    suivant = 0
+    for d in sorted(demandes, key=lambda c: c.date_debut):
+        # Congés commencés au plus tard au début de la demande...
+        while suivant < len(actifs) and debuts[suivant] <= d.date_debut:
+            heapq.heappush(en_cours, (actifs[suivant].date_fin, suivant))
+            suivant += 1
+        # ... dont ceux déjà terminés ne chevauchent plus aucune demande suivante.
+        while en_cours and en_cours[0][0] < d.date_debut:
+            heapq.heappop(en_cours)
+        rangs = sorted(rang for fin, rang in en_cours if fin >= d.date_debut)
+        # Plus ceux qui commencent pendant la demande.
+        rangs.extend(range(suivant, bisect_right(debuts, d.date_fin, lo=suivant)))
+        resultat[d.id] = [actifs[r] for r in rangs if actifs[r].user_id != d.user_id]
+    return resultat
+
+
 def detecter_chevauchement(user_id, date_debut, date_fin, conge_id_exclu=None):
     """Détecte si un congé chevauche un congé existant (validé ou en attente) pour un utilisateur.
     Retourne le congé en conflit ou None.
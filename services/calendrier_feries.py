@@ -0,0 +1,166 @@
+"""Calendrier des jours fériés en mémoire (cache processus).
+
+La table ``jours_feries`` est minuscule (≈ 11 lignes par an) mais elle était
+relue à chaque comptage de jours ouvrables : `compter_jours_ouvrables_avec_demi`
+l'interrogeait deux fois, et le prorata d'un congé à cheval quatre fois. On la
+charge ici une seule fois par processus, sous forme de tuples triés par année,
+puis tous les comptages se font sans accès base via `WorkingDayIndex`.
+
+Invalidation :
+- explicite, après commit, par les actions RH qui écrivent la table
+  (`ajouter_ferie`, `supprimer_ferie`, `charger_feries` dans routes/rh.py) ;
+- filet de sécurité : toute écriture ORM sur `JourFerie` (scripts, tests)
+  invalide aussi le cache au flush.
+"""
+from __future__ import annotations
+
+import threading
+from array import array
+from bisect import bisect_left, bisect_right
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from models import db
+from models.jour_ferie import JourFerie
+
+_verrou = threading.Lock()
+# {année: dates fériées triées}
+_feries_par_annee: dict[int, tuple[date, ...]] | None = None
+# Incrémenté à chaque invalidation : un index construit avant ne doit pas être installé.
+_generation = 0
+
+
+def _charger() -> dict[int, tuple[date, ...]]:
+    global _feries_par_annee
+    with _verrou:
+        if _feries_par_annee is None:
+            par_annee: dict[int, list[date]] = {}
+            for (d,) in db.session.query(JourFerie.date_ferie).all():
+                par_annee.setdefault(d.year, []).append(d)
+            _feries_par_annee = {annee: tuple(sorted(dates)) for annee, dates in par_annee.items()}
+        return _feries_par_annee
+
+
+def invalider_calendrier_feries() -> None:
+    """Oublie le calendrier chargé : la prochaine lecture relit la table."""
+    global _feries_par_annee, _index, _generation
+    with _verrou:
+        _feries_par_annee = None
+        _index = None
+        _generation += 1
+
+
+def feries_entre(date_debut: date, date_fin: date) -> set[date]:
+    """Set des dates fériées dans [date_debut, date_fin] (sans accès base)."""
+    if date_fin < date_debut:
+        return set()
+    calendrier = _charger()
+    resultat: set[date] = set()
+    for annee in range(date_debut.year, date_fin.year + 1):
+        dates = calendrier.get(annee, ())
+        resultat.update(dates[bisect_left(dates, date_debut):bisect_right(dates, date_fin)])
+    return resultat
+
+
+class WorkingDayIndex:
+    """Cumul des jours ouvrables par jour calendaire, une table par année.
+
+    ``_cumuls[annee][i]`` = nombre de jours ouvrables (lun-ven hors fériés) parmi
+    les ``i`` premiers jours de l'année. Le nombre de jours ouvrables de
+    ``[a, b]`` dans une même année vaut donc ``cumul[b] - cumul[a - 1]`` : deux
+    lectures de tableau, quelle que soit la longueur de la période. Les tables
+    sont construites à la demande (≈ 366 entrées par année rencontrée).
+    """
+
+    def __init__(self, feries_par_annee: dict[int, tuple[date, ...]]):
+        self._feries = feries_par_annee
+        self._cumuls: dict[int, array] = {}
+
+    def _cumul(self, annee: int) -> array:
+        cumul = self._cumuls.get(annee)
+        if cumul is None:
+            feries = set(self._feries.get(annee, ()))
+            premier = date(annee, 1, 1)
+            nb_jours = (date(annee + 1, 1, 1) - premier).days
+            wd = premier.weekday()
+            cumul = array("H", [0]) * (nb_jours + 1)
+            total = 0
+            for i in range(nb_jours):
+                if (wd + i) % 7 < 5 and (premier + timedelta(days=i)) not in feries:
+                    total += 1
+                cumul[i + 1] = total
+            self._cumuls[annee] = cumul
+        return cumul
+
+    def _rang(self, d: date) -> int:
+        """Jours ouvrables du 1er janvier jusqu'à ``d`` inclus."""
+        return self._cumul(d.year)[d.timetuple().tm_yday]
+
+    def est_ouvre(self, d: date) -> bool:
+        jour = d.timetuple().tm_yday
+        cumul = self._cumul(d.year)
+        return cumul[jour] != cumul[jour - 1]
+
+    def compter(self, date_debut: date, date_fin: date) -> int:
+        """Jours ouvrables dans [date_debut, date_fin] (bornes incluses)."""
+        if date_fin < date_debut:
+            return 0
+        avant_debut = self._rang(date_debut) - self.est_ouvre(date_debut)
+        if date_debut.year == date_fin.year:
+            return self._rang(date_fin) - avant_debut
+        total = self._cumul(date_debut.year)[-1] - avant_debut
+        for annee in range(date_debut.year + 1, date_fin.year):
+            total += self._cumul(annee)[-1]
+        return total + self._rang(date_fin)
+
+    def compter_avec_demi(self, date_debut: date, date_fin: date, demi_debut=None, demi_fin=None) -> float:
+        """Comme `compter`, avec les demi-journées de bordure d'un congé.
+
+        Mêmes règles que `compter_jours_ouvrables_avec_demi` : un mono-jour avec
+        une demi-journée vaut 0,5 ; en multi-jours, ``demi_debut="apres_midi"``
+        et ``demi_fin="matin"`` retirent chacun 0,5 si la bordure est ouvrable.
+        """
+        if date_fin < date_debut:
+            return 0.0
+        if date_debut == date_fin:
+            if not self.est_ouvre(date_debut):
+                return 0.0
+            if demi_debut in ("matin", "apres_midi") or demi_fin in ("matin", "apres_midi"):
+                return 0.5
+            return 1.0
+        total = float(self.compter(date_debut, date_fin))
+        if demi_debut == "apres_midi" and self.est_ouvre(date_debut):
+            total -= 0.5
+        if demi_fin == "matin" and self.est_ouvre(date_fin):
+            total -= 0.5
+        return max(0.0, total)
+
+
+_index: WorkingDayIndex | None = None
+
+
+def index_jours_ouvres() -> WorkingDayIndex:
+    """Index des jours ouvrables du processus (reconstruit après invalidation).
+
+    L'index n'est installé que si aucune invalidation n'a eu lieu depuis la
+    lecture du calendrier ; sinon il est reconstruit sur le calendrier relu.
+    """
+    global _index
+    index = _index
+    while index is None:
+        with _verrou:
+            generation = _generation
+        candidat = WorkingDayIndex(_charger())
+        with _verrou:
+            if _index is None and _generation == generation:
+                _index = candidat
+            index = _index
+    return index
+
+
+@event.listens_for(JourFerie, "after_insert")
+@event.listens_for(JourFerie, "after_update")
+@event.listens_for(JourFerie, "after_delete")
+def _invalider_sur_ecriture(mapper, connection, target):
+    invalider_calendrier_feries()
@@ -0,0 +1,94 @@
+"""Répercussion d'un changement de congé sur les données calculées.
+
+Point d'appel unique, à invoquer par les routes après toute création,
+validation, refus, annulation, modification ou suppression d'un congé,
+**avant** le commit (même transaction) :
+
+    avant = etat_conge(conge)
+    ... modification ...
+    conge_modifie(avant, conge)      # ou conge_modifie(avant, None) si supprimé
+
+Effets :
+- consommations CP/RTT matérialisées (`soldes_snapshot`) des exercices couverts ;
+- congés validés (avant ou après) : recalcul RTT des semaines couvertes
+  (cf. services/rtt_hebdo.recalculer_semaines) et du cube mensuel des mois
+  couverts (cf. services/absences_mensuelles.rafraichir_mois).
+Ne commit pas.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import date
+
+from models.conge import Conge
+from models.parametrage import ParametrageAnnuel
+from services.absences_mensuelles import mois_entre, rafraichir_mois
+from services.consommation import STATUT_VALIDE
+from services.rtt_hebdo import recalculer_semaines, semaines_periode
+from services.solde import get_parametrage_actif, rafraichir_solde_snapshot
+
+
+@dataclass(frozen=True)
+class EtatConge:
+    """Instantané des champs d'un congé qui influent sur les calculs."""
+    user_id: int
+    date_debut: date
+    date_fin: date
+    statut: str
+    type_conge: str
+    demi_journee_debut: str | None = None
+    demi_journee_fin: str | None = None
+    nb_jours_ouvrables: float | None = None
+    nb_heures_rtt: float | None = None
+
+
+def etat_conge(conge: Conge | None) -> EtatConge | None:
+    if conge is None:
+        return None
+    return EtatConge(
+        user_id=conge.user_id,
+        date_debut=conge.date_debut,
+        date_fin=conge.date_fin,
+        statut=conge.statut,
+        type_conge=conge.type_conge,
+        demi_journee_debut=conge.demi_journee_debut,
+        demi_journee_fin=conge.demi_journee_fin,
+        nb_jours_ouvrables=conge.nb_jours_ouvrables,
+        nb_heures_rtt=conge.nb_heures_rtt,
+    )
+
+
+def _rafraichir_soldes(etats: list[EtatConge]) -> None:
+    cibles = set()
+    for e in etats:
+        params = ParametrageAnnuel.query.filter(
+            ParametrageAnnuel.debut_exercice <= e.date_fin,
+            ParametrageAnnuel.fin_exercice >= e.date_debut,
+        )
+        cibles.update((e.user_id, p.id) for p in params)
+    for user_id, parametrage_id in sorted(cibles):
+        rafraichir_solde_snapshot(user_id, parametrage_id)
+
+
+def conge_modifie(avant: EtatConge | None, conge: Conge | None) -> None:
+    """Met à jour les données dérivées après un changement de congé.
+
+    ``avant`` : état capturé avant modification (None pour une création).
+    ``conge`` : congé après modification (None s'il a été supprimé).
+    """
+    apres = etat_conge(conge)
+    if avant == apres:
+        return
+    etats = [e for e in (avant, apres) if e is not None]
+
+    # Toujours rafraîchi : l'écriture du congé a de toute façon purgé les lignes
+    # du salarié (filet de sécurité de services/solde.py).
+    _rafraichir_soldes(etats)
+
+    valides = [e for e in etats if e.statut == STATUT_VALIDE]
+    if valides:
+        paires = set()
+        for e in valides:
+            paires |= semaines_periode(e.user_id, e.date_debut, e.date_fin)
+        recalculer_semaines(get_parametrage_actif(), paires)
+        rafraichir_mois({m for e in valides for m in mois_entre(e.date_debut, e.date_fin)})
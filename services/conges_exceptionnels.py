@@ -1,8 +1,8 @@
 from models import db
 from models.conge import Conge
-from models.parametrage import ParametrageAnnuel
 from models.conge_exceptionnel_type import CongeExceptionnelType
 from services.consommation import somme_consommation, STATUT_VALIDE
+from services.parametrage_actif import get_parametrage, get_parametrage_actif
 
 
 EXC_PREFIX = "EXC:"
@@ -68,8 +68,8 @@ def parse_code(type_conge: str):
 
 def _get_param(parametrage_id):
     if parametrage_id:
-        return ParametrageAnnuel.query.get(parametrage_id)
-    return ParametrageAnnuel.query.filter_by(actif=True).first()
+        return get_parametrage(parametrage_id)
+    return get_parametrage_actif()
 
 
 def calculer_consommation(user_id: int, code: str, unite: str, parametrage_id=None, conge_id_exclu=None):
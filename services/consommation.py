@@ -15,7 +15,7 @@ from sqlalchemy import func, or_
 
 from models import db
 from models.conge import Conge
-from services.calcul_jours import compter_jours_ouvrables_avec_demi
+from services.calendrier_feries import index_jours_ouvres
 
 STATUT_VALIDE = "valide"
 STATUTS_EN_ATTENTE = ("en_attente_responsable", "en_attente_rh")
@@ -53,7 +53,8 @@ def _prorata_fenetre(conge, colonne_key, date_debut_min, date_fin_max):
     if not valeur:
         return 0.0
 
-    jours_total = compter_jours_ouvrables_avec_demi(
+    index = index_jours_ouvres()
+    jours_total = index.compter_avec_demi(
         conge.date_debut, conge.date_fin, conge.demi_journee_debut, conge.demi_journee_fin
     )
     if jours_total <= 0:
@@ -64,7 +65,7 @@ def _prorata_fenetre(conge, colonne_key, date_debut_min, date_fin_max):
     # La demi-journée de bordure ne compte que si la vraie bordure est dans la fenêtre.
     demi_debut = conge.demi_journee_debut if conge.date_debut >= date_debut_min else None
     demi_fin = conge.demi_journee_fin if conge.date_fin <= date_fin_max else None
-    jours_fenetre = compter_jours_ouvrables_avec_demi(part_debut, part_fin, demi_debut, demi_fin)
+    jours_fenetre = index.compter_avec_demi(part_debut, part_fin, demi_debut, demi_fin)
 
     return float(valeur) * jours_fenetre / jours_total
 
@@ -0,0 +1,91 @@
+"""Annuaire ERP (dbo.SALARIES) en cache processus, pour le rattachement des matricules.
+
+`salaries_erp` relit toute la table SALARIES ; la synchro n'en a besoin que
+pour nommer ou rattacher les matricules TEMPAS inconnus de l'application. On
+garde ici un instantané ``{matricule: nom}`` avec les noms déjà normalisés :
+le rapprochement par nom devient une recherche dans un dictionnaire.
+
+Rechargement :
+- après ``ERP_ANNUAIRE_TTL`` secondes (défaut 6 h) et chaque nuit (scheduler) ;
+- quand un matricule absent de l'instantané apparaît, au plus une fois toutes
+  les ``_DELAI_MIN_RECHARGEMENT`` secondes (un matricule TEMPAS sans fiche
+  SALARIES ne relance pas la lecture à chaque synchro).
+"""
+from __future__ import annotations
+
+import os
+import threading
+import time
+import unicodedata
+from dataclasses import dataclass
+
+from services.erp.requetes import salaries_erp
+
+_DELAI_MIN_RECHARGEMENT = 300.0
+
+_verrou = threading.Lock()
+_annuaire: AnnuaireErp | None = None
+_stats = {"hits": 0, "rechargements": 0}
+
+
+def normaliser_nom(nom: str) -> str:
+    """Normalise un nom pour rapprochement robuste (accents/casse/espaces)."""
+    txt = unicodedata.normalize("NFKD", nom or "")
+    txt = "".join(ch for ch in txt if not unicodedata.combining(ch))
+    return " ".join(txt.upper().split())
+
+
+@dataclass(frozen=True)
+class AnnuaireErp:
+    noms: dict[str, str]             # matricule canonique → nom complet ERP
+    noms_normalises: dict[str, str]  # matricule canonique → normaliser_nom(nom complet)
+    charge_le: float                 # time.monotonic() au chargement
+
+
+def _ttl() -> float:
+    try:
+        return float(os.environ.get("ERP_ANNUAIRE_TTL", 6 * 3600))
+    except ValueError:
+        return 6 * 3600.0
+
+
+def recharger_annuaire_erp(conn) -> AnnuaireErp:
+    """Relit dbo.SALARIES et remplace l'instantané du processus."""
+    noms = {s.matricule: s.nom_complet for s in salaries_erp(conn) if s.matricule and s.nom_complet}
+    annuaire = AnnuaireErp(
+        noms=noms,
+        noms_normalises={mat: normaliser_nom(nom) for mat, nom in noms.items()},
+        charge_le=time.monotonic(),
+    )
+    global _annuaire
+    with _verrou:
+        _annuaire = annuaire
+        _stats["rechargements"] += 1
+    return annuaire
+
+
+def annuaire_erp(conn, matricules=()) -> AnnuaireErp:
+    """Instantané de l'annuaire ; relu s'il a expiré ou si un des ``matricules`` y manque."""
+    with _verrou:
+        annuaire = _annuaire
+    if annuaire is not None:
+        age = time.monotonic() - annuaire.charge_le
+        manquant = any(m not in annuaire.noms for m in matricules)
+        if age < _ttl() and (not manquant or age < _DELAI_MIN_RECHARGEMENT):
+            with _verrou:
+                _stats["hits"] += 1
+            return annuaire
+    return recharger_annuaire_erp(conn)
+
+
+def invalider_annuaire_erp() -> None:
+    """Oublie l'instantané : le prochain besoin relit dbo.SALARIES."""
+    global _annuaire
+    with _verrou:
+        _annuaire = None
+
+
+def statistiques_annuaire_erp() -> dict:
+    """Compteurs ``{"hits", "rechargements"}`` depuis le démarrage du processus."""
+    with _verrou:
+        return dict(_stats)
@@ -15,10 +15,24 @@ Configuration (variables d'environnement, ex. dans web.config) :
   ERP_DB_ENCRYPT         = yes
   ERP_DB_TRUST_CERT      = yes     # certificat auto-signé interne
   ERP_DB_TIMEOUT         = 10      # secondes
+
+ERP de substitution (cf. services/erp/simulateur.py) :
+  ERP_DB_SIMULATEUR      = chemin.sqlite  # base SQLite au format TEMPAS/SALARIES à la
+                                          # place de SQL Server (tests de charge, démo)
+
+Pool de connexions (cf. services/erp/pool.py) :
+  ERP_POOL_TAILLE            = 2     # connexions ouvertes au maximum
+  ERP_POOL_INACTIVITE_MAX    = 300   # secondes avant fermeture d'une connexion inutilisée
+  ERP_POOL_DUREE_VIE_MAX     = 1800  # secondes avant renouvellement d'une connexion
+  ERP_POOL_ATTENTE_MAX       = 30    # secondes d'attente d'une connexion libre
+  ERP_EXTRACTION_PARALLELE   = 1     # requêtes TEMPAS simultanées lors de la synchro de
+                                     # l'exercice (bornées à ERP_POOL_TAILLE - 1)
 """
 from __future__ import annotations
 
 import os
+import sqlite3
+import threading
 from contextlib import contextmanager
 
 try:
@@ -27,10 +41,17 @@ except ImportError:  # pragma: no cover
     pyodbc = None  # type: ignore[assignment]
 
 
+from services.erp.pool import PoolConnexions, PoolFermeError, PoolSatureError  # noqa: F401 (réexport)
+
+
 class ErpNonConfigureError(RuntimeError):
     """Levée si ERP_DB_ENABLED n'est pas 'true' ou si pyodbc est absent."""
 
 
+_pool: PoolConnexions | None = None
+_pool_verrou = threading.Lock()
+
+
 def erp_active() -> bool:
     return os.environ.get("ERP_DB_ENABLED", "").lower() == "true"
 
@@ -64,25 +85,17 @@ def _conn_str() -> str:
     )
 
 
-@contextmanager
-def erp_connexion():
-    """Context manager : ouvre une connexion read-only et la ferme à la sortie.
+def _simulateur() -> str:
+    return os.environ.get("ERP_DB_SIMULATEUR", "").strip()
 
-    Usage :
-        with erp_connexion() as conn:
-            rows = conn.execute("SELECT ...").fetchall()
-
-    Lève ErpNonConfigureError si ERP_DB_ENABLED != 'true' ou pyodbc absent.
-    """
-    if not erp_active():
-        raise ErpNonConfigureError(
-            "Connexion ERP désactivée. Définissez ERP_DB_ENABLED=true et les variables ERP_DB_*."
-        )
-    if pyodbc is None:
-        raise ErpNonConfigureError("Le module pyodbc n'est pas installé (pip install pyodbc).")
 
+def _ouvrir_connexion():
+    """Ouvre une connexion pyodbc read-only (appelé par le pool)."""
+    if _simulateur():
+        from services.erp.simulateur import connecter_simulateur
+        return connecter_simulateur(_simulateur())
     try:
-        conn = pyodbc.connect(_conn_str(), autocommit=True, timeout=10, readonly=True)
+        return pyodbc.connect(_conn_str(), autocommit=True, timeout=10, readonly=True)
     except pyodbc.Error as e:
         code = e.args[0] if e.args else ""
         if code == "IM002":
@@ -95,7 +108,62 @@ def erp_connexion():
                 "Installez « ODBC Driver 17/18 for SQL Server » ou ajustez ERP_DB_DRIVER dans web.config."
             ) from e
         raise
+
+
+def _env_float(nom: str, defaut: float) -> float:
     try:
+        return float(os.environ.get(nom, defaut))
+    except ValueError:
+        return defaut
+
+
+def pool_erp() -> PoolConnexions:
+    """Pool de connexions ERP du processus (créé au premier emprunt)."""
+    global _pool
+    with _pool_verrou:
+        if _pool is None:
+            _pool = PoolConnexions(
+                _ouvrir_connexion,
+                taille_max=int(_env_float("ERP_POOL_TAILLE", 2)),
+                inactivite_max=_env_float("ERP_POOL_INACTIVITE_MAX", 300),
+                duree_vie_max=_env_float("ERP_POOL_DUREE_VIE_MAX", 1800),
+                attente_max=_env_float("ERP_POOL_ATTENTE_MAX", 30),
+                erreurs=(sqlite3.Error,) if _simulateur() else (pyodbc.Error,) if pyodbc is not None else (),
+            )
+        return _pool
+
+
+def fermer_pool_erp() -> None:
+    """Ferme les connexions du pool ; le prochain emprunt recrée un pool (relit la config)."""
+    global _pool
+    with _pool_verrou:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.fermer()
+
+
+def statistiques_pool_erp() -> dict:
+    """Compteurs du pool : emprunts, réutilisations, connexions ouvertes, latence, échecs."""
+    return pool_erp().statistiques()
+
+
+@contextmanager
+def erp_connexion():
+    """Context manager : prête une connexion read-only du pool et la rend à la sortie.
+
+    Usage :
+        with erp_connexion() as conn:
+            rows = conn.execute("SELECT ...").fetchall()
+
+    Lève ErpNonConfigureError si ERP_DB_ENABLED != 'true' ou pyodbc absent,
+    PoolSatureError si aucune connexion ne se libère à temps.
+    """
+    if not erp_active():
+        raise ErpNonConfigureError(
+            "Connexion ERP désactivée. Définissez ERP_DB_ENABLED=true et les variables ERP_DB_*."
+        )
+    if pyodbc is None and not _simulateur():
+        raise ErpNonConfigureError("Le module pyodbc n'est pas installé (pip install pyodbc).")
+
+    with pool_erp().connexion() as conn:
         yield conn
-    finally:
-        conn.close()
@@ -0,0 +1,118 @@
+"""État de la synchro ERP : empreinte de chaque semaine déjà importée.
+
+La synchro de l'exercice compare l'empreinte TEMPAS de chaque semaine
+(`requetes.empreintes_semaines`, une requête agrégée) à celle enregistrée au
+dernier import et ne relit que les semaines qui diffèrent.
+
+Une semaine ERP inchangée peut devoir être relue si c'est l'application qui a
+changé : matricule ou activation d'un salarié (lignes jusque-là ignorées),
+suppression d'une saisie d'heures, passage d'une saisie manuelle à l'ERP.
+Ces écritures ORM effacent les empreintes concernées (filet de sécurité, même
+principe que services/solde.py).
+"""
+from __future__ import annotations
+
+from datetime import datetime, timezone
+
+from sqlalchemy import event, inspect as sa_inspect
+
+from models import db
+from models.heures_hebdo import HeuresHebdo
+from models.sync_erp_semaine import SyncErpSemaine
+from models.user import User
+
+
+def _cle(nb_lignes, total_heures, signature) -> tuple:
+    return (int(nb_lignes or 0), round(float(total_heures or 0), 4), signature)
+
+
+_VIDE = _cle(0, 0, None)
+
+
+def semaines_modifiees(semaines: list[str], empreintes_erp: dict) -> list[str]:
+    """Semaines dont l'empreinte ERP diffère de l'empreinte enregistrée.
+
+    ``empreintes_erp`` : ``{semaine: EmpreinteSemaine}`` (semaines vides absentes).
+    Une semaine jamais importée et vide côté ERP n'est pas à relire.
+    """
+    if not semaines:
+        return []
+    enregistrees = {
+        s: _cle(n, h, sig)
+        for s, n, h, sig in db.session.query(
+            SyncErpSemaine.semaine_erp, SyncErpSemaine.nb_lignes,
+            SyncErpSemaine.total_heures, SyncErpSemaine.signature,
+        ).filter(SyncErpSemaine.semaine_erp.in_(semaines))
+    }
+    modifiees = []
+    for s in semaines:
+        e = empreintes_erp.get(s)
+        actuelle = _cle(e.nb_lignes, e.total_heures, e.signature) if e else _VIDE
+        if enregistrees.get(s, _VIDE) != actuelle:
+            modifiees.append(s)
+    return modifiees
+
+
+def enregistrer_empreintes(semaines: list[str], empreintes_erp: dict) -> None:
+    """Enregistre l'empreinte ERP des semaines importées. Ne commit pas."""
+    if not semaines:
+        return
+    # Les écritures d'heures en attente passent d'abord (et leur filet de sécurité).
+    db.session.flush()
+    table = SyncErpSemaine.__table__
+    maintenant = datetime.now(timezone.utc)
+    db.session.execute(table.delete().where(table.c.semaine_erp.in_(semaines)))
+    lignes = []
+    for s in semaines:
+        e = empreintes_erp.get(s)
+        lignes.append({
+            "semaine_erp": s,
+            "nb_lignes": e.nb_lignes if e else 0,
+            "total_heures": e.total_heures if e else 0.0,
+            "signature": e.signature if e else None,
+            "synchronise_le": maintenant,
+        })
+    db.session.execute(table.insert(), lignes)
+
+
+def _semaine_erp(d) -> str:
+    iso = d.isocalendar()
+    return f"{iso[0]}{iso[1]:02d}"
+
+
+def oublier_empreintes(lundis) -> None:
+    """Efface l'empreinte des semaines données (à relire à la prochaine synchro). Ne commit pas.
+
+    Pour les écritures groupées hors ORM qui remplacent des heures ERP (le
+    filet de sécurité ci-dessous ne voit que les écritures ORM).
+    """
+    semaines = sorted({_semaine_erp(l) for l in lundis})
+    if semaines:
+        table = SyncErpSemaine.__table__
+        db.session.execute(table.delete().where(table.c.semaine_erp.in_(semaines)))
+
+
+@event.listens_for(User, "after_insert")
+def _invalider_sur_nouveau_salarie(mapper, connection, target):
+    if target.matricule:
+        connection.execute(SyncErpSemaine.__table__.delete())
+
+
+@event.listens_for(User, "after_update")
+def _invalider_sur_salarie(mapper, connection, target):
+    etat = sa_inspect(target)
+    if etat.attrs.matricule.history.has_changes() or etat.attrs.actif.history.has_changes():
+        connection.execute(SyncErpSemaine.__table__.delete())
+
+
+@event.listens_for(HeuresHebdo, "after_delete")
+def _invalider_sur_suppression_heures(mapper, connection, target):
+    table = SyncErpSemaine.__table__
+    connection.execute(table.delete().where(table.c.semaine_erp == _semaine_erp(target.date_lundi)))
+
+
+@event.listens_for(HeuresHebdo, "after_update")
+def _invalider_sur_source_heures(mapper, connection, target):
+    if sa_inspect(target).attrs.source.history.has_changes():
+        table = SyncErpSemaine.__table__
+        connection.execute(table.delete().where(table.c.semaine_erp == _semaine_erp(target.date_lundi)))
@@ -0,0 +1,225 @@
+"""Pool borné de connexions DB-API (utilisé pour la connexion read-only ERP).
+
+Ouvrir une connexion SQL Server coûte une négociation TLS et une
+authentification : le pool garde quelques connexions ouvertes entre deux
+synchronisations et les prête à `erp_connexion()`.
+
+- borné : au plus ``taille_max`` connexions ouvertes ; au-delà, l'emprunteur
+  attend ``attente_max`` secondes puis reçoit `PoolSatureError` ;
+- vérification de vie (``SELECT 1``) à chaque emprunt d'une connexion
+  inactive ; une connexion morte est fermée et remplacée ;
+- éviction des connexions inactives depuis plus de ``inactivite_max``
+  secondes et de celles ouvertes depuis plus de ``duree_vie_max`` secondes ;
+- une connexion rendue après une erreur du pilote est fermée, pas réutilisée ;
+- après `fermer()`, le pool refuse les emprunts (`PoolFermeError`) et ferme
+  les connexions encore prêtées à leur retour.
+
+Le pool ne dépend pas de pyodbc : il reçoit une fonction ``connecter`` et les
+classes d'erreur du pilote (un pilote factice suffit pour les tests).
+"""
+from __future__ import annotations
+
+import threading
+import time
+from contextlib import contextmanager
+from dataclasses import dataclass
+
+
+class PoolSatureError(RuntimeError):
+    """Levée si aucune connexion ne s'est libérée dans le délai d'attente."""
+
+
+class PoolFermeError(RuntimeError):
+    """Levée par un emprunt sur un pool fermé."""
+
+
+@dataclass
+class _Entree:
+    conn: object
+    ouverte_le: float
+    utilisee_le: float
+
+
+class PoolConnexions:
+    """Pool thread-safe de connexions, prêtées par le context manager `connexion()`."""
+
+    def __init__(
+        self,
+        connecter,
+        *,
+        taille_max: int = 2,
+        inactivite_max: float = 300.0,
+        duree_vie_max: float = 1800.0,
+        attente_max: float = 30.0,
+        erreurs: tuple = (Exception,),
+        horloge=time.monotonic,
+    ):
+        self._connecter = connecter
+        self.taille_max = max(1, int(taille_max))
+        self.inactivite_max = inactivite_max
+        self.duree_vie_max = duree_vie_max
+        self.attente_max = attente_max
+        self._erreurs = erreurs
+        self._horloge = horloge
+        self._cond = threading.Condition()
+        self._inactives: list[_Entree] = []  # pile : la plus récente en dernier
+        self._nb_ouvertes = 0  # inactives + prêtées
+        self._ferme = False
+        self._stats = {
+            "emprunts": 0,
+            "reutilisations": 0,
+            "connexions": 0,
+            "echecs_connexion": 0,
+            "connexions_mortes": 0,
+            "evictions": 0,
+            "saturations": 0,
+            "latence_connexion_totale": 0.0,
+            "latence_connexion_max": 0.0,
+        }
+
+    # --- API -----------------------------------------------------------------
+
+    @contextmanager
+    def connexion(self):
+        """Prête une connexion ; elle revient au pool à la sortie du bloc."""
+        entree = self._emprunter()
+        reutilisable = True
+        try:
+            yield entree.conn
+        except self._erreurs:
+            reutilisable = False
+            raise
+        finally:
+            self._rendre(entree, reutilisable)
+
+    def fermer(self) -> None:
+        """Ferme les connexions inactives (les connexions prêtées le seront au retour).
+
+        Le pool est ensuite inutilisable : tout emprunt lève `PoolFermeError`.
+        """
+        with self._cond:
+            self._ferme = True
+            inactives, self._inactives = self._inactives, []
+            self._nb_ouvertes -= len(inactives)
+            self._cond.notify_all()
+        for entree in inactives:
+            self._fermer_conn(entree)
+
+    def statistiques(self) -> dict:
+        with self._cond:
+            stats = dict(self._stats)
+            stats["ouvertes"] = self._nb_ouvertes
+            stats["inactives"] = len(self._inactives)
+        nb = stats["connexions"]
+        stats["latence_connexion_moy"] = stats["latence_connexion_totale"] / nb if nb else 0.0
+        return stats
+
+    # --- Interne -------------------------------------------------------------
+
+    def _emprunter(self) -> _Entree:
+        debut_attente = self._horloge()
+        a_fermer: list[_Entree] = []
+        entree = None
+        with self._cond:
+            self._stats["emprunts"] += 1
+            while True:
+                if self._ferme:
+                    raise PoolFermeError("Pool de connexions ERP fermé.")
+                a_fermer.extend(self._evincer())
+                if self._inactives:
+                    entree = self._inactives.pop()
+                    break
+                if self._nb_ouvertes < self.taille_max:
+                    self._nb_ouvertes += 1  # place réservée pour une nouvelle connexion
+                    break
+                reste = self.attente_max - (self._horloge() - debut_attente)
+                if reste <= 0:
+                    self._stats["saturations"] += 1
+                    raise PoolSatureError(
+                        f"Aucune connexion ERP libre après {self.attente_max:g} s "
+                        f"({self.taille_max} connexion(s) maximum)."
+                    )
+                self._cond.wait(reste)
+        for e in a_fermer:
+            self._fermer_conn(e)
+
+        if entree is not None:
+            if self._vivante(entree.conn):
+                with self._cond:
+                    self._stats["reutilisations"] += 1
+                return entree
+            # Connexion morte : on la remplace en gardant sa place.
+            with self._cond:
+                self._stats["connexions_mortes"] += 1
+            self._fermer_conn(entree)
+        return self._ouvrir()
+
+    def _ouvrir(self) -> _Entree:
+        t0 = self._horloge()
+        try:
+            conn = self._connecter()
+        except BaseException:
+            with self._cond:
+                self._nb_ouvertes -= 1
+                self._stats["echecs_connexion"] += 1
+                self._cond.notify()
+            raise
+        maintenant = self._horloge()
+        latence = maintenant - t0
+        with self._cond:
+            self._stats["connexions"] += 1
+            self._stats["latence_connexion_totale"] += latence
+            self._stats["latence_connexion_max"] = max(self._stats["latence_connexion_max"], latence)
+        return _Entree(conn=conn, ouverte_le=maintenant, utilisee_le=maintenant)
+
+    def _rendre(self, entree: _Entree, reutilisable: bool) -> None:
+        maintenant = self._horloge()
+        if reutilisable and maintenant - entree.ouverte_le < self.duree_vie_max:
+            entree.utilisee_le = maintenant
+            with self._cond:
+                if not self._ferme:
+                    self._inactives.append(entree)
+                    self._cond.notify()
+                    return
+                self._nb_ouvertes -= 1
+            self._fermer_conn(entree)
+            return
+        with self._cond:
+            self._nb_ouvertes -= 1
+            self._cond.notify()
+        self._fermer_conn(entree)
+
+    def _evincer(self) -> list[_Entree]:
+        """Retire (sous verrou) les connexions inactives trop anciennes ; à fermer hors verrou."""
+        maintenant = self._horloge()
+        gardees, evincees = [], []
+        for e in self._inactives:
+            if (maintenant - e.utilisee_le >= self.inactivite_max
+                    or maintenant - e.ouverte_le >= self.duree_vie_max):
+                evincees.append(e)
+            else:
+                gardees.append(e)
+        if evincees:
+            self._inactives = gardees
+            self._nb_ouvertes -= len(evincees)
+            self._stats["evictions"] += len(evincees)
+        return evincees
+
+    def _vivante(self, conn) -> bool:
+        try:
+            cur = conn.cursor()
+            try:
+                cur.execute("SELECT 1")
+                cur.fetchone()
+            finally:
+                cur.close()
+            return True
+        except Exception:
+            return False
+
+    @staticmethod
+    def _fermer_conn(entree: _Entree) -> None:
+        try:
+            entree.conn.close()
+        except Exception:
+            pass
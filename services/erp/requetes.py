@@ -1,7 +1,8 @@
 """Requêtes SQL READ-ONLY sur l'ERP SILOG/Cegid PMI (base PMI, SQL Server).
 
 Toutes les fonctions reçoivent une connexion pyodbc déjà ouverte et retournent
-des listes de namedtuples. Aucune écriture vers l'ERP.
+des listes de dataclasses (`iter_heures_periode` : des lots, en flux). Aucune
+écriture vers l'ERP.
 
 Schéma pertinent (découvert par introspection 2026-06-29, confirmé 2026-07-09) :
   dbo.TEMPAS   : temps déclarés sur OF par salarié/semaine.
@@ -23,7 +24,7 @@ from dataclasses import dataclass
 from datetime import date
 
 
-@dataclass
+@dataclass(slots=True)
 class HeuresSemaine:
     matricule: str       # '000011'
     semaine_erp: str     # '202624'
@@ -31,6 +32,15 @@ class HeuresSemaine:
     date_lundi: date     # calculé par le service appelant
 
 
+@dataclass
+class EmpreinteSemaine:
+    """Empreinte TEMPAS d'une semaine : détecte un changement sans relire les heures."""
+    semaine_erp: str
+    nb_lignes: int
+    total_heures: float
+    signature: int | None  # CHECKSUM_AGG(matricule, heures) : détecte un transfert d'heures
+
+
 @dataclass
 class SalarieErp:
     matricule: str
@@ -82,6 +92,7 @@ def _sql_heures_agregees(where_semaine_sql: str) -> str:
                  END,
                  RTRIM(BECSSAREAL)
         HAVING SUM(CAST(BECNREALIS AS float)) > 0
+        ORDER BY semaine, matricule
     """
 
 
@@ -122,6 +133,60 @@ def heures_periode(conn, semaines_erp: list[str]) -> list[HeuresSemaine]:
     return _lignes_depuis_rows(rows)
 
 
+def iter_heures_periode(conn, semaines_erp: list[str], taille_lot: int = 1000):
+    """Comme `heures_periode`, mais en flux : lots d'au plus ``taille_lot`` lignes.
+
+    Les lignes sont lues par ``fetchmany`` sur un curseur dédié (fermé à la
+    fin ou à l'abandon du générateur) : la mémoire reste bornée quel que soit
+    le nombre de semaines. L'appelant découpe la période en pages de semaines.
+    """
+    semaines = [s.strip() for s in semaines_erp if s and s.strip()]
+    if not semaines:
+        return
+    placeholders = ",".join("?" * len(semaines))
+    sql = _sql_heures_agregees(f"RTRIM(BECSSAREAL) IN ({placeholders})")
+    cur = conn.cursor()
+    try:
+        cur.execute(sql, (SOC, *semaines))
+        while True:
+            rows = cur.fetchmany(taille_lot)
+            if not rows:
+                break
+            yield _lignes_depuis_rows(rows)
+    finally:
+        cur.close()
+
+
+def empreintes_semaines(conn, premiere: str, derniere: str) -> dict[str, EmpreinteSemaine]:
+    """Empreinte (nb lignes, somme, signature) de chaque semaine TEMPAS de [premiere, derniere].
+
+    Même filtre que l'agrégat des heures ; une seule requête agrégée par
+    semaine, sans ramener les lignes. Les semaines sans ligne sont absentes.
+    """
+    sql = """
+        SELECT RTRIM(BECSSAREAL) AS semaine,
+               COUNT(*) AS nb,
+               SUM(CAST(BECNREALIS AS float)) AS heures,
+               CHECKSUM_AGG(BINARY_CHECKSUM(LTRIM(RTRIM(BECTMATRI1)), BECNREALIS)) AS signature
+        FROM dbo.TEMPAS
+        WHERE BEKTSOC     = ?
+          AND (BECTUNCONS = 'H' OR BECTUNSTK = 'H')
+          AND LTRIM(RTRIM(BECTMATRI1)) <> ''
+          AND BECSSAREAL >= ? AND BECSSAREAL <= ?
+        GROUP BY RTRIM(BECSSAREAL)
+    """
+    rows = conn.execute(sql, (SOC, premiere, derniere)).fetchall()
+    return {
+        r[0].strip(): EmpreinteSemaine(
+            semaine_erp=r[0].strip(),
+            nb_lignes=int(r[1]),
+            total_heures=float(r[2] or 0),
+            signature=None if r[3] is None else int(r[3]),
+        )
+        for r in rows
+    }
+
+
 def salaries_erp(conn) -> list[SalarieErp]:
     """Liste de tous les salariés de la société."""
     sql = """
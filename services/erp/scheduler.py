@@ -9,13 +9,14 @@ Quand le serveur s'arrête, arreter_scheduler() est appelé proprement.
 from __future__ import annotations
 
 import logging
-from datetime import datetime
+from datetime import datetime, timezone
 
 logger = logging.getLogger(__name__)
 
 try:
     from apscheduler.schedulers.background import BackgroundScheduler
     from apscheduler.triggers.cron import CronTrigger
+    from apscheduler.triggers.interval import IntervalTrigger
     _apscheduler_ok = True
 except ImportError:
     _apscheduler_ok = False
@@ -43,6 +44,7 @@ def demarrer_scheduler(app) -> None:
             if not erp_active():
                 return
             from services.erp.sync_heures import synchroniser_semaine
+            from services.verrous import VerrouOccupeError
             try:
                 rapport = synchroniser_semaine(recalculer_rtt=True)
                 logger.info(
@@ -54,6 +56,8 @@ def demarrer_scheduler(app) -> None:
                 )
                 for w in rapport.avertissements:
                     logger.warning("Synchro ERP : %s", w)
+            except VerrouOccupeError as e:
+                logger.warning("Synchro ERP auto non lancée : %s", e)
             except Exception:
                 logger.exception("Synchro ERP auto : erreur non gérée.")
 
@@ -125,14 +129,162 @@ def demarrer_scheduler(app) -> None:
         minute_bak,
     )
 
+    # Réconciliation nocturne des soldes matérialisés (soldes_snapshot) avec
+    # le calcul direct : journalise les écarts et réécrit les lignes.
+    def _job_reconciliation_soldes():
+        with app.app_context():
+            from models import db
+            from services.solde import reconcilier_soldes_snapshot
+            try:
+                ecarts = reconcilier_soldes_snapshot(corriger=True)
+                db.session.commit()
+                for e in ecarts:
+                    logger.warning(
+                        "Solde matérialisé divergent : user=%s %s stocké=%s attendu=%s",
+                        e["user_id"], e["champ"], e["stocke"], e["attendu"],
+                    )
+                logger.info("Réconciliation soldes : %d écart(s) corrigé(s).", len(ecarts))
+            except Exception:
+                db.session.rollback()
+                logger.exception("Réconciliation soldes : erreur non gérée.")
+
+    _scheduler.add_job(
+        _job_reconciliation_soldes,
+        CronTrigger(hour=3, minute=0, timezone="Europe/Paris"),
+        id="reconciliation_soldes",
+        name="Réconciliation des soldes matérialisés",
+        replace_existing=True,
+    )
+
+    # Cube mensuel des absences : recalcule les mois sortis de la couverture
+    # (écritures hors routes, modification des jours fériés).
+    def _job_absences_mensuelles():
+        with app.app_context():
+            from models import db
+            from services.absences_mensuelles import reconstruire_absences_mensuelles
+            try:
+                nb = reconstruire_absences_mensuelles()
+                db.session.commit()
+                logger.info("Cube des absences : %d mois recalculé(s).", nb)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Cube des absences : erreur non gérée.")
+
+    _scheduler.add_job(
+        _job_absences_mensuelles,
+        CronTrigger(hour=3, minute=15, timezone="Europe/Paris"),
+        id="absences_mensuelles",
+        name="Recalcul du cube mensuel des absences",
+        replace_existing=True,
+    )
+
+    # RTT des semaines saisies à l'avance : comptées une fois leur lundi atteint
+    # (le recalcul incrémental ignore les semaines futures).
+    def _job_rtt_rattrapage():
+        with app.app_context():
+            from models import db
+            from services.parametrage_actif import get_parametrage_actif
+            from services.rtt_hebdo import rattraper_semaines_echues
+            from services.verrous import VERROU_HEURES_RTT, VerrouOccupeError, execution_unique
+            try:
+                param = get_parametrage_actif()
+                if param is None:
+                    return
+                with execution_unique(VERROU_HEURES_RTT, "rtt_rattrapage"):
+                    nb = rattraper_semaines_echues(param)
+                    db.session.commit()
+                if nb:
+                    logger.info("RTT : %d semaine(s) échue(s) rattrapée(s).", nb)
+            except VerrouOccupeError as e:
+                logger.warning("Rattrapage RTT non lancé : %s", e)
+            except Exception:
+                db.session.rollback()
+                logger.exception("Rattrapage RTT : erreur non gérée.")
+
+    _scheduler.add_job(
+        _job_rtt_rattrapage,
+        CronTrigger(hour=3, minute=30, timezone="Europe/Paris"),
+        id="rtt_rattrapage",
+        name="RTT des semaines saisies à l'avance devenues échues",
+        replace_existing=True,
+    )
+
+    # Annuaire ERP (dbo.SALARIES) : relu chaque nuit pour que la synchro du
+    # jour rapproche les nouveaux matricules sans lecture ERP.
+    def _job_annuaire_erp():
+        with app.app_context():
+            from services.erp.connexion import erp_active, erp_connexion
+            if not erp_active():
+                return
+            from services.erp.annuaire import recharger_annuaire_erp
+            try:
+                with erp_connexion() as conn:
+                    annuaire = recharger_annuaire_erp(conn)
+                logger.info("Annuaire ERP rechargé : %d salarié(s).", len(annuaire.noms))
+            except Exception:
+                logger.exception("Annuaire ERP : erreur non gérée.")
+
+    _scheduler.add_job(
+        _job_annuaire_erp,
+        CronTrigger(hour=5, minute=30, timezone="Europe/Paris"),
+        id="annuaire_erp",
+        name="Rechargement de l'annuaire ERP",
+        replace_existing=True,
+    )
+
+    # File des synchros ERP demandées depuis l'écran RH (services/erp/taches.py) :
+    # exécutée ici plutôt que dans un thread Waitress. La route réveille le job
+    # (`reveiller_taches_erp`) ; le passage à la minute est un filet de sécurité.
+    def _job_taches_erp():
+        with app.app_context():
+            from services.erp.taches import executer_taches_en_attente
+            try:
+                nb = executer_taches_en_attente()
+                if nb:
+                    logger.info("Synchros ERP en arrière-plan : %d tâche(s) exécutée(s).", nb)
+            except Exception:
+                logger.exception("Synchros ERP en arrière-plan : erreur non gérée.")
+
+    with app.app_context():
+        from services.erp.taches import reprendre_taches_interrompues
+        try:
+            nb = reprendre_taches_interrompues()
+            if nb:
+                logger.warning("Synchros ERP interrompues remises en file : %d.", nb)
+        except Exception:
+            logger.exception("Reprise des synchros ERP interrompues : erreur non gérée.")
+
+    _scheduler.add_job(
+        _job_taches_erp,
+        IntervalTrigger(minutes=1, timezone="Europe/Paris"),
+        id="taches_erp",
+        name="File des synchros ERP (écran RH)",
+        max_instances=1,
+        coalesce=True,
+        replace_existing=True,
+    )
+
+
+def reveiller_taches_erp() -> bool:
+    """Lance sans attendre le job de la file des synchros ; False si le planificateur ne tourne pas."""
+    if not scheduler_actif():
+        return False
+    job = _scheduler.get_job("taches_erp")
+    if job is None:
+        return False
+    job.modify(next_run_time=datetime.now(timezone.utc))
+    return True
+
 
 def arreter_scheduler() -> None:
-    """Arrête proprement le planificateur (appelé à l'arrêt du serveur)."""
+    """Arrête proprement le planificateur et ferme le pool ERP (appelé à l'arrêt du serveur)."""
     global _scheduler
     if _scheduler and _scheduler.running:
         _scheduler.shutdown(wait=False)
         logger.info("Planificateur ERP arrêté.")
     _scheduler = None
+    from services.erp.connexion import fermer_pool_erp
+    fermer_pool_erp()
 
 
 def prochain_passage() -> datetime | None:
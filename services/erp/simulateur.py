@@ -0,0 +1,216 @@
+"""ERP de substitution : base SQLite au format TEMPAS / SALARIES.
+
+Permet d'exécuter la synchro (services/erp/sync_heures.py) sans le SQL Server
+de production : tests de charge, démonstration, reprise à blanc. La base est
+attachée sous le schéma ``dbo`` et les fonctions T-SQL utilisées par
+services/erp/requetes.py sont fournies en Python (``REPLICATE``, ``RIGHT``,
+``LIKE`` avec classes ``[...]``, ``BINARY_CHECKSUM``, ``CHECKSUM_AGG``) : les
+requêtes ERP s'exécutent telles quelles (seul ``RIGHT(``, mot-clé SQLite, est
+renommé à la volée).
+
+Activation : ``ERP_DB_SIMULATEUR=<chemin .sqlite>`` (avec ``ERP_DB_ENABLED=true``).
+Génération : `generer_base_simulateur` (N salariés × M semaines), utilisée par
+scripts/bench_sync_erp.py.
+
+Différence assumée avec SQL Server : les colonnes comparées sans RTRIM
+(``BECSSAREAL``, ``BEKTSOC``, ``MAKTSOC``) ne sont pas complétées d'espaces,
+SQLite ne les ignorant pas dans les comparaisons.
+"""
+from __future__ import annotations
+
+import random
+import re
+import sqlite3
+import zlib
+from datetime import date, timedelta
+from functools import lru_cache
+
+from services.erp.requetes import SOC
+
+_SCHEMA = """
+CREATE TABLE TEMPAS (
+    BECTMATRI1 TEXT NOT NULL,   -- nchar(12), complété d'espaces
+    BECSSAREAL TEXT NOT NULL,   -- AAAASS
+    BECNREALIS REAL NOT NULL,
+    BECTUNCONS TEXT,
+    BECTUNSTK  TEXT,
+    BEKTSOC    TEXT NOT NULL
+);
+CREATE INDEX ix_tempas_semaine ON TEMPAS (BEKTSOC, BECSSAREAL);
+CREATE TABLE SALARIES (
+    MAKTCODE TEXT NOT NULL,     -- nchar(12), complété d'espaces
+    MACTNOM  TEXT NOT NULL,     -- nchar(80), complété d'espaces
+    MAKTSOC  TEXT NOT NULL
+);
+"""
+
+
+@lru_cache(maxsize=64)
+def _motif_like(motif: str) -> re.Pattern:
+    """Traduit un motif LIKE T-SQL (``%``, ``_``, ``[...]``) en regex insensible à la casse."""
+    morceaux = []
+    i = 0
+    while i < len(motif):
+        c = motif[i]
+        if c == "%":
+            morceaux.append(".*")
+        elif c == "_":
+            morceaux.append(".")
+        elif c == "[" and "]" in motif[i + 1:]:
+            fin = motif.index("]", i + 1)
+            classe = motif[i + 1:fin]
+            morceaux.append("[" + classe.replace("\\", "\\\\") + "]")
+            i = fin
+        else:
+            morceaux.append(re.escape(c))
+        i += 1
+    return re.compile("".join(morceaux), re.IGNORECASE | re.DOTALL)
+
+
+def _like(motif, valeur):
+    if motif is None or valeur is None:
+        return None
+    return _motif_like(motif).fullmatch(str(valeur)) is not None
+
+
+def _right(valeur, n):
+    if valeur is None:
+        return None
+    return str(valeur)[-int(n):] if int(n) > 0 else ""
+
+
+def _replicate(valeur, n):
+    return None if valeur is None else str(valeur) * max(0, int(n))
+
+
+def _binary_checksum(*valeurs):
+    crc = zlib.crc32(repr(valeurs).encode())
+    return crc - (1 << 32) if crc >= (1 << 31) else crc
+
+
+class _ChecksumAgg:
+    """CHECKSUM_AGG : OU exclusif des valeurs (NULL si aucune ligne)."""
+
+    def __init__(self):
+        self.valeur = None
+
+    def step(self, v):
+        if v is not None:
+            self.valeur = (self.valeur or 0) ^ int(v)
+
+    def finalize(self):
+        return self.valeur
+
+
+_RIGHT = re.compile(r"\bRIGHT\s*\(", re.IGNORECASE)
+
+
+def _traduire(sql: str) -> str:
+    return _RIGHT.sub("TSQL_RIGHT(", sql)
+
+
+class _CurseurSimulateur:
+    """Curseur DB-API (sous-ensemble pyodbc utilisé par requetes.py)."""
+
+    def __init__(self, curseur: sqlite3.Cursor):
+        self._curseur = curseur
+
+    def execute(self, sql, params=()):
+        self._curseur.execute(_traduire(sql), params)
+        return self
+
+    def fetchone(self):
+        return self._curseur.fetchone()
+
+    def fetchall(self):
+        return self._curseur.fetchall()
+
+    def fetchmany(self, taille):
+        return self._curseur.fetchmany(taille)
+
+    def close(self):
+        self._curseur.close()
+
+
+class ConnexionSimulateur:
+    """Connexion « ERP » sur SQLite, même usage qu'une connexion pyodbc."""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self._conn = conn
+
+    def cursor(self):
+        return _CurseurSimulateur(self._conn.cursor())
+
+    def execute(self, sql, params=()):
+        return self.cursor().execute(sql, params)
+
+    def close(self):
+        self._conn.close()
+
+
+def connecter_simulateur(chemin: str) -> ConnexionSimulateur:
+    """Connexion « ERP » : base ``chemin`` attachée en ``dbo``, fonctions T-SQL enregistrées.
+
+    Partageable entre threads (le pool ERP la prête à un thread à la fois).
+    """
+    conn = sqlite3.connect(":memory:", check_same_thread=False)
+    conn.execute("ATTACH DATABASE ? AS dbo", (chemin,))
+    conn.create_function("LIKE", 2, _like, deterministic=True)
+    conn.create_function("TSQL_RIGHT", 2, _right, deterministic=True)
+    conn.create_function("REPLICATE", 2, _replicate, deterministic=True)
+    conn.create_function("BINARY_CHECKSUM", -1, _binary_checksum, deterministic=True)
+    conn.create_aggregate("CHECKSUM_AGG", 1, _ChecksumAgg)
+    return ConnexionSimulateur(conn)
+
+
+def _semaine_erp(lundi: date) -> str:
+    iso = lundi.isocalendar()
+    return f"{iso[0]}{iso[1]:02d}"
+
+
+def generer_base_simulateur(
+    chemin: str,
+    nb_salaries: int,
+    nb_semaines: int,
+    premier_lundi: date,
+    graine: int = 42,
+    matricule_depart: int = 1,
+) -> int:
+    """Crée (ou remplace) une base TEMPAS / SALARIES : ``nb_salaries`` × ``nb_semaines``.
+
+    Chaque salarié déclare 2 à 6 lignes d'OF par semaine (≈ 35-39 h), avec
+    des absences (semaine vide) et des lignes hors unité heures (ignorées par
+    la synchro), comme dans TEMPAS. Renvoie le nombre de lignes TEMPAS.
+    """
+    rng = random.Random(graine)
+    conn = sqlite3.connect(chemin)
+    try:
+        conn.executescript("DROP TABLE IF EXISTS TEMPAS; DROP TABLE IF EXISTS SALARIES;" + _SCHEMA)
+        salaries = [
+            (f"{matricule_depart + i:06d}".ljust(12), f"SALARIE{i:05d} Bench".ljust(80), SOC)
+            for i in range(nb_salaries)
+        ]
+        conn.executemany("INSERT INTO SALARIES VALUES (?, ?, ?)", salaries)
+
+        nb_lignes = 0
+        for s in range(nb_semaines):
+            semaine = _semaine_erp(premier_lundi + timedelta(weeks=s))
+            lignes = []
+            for matricule, _, _ in salaries:
+                if rng.random() < 0.08:  # congé, arrêt : rien de déclaré
+                    continue
+                total = rng.choice((35.0, 36.5, 37.0, 38.0, 39.0))
+                nb_of = rng.randint(2, 6)
+                parts = sorted(round(rng.uniform(0, total) * 2) / 2 for _ in range(nb_of - 1))
+                bornes = [0.0, *parts, total]
+                for a, b in zip(bornes, bornes[1:]):
+                    if b > a:
+                        lignes.append((matricule, semaine, b - a, "H", "H", SOC))
+                if rng.random() < 0.1:  # consommation matière : pas des heures
+                    lignes.append((matricule, semaine, rng.uniform(1, 20), "KG", "KG", SOC))
+            conn.executemany("INSERT INTO TEMPAS VALUES (?, ?, ?, ?, ?, ?)", lignes)
+            nb_lignes += len(lignes)
+        conn.commit()
+        return nb_lignes
+    finally:
+        conn.close()
@@ -2,9 +2,23 @@
 
 Flux :
   ERP SILOG/PMI (dbo.TEMPAS, lecture seule)
+    → empreinte par semaine (nb lignes, somme, signature) : seules les semaines
+      modifiées depuis le dernier import sont relues (services/erp/etat_sync.py)
     → aggrégat heures/salarié/semaine
-    → heures_hebdo (source='erp', écrase si déjà saisi manuellement)
-    → recalcul RTT (maj_rtt_allocations_hebdo)
+    → heures_hebdo (source='erp', upsert groupé ; une saisie manuelle est conservée)
+    → recalcul RTT des seules semaines importées (recalculer_semaines) et des
+      semaines saisies à l'avance devenues échues (rattraper_semaines_echues)
+
+Reprise multi-exercices (`reprendre_heures`, `flask erp-reprise-heures`) :
+  même chaîne, lue en flux par pages de semaines avec un commit par page.
+
+Télémétrie : chaque synchro est chronométrée par phase (connexion, TEMPAS,
+SALARIES, rapprochement, upsert, commit, RTT) et historisée dans
+``executions_sync_erp`` (services/erp/telemetrie.py).
+
+Exécution unique : les imports (hors aperçu) prennent le verrou ``heures_rtt``
+(services/verrous.py). Un import identique déjà en cours dans un autre
+processus (scheduler, écran RH, CLI) est attendu puis rejoint, pas relancé.
 
 Sécurité :
   - Aucune écriture vers l'ERP.
@@ -14,30 +28,51 @@ Sécurité :
 from __future__ import annotations
 
 import logging
-import unicodedata
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
 from dataclasses import dataclass, field
 from datetime import date, timedelta
 
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
 from models import db
 from models.heures_hebdo import HeuresHebdo
 from models.parametrage import ParametrageAnnuel
 from models.user import User
-from services.erp.connexion import erp_connexion
+from services.erp.annuaire import AnnuaireErp, annuaire_erp, normaliser_nom
+from services.erp.connexion import erp_connexion, pool_erp
+from services.erp.etat_sync import enregistrer_empreintes, semaines_modifiees
+from services.erp.telemetrie import ajouter_duree, compter_lignes_erp, phase, suivre_execution
 from services.erp.requetes import (
+    empreintes_semaines,
     heures_periode,
     heures_semaine,
+    HeuresSemaine,
+    iter_heures_periode,
     normaliser_matricule_erp,
-    salaries_erp,
 )
-from services.rtt_hebdo import maj_rtt_allocations_hebdo
+from services.parametrage_actif import get_parametrage_actif
+from services.rtt_hebdo import rattraper_semaines_echues, recalculer_semaines
+from services.verrous import VERROU_HEURES_RTT, Execution, execution_unique
 
 logger = logging.getLogger(__name__)
 
+# Lignes par INSERT groupé (5 paramètres par ligne, sous la limite SQLite de 32 766).
+_LIGNES_PAR_UPSERT = 2000
+
+# Reprise multi-exercices : semaines par page (un commit par page) et lignes par lot lu.
+_SEMAINES_PAR_PAGE = 13
+_LIGNES_PAR_LOT = 1000
+
 
 @dataclass
 class RapportSyncExercice:
     """Bilan d'un import ERP couvrant plusieurs semaines (ex. tout l'exercice)."""
     semaines: list[str] = field(default_factory=list)
+    # Semaines relues dans TEMPAS (empreinte ERP différente du dernier import).
+    semaines_modifiees: list[str] = field(default_factory=list)
     nb_importes: int = 0
     nb_skipped_sans_matricule: int = 0
     nb_skipped_sans_user: int = 0
@@ -45,6 +80,13 @@ class RapportSyncExercice:
     rtt_recalcule: bool = False
     dry_run: bool = False
     preview: list[dict] = field(default_factory=list)
+    # Paires (user_id, lundi) réellement écrites : base du recalcul RTT incrémental.
+    semaines_importees: list[tuple[int, date]] = field(default_factory=list)
+    # Import identique déjà en cours ailleurs : attendu, pas relancé.
+    execution_rejointe: bool = False
+    # Télémétrie : secondes par phase et lignes lues dans TEMPAS.
+    durees: dict[str, float] = field(default_factory=dict, compare=False)
+    nb_lignes_erp: int = 0
 
     @property
     def ok(self) -> bool:
@@ -64,28 +106,25 @@ class RapportSync:
     # import sont listées dans `preview` pour que la RH valide avant d'écraser.
     dry_run: bool = False
     preview: list[dict] = field(default_factory=list)
+    semaines_importees: list[tuple[int, date]] = field(default_factory=list)
+    execution_rejointe: bool = False
+    durees: dict[str, float] = field(default_factory=dict, compare=False)
+    nb_lignes_erp: int = 0
 
     @property
     def ok(self) -> bool:
         return self.nb_importes >= 0
 
 
-def _normaliser_nom(nom: str) -> str:
-    """Normalise un nom pour rapprochement robuste (accents/casse/espaces)."""
-    txt = unicodedata.normalize("NFKD", nom or "")
-    txt = "".join(ch for ch in txt if not unicodedata.combining(ch))
-    return " ".join(txt.upper().split())
-
-
 def _index_users_par_matricule() -> dict[str, int]:
     """Index matricule canonique → user_id (salariés actifs)."""
     index: dict[str, int] = {}
-    for u in User.query.filter(User.actif == True, User.matricule.isnot(None)).all():
-        if not u.matricule:
-            continue
-        canon = normaliser_matricule_erp(u.matricule)
+    for user_id, matricule in db.session.query(User.id, User.matricule).filter(
+        User.actif == True, User.matricule.isnot(None)
+    ):
+        canon = normaliser_matricule_erp(matricule)
         if canon:
-            index[canon] = u.id
+            index[canon] = user_id
     return index
 
 
@@ -94,28 +133,21 @@ def _auto_rattacher_matricules(
     inconnus: set[str],
     users_par_matricule: dict[str, int],
     rapport: RapportSync,
-    conn,
+    annuaire: AnnuaireErp,
     dry_run: bool,
-    noms_erp_par_matricule: dict[str, str] | None = None,
 ) -> None:
     """Rattache automatiquement des matricules ERP à des salariés sans matricule.
 
     Règle de sécurité : on ne rattache que si le nom complet ERP correspond
     exactement (après normalisation) à un unique salarié actif sans matricule.
+    Les noms ERP normalisés viennent de l'annuaire en cache (aucune requête ERP).
     """
-    if not inconnus:
-        return
-
-    if noms_erp_par_matricule is None:
-        rows = salaries_erp(conn)
-        nom_erp_par_matricule = {
-            r.matricule: r.nom_complet for r in rows if r.matricule in inconnus and r.nom_complet
-        }
-    else:
-        nom_erp_par_matricule = {
-            mat: nom for mat, nom in noms_erp_par_matricule.items() if mat in inconnus and nom
-        }
-    if not nom_erp_par_matricule:
+    noms_inconnus = {
+        mat: annuaire.noms_normalises[mat]
+        for mat in inconnus
+        if mat not in users_par_matricule and annuaire.noms_normalises.get(mat)
+    }
+    if not noms_inconnus:
         return
 
     users_sans_matricule = User.query.filter(
@@ -124,17 +156,14 @@ def _auto_rattacher_matricules(
     users_par_nom: dict[str, list[User]] = {}
     for u in users_sans_matricule:
         for cle in (
-            _normaliser_nom(f"{u.nom} {u.prenom}"),
-            _normaliser_nom(f"{u.prenom} {u.nom}"),
+            normaliser_nom(f"{u.nom} {u.prenom}"),
+            normaliser_nom(f"{u.prenom} {u.nom}"),
         ):
             users_par_nom.setdefault(cle, []).append(u)
 
     users_deja_rattaches: set[int] = set()
-    for mat, nom_erp in nom_erp_par_matricule.items():
-        if mat in users_par_matricule:
-            continue
-        cle = _normaliser_nom(nom_erp)
-        candidats = users_par_nom.get(cle, [])
+    for mat in sorted(noms_inconnus):
+        candidats = users_par_nom.get(noms_inconnus[mat], [])
         # Déduplique si le salarié est indexé sous nom prénom ET prénom nom.
         candidats = list({u.id: u for u in candidats}.values())
         if len(candidats) != 1:
@@ -165,6 +194,17 @@ def _semaine_erp_depuis_date(d: date) -> str:
     return f"{iso[0]}{iso[1]:02d}"
 
 
+def _semaines_entre(premiere: str, derniere: str) -> list[str]:
+    """Codes AAAASS de la semaine ``premiere`` à la semaine ``derniere`` incluses."""
+    lundi = _lundi_depuis_semaine_erp(premiere)
+    fin = _lundi_depuis_semaine_erp(derniere)
+    semaines: list[str] = []
+    while lundi <= fin:
+        semaines.append(_semaine_erp_depuis_date(lundi))
+        lundi += timedelta(days=7)
+    return semaines
+
+
 def _semaines_erp_exercice(param: ParametrageAnnuel, jusqu_a: date | None = None) -> list[str]:
     """Codes AAAASS des semaines couvrant l'exercice actif, jusqu'à aujourd'hui par défaut."""
     debut = param.debut_exercice
@@ -185,26 +225,71 @@ def _preparer_import_erp(
     conn,
     dry_run: bool,
 ) -> tuple[dict[str, int], dict[str, str]]:
-    """Index matricules + auto-rattachement avant import des lignes ERP."""
-    users_par_matricule = _index_users_par_matricule()
-    salaries = salaries_erp(conn)
-    noms_erp_par_matricule = {
-        s.matricule: s.nom_complet for s in salaries if s.matricule and s.nom_complet
-    }
-    inconnus = {
-        normaliser_matricule_erp(l.matricule)
-        for l in lignes
-        if l.matricule and normaliser_matricule_erp(l.matricule) not in users_par_matricule
-    }
-    _auto_rattacher_matricules(
-        inconnus=inconnus,
-        users_par_matricule=users_par_matricule,
-        rapport=rapport,
-        conn=conn,
-        dry_run=dry_run,
-        noms_erp_par_matricule=noms_erp_par_matricule,
+    """Index matricules + auto-rattachement avant import des lignes ERP.
+
+    L'annuaire ERP n'est consulté que si une ligne porte un matricule inconnu
+    de l'application (cas courant : aucun, donc aucune lecture de SALARIES).
+    """
+    with phase("rapprochement"):
+        users_par_matricule = _index_users_par_matricule()
+        inconnus = {
+            normaliser_matricule_erp(l.matricule)
+            for l in lignes
+            if l.matricule and normaliser_matricule_erp(l.matricule) not in users_par_matricule
+        }
+        if not inconnus:
+            return users_par_matricule, {}
+        with phase("salaries"):
+            annuaire = annuaire_erp(conn, inconnus)
+        _auto_rattacher_matricules(
+            inconnus=inconnus,
+            users_par_matricule=users_par_matricule,
+            rapport=rapport,
+            annuaire=annuaire,
+            dry_run=dry_run,
+        )
+    return users_par_matricule, annuaire.noms
+
+
+def _heures_existantes(lignes_cibles: list[tuple[int, date]]) -> dict[tuple[int, date], tuple[str, float]]:
+    """{(user_id, lundi): (source, heures)} des saisies existantes, en une requête."""
+    if not lignes_cibles:
+        return {}
+    user_ids = {u for u, _ in lignes_cibles}
+    lundis = [l for _, l in lignes_cibles]
+    cibles = set(lignes_cibles)
+    rows = db.session.query(
+        HeuresHebdo.user_id, HeuresHebdo.date_lundi, HeuresHebdo.source, HeuresHebdo.heures_travaillees,
+    ).filter(
+        HeuresHebdo.user_id.in_(user_ids),
+        HeuresHebdo.date_lundi.between(min(lundis), max(lundis)),
     )
-    return users_par_matricule, noms_erp_par_matricule
+    return {
+        (user_id, lundi): (source, heures)
+        for user_id, lundi, source, heures in rows
+        if (user_id, lundi) in cibles
+    }
+
+
+def _ecrire_heures_erp(valeurs: dict[tuple[int, date], float]) -> None:
+    """Upsert groupé des heures ERP ; une saisie manuelle n'est jamais écrasée.
+
+    Le ``WHERE source != 'manuel'`` du ``ON CONFLICT`` protège aussi une saisie
+    manuelle enregistrée entre la lecture des existants et l'écriture.
+    """
+    lignes = [
+        {"user_id": user_id, "date_lundi": lundi, "heures_travaillees": heures, "source": "erp"}
+        for (user_id, lundi), heures in valeurs.items()
+    ]
+    table = HeuresHebdo.__table__
+    for i in range(0, len(lignes), _LIGNES_PAR_UPSERT):
+        stmt = sqlite_insert(table).values(lignes[i:i + _LIGNES_PAR_UPSERT])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "date_lundi"],
+            set_={"heures_travaillees": stmt.excluded.heures_travaillees, "source": "erp"},
+            where=table.c.source != "manuel",
+        )
+        db.session.execute(stmt)
 
 
 def _importer_lignes_erp(
@@ -215,7 +300,38 @@ def _importer_lignes_erp(
     rapport,
     dry_run: bool,
 ) -> None:
-    """Importe des lignes ERP (une ou plusieurs semaines) dans heures_hebdo."""
+    """Importe des lignes ERP (une ou plusieurs semaines) dans heures_hebdo.
+
+    Les saisies existantes sont lues en une requête et l'écriture est un seul
+    ``INSERT ... ON CONFLICT DO UPDATE`` (plus d'aller-retour par ligne).
+    """
+    with phase("rapprochement"):
+        valeurs = _comparer_lignes_erp(
+            lignes,
+            users_par_matricule=users_par_matricule,
+            noms_erp_par_matricule=noms_erp_par_matricule,
+            rapport=rapport,
+            dry_run=dry_run,
+        )
+    if not dry_run:
+        with phase("upsert"):
+            _ecrire_heures_erp(valeurs)
+
+
+def _comparer_lignes_erp(
+    lignes,
+    *,
+    users_par_matricule: dict[str, int],
+    noms_erp_par_matricule: dict[str, str],
+    rapport,
+    dry_run: bool,
+) -> dict[tuple[int, date], float]:
+    """Rapproche les lignes ERP des salariés et des saisies existantes.
+
+    Renvoie les heures à écrire ``{(user_id, lundi): heures}`` ; en aperçu,
+    remplit ``rapport.preview`` à la place.
+    """
+    a_importer: list[tuple[str, int, date, object]] = []
     for ligne in lignes:
         mat = normaliser_matricule_erp(ligne.matricule)
         if not mat:
@@ -233,18 +349,22 @@ def _importer_lignes_erp(
             )
             continue
 
-        date_lundi = _lundi_depuis_semaine_erp(ligne.semaine_erp)
-        row = HeuresHebdo.query.filter_by(user_id=user_id, date_lundi=date_lundi).first()
+        a_importer.append((mat, user_id, _lundi_depuis_semaine_erp(ligne.semaine_erp), ligne))
+
+    existantes = _heures_existantes([(user_id, lundi) for _, user_id, lundi, _ in a_importer])
+    valeurs: dict[tuple[int, date], float] = {}
+    for mat, user_id, date_lundi, ligne in a_importer:
+        existante = existantes.get((user_id, date_lundi))
         action = "import"
         ancienne_valeur = None
-        if row is not None and row.source == "manuel":
+        if existante is not None and existante[0] == "manuel":
             rapport.avertissements.append(
                 f"Matricule {mat} ({date_lundi}) : valeur manuelle conservée "
-                f"({row.heures_travaillees} h saisi, ERP={ligne.heures} h)."
+                f"({existante[1]} h saisi, ERP={ligne.heures} h)."
             )
             action = "skip_manuel"
-        elif row is not None:
-            ancienne_valeur = row.heures_travaillees
+        elif existante is not None:
+            ancienne_valeur = existante[1]
 
         if dry_run:
             rapport.preview.append({
@@ -263,13 +383,84 @@ def _importer_lignes_erp(
         if action == "skip_manuel":
             continue
 
-        if row is None:
-            row = HeuresHebdo(user_id=user_id, date_lundi=date_lundi, source="erp")
-            db.session.add(row)
-
-        row.heures_travaillees = round(ligne.heures, 2)
-        row.source = "erp"
+        # Deux lignes pour la même semaine : la dernière l'emporte.
+        valeurs[(user_id, date_lundi)] = round(ligne.heures, 2)
         rapport.nb_importes += 1
+        rapport.semaines_importees.append((user_id, date_lundi))
+    return valeurs
+
+
+@contextmanager
+def _connexion_erp():
+    """`erp_connexion()` dont l'emprunt au pool est compté dans la phase « connexion »."""
+    debut = time.perf_counter()
+    with erp_connexion() as conn:
+        ajouter_duree("connexion", time.perf_counter() - debut)
+        yield conn
+
+
+def _lire_tempas(lecture, *args, **kwargs) -> list[HeuresSemaine]:
+    with phase("tempas"):
+        lignes = lecture(*args, **kwargs)
+    compter_lignes_erp(len(lignes))
+    return lignes
+
+
+def _lots_tempas(lots):
+    """Lots de `iter_heures_periode`, leur lecture comptée dans la phase « tempas »."""
+    try:
+        while True:
+            with phase("tempas"):
+                lot = next(lots, None)
+            if lot is None:
+                return
+            compter_lignes_erp(len(lot))
+            yield lot
+    finally:
+        lots.close()
+
+
+def _nb_extracteurs(demande: int | None, nb_tranches: int) -> int:
+    """Requêtes TEMPAS simultanées : demandées (ou ERP_EXTRACTION_PARALLELE), bornées par le pool.
+
+    La synchro garde une connexion du pool (empreintes, salariés) : les
+    extracteurs se partagent les autres, sans jamais dépasser ERP_POOL_TAILLE.
+    """
+    if demande is None:
+        try:
+            demande = int(os.environ.get("ERP_EXTRACTION_PARALLELE", "1"))
+        except ValueError:
+            demande = 1
+    if demande <= 1 or nb_tranches <= 1:
+        return 1
+    return max(1, min(demande, pool_erp().taille_max - 1, nb_tranches))
+
+
+def _extraire_en_parallele(semaines: list[str], nb_extracteurs: int, progression=None) -> list[HeuresSemaine]:
+    """Lit les heures de ``semaines`` par tranches, sur plusieurs connexions du pool ERP.
+
+    Les tranches sont recollées dans l'ordre des semaines : le résultat est
+    celui de `heures_periode` sur toute la liste (agrégat trié par semaine).
+    ``progression(nb_tranches_lues, nb_tranches)`` est appelée dans le thread
+    appelant après chaque tranche.
+    """
+    tranches = [semaines[i:i + _SEMAINES_PAR_PAGE] for i in range(0, len(semaines), _SEMAINES_PAR_PAGE)]
+    resultats: list[list[HeuresSemaine]] = [[] for _ in tranches]
+
+    def _lire(tranche):
+        with erp_connexion() as conn:
+            return heures_periode(conn, tranche)
+
+    executeur = ThreadPoolExecutor(max_workers=nb_extracteurs, thread_name_prefix="erp-extraction")
+    try:
+        futures = {executeur.submit(_lire, t): i for i, t in enumerate(tranches)}
+        for nb_lues, future in enumerate(as_completed(futures), 1):
+            resultats[futures[future]] = future.result()
+            if progression:
+                progression(nb_lues, len(tranches))
+    finally:
+        executeur.shutdown(wait=True, cancel_futures=True)
+    return [ligne for lignes in resultats for ligne in lignes]
 
 
 def _semaine_precedente(reference: date | None = None) -> str:
@@ -289,6 +480,15 @@ def _lundi_depuis_semaine_erp(semaine_erp: str) -> date:
     return date.fromisocalendar(annee, semaine, 1)
 
 
+def _rapport_rejoint(rapport, execution: Execution):
+    rapport.execution_rejointe = True
+    rapport.avertissements.append(
+        f"Synchronisation identique déjà en cours ailleurs : terminée pendant l'attente "
+        f"({execution.attente:.0f} s), non relancée."
+    )
+    return rapport
+
+
 def synchroniser_semaine(
     semaine_erp: str | None = None,
     recalculer_rtt: bool = True,
@@ -309,14 +509,29 @@ def synchroniser_semaine(
 
     date_lundi = _lundi_depuis_semaine_erp(semaine_erp)
     rapport = RapportSync(semaine_erp=semaine_erp, date_lundi=date_lundi, dry_run=dry_run)
+    with suivre_execution("semaine", [semaine_erp], rapport):
+        if dry_run:
+            return _synchroniser_semaine(rapport, recalculer_rtt)
+        with execution_unique(VERROU_HEURES_RTT, f"semaine:{semaine_erp}:rtt={int(recalculer_rtt)}") as execution:
+            if execution.rejointe:
+                return _rapport_rejoint(rapport, execution)
+            return _synchroniser_semaine(rapport, recalculer_rtt)
 
-    with erp_connexion() as conn:
-        lignes = heures_semaine(conn, semaine_erp)
+
+def _synchroniser_semaine(rapport: RapportSync, recalculer_rtt: bool) -> RapportSync:
+    semaine_erp, dry_run = rapport.semaine_erp, rapport.dry_run
+    with _connexion_erp() as conn:
+        lignes = _lire_tempas(heures_semaine, conn, semaine_erp)
         if not lignes:
             rapport.avertissements.append(
                 f"Aucune heure trouvée dans TEMPAS pour la semaine {semaine_erp}."
             )
             return rapport
+        if dry_run:
+            empreintes = {}
+        else:
+            with phase("tempas"):
+                empreintes = empreintes_semaines(conn, semaine_erp, semaine_erp)
 
         users_par_matricule, noms_erp_par_matricule = _preparer_import_erp(
             lignes, rapport=rapport, conn=conn, dry_run=dry_run
@@ -336,16 +551,21 @@ def synchroniser_semaine(
         )
         return rapport
 
-    db.session.commit()
+    with phase("commit"):
+        enregistrer_empreintes([semaine_erp], empreintes)
+        db.session.commit()
     logger.info(
         "Synchro ERP semaine %s : %d heures importées, %d avertissements.",
         semaine_erp, rapport.nb_importes, len(rapport.avertissements),
     )
 
     if recalculer_rtt and rapport.nb_importes > 0:
-        param = ParametrageAnnuel.query.filter_by(actif=True).first()
+        param = get_parametrage_actif()
         if param:
-            maj_rtt_allocations_hebdo(param)
+            with phase("rtt"):
+                recalculer_semaines(param, rapport.semaines_importees)
+                rattraper_semaines_echues(param)
+                db.session.commit()
             rapport.rtt_recalcule = True
 
     return rapport
@@ -355,13 +575,23 @@ def synchroniser_exercice(
     recalculer_rtt: bool = True,
     dry_run: bool = False,
     jusqu_a: date | None = None,
+    complet: bool = False,
+    paralleles: int | None = None,
+    progression=None,
 ) -> RapportSyncExercice:
-    """Importe toutes les heures ERP depuis le début de l'exercice actif.
+    """Importe les heures ERP depuis le début de l'exercice actif.
 
     Nécessaire pour un recalcul RTT fiable : le calcul agrège toutes les semaines
-    de l'exercice, pas seulement la dernière importée.
+    de l'exercice, pas seulement la dernière importée. Seules les semaines dont
+    l'empreinte TEMPAS a changé depuis le dernier import sont relues
+    (``complet=True`` : toutes).
+
+    ``paralleles`` : requêtes TEMPAS simultanées (défaut ERP_EXTRACTION_PARALLELE,
+    borné par le pool ERP) ; au-delà d'une, les semaines sont lues par tranches
+    en parallèle puis importées comme en série. ``progression(faites, total)``
+    suit la lecture des tranches.
     """
-    param = ParametrageAnnuel.query.filter_by(actif=True).first()
+    param = get_parametrage_actif()
     if not param:
         rapport = RapportSyncExercice(dry_run=dry_run)
         rapport.avertissements.append("Aucun paramétrage actif. Configurez d'abord l'exercice.")
@@ -373,25 +603,64 @@ def synchroniser_exercice(
         rapport.avertissements.append("Aucune semaine à synchroniser sur l'exercice actif.")
         return rapport
 
-    with erp_connexion() as conn:
-        lignes = heures_periode(conn, semaines)
-        if not lignes:
+    options = dict(recalculer_rtt=recalculer_rtt, complet=complet, paralleles=paralleles, progression=progression)
+    with suivre_execution("exercice", semaines, rapport):
+        if dry_run:
+            return _synchroniser_exercice(param, rapport, **options)
+        cle = f"exercice:{semaines[0]}-{semaines[-1]}:rtt={int(recalculer_rtt)}:complet={int(complet)}"
+        with execution_unique(VERROU_HEURES_RTT, cle) as execution:
+            if execution.rejointe:
+                return _rapport_rejoint(rapport, execution)
+            return _synchroniser_exercice(param, rapport, **options)
+
+
+def _synchroniser_exercice(
+    param: ParametrageAnnuel,
+    rapport: RapportSyncExercice,
+    *,
+    recalculer_rtt: bool,
+    complet: bool,
+    paralleles: int | None,
+    progression,
+) -> RapportSyncExercice:
+    semaines, dry_run = rapport.semaines, rapport.dry_run
+    with _connexion_erp() as conn:
+        with phase("tempas"):
+            empreintes = empreintes_semaines(conn, semaines[0], semaines[-1])
+        modifiees = list(semaines) if complet else semaines_modifiees(semaines, empreintes)
+        rapport.semaines_modifiees = modifiees
+        if not modifiees:
+            logger.info(
+                "Synchro ERP exercice %s → %s : aucune semaine modifiée.", semaines[0], semaines[-1],
+            )
+            return rapport
+
+        nb_tranches = -(-len(modifiees) // _SEMAINES_PAR_PAGE)
+        nb_extracteurs = _nb_extracteurs(paralleles, nb_tranches)
+        if nb_extracteurs > 1:
+            lignes = _lire_tempas(_extraire_en_parallele, modifiees, nb_extracteurs, progression)
+        else:
+            lignes = _lire_tempas(heures_periode, conn, modifiees)
+            if progression:
+                progression(1, 1)
+        if not lignes and complet:
             rapport.avertissements.append(
                 f"Aucune heure trouvée dans TEMPAS pour l'exercice "
                 f"({semaines[0]} → {semaines[-1]})."
             )
             return rapport
 
-        users_par_matricule, noms_erp_par_matricule = _preparer_import_erp(
-            lignes, rapport=rapport, conn=conn, dry_run=dry_run
-        )
-        _importer_lignes_erp(
-            lignes,
-            users_par_matricule=users_par_matricule,
-            noms_erp_par_matricule=noms_erp_par_matricule,
-            rapport=rapport,
-            dry_run=dry_run,
-        )
+        if lignes:
+            users_par_matricule, noms_erp_par_matricule = _preparer_import_erp(
+                lignes, rapport=rapport, conn=conn, dry_run=dry_run
+            )
+            _importer_lignes_erp(
+                lignes,
+                users_par_matricule=users_par_matricule,
+                noms_erp_par_matricule=noms_erp_par_matricule,
+                rapport=rapport,
+                dry_run=dry_run,
+            )
 
     if dry_run:
         logger.info(
@@ -400,14 +669,129 @@ def synchroniser_exercice(
         )
         return rapport
 
-    db.session.commit()
+    with phase("commit"):
+        enregistrer_empreintes(modifiees, empreintes)
+        db.session.commit()
     logger.info(
-        "Synchro ERP exercice %s → %s : %d heures importées.",
-        semaines[0], semaines[-1], rapport.nb_importes,
+        "Synchro ERP exercice %s → %s : %d semaine(s) modifiée(s), %d heures importées.",
+        semaines[0], semaines[-1], len(modifiees), rapport.nb_importes,
     )
 
     if recalculer_rtt and rapport.nb_importes > 0:
-        maj_rtt_allocations_hebdo(param)
+        with phase("rtt"):
+            recalculer_semaines(param, rapport.semaines_importees)
+            rattraper_semaines_echues(param)
+            db.session.commit()
+        rapport.rtt_recalcule = True
+
+    return rapport
+
+
+def reprendre_heures(
+    premiere: str,
+    derniere: str,
+    recalculer_rtt: bool = True,
+    complet: bool = False,
+    semaines_par_page: int = _SEMAINES_PAR_PAGE,
+    taille_lot: int = _LIGNES_PAR_LOT,
+) -> RapportSyncExercice:
+    """Reprise des heures ERP sur plusieurs exercices (semaines ``premiere`` → ``derniere``).
+
+    Les semaines à relire sont découpées en pages ; chaque page est lue en flux
+    (`iter_heures_periode`, lots de ``taille_lot`` lignes), importée lot par lot
+    puis validée par un commit avec ses empreintes. Une reprise interrompue
+    repart donc de la première page non validée : les semaines déjà
+    enregistrées et inchangées dans TEMPAS sont ignorées (sauf ``complet``).
+
+    Seules les semaines de l'exercice actif sont recalculées côté RTT (et
+    gardées dans ``semaines_importees``) ; les exercices passés sont clos.
+    """
+    semaines = _semaines_entre(premiere, derniere)
+    rapport = RapportSyncExercice(semaines=semaines)
+    if not semaines:
+        rapport.avertissements.append(f"Période vide : {premiere} → {derniere}.")
+        return rapport
+
+    cle = f"reprise:{premiere}-{derniere}:rtt={int(recalculer_rtt)}:complet={int(complet)}"
+    with suivre_execution("reprise", semaines, rapport), \
+            execution_unique(VERROU_HEURES_RTT, cle) as execution:
+        if execution.rejointe:
+            return _rapport_rejoint(rapport, execution)
+        return _reprendre_heures(
+            rapport,
+            recalculer_rtt=recalculer_rtt,
+            complet=complet,
+            semaines_par_page=semaines_par_page,
+            taille_lot=taille_lot,
+        )
+
+
+def _reprendre_heures(
+    rapport: RapportSyncExercice,
+    *,
+    recalculer_rtt: bool,
+    complet: bool,
+    semaines_par_page: int,
+    taille_lot: int,
+) -> RapportSyncExercice:
+    semaines = rapport.semaines
+    param = get_parametrage_actif()
+    with _connexion_erp() as conn:
+        with phase("tempas"):
+            empreintes = empreintes_semaines(conn, semaines[0], semaines[-1])
+        modifiees = list(semaines) if complet else semaines_modifiees(semaines, empreintes)
+        rapport.semaines_modifiees = modifiees
+        if not modifiees:
+            return rapport
+
+        with phase("rapprochement"):
+            users_par_matricule = _index_users_par_matricule()
+        # Lu avant le flux : la connexion est ensuite occupée par le curseur paginé.
+        with phase("salaries"):
+            annuaire = annuaire_erp(conn)
+        noms_erp_par_matricule = annuaire.noms
+        semaines_rtt: list[tuple[int, date]] = []
+        for i in range(0, len(modifiees), semaines_par_page):
+            page = modifiees[i:i + semaines_par_page]
+            for lot in _lots_tempas(iter_heures_periode(conn, page, taille_lot=taille_lot)):
+                inconnus = {l.matricule for l in lot if l.matricule and l.matricule not in users_par_matricule}
+                with phase("rapprochement"):
+                    _auto_rattacher_matricules(
+                        inconnus=inconnus,
+                        users_par_matricule=users_par_matricule,
+                        rapport=rapport,
+                        annuaire=annuaire,
+                        dry_run=False,
+                    )
+                _importer_lignes_erp(
+                    lot,
+                    users_par_matricule=users_par_matricule,
+                    noms_erp_par_matricule=noms_erp_par_matricule,
+                    rapport=rapport,
+                    dry_run=False,
+                )
+                if param:
+                    semaines_rtt.extend(
+                        (uid, lundi) for uid, lundi in rapport.semaines_importees
+                        if param.debut_exercice - timedelta(days=6) <= lundi <= param.fin_exercice
+                    )
+                rapport.semaines_importees.clear()
+            with phase("commit"):
+                enregistrer_empreintes(page, empreintes)
+                db.session.commit()
+            # Un avertissement « matricule absent » par matricule, pas par ligne.
+            rapport.avertissements = list(dict.fromkeys(rapport.avertissements))
+            logger.info(
+                "Reprise ERP : semaines %s → %s validées (%d/%d), %d heures importées.",
+                page[0], page[-1], i + len(page), len(modifiees), rapport.nb_importes,
+            )
+    rapport.semaines_importees = semaines_rtt
+
+    if recalculer_rtt and semaines_rtt:
+        with phase("rtt"):
+            recalculer_semaines(param, semaines_rtt)
+            rattraper_semaines_echues(param)
+            db.session.commit()
         rapport.rtt_recalcule = True
 
     return rapport
@@ -0,0 +1,165 @@
+"""File des synchros ERP exécutées en arrière-plan (table ``taches_sync_erp``).
+
+La route RH enfile une tâche (`creer_tache`) et rend la main : une synchro de
+l'exercice avec recalcul RTT peut durer plusieurs minutes et ne doit ni
+bloquer un thread Waitress ni dépasser le délai du proxy IIS. Le planificateur
+(services/erp/scheduler.py) exécute la file (`executer_taches_en_attente`)
+dans son propre thread ; la page de suivi interroge `etat_tache`.
+
+Sans planificateur (flask run, tests), la route exécute la tâche aussitôt.
+"""
+from __future__ import annotations
+
+import dataclasses
+import json
+import logging
+import threading
+from datetime import date, datetime, timezone
+
+from models import db
+from models.tache_sync_erp import TacheSyncErp
+
+logger = logging.getLogger(__name__)
+
+STATUT_EN_ATTENTE = "en_attente"
+STATUT_EN_COURS = "en_cours"
+STATUT_TERMINEE = "terminee"
+STATUT_ERREUR = "erreur"
+STATUTS_ACTIFS = (STATUT_EN_ATTENTE, STATUT_EN_COURS)
+
+TYPES_SYNC = ("semaine", "exercice")
+
+# Une seule exécution de la file à la fois dans le processus.
+_verrou_execution = threading.Lock()
+
+
+def creer_tache(type_sync: str, parametres: dict, demande_par_id: int | None = None) -> TacheSyncErp:
+    """Enfile une synchro ERP et commit.
+
+    Une tâche identique (même type et mêmes paramètres) déjà en attente ou en
+    cours est renvoyée au lieu d'en créer une seconde (double clic, deux RH).
+    """
+    if type_sync not in TYPES_SYNC:
+        raise ValueError(f"Type de synchro inconnu : {type_sync!r}")
+    parametres_json = json.dumps(parametres, sort_keys=True)
+    existante = TacheSyncErp.query.filter(
+        TacheSyncErp.type_sync == type_sync,
+        TacheSyncErp.parametres == parametres_json,
+        TacheSyncErp.statut.in_(STATUTS_ACTIFS),
+    ).order_by(TacheSyncErp.id).first()
+    if existante is not None:
+        return existante
+    tache = TacheSyncErp(
+        type_sync=type_sync,
+        parametres=parametres_json,
+        statut=STATUT_EN_ATTENTE,
+        demande_par_id=demande_par_id,
+    )
+    db.session.add(tache)
+    db.session.commit()
+    return tache
+
+
+def _json_defaut(valeur):
+    if isinstance(valeur, (date, datetime)):
+        return valeur.isoformat()
+    return str(valeur)
+
+
+def _maj_progression(tache_id: int, faites: int, total: int) -> None:
+    """Écrit la progression hors de la session (la synchro n'a encore rien écrit)."""
+    table = TacheSyncErp.__table__
+    with db.engine.begin() as conn:
+        conn.execute(
+            table.update().where(table.c.id == tache_id)
+            .values(progression_faite=faites, progression_totale=total)
+        )
+
+
+def _executer(tache: TacheSyncErp):
+    from services.erp.sync_heures import synchroniser_exercice, synchroniser_semaine
+
+    parametres = json.loads(tache.parametres or "{}")
+    if tache.type_sync == "exercice":
+        return synchroniser_exercice(
+            recalculer_rtt=parametres.get("recalculer_rtt", True),
+            dry_run=parametres.get("dry_run", False),
+            complet=parametres.get("complet", False),
+            progression=lambda faites, total: _maj_progression(tache.id, faites, total),
+        )
+    return synchroniser_semaine(
+        semaine_erp=parametres.get("semaine_erp"),
+        recalculer_rtt=parametres.get("recalculer_rtt", True),
+        dry_run=parametres.get("dry_run", False),
+    )
+
+
+def executer_tache(tache: TacheSyncErp) -> TacheSyncErp:
+    """Exécute une tâche en attente et enregistre son rapport (ou son erreur). Commit."""
+    tache_id = tache.id
+    tache.statut = STATUT_EN_COURS
+    tache.debut_le = datetime.now(timezone.utc)
+    db.session.commit()
+    try:
+        rapport = _executer(tache)
+    except Exception as e:
+        db.session.rollback()
+        logger.exception("Synchro ERP (tâche %s) : erreur.", tache_id)
+        tache = db.session.get(TacheSyncErp, tache_id)
+        tache.statut = STATUT_ERREUR
+        tache.message = str(e)[:500]
+    else:
+        # La progression a été écrite hors de la session : on la relit.
+        tache = db.session.get(TacheSyncErp, tache_id, populate_existing=True)
+        tache.statut = STATUT_TERMINEE
+        tache.rapport = json.dumps(dataclasses.asdict(rapport), default=_json_defaut, ensure_ascii=False)
+        tache.progression_faite = tache.progression_totale = max(1, tache.progression_totale)
+    tache.fin_le = datetime.now(timezone.utc)
+    db.session.commit()
+    return tache
+
+
+def executer_taches_en_attente() -> int:
+    """Exécute les tâches en attente, la plus ancienne d'abord. Renvoie leur nombre.
+
+    Sans effet si la file est déjà en cours d'exécution dans ce processus.
+    """
+    if not _verrou_execution.acquire(blocking=False):
+        return 0
+    try:
+        nb = 0
+        while True:
+            tache = TacheSyncErp.query.filter_by(statut=STATUT_EN_ATTENTE).order_by(TacheSyncErp.id).first()
+            if tache is None:
+                return nb
+            executer_tache(tache)
+            nb += 1
+    finally:
+        _verrou_execution.release()
+
+
+def reprendre_taches_interrompues() -> int:
+    """Remet en attente les tâches restées « en cours » (processus arrêté en pleine synchro). Commit."""
+    nb = TacheSyncErp.query.filter_by(statut=STATUT_EN_COURS).update(
+        {"statut": STATUT_EN_ATTENTE, "debut_le": None, "progression_faite": 0},
+        synchronize_session=False,
+    )
+    db.session.commit()
+    return nb
+
+
+def etat_tache(tache: TacheSyncErp) -> dict:
+    """État sérialisable (JSON) d'une tâche : statut, progression, rapport final."""
+    return {
+        "id": tache.id,
+        "type_sync": tache.type_sync,
+        "parametres": json.loads(tache.parametres or "{}"),
+        "statut": tache.statut,
+        "termine": tache.statut not in STATUTS_ACTIFS,
+        "progression": {"faites": tache.progression_faite, "total": tache.progression_totale},
+        "message": tache.message,
+        "rapport": json.loads(tache.rapport) if tache.rapport else None,
+        "cree_le": _json_defaut(tache.cree_le) if tache.cree_le else None,
+        "debut_le": _json_defaut(tache.debut_le) if tache.debut_le else None,
+        "fin_le": _json_defaut(tache.fin_le) if tache.fin_le else None,
+    }
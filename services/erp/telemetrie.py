@@ -0,0 +1,209 @@
+"""Télémétrie des synchros ERP : durée de chaque phase, historisée par exécution.
+
+Phases (exclusives : le temps d'une phase imbriquée est retiré de la phase
+englobante, leur somme ne dépasse donc pas la durée totale) :
+
+- ``connexion`` : emprunt d'une connexion au pool ERP (ouverture comprise) ;
+- ``tempas`` : requêtes sur dbo.TEMPAS (empreintes, heures, lecture en flux) ;
+- ``salaries`` : annuaire dbo.SALARIES (instantané en cache ou relecture) ;
+- ``rapprochement`` : matricules → salariés, auto-rattachement, saisies existantes ;
+- ``upsert`` : écriture groupée dans heures_hebdo ;
+- ``commit`` : empreintes des semaines et commit ;
+- ``rtt`` : recalcul RTT des semaines importées.
+
+`suivre_execution` ouvre le chronomètre d'une synchro (variable de contexte :
+les étapes de sync_heures l'alimentent par `phase` sans le recevoir en
+paramètre) et enregistre l'exécution dans ``executions_sync_erp`` à la fin,
+en succès comme en erreur (session annulée d'abord en cas d'erreur). `tendances_sync_erp` compare les dernières
+exécutions aux précédentes (écran heures hebdo, ``flask erp-sync-stats``).
+"""
+from __future__ import annotations
+
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timezone
+
+from models import db
+from models.execution_sync_erp import ExecutionSyncErp
+
+logger = logging.getLogger(__name__)
+
+PHASES = ("connexion", "tempas", "salaries", "rapprochement", "upsert", "commit", "rtt")
+TYPES_SYNC = ("semaine", "exercice", "reprise")
+
+
+class Chronometre:
+    """Durées cumulées par phase d'une synchro, et volume lu dans TEMPAS."""
+
+    def __init__(self):
+        self.durees = dict.fromkeys(PHASES, 0.0)
+        self.nb_lignes_erp = 0
+        self._pile: list[float] = []  # temps des phases imbriquées, par phase ouverte
+
+    @contextmanager
+    def phase(self, nom: str):
+        debut = time.perf_counter()
+        self._pile.append(0.0)
+        try:
+            yield
+        finally:
+            imbriquees = self._pile.pop()
+            self.ajouter(nom, time.perf_counter() - debut, imbriquees)
+
+    def ajouter(self, nom: str, secondes: float, deja_comptees: float = 0.0) -> None:
+        self.durees[nom] += secondes - deja_comptees
+        if self._pile:
+            self._pile[-1] += secondes
+
+
+_chrono_courant: ContextVar[Chronometre | None] = ContextVar("chrono_sync_erp", default=None)
+
+
+@contextmanager
+def phase(nom: str):
+    """Chronomètre le bloc dans la phase ``nom`` de la synchro en cours (sinon sans effet)."""
+    chrono = _chrono_courant.get()
+    if chrono is None:
+        yield
+        return
+    with chrono.phase(nom):
+        yield
+
+
+def ajouter_duree(nom: str, secondes: float) -> None:
+    """Ajoute une durée mesurée ailleurs à la phase ``nom`` de la synchro en cours."""
+    chrono = _chrono_courant.get()
+    if chrono is not None:
+        chrono.ajouter(nom, secondes)
+
+
+def compter_lignes_erp(nb: int) -> None:
+    chrono = _chrono_courant.get()
+    if chrono is not None:
+        chrono.nb_lignes_erp += nb
+
+
+def _semaines_libelle(semaines: list[str]) -> str | None:
+    if not semaines:
+        return None
+    return semaines[0] if len(semaines) == 1 else f"{semaines[0]}-{semaines[-1]}"
+
+
+@contextmanager
+def suivre_execution(type_sync: str, semaines: list[str], rapport):
+    """Chronomètre une synchro et l'enregistre dans l'historique.
+
+    À la sortie, ``rapport.durees`` et ``rapport.nb_lignes_erp`` sont renseignés.
+    Si la synchro échoue, la session est annulée avant l'écriture de l'historique.
+    """
+    chrono = Chronometre()
+    jeton = _chrono_courant.set(chrono)
+    debut_le = datetime.now(timezone.utc)
+    t0 = time.perf_counter()
+    statut, message = "ok", None
+    try:
+        yield chrono
+    except Exception as e:
+        statut, message = "erreur", str(e)[:500]
+        # Écritures de la synchro non commitées : elles tiendraient le verrou
+        # d'écriture SQLite et bloqueraient l'historique, écrit sur une autre connexion.
+        db.session.rollback()
+        raise
+    finally:
+        _chrono_courant.reset(jeton)
+        duree = time.perf_counter() - t0
+        rapport.durees = {p: round(s, 4) for p, s in chrono.durees.items()}
+        rapport.nb_lignes_erp = chrono.nb_lignes_erp
+        if statut == "ok" and rapport.execution_rejointe:
+            statut = "rejointe"
+        modifiees = getattr(rapport, "semaines_modifiees", None)
+        nb_semaines_lues = len(modifiees) if modifiees is not None else int(statut != "rejointe")
+        try:
+            # Connexion propre : l'historique ne dépend pas de la session de la synchro.
+            with db.engine.begin() as conn:
+                conn.execute(ExecutionSyncErp.__table__.insert().values(
+                    type_sync=type_sync,
+                    semaines=_semaines_libelle(semaines),
+                    statut=statut,
+                    dry_run=bool(rapport.dry_run),
+                    debut_le=debut_le,
+                    duree_totale=duree,
+                    nb_semaines_lues=nb_semaines_lues,
+                    nb_lignes_erp=chrono.nb_lignes_erp,
+                    nb_importes=rapport.nb_importes,
+                    nb_avertissements=len(rapport.avertissements),
+                    message=message,
+                    **{f"duree_{p}": s for p, s in chrono.durees.items()},
+                ))
+        except Exception:
+            logger.exception("Télémétrie synchro ERP : enregistrement de l'exécution impossible.")
+        logger.info(
+            "Synchro ERP %s %s (%s) : %.2f s — %s ; %d ligne(s) TEMPAS.",
+            type_sync, _semaines_libelle(semaines) or "-", statut, duree,
+            ", ".join(f"{p} {s:.2f} s" for p, s in chrono.durees.items() if s >= 0.005) or "aucune phase",
+            chrono.nb_lignes_erp,
+        )
+
+
+def historique_sync_erp(limite: int = 20, type_sync: str | None = None) -> list[ExecutionSyncErp]:
+    """Dernières exécutions, la plus récente d'abord."""
+    q = ExecutionSyncErp.query
+    if type_sync:
+        q = q.filter(ExecutionSyncErp.type_sync == type_sync)
+    return q.order_by(ExecutionSyncErp.debut_le.desc(), ExecutionSyncErp.id.desc()).limit(limite).all()
+
+
+def _moyennes(executions: list[ExecutionSyncErp]) -> dict | None:
+    if not executions:
+        return None
+    nb = len(executions)
+    moyennes = {"totale": sum(e.duree_totale for e in executions) / nb}
+    for p in PHASES:
+        moyennes[p] = sum(getattr(e, f"duree_{p}") for e in executions) / nb
+    moyennes["nb_lignes_erp"] = sum(e.nb_lignes_erp for e in executions) / nb
+    lignes = sum(e.nb_lignes_erp for e in executions)
+    # Latence TEMPAS ramenée au volume lu : comparable entre petites et grosses synchros.
+    moyennes["tempas_ms_par_1000_lignes"] = (
+        sum(e.duree_tempas for e in executions) * 1000 / lignes * 1000 if lignes else None
+    )
+    return moyennes
+
+
+def _evolution(actuelle, precedente) -> float | None:
+    if actuelle is None or not precedente:
+        return None
+    return round((actuelle - precedente) * 100 / precedente, 1)
+
+
+def tendances_sync_erp(nb: int = 10) -> dict[str, dict]:
+    """Par type de synchro : moyennes des ``nb`` dernières exécutions réussies
+    (hors aperçus) et des ``nb`` précédentes, et évolution en %.
+
+    ``{type_sync: {"nb", "moyennes", "precedentes", "evolution"}}`` ; les
+    types sans exécution sont absents.
+    """
+    tendances: dict[str, dict] = {}
+    for type_sync in TYPES_SYNC:
+        executions = (
+            ExecutionSyncErp.query
+            .filter_by(type_sync=type_sync, statut="ok", dry_run=False)
+            .order_by(ExecutionSyncErp.debut_le.desc(), ExecutionSyncErp.id.desc())
+            .limit(2 * nb)
+            .all()
+        )
+        if not executions:
+            continue
+        moyennes = _moyennes(executions[:nb])
+        precedentes = _moyennes(executions[nb:])
+        tendances[type_sync] = {
+            "nb": len(executions[:nb]),
+            "moyennes": moyennes,
+            "precedentes": precedentes,
+            "evolution": {
+                cle: _evolution(valeur, precedentes.get(cle)) if precedentes else None
+                for cle, valeur in moyennes.items()
+            },
+        }
+    return tendances
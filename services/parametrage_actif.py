@@ -0,0 +1,121 @@
+"""Cache processus des paramétrages annuels (exercice actif en tête).
+
+`get_parametrage_actif()` était rappelé plusieurs fois par requête (solde,
+allocations, congés exceptionnels, RTT) et relisait `parametrage_annuel` à
+chaque fois. On garde ici, par identifiant, les valeurs de colonnes de chaque
+paramétrage lu, plus l'identifiant de l'exercice actif : un paramétrage n'est
+relu qu'une fois par processus, jusqu'à sa prochaine modification.
+
+Les appelants reçoivent une instance **rattachée à la session courante**
+(`Session.merge(load=False)`, sans requête) : ils peuvent la modifier et la
+commiter comme un objet chargé normalement.
+
+Invalidation :
+- explicite, après commit, par les routes `parametrage` et `cloture_exercice`
+  (routes/rh.py) ;
+- filet de sécurité : toute écriture ORM sur `ParametrageAnnuel` invalide au flush.
+Une lecture commencée avant une invalidation est rendue à son appelant mais pas
+mise en cache (compteur `_generation`).
+"""
+from __future__ import annotations
+
+import threading
+
+from sqlalchemy import event, inspect as sa_inspect, select
+from sqlalchemy.orm import make_transient_to_detached
+
+from models import db
+from models.parametrage import ParametrageAnnuel
+
+_verrou = threading.Lock()
+_INCONNU = object()
+_actif_id = _INCONNU
+# {id: {colonne: valeur}}
+_valeurs_par_id: dict[int, dict] = {}
+_stats = {"hits": 0, "misses": 0}
+# Incrémenté à chaque invalidation : une lecture commencée avant n'est pas mise en cache.
+_generation = 0
+
+
+def invalider_parametrage_cache() -> None:
+    """Oublie les paramétrages en cache : la prochaine lecture relit la table."""
+    global _actif_id, _generation
+    with _verrou:
+        _actif_id = _INCONNU
+        _valeurs_par_id.clear()
+        _generation += 1
+
+
+def statistiques_parametrage_cache() -> dict:
+    """Compteurs ``{"hits", "misses"}`` depuis le démarrage du processus."""
+    with _verrou:
+        return dict(_stats)
+
+
+def _lire(clause) -> dict | None:
+    table = ParametrageAnnuel.__table__
+    row = db.session.execute(select(table).where(clause).limit(1)).mappings().first()
+    if row is None:
+        return None
+    # Clés = noms d'attributs ORM (identiques aux noms de colonnes ici).
+    return {attr.key: row[attr.columns[0].name] for attr in sa_inspect(ParametrageAnnuel).column_attrs}
+
+
+def _attacher(valeurs: dict) -> ParametrageAnnuel:
+    """Instance persistante de la session courante, construite sans requête."""
+    session = db.session
+    existant = session.identity_map.get(session.identity_key(ParametrageAnnuel, valeurs["id"]))
+    if existant is not None:
+        etat = sa_inspect(existant)
+        # Objet déjà chargé (ou modifié, à ne pas écraser) : on le rend tel quel.
+        if etat.modified or not etat.expired_attributes:
+            return existant
+    copie = ParametrageAnnuel(**valeurs)
+    make_transient_to_detached(copie)
+    return session.merge(copie, load=False)
+
+
+def get_parametrage(parametrage_id: int) -> ParametrageAnnuel | None:
+    with _verrou:
+        valeurs = _valeurs_par_id.get(parametrage_id)
+        _stats["hits" if valeurs is not None else "misses"] += 1
+        generation = _generation
+    if valeurs is None:
+        valeurs = _lire(ParametrageAnnuel.__table__.c.id == parametrage_id)
+        if valeurs is None:
+            return None
+        with _verrou:
+            if _generation == generation:
+                _valeurs_par_id[parametrage_id] = valeurs
+    return _attacher(valeurs)
+
+
+def get_parametrage_actif() -> ParametrageAnnuel | None:
+    """Retourne le paramétrage annuel actif (None si aucun)."""
+    global _actif_id
+    with _verrou:
+        actif_id = _actif_id
+        valeurs = _valeurs_par_id.get(actif_id) if actif_id not in (_INCONNU, None) else None
+        connu = actif_id is None or valeurs is not None
+        _stats["hits" if connu else "misses"] += 1
+        generation = _generation
+    if not connu:
+        valeurs = _lire(ParametrageAnnuel.__table__.c.actif == True)  # noqa: E712
+        with _verrou:
+            if _generation != generation:
+                pass  # invalidé pendant la lecture : résultat rendu mais pas mis en cache
+            elif valeurs is None:
+                _actif_id = None
+            else:
+                _actif_id = valeurs["id"]
+                _valeurs_par_id[valeurs["id"]] = valeurs
+    if valeurs is None:
+        return None
+    return _attacher(valeurs)
+
+
+@event.listens_for(ParametrageAnnuel, "after_insert")
+@event.listens_for(ParametrageAnnuel, "after_update")
+@event.listens_for(ParametrageAnnuel, "after_delete")
+def _invalider_sur_ecriture(mapper, connection, target):
+    invalider_parametrage_cache()
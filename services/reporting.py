@@ -14,14 +14,18 @@ C'est la sémantique attendue pour un tableau de bord d'absentéisme mensuel.
 """
 from __future__ import annotations
 
+from array import array
 from dataclasses import dataclass, field
 from datetime import date, timedelta
 
-from sqlalchemy import func
+from sqlalchemy import and_, or_
 
 from models import db
+from models.absence_mensuelle import AbsenceMensuelle
 from models.conge import Conge
 from models.user import User
+from services.absences_mensuelles import fin_du_mois, mois_couverts
+from services.calendrier_feries import index_jours_ouvres
 
 
 @dataclass
@@ -47,42 +51,134 @@ class RapportAbsenteisme:
     top_consommateurs_cp: list[dict] = field(default_factory=list)
 
 
-def _jours_ouvrables_dans_periode(debut_conge: date, fin_conge: date, debut_periode: date, fin_periode: date) -> float:
-    """Compte les jours ouvrables (lun-sam, hors fériés) du congé dans la fenêtre.
+class AxeJoursPeriode:
+    """Axe jour par jour de la période d'un rapport, construit une seule fois.
 
-    Version simplifiée du calcul (pas de demi-journées) : suffisant pour un
-    tableau de bord agrégé. Les demi-journées de bordure sont arrondies au jour
-    pour ne pas surcharger ce reporting de synthèse.
+    ``cumul[i]`` = jours ouvrables parmi les ``i`` premiers jours de la période
+    et ``mois_du_jour[i]`` = rang du mois du jour ``i``. Chaque congé devient un
+    intervalle ``[a, b]`` d'indices sur cet axe : ses jours ouvrables dans la
+    période valent ``cumul[b + 1] - cumul[a]`` et sa ventilation mensuelle se
+    lit aux bornes des mois, sans parcourir les jours ni interroger les fériés.
     """
-    from services.calcul_jours import get_dates_feries_set, _est_ouvrable
-
-    debut = max(debut_conge, debut_periode)
-    fin = min(fin_conge, fin_periode)
-    if fin < debut:
-        return 0.0
-    feries = get_dates_feries_set(debut_periode, fin_periode)
-    total = 0.0
-    j = debut
-    while j <= fin:
-        if _est_ouvrable(j, feries):
-            total += 1.0
-        j += timedelta(days=1)
-    return total
+
+    def __init__(self, debut: date, fin: date):
+        self.debut = debut
+        self.fin = fin
+        index = index_jours_ouvres()
+        nb = (fin - debut).days + 1
+        self.cumul = array("I", [0]) * (nb + 1)
+        self.mois_du_jour = array("H", [0]) * nb
+        # Par mois : (clé "AAAA-MM", indice du 1er jour, indice du dernier jour).
+        self.mois: list[tuple[str, int, int]] = []
+        total = 0
+        for i in range(nb):
+            d = debut + timedelta(days=i)
+            if i == 0 or d.day == 1:
+                if self.mois:
+                    cle, premier, _ = self.mois[-1]
+                    self.mois[-1] = (cle, premier, i - 1)
+                self.mois.append((d.strftime("%Y-%m"), i, nb - 1))
+            self.mois_du_jour[i] = len(self.mois) - 1
+            total += index.est_ouvre(d)
+            self.cumul[i + 1] = total
+
+    @property
+    def jours_ouvres(self) -> int:
+        return self.cumul[-1]
+
+    def intervalle(self, date_debut: date, date_fin: date) -> tuple[int, int]:
+        """Indices ``[a, b]`` de l'intersection congé ∩ période (a > b si vide)."""
+        return (
+            (max(date_debut, self.debut) - self.debut).days,
+            (min(date_fin, self.fin) - self.debut).days,
+        )
+
+    def compter(self, a: int, b: int) -> int:
+        return self.cumul[b + 1] - self.cumul[a] if a <= b else 0
+
+
+def _cles_service(users_by_id: dict[int, User]) -> dict[int, str]:
+    """Libellé de service (responsable) de chaque salarié, en une requête au plus.
+
+    Les responsables absents de ``users_by_id`` (p.ex. désactivés alors que le
+    rapport ne porte que sur les actifs) sont chargés en lot.
+    """
+    manquants = {
+        u.responsable_id for u in users_by_id.values()
+        if u.responsable_id and u.responsable_id not in users_by_id
+    }
+    responsables = dict(users_by_id)
+    if manquants:
+        responsables.update(
+            (u.id, u) for u in User.query.filter(User.id.in_(manquants)).all()
+        )
+    cles: dict[int, str] = {}
+    for uid, u in users_by_id.items():
+        resp = responsables.get(u.responsable_id) if u.responsable_id else None
+        cles[uid] = f"Service {resp.prenom} {resp.nom}" if resp else "Sans responsable"
+    return cles
+
+
+class _Agregats:
+    """Accumulateurs du rapport, alimentés par congé (brut) ou par ligne du cube."""
+
+    def __init__(self, service_de: dict[int, str]):
+        self.service_de = service_de
+        self.par_type: dict[str, StatAbsence] = {}
+        self.par_service: dict[str, StatAbsence] = {}
+        self.par_mois: dict[str, dict] = {}
+        self.conso_cp: dict[int, float] = {}
+
+    def ajouter(self, user_id: int, cle_type: str, nb_conges: int, jours: float, heures_rtt: float) -> None:
+        stat = self.par_type.get(cle_type)
+        if stat is None:
+            stat = self.par_type[cle_type] = StatAbsence(cle=cle_type)
+        stat.nb_conges += nb_conges
+        stat.nb_jours += jours
+        if cle_type == "RTT":
+            stat.nb_heures_rtt += heures_rtt
+
+        cle_service = self.service_de[user_id]
+        stat = self.par_service.get(cle_service)
+        if stat is None:
+            stat = self.par_service[cle_service] = StatAbsence(cle=cle_service)
+        stat.nb_conges += nb_conges
+        stat.nb_jours += jours
+
+        if cle_type in ("CP", "Anciennete"):
+            self.conso_cp[user_id] = self.conso_cp.get(user_id, 0.0) + jours
+
+    def ajouter_mois(self, cle_mois: str, nb_conges: int, jours: float) -> None:
+        mois = self.par_mois.get(cle_mois)
+        if mois is None:
+            mois = self.par_mois[cle_mois] = {"mois": cle_mois, "nb_conges": 0, "nb_jours": 0.0}
+        mois["nb_conges"] += nb_conges
+        mois["nb_jours"] += jours
 
 
 def generer_rapport(
     periode_debut: date,
     periode_fin: date,
     include_inactifs: bool = False,
+    utiliser_cube: bool = True,
 ) -> RapportAbsenteisme:
     """Génère un rapport d'absentéisme agrégé sur la période [debut, fin].
 
+    Les mois entiers couverts par le cube (services/absences_mensuelles.py) sont
+    lus dans ``absences_mensuelles`` ; seuls les mois partiels (bords de la
+    période) ou non couverts sont recalculés depuis les congés, projetés une
+    seule fois sur `AxeJoursPeriode`. Un congé à cheval sur le cube et les
+    congés bruts n'est compté qu'une fois.
+
     Args:
         periode_debut: borne basse incluse.
         periode_fin: borne haute incluse.
         include_inactifs: inclure les salariés désactivés (défaut : actifs seulement).
+        utiliser_cube: False pour tout recalculer depuis les congés.
     """
     rapport = RapportAbsenteisme(periode_debut=periode_debut, periode_fin=periode_fin)
+    if periode_fin < periode_debut:
+        return rapport
 
     # Salariés concernés.
     users_q = User.query
@@ -90,107 +186,98 @@ def generer_rapport(
         users_q = users_q.filter_by(actif=True)
     users = users_q.order_by(User.nom, User.prenom).all()
     rapport.nb_salaries_actifs = len(users)
+    if not users:
+        return rapport
     users_by_id = {u.id: u for u in users}
+    agregats = _Agregats(_cles_service(users_by_id))
+    axe = AxeJoursPeriode(periode_debut, periode_fin)
 
-    # Congés valides chevauchant la période.
-    conges = (
-        Conge.query.filter(
-            Conge.statut == "valide",
-            Conge.date_debut <= periode_fin,
-            Conge.date_fin >= periode_debut,
-            Conge.user_id.in_([u.id for u in users]) if users else False,
-        ).all()
-    )
-
-    # --- Agrégats par type ---
-    par_type: dict[str, StatAbsence] = {}
-    for c in conges:
-        cle = c.type_conge or "Autre"
-        stat = par_type.setdefault(cle, StatAbsence(cle=cle))
-        stat.nb_conges += 1
-        if c.type_conge == "RTT":
-            # RTT : on compte les heures RTT (proportion de la période).
-            jours_dans = _jours_ouvrables_dans_periode(
-                c.date_debut, c.date_fin, periode_debut, periode_fin
-            )
-            jours_total = max(1.0, _jours_ouvrables_dans_periode(
-                c.date_debut, c.date_fin, c.date_debut, c.date_fin
-            ))
-            stat.nb_heures_rtt += (c.nb_heures_rtt or 0) * (jours_dans / jours_total)
-            stat.nb_jours += jours_dans
-        else:
-            stat.nb_jours += _jours_ouvrables_dans_periode(
-                c.date_debut, c.date_fin, periode_debut, periode_fin
-            )
-    rapport.par_type = sorted(par_type.values(), key=lambda s: -s.nb_jours)
-
-    # --- Agrégats par service (responsable) ---
-    par_service: dict[str, StatAbsence] = {}
-    for c in conges:
-        u = users_by_id.get(c.user_id)
-        if u is None:
-            continue
-        if u.responsable_id:
-            resp = users_by_id.get(u.responsable_id) or User.query.get(u.responsable_id)
-            cle_service = f"Service {resp.prenom} {resp.nom}" if resp else "Sans responsable"
-        else:
-            cle_service = "Sans responsable"
-        stat = par_service.setdefault(cle_service, StatAbsence(cle=cle_service))
-        stat.nb_conges += 1
-        stat.nb_jours += _jours_ouvrables_dans_periode(
-            c.date_debut, c.date_fin, periode_debut, periode_fin
+    # Mois lus dans le cube : entiers et couverts. Un congé y est compté au
+    # premier mois de chaque plage contiguë qu'il chevauche (nb_conges), ou à
+    # son mois de début s'il commence dans la plage (nb_debutes).
+    premiers = [periode_debut + timedelta(days=premier) for _, premier, _ in axe.mois]
+    du_cube: set[int] = set()
+    if utiliser_cube:
+        couverts = mois_couverts(periode_debut, periode_fin)
+        du_cube = {
+            m for m, (_, premier, dernier) in enumerate(axe.mois)
+            if premiers[m] in couverts
+            and premiers[m].day == 1
+            and periode_debut + timedelta(days=dernier) == fin_du_mois(premiers[m])
+        }
+    debuts_plage = {m for m in du_cube if m - 1 not in du_cube}
+
+    if du_cube:
+        rang_mois = {premiers[m]: m for m in du_cube}
+        lignes = db.session.query(
+            AbsenceMensuelle.mois, AbsenceMensuelle.user_id, AbsenceMensuelle.type_conge,
+            AbsenceMensuelle.nb_conges, AbsenceMensuelle.nb_debutes,
+            AbsenceMensuelle.nb_jours, AbsenceMensuelle.nb_heures_rtt,
+        ).filter(
+            AbsenceMensuelle.mois.in_(sorted(rang_mois)),
+            AbsenceMensuelle.user_id.in_(list(users_by_id)),
         )
-    rapport.par_service = sorted(par_service.values(), key=lambda s: -s.nb_jours)
-
-    # --- Agrégat par mois ---
-    par_mois: dict[str, dict] = {}
-    for c in conges:
-        j = max(c.date_debut, periode_debut).replace(day=1)
-        fin = min(c.date_fin, periode_fin)
-        while j <= fin:
-            cle_mois = j.strftime("%Y-%m")
-            mois = par_mois.setdefault(cle_mois, {"mois": cle_mois, "nb_conges": 0, "nb_jours": 0.0})
-            debut_mois = j
-            fin_mois = min(j.replace(day=28) + timedelta(days=4), fin)
-            fin_mois = fin_mois.replace(day=1) - timedelta(days=1)
-            mois["nb_conges"] += 1
-            mois["nb_jours"] += _jours_ouvrables_dans_periode(
-                c.date_debut, c.date_fin, debut_mois, fin_mois
-            )
-            # Mois suivant.
-            if j.month == 12:
-                j = j.replace(year=j.year + 1, month=1, day=1)
+        for mois, user_id, cle_type, nb_conges, nb_debutes, jours, heures in lignes:
+            m = rang_mois[mois]
+            agregats.ajouter(user_id, cle_type, nb_conges if m in debuts_plage else nb_debutes, jours, heures)
+            agregats.ajouter_mois(axe.mois[m][0], nb_conges, jours)
+
+    bruts = [m for m in range(len(axe.mois)) if m not in du_cube]
+    if bruts:
+        # Congés valides chevauchant les mois hors cube (colonnes utiles seulement).
+        fenetres: list[tuple[date, date]] = []
+        for m in bruts:
+            debut = periode_debut + timedelta(days=axe.mois[m][1])
+            fin = periode_debut + timedelta(days=axe.mois[m][2])
+            if fenetres and fenetres[-1][1] + timedelta(days=1) == debut:
+                fenetres[-1] = (fenetres[-1][0], fin)
             else:
-                j = j.replace(month=j.month + 1, day=1)
-    rapport.par_mois = sorted(par_mois.values(), key=lambda m: m["mois"])
+                fenetres.append((debut, fin))
+        conges = db.session.query(
+            Conge.user_id, Conge.type_conge, Conge.date_debut, Conge.date_fin, Conge.nb_heures_rtt,
+        ).filter(
+            Conge.statut == "valide",
+            or_(*(and_(Conge.date_debut <= fin, Conge.date_fin >= debut) for debut, fin in fenetres)),
+            Conge.user_id.in_(list(users_by_id)),
+        ).all()
+        index = index_jours_ouvres()
+
+        for user_id, type_conge, date_debut, date_fin, nb_heures_rtt in conges:
+            a, b = axe.intervalle(date_debut, date_fin)
+            premier_mois, dernier_mois = axe.mois_du_jour[a], axe.mois_du_jour[b]
+            cle_type = type_conge or "Autre"
+            # RTT : heures au prorata des jours ouvrables retenus.
+            jours_total = max(1, index.compter(date_debut, date_fin)) if type_conge == "RTT" else 1
+            jours = 0.0
+            deja_comptes = 0
+            for m in range(premier_mois, dernier_mois + 1):
+                if m in du_cube:
+                    deja_comptes += m in debuts_plage or m == premier_mois
+                    continue
+                cle_mois, premier, dernier = axe.mois[m]
+                jours_mois = float(axe.compter(max(a, premier), min(b, dernier)))
+                jours += jours_mois
+                agregats.ajouter_mois(cle_mois, 1, jours_mois)
+            heures = float(nb_heures_rtt or 0) * jours / jours_total if type_conge == "RTT" else 0.0
+            agregats.ajouter(user_id, cle_type, 1 - deja_comptes, jours, heures)
+
+    rapport.par_type = sorted(agregats.par_type.values(), key=lambda s: -s.nb_jours)
+    rapport.par_service = sorted(agregats.par_service.values(), key=lambda s: -s.nb_jours)
+    rapport.par_mois = sorted(agregats.par_mois.values(), key=lambda m: m["mois"])
 
     # --- Taux d'absentéisme global ---
     # = jours d'absence / (nb salariés × jours ouvrables de la période) × 100.
     total_jours_absence = sum(s.nb_jours for s in rapport.par_type)
-    jours_ouv_periode = _jours_ouvrables_dans_periode(
-        periode_debut, periode_fin, periode_debut, periode_fin
-    )
-    if rapport.nb_salaries_actifs > 0 and jours_ouv_periode > 0:
+    if axe.jours_ouvres > 0:
         rapport.taux_absenteisme_global = round(
-            100.0 * total_jours_absence / (rapport.nb_salaries_actifs * jours_ouv_periode), 2
+            100.0 * total_jours_absence / (rapport.nb_salaries_actifs * axe.jours_ouvres), 2
         )
 
     # --- Top consommateurs CP ---
-    conso_cp: dict[int, float] = {}
-    for c in conges:
-        if c.type_conge in ("CP", "Anciennete"):
-            jours = _jours_ouvrables_dans_periode(
-                c.date_debut, c.date_fin, periode_debut, periode_fin
-            )
-            conso_cp[c.user_id] = conso_cp.get(c.user_id, 0.0) + jours
-    top = sorted(conso_cp.items(), key=lambda kv: -kv[1])[:10]
+    top = sorted(agregats.conso_cp.items(), key=lambda kv: -kv[1])[:10]
     rapport.top_consommateurs_cp = [
-        {
-            "user": users_by_id.get(uid),
-            "nb_jours": round(jours, 2),
-        }
+        {"user": users_by_id[uid], "nb_jours": round(jours, 2)}
         for uid, jours in top
-        if users_by_id.get(uid) is not None
     ]
 
     return rapport
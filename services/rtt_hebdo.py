@@ -10,22 +10,40 @@ salarié a travaillé 28 h cette semaine-là, RTT = 0,35 h (équivalent d'une se
 pleine à 35 h).
 
 Le module expose :
-- `calculer_rtt_semaine(...)` : fonction pure, unitairement testable.
+- `calculer_rtt_semaines_lot(...)` : noyau de calcul sur des tableaux parallèles
+  (heures, absences, seuil, heures/jour, coefficient) de toutes les semaines
+  (salarié, lundi) à la fois ; RTT par semaine et total par salarié.
+- `calculer_rtt_semaine(...)` : fonction pure pour une semaine (appelle le noyau).
 - `calculer_rtt_hebdo(user_id, param)` : agrège sur l'exercice à partir des heures
-  hebdomadaires saisies (HeuresHebdo) et des absences (Conge validés).
+  hebdomadaires saisies (HeuresHebdo) et des absences (Conge validés, lues dans
+  le bitmap de l'exercice, services/absences_bitmap.py).
+- `calculer_rtt_hebdo_lot(param, user_ids=None)` : même calcul pour tous les
+  salariés en deux requêtes (heures + congés de l'exercice).
 - `maj_rtt_allocations_hebdo(param, user_ids=None)` : applique le résultat sur
-  AllocationConge.rtt_heures_allouees.
+  AllocationConge.rtt_heures_allouees (recalcul complet).
+- `recalculer_semaines(param, paires)` : recalcul incrémental des seules semaines
+  ``(user_id, lundi)`` touchées, stockées dans RttSemaine ; l'allocation est
+  réécrite depuis la somme des semaines stockées (un UPDATE). Une semaine future n'est comptée qu'une fois son lundi
+  atteint : `rattraper_semaines_echues(param)` (job nocturne, synchro ERP)
+  recalcule les semaines échues restées sans ligne stockée.
+- `verifier_rtt_semaines(param)` : contrôle de cohérence contre le recalcul complet.
+- `jours_absence_semaine_lot(user_ids, lundi)` : jours d'absence de la semaine de
+  chaque salarié (écran de saisie hebdomadaire), en une requête au plus.
 """
 from __future__ import annotations
 
 from dataclasses import dataclass
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta, timezone
+from itertools import repeat
+
+from sqlalchemy import func, select, update
 
 from models import db
-from models.conge import Conge
 from models.heures_hebdo import HeuresHebdo
 from models.parametrage import AllocationConge, ParametrageAnnuel
-from services.calcul_jours import get_dates_feries_set, _est_ouvrable
+from models.rtt_semaine import RttSemaine
+from services.absences_bitmap import absences_periode, bitmaps_absences
+from services.parametrage_actif import get_parametrage_actif
 
 # Valeurs par défaut (modifiables via paramétrage annuel).
 SEUIL_HEBDO_DEFAUT = 34.65
@@ -40,6 +58,83 @@ class RttHebdoResult:
     detail: list  # liste de dicts par semaine : {lundi, heures, jours_absence, rtt}
 
 
+@dataclass(frozen=True)
+class RttLot:
+    rtt: list[float]  # RTT de chaque semaine, dans l'ordre des tableaux d'entrée
+    totaux: dict[int, float]  # {user_id: somme arrondie à 2 décimales}
+
+
+def _colonne(valeur, n: int, nom: str):
+    """Paramètre scalaire (commun à toutes les semaines) ou tableau de longueur ``n``."""
+    if isinstance(valeur, (int, float)):
+        return repeat(float(valeur), n)
+    if len(valeur) != n:
+        raise ValueError(f"{nom} : {len(valeur)} valeur(s) pour {n} semaine(s).")
+    return map(float, valeur)
+
+
+def calculer_rtt_semaines_lot(
+    heures,
+    jours_absence,
+    seuil_hebdo=SEUIL_HEBDO_DEFAUT,
+    heures_par_jour=HEURES_PAR_JOUR_DEFAUT,
+    coef=1.0,
+    user_ids=None,
+) -> RttLot:
+    """RTT de N semaines en une passe (tableaux parallèles, un élément par semaine).
+
+    ``heures`` et ``jours_absence`` : une valeur par semaine (0 pour une semaine
+    sans heures saisies). ``seuil_hebdo``, ``heures_par_jour`` et ``coef`` :
+    scalaires communs ou tableaux de même longueur. ``user_ids`` (optionnel) :
+    salarié de chaque semaine, pour les totaux ; les semaines d'un salarié sont
+    sommées dans l'ordre des tableaux puis arrondies à 2 décimales, comme dans
+    `calculer_rtt_hebdo`.
+
+    Règle : le seuil est réduit au prorata des jours d'absence (sans descendre
+    sous 0) ; le RTT est le surplus d'heures au-delà du seuil ajusté, multiplié
+    par le coefficient, arrondi à 2 décimales pour neutraliser les artefacts du
+    flottant (ex. 39 - 34.65 = 4.350000000000001).
+    """
+    n = len(heures)
+    if len(jours_absence) != n:
+        raise ValueError(f"jours_absence : {len(jours_absence)} valeur(s) pour {n} semaine(s).")
+    if all(isinstance(v, (int, float)) for v in (seuil_hebdo, heures_par_jour, coef)):
+        # Cas courant (un seul paramétrage) : le seuil ajusté ne dépend que du
+        # nombre de jours d'absence, qui prend peu de valeurs distinctes.
+        s, hj, c = float(seuil_hebdo), float(heures_par_jour), float(coef)
+        ajuste = {j: max(0.0, s - float(j) * hj) for j in set(jours_absence)}
+        if c == 1.0:
+            rtt = [
+                round(d, 2) if (d := float(h) - ajuste[j]) > 0.0 else 0.0
+                for h, j in zip(heures, jours_absence)
+            ]
+        else:
+            rtt = [
+                round(d * c, 2) if (d := float(h) - ajuste[j]) > 0.0 else 0.0
+                for h, j in zip(heures, jours_absence)
+            ]
+    else:
+        rtt = [
+            round(max(0.0, h - max(0.0, s - j * hj)) * c, 2)
+            for h, j, s, hj, c in zip(
+                map(float, heures),
+                map(float, jours_absence),
+                _colonne(seuil_hebdo, n, "seuil_hebdo"),
+                _colonne(heures_par_jour, n, "heures_par_jour"),
+                _colonne(coef, n, "coef"),
+            )
+        ]
+
+    totaux: dict[int, float] = {}
+    if user_ids is not None:
+        if len(user_ids) != n:
+            raise ValueError(f"user_ids : {len(user_ids)} valeur(s) pour {n} semaine(s).")
+        for uid, r in zip(user_ids, rtt):
+            totaux[uid] = totaux.get(uid, 0.0) + r
+        totaux = {uid: round(t, 2) for uid, t in totaux.items()}
+    return RttLot(rtt=rtt, totaux=totaux)
+
+
 def calculer_rtt_semaine(
     heures_reelles: float,
     jours_absence: float,
@@ -52,13 +147,11 @@ def calculer_rtt_semaine(
     Le seuil est réduit au prorata des jours d'absence pour ne pas pénaliser le
     salarié. Le RTT acquis est le surplus d'heures travaillées au-delà du seuil
     ajusté, multiplié par un coefficient (1.0 = surplus converti tel quel en heures RTT).
+    Même règle que `calculer_rtt_semaines_lot`, pour une seule semaine.
     """
-    seuil_ajuste = max(0.0, float(seuil_hebdo) - float(jours_absence) * float(heures_par_jour))
-    surplus = max(0.0, float(heures_reelles) - seuil_ajuste)
-    # Arrondi à 2 décimales pour neutraliser les artefacts du flottant
-    # (ex. 39 - 34.65 = 4.350000000000001) ; cohérent avec le round(total, 2)
-    # appliqué par calculer_rtt_hebdo sur l'agrégat.
-    return round(surplus * float(coef), 2)
+    return calculer_rtt_semaines_lot(
+        [heures_reelles], [jours_absence], float(seuil_hebdo), float(heures_par_jour), float(coef),
+    ).rtt[0]
 
 
 def _coef_param(param: ParametrageAnnuel) -> float:
@@ -114,6 +207,17 @@ def _semaines_exercice(param: ParametrageAnnuel, jusqu_a: date | None = None) ->
     return semaines
 
 
+def bitmaps_exercice(param: ParametrageAnnuel, user_ids=None) -> dict:
+    """Bitmaps d'absence de l'exercice (congés validés hors types exclus du calcul RTT).
+
+    Voir `services.absences_bitmap.bitmaps_absences` : sans ``user_ids``, les
+    seuls salariés ayant un congé validé sur l'exercice.
+    """
+    return bitmaps_absences(
+        param.debut_exercice, param.fin_exercice, types_absence_exclus_param(param), user_ids,
+    )
+
+
 def _absence_fraction_par_jour(user_id: int, param: ParametrageAnnuel) -> dict:
     """Retourne {date: fraction d'absence (0.5 ou 1.0)} sur l'exercice.
 
@@ -123,83 +227,124 @@ def _absence_fraction_par_jour(user_id: int, param: ParametrageAnnuel) -> dict:
     non travaillé, ce qui justifie de réduire le seuil hebdomadaire), sauf les
     types explicitement exclus via ``rtt_types_absence_exclus`` (ex. Maladie).
     """
-    debut = param.debut_exercice
-    fin = param.fin_exercice
-    feries = get_dates_feries_set(debut, fin)
-    exclus = types_absence_exclus_param(param)
-
-    q = Conge.query.filter(
-        Conge.user_id == user_id,
-        Conge.statut == "valide",
-        Conge.date_debut <= fin,
-        Conge.date_fin >= debut,
-    )
-    if exclus:
-        q = q.filter(~Conge.type_conge.in_(exclus))
-    conges = q.all()
-
-    fractions: dict = {}
-    for c in conges:
-        jour = max(c.date_debut, debut)
-        dernier = min(c.date_fin, fin)
-        while jour <= dernier:
-            if _est_ouvrable(jour, feries):
-                frac = 1.0
-                # Demi-journées aux bordures du congé (mêmes règles que le calcul ouvrable).
-                if c.date_debut == c.date_fin:
-                    if c.demi_journee_debut or c.demi_journee_fin:
-                        frac = 0.5
-                else:
-                    if jour == c.date_debut and c.demi_journee_debut == "apres_midi":
-                        frac = 0.5
-                    elif jour == c.date_fin and c.demi_journee_fin == "matin":
-                        frac = 0.5
-                # On cumule sans dépasser 1 jour d'absence par date.
-                fractions[jour] = min(1.0, fractions.get(jour, 0.0) + frac)
-            jour += timedelta(days=1)
-    return fractions
+    return bitmaps_exercice(param, [user_id])[user_id].fractions()
 
 
 def _lundi(d: date) -> date:
     return d - timedelta(days=d.weekday())
 
 
-def jours_absence_semaine(user_id: int, lundi: date, exclus: set[str] | None = None) -> float:
-    """Nombre de jours ouvrables d'absence (congés validés) sur la semaine du `lundi`.
+def jours_absence_semaine_lot(
+    user_ids,
+    lundi: date,
+    exclus: set[str] | None = None,
+    param: ParametrageAnnuel | None = None,
+) -> dict[int, float]:
+    """Jours ouvrables d'absence (congés validés) de chaque salarié sur la semaine du `lundi`.
 
-    Utilisé par l'écran de saisie hebdomadaire pour afficher le contexte d'absence.
+    ``{user_id: jours}`` pour tous les ``user_ids`` : une requête sur les congés
+    au plus (salariés absents du cache des bitmaps de l'exercice ``param``, par
+    défaut l'exercice actif) et le calendrier des fériés en mémoire. Une semaine
+    qui déborde de l'exercice est calculée directement, toujours en une requête.
     Les types listés dans ``exclus`` ne sont pas comptés (ex. Maladie).
     """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return {}
     lundi = _lundi(lundi)
     dimanche = lundi + timedelta(days=6)
-    feries = get_dates_feries_set(lundi, dimanche)
-    q = Conge.query.filter(
-        Conge.user_id == user_id,
-        Conge.statut == "valide",
-        Conge.date_debut <= dimanche,
-        Conge.date_fin >= lundi,
+    param = param or get_parametrage_actif()
+    if param is not None and param.debut_exercice <= lundi and dimanche <= param.fin_exercice:
+        bitmaps = bitmaps_absences(param.debut_exercice, param.fin_exercice, exclus or (), user_ids)
+    else:
+        bitmaps = absences_periode(user_ids, lundi, dimanche, exclus or ())
+    return {uid: bitmaps[uid].jours(lundi, dimanche) for uid in user_ids}
+
+
+def jours_absence_semaine(
+    user_id: int,
+    lundi: date,
+    exclus: set[str] | None = None,
+    param: ParametrageAnnuel | None = None,
+) -> float:
+    """Nombre de jours ouvrables d'absence (congés validés) sur la semaine du `lundi`.
+
+    Version unitaire de `jours_absence_semaine_lot`. Les types listés dans
+    ``exclus`` ne sont pas comptés (ex. Maladie).
+    """
+    return jours_absence_semaine_lot([user_id], lundi, exclus, param)[user_id]
+
+
+def _semaines_rtt(heures_par_lundi: dict, absences_semaine: dict, fin_calcul: date) -> list:
+    """Semaines à détailler : heures saisies ou absences, jusqu'à ``fin_calcul``."""
+    return sorted(
+        s for s in (set(heures_par_lundi.keys()) | set(absences_semaine.keys())) if s <= fin_calcul
+    )
+
+
+def _resultats_rtt(
+    entrees,
+    *,
+    seuil: float,
+    heures_jour: float,
+    coef: float,
+    fin_calcul: date,
+) -> dict[int, RttHebdoResult]:
+    """Assemble le résultat RTT de chaque salarié à partir de ses heures et absences.
+
+    ``entrees`` : ``(user_id, {lundi: heures}, {lundi: jours d'absence})``.
+    Source unique de la règle : utilisée par `calculer_rtt_hebdo` (un salarié)
+    ET `calculer_rtt_hebdo_lot` (toute l'entreprise), pour des chiffres
+    strictement identiques entre les deux chemins. Toutes les semaines de tous
+    les salariés passent en un seul appel à `calculer_rtt_semaines_lot`.
+    """
+    par_user = []
+    uids, lundis, heures, absences = [], [], [], []
+    for user_id, heures_par_lundi, absences_semaine in entrees:
+        semaines = _semaines_rtt(heures_par_lundi, absences_semaine, fin_calcul)
+        par_user.append((user_id, len(semaines)))
+        for lundi in semaines:
+            uids.append(user_id)
+            lundis.append(lundi)
+            heures.append(heures_par_lundi.get(lundi))
+            absences.append(absences_semaine.get(lundi, 0.0))
+
+    # Une semaine sans heures saisies (absence seule) ne produit pas de RTT.
+    lot = calculer_rtt_semaines_lot(
+        [h or 0 for h in heures], absences, seuil, heures_jour, coef, user_ids=uids,
+    )
+
+    resultats: dict[int, RttHebdoResult] = {}
+    i = 0
+    for user_id, nb in par_user:
+        detail = [
+            {
+                "lundi": lundis[k],
+                "heures": heures[k] or 0,
+                "jours_absence": absences[k],
+                "surplus": lot.rtt[k],
+                "rtt": lot.rtt[k],
+            }
+            for k in range(i, i + nb)
+        ]
+        i += nb
+        resultats[user_id] = RttHebdoResult(
+            user_id=user_id,
+            # On ne tronque plus à l'entier : on conserve les fractions d'heure
+            # (arrondi à 2 décimales pour neutraliser les artefacts de calcul flottant).
+            # L'arrondi d'affichage se fait dans les templates.
+            rtt_calculee=lot.totaux.get(user_id, 0.0),
+            nb_semaines=nb,
+            detail=detail,
+        )
+    return resultats
+
+
+def _requete_heures(param: ParametrageAnnuel, fin_calcul: date):
+    return HeuresHebdo.query.filter(
+        HeuresHebdo.date_lundi >= _lundi(param.debut_exercice),
+        HeuresHebdo.date_lundi <= fin_calcul,
     )
-    if exclus:
-        q = q.filter(~Conge.type_conge.in_(exclus))
-    conges = q.all()
-    total = 0.0
-    for c in conges:
-        jour = max(c.date_debut, lundi)
-        dernier = min(c.date_fin, dimanche)
-        while jour <= dernier:
-            if _est_ouvrable(jour, feries):
-                frac = 1.0
-                if c.date_debut == c.date_fin:
-                    if c.demi_journee_debut or c.demi_journee_fin:
-                        frac = 0.5
-                else:
-                    if jour == c.date_debut and c.demi_journee_debut == "apres_midi":
-                        frac = 0.5
-                    elif jour == c.date_fin and c.demi_journee_fin == "matin":
-                        frac = 0.5
-                total += frac
-            jour += timedelta(days=1)
-    return total
 
 
 def calculer_rtt_hebdo(
@@ -212,86 +357,348 @@ def calculer_rtt_hebdo(
     Le RTT provient uniquement du surplus d'heures travaillées (HeuresHebdo)
     au-delà du seuil hebdomadaire ajusté selon les absences.
     """
-    seuil = seuil_hebdo_param(param)
-    heures_jour = heures_par_jour_absence_param(param)
-    coef = _coef_param(param)
     fin_calcul = min(param.fin_exercice, jusqu_a or date.today())
-
-    # Absences par semaine (lundi -> total jours d'absence ouvrables).
-    absences_jour = _absence_fraction_par_jour(user_id, param)
-    absences_semaine: dict = {}
-    for jour, frac in absences_jour.items():
-        lundi = _lundi(jour)
-        absences_semaine[lundi] = absences_semaine.get(lundi, 0.0) + frac
-
-    rows = (
-        HeuresHebdo.query.filter(
-            HeuresHebdo.user_id == user_id,
-            HeuresHebdo.date_lundi >= _lundi(param.debut_exercice),
-            HeuresHebdo.date_lundi <= fin_calcul,
-        ).all()
+    rows = _requete_heures(param, fin_calcul).filter(HeuresHebdo.user_id == user_id).all()
+    entree = (
+        user_id,
+        {r.date_lundi: (r.heures_travaillees or 0) for r in rows},
+        bitmaps_exercice(param, [user_id])[user_id].jours_par_semaine(),
     )
-    heures_par_lundi = {r.date_lundi: (r.heures_travaillees or 0) for r in rows}
+    return _resultats_rtt(
+        [entree],
+        seuil=seuil_hebdo_param(param),
+        heures_jour=heures_par_jour_absence_param(param),
+        coef=_coef_param(param),
+        fin_calcul=fin_calcul,
+    )[user_id]
 
-    # Semaines avec heures saisies ou absences (pour le détail UI).
-    semaines = sorted(
-        s for s in (set(heures_par_lundi.keys()) | set(absences_semaine.keys())) if s <= fin_calcul
-    )
 
-    total = 0.0
-    detail = []
-    for lundi in semaines:
-        jours_absence = absences_semaine.get(lundi, 0.0)
-        heures = heures_par_lundi.get(lundi)
-        surplus = 0.0
-        if heures is not None:
-            surplus = calculer_rtt_semaine(
-                heures,
-                jours_absence,
-                seuil_hebdo=seuil,
-                heures_par_jour=heures_jour,
-                coef=coef,
-            )
+def calculer_rtt_hebdo_lot(
+    param: ParametrageAnnuel,
+    user_ids: list[int] | None = None,
+    jusqu_a: date | None = None,
+) -> dict[int, RttHebdoResult]:
+    """Version ensembliste de `calculer_rtt_hebdo` pour tous les salariés.
+
+    Renvoie ``{user_id: RttHebdoResult}`` identique au calcul individuel, en
+    deux requêtes au total (une passe sur HeuresHebdo, une sur les congés
+    validés de l'exercice) au lieu de trois requêtes **par** salarié. Sans
+    ``user_ids``, couvre tous les salariés ayant des heures ou des absences.
+    """
+    fin_calcul = min(param.fin_exercice, jusqu_a or date.today())
 
-        rtt = surplus
-        total += rtt
-        detail.append({
-            "lundi": lundi,
-            "heures": heures or 0,
-            "jours_absence": jours_absence,
-            "surplus": surplus,
-            "rtt": rtt,
-        })
-
-    return RttHebdoResult(
-        user_id=user_id,
-        # On ne tronque plus à l'entier : on conserve les fractions d'heure
-        # (arrondi à 2 décimales pour neutraliser les artefacts de calcul flottant).
-        # L'arrondi d'affichage se fait dans les templates.
-        rtt_calculee=round(total, 2),
-        nb_semaines=len(semaines),
-        detail=detail,
+    q_heures = _requete_heures(param, fin_calcul)
+    if user_ids is not None:
+        user_ids = list(user_ids)
+        if not user_ids:
+            return {}
+        q_heures = q_heures.filter(HeuresHebdo.user_id.in_(user_ids))
+
+    heures_par_user: dict[int, dict] = {}
+    for uid, lundi, heures in q_heures.with_entities(
+        HeuresHebdo.user_id, HeuresHebdo.date_lundi, HeuresHebdo.heures_travaillees
+    ):
+        heures_par_user.setdefault(uid, {})[lundi] = heures or 0
+
+    bitmaps = bitmaps_exercice(param, user_ids)
+    cibles = user_ids if user_ids is not None else sorted(set(heures_par_user) | set(bitmaps))
+    return _resultats_rtt(
+        (
+            (uid, heures_par_user.get(uid, {}), bitmaps[uid].jours_par_semaine() if uid in bitmaps else {})
+            for uid in cibles
+        ),
+        seuil=seuil_hebdo_param(param),
+        heures_jour=heures_par_jour_absence_param(param),
+        coef=_coef_param(param),
+        fin_calcul=fin_calcul,
     )
 
 
-def maj_rtt_allocations_hebdo(param: ParametrageAnnuel, user_ids: list[int] | None = None) -> list[RttHebdoResult]:
-    """Met à jour AllocationConge.rtt_heures_allouees selon le calcul hebdomadaire.
+def _ecrire_semaines(param: ParametrageAnnuel, resultats) -> None:
+    """Remplace les semaines stockées (RttSemaine) des salariés recalculés."""
+    user_ids = [r.user_id for r in resultats]
+    if not user_ids:
+        return
+    RttSemaine.query.filter(
+        RttSemaine.parametrage_id == param.id,
+        RttSemaine.user_id.in_(user_ids),
+    ).delete()
+    db.session.add_all(
+        RttSemaine(
+            user_id=r.user_id,
+            parametrage_id=param.id,
+            date_lundi=d["lundi"],
+            heures=d["heures"],
+            jours_absence=d["jours_absence"],
+            rtt=d["rtt"],
+        )
+        for r in resultats
+        for d in r.detail
+    )
 
-    Le calcul hebdomadaire est désormais le seul mode RTT de l'application.
-    """
-    if not param:
-        return []
 
+def _recalcul_complet(param: ParametrageAnnuel, user_ids: list[int] | None = None) -> list[RttHebdoResult]:
     q = AllocationConge.query.filter_by(parametrage_id=param.id)
     if user_ids:
         q = q.filter(AllocationConge.user_id.in_(user_ids))
     allocations = q.all()
 
+    par_user = calculer_rtt_hebdo_lot(param, [a.user_id for a in allocations])
     results: list[RttHebdoResult] = []
     for alloc in allocations:
-        res = calculer_rtt_hebdo(alloc.user_id, param)
+        res = par_user[alloc.user_id]
         alloc.rtt_heures_allouees = res.rtt_calculee
         results.append(res)
+    _ecrire_semaines(param, results)
+    return results
+
+
+def maj_rtt_allocations_hebdo(param: ParametrageAnnuel, user_ids: list[int] | None = None) -> list[RttHebdoResult]:
+    """Met à jour AllocationConge.rtt_heures_allouees selon le calcul hebdomadaire.
+
+    Le calcul hebdomadaire est désormais le seul mode RTT de l'application.
+    Recalcul complet (toutes les semaines de l'exercice) : il réécrit aussi les
+    semaines stockées (RttSemaine) et sert de référence à `recalculer_semaines`.
+    Passe par `calculer_rtt_hebdo_lot` : nombre fixe de requêtes quel que soit
+    l'effectif.
+    """
+    if not param:
+        return []
 
+    results = _recalcul_complet(param, user_ids)
     db.session.commit()
     return results
+
+
+def semaines_periode(user_id: int, date_debut: date, date_fin: date) -> set:
+    """Paires ``(user_id, lundi)`` des semaines couvertes par [date_debut, date_fin]."""
+    paires = set()
+    lundi = _lundi(date_debut)
+    while lundi <= date_fin:
+        paires.add((user_id, lundi))
+        lundi += timedelta(days=7)
+    return paires
+
+
+def recalculer_semaines(
+    param: ParametrageAnnuel,
+    paires,
+    jusqu_a: date | None = None,
+) -> int:
+    """Recalcul incrémental : ne recalcule que les semaines ``(user_id, lundi)`` données.
+
+    Chaque semaine est recalculée depuis ses sources (heures + congés validés),
+    la ligne RttSemaine est mise à jour puis l'allocation RTT du salarié est
+    réécrite en SQL depuis la somme de ses semaines stockées (un seul UPDATE :
+    pas de lecture-modification-écriture en Python, qu'un appel concurrent
+    pourrait écraser). Un salarié dont les semaines n'ont jamais été stockées
+    pour cet exercice passe par le recalcul complet. Les semaines postérieures à ``jusqu_a``
+    (défaut : aujourd'hui) sont ignorées, comme dans le calcul complet ;
+    `rattraper_semaines_echues` les reprend une fois leur lundi atteint.
+
+    Ne commit pas : le caller décide. Retourne le nombre de semaines recalculées.
+    """
+    if not param:
+        return 0
+    premier_lundi = _lundi(param.debut_exercice)
+    fin_calcul = min(param.fin_exercice, jusqu_a or date.today())
+    lundis_par_user: dict[int, set] = {}
+    for uid, lundi in paires:
+        lundi = _lundi(lundi)
+        if premier_lundi <= lundi <= param.fin_exercice:
+            lundis_par_user.setdefault(uid, set()).add(lundi)
+    if not lundis_par_user:
+        return 0
+
+    allocations = {
+        a.user_id: a
+        for a in AllocationConge.query.filter(
+            AllocationConge.parametrage_id == param.id,
+            AllocationConge.user_id.in_(list(lundis_par_user)),
+        )
+    }
+    initialises = {
+        uid for (uid,) in db.session.query(RttSemaine.user_id).filter(
+            RttSemaine.parametrage_id == param.id,
+            RttSemaine.user_id.in_(list(allocations)),
+        ).distinct()
+    }
+    a_initialiser = sorted(set(allocations) - initialises)
+    if a_initialiser:
+        _recalcul_complet(param, a_initialiser)
+    lundis_par_user = {uid: l for uid, l in lundis_par_user.items() if uid in initialises}
+    if not lundis_par_user:
+        return 0
+
+    user_ids = list(lundis_par_user)
+    tous = set().union(*lundis_par_user.values())
+    lmin, lmax = min(tous), max(tous)
+
+    heures = {
+        (uid, lundi): (h or 0)
+        for uid, lundi, h in db.session.query(
+            HeuresHebdo.user_id, HeuresHebdo.date_lundi, HeuresHebdo.heures_travaillees
+        ).filter(
+            HeuresHebdo.user_id.in_(user_ids),
+            HeuresHebdo.date_lundi >= lmin,
+            HeuresHebdo.date_lundi <= lmax,
+        )
+    }
+    bitmaps = bitmaps_exercice(param, user_ids)
+    stockees = {
+        (r.user_id, r.date_lundi): r
+        for r in RttSemaine.query.filter(
+            RttSemaine.parametrage_id == param.id,
+            RttSemaine.user_id.in_(user_ids),
+            RttSemaine.date_lundi >= lmin,
+            RttSemaine.date_lundi <= lmax,
+        )
+    }
+
+    # Semaines à recalculer, par salarié et dans l'ordre : (lundi, heures, jours d'absence) ;
+    # heures None et pas d'absence (ou semaine future) = semaine à retirer.
+    a_traiter: dict[int, list] = {}
+    for uid, lundis in lundis_par_user.items():
+        absences_semaine = bitmaps[uid].jours_par_semaine()
+        a_traiter[uid] = [
+            (lundi, heures.get((uid, lundi)), absences_semaine.get(lundi, 0.0)) for lundi in sorted(lundis)
+        ]
+    calculees = [
+        (h, j) for semaines in a_traiter.values() for lundi, h, j in semaines
+        if not (lundi > fin_calcul or (h is None and not j))
+    ]
+    lot = calculer_rtt_semaines_lot(
+        [h or 0 for h, _ in calculees],
+        [j for _, j in calculees],
+        seuil_hebdo_param(param),
+        heures_par_jour_absence_param(param),
+        _coef_param(param),
+    )
+    rtt_calcules = iter(lot.rtt)
+
+    nb = 0
+    for uid, semaines in a_traiter.items():
+        for lundi, h, jours_absence in semaines:
+            nb += 1
+            ligne = stockees.get((uid, lundi))
+            if lundi > fin_calcul or (h is None and not jours_absence):
+                if ligne is not None:
+                    db.session.delete(ligne)
+                continue
+
+            rtt = next(rtt_calcules)
+            if ligne is None:
+                ligne = RttSemaine(user_id=uid, parametrage_id=param.id, date_lundi=lundi)
+                db.session.add(ligne)
+            ligne.heures = h or 0
+            ligne.jours_absence = jours_absence
+            ligne.rtt = rtt
+            ligne.calcule_le = datetime.now(timezone.utc)
+
+    # Allocation = somme des semaines stockées, arrondie comme le calcul complet.
+    db.session.flush()
+    total = (
+        select(func.round(func.coalesce(func.sum(RttSemaine.rtt), 0), 2))
+        .where(
+            RttSemaine.user_id == AllocationConge.user_id,
+            RttSemaine.parametrage_id == param.id,
+        )
+        .scalar_subquery()
+    )
+    db.session.execute(
+        update(AllocationConge)
+        .where(
+            AllocationConge.parametrage_id == param.id,
+            AllocationConge.user_id.in_(user_ids),
+        )
+        .values(rtt_heures_allouees=total)
+        .execution_options(synchronize_session=False)
+    )
+    for uid in user_ids:
+        db.session.expire(allocations[uid], ["rtt_heures_allouees"])
+    return nb
+
+
+def semaines_echues_a_calculer(param: ParametrageAnnuel, jusqu_a: date | None = None) -> set:
+    """Paires ``(user_id, lundi)`` échues (lundi <= ``jusqu_a``, défaut aujourd'hui)
+    ayant des heures ou des absences mais aucune ligne RttSemaine.
+
+    Ce sont les semaines saisies ou touchées à l'avance : `recalculer_semaines`
+    les ignore tant que leur lundi n'est pas atteint. Trois requêtes (allocations,
+    semaines stockées, heures) plus les bitmaps d'absence de l'exercice.
+    """
+    if not param:
+        return set()
+    premier_lundi = _lundi(param.debut_exercice)
+    fin_calcul = min(param.fin_exercice, jusqu_a or date.today())
+    user_ids = [
+        uid for (uid,) in db.session.query(AllocationConge.user_id).filter(
+            AllocationConge.parametrage_id == param.id
+        )
+    ]
+    if not user_ids or fin_calcul < premier_lundi:
+        return set()
+    stockees = set(
+        db.session.query(RttSemaine.user_id, RttSemaine.date_lundi).filter(
+            RttSemaine.parametrage_id == param.id,
+            RttSemaine.date_lundi <= fin_calcul,
+        )
+    )
+    candidates = set(
+        db.session.query(HeuresHebdo.user_id, HeuresHebdo.date_lundi).filter(
+            HeuresHebdo.user_id.in_(user_ids),
+            HeuresHebdo.date_lundi >= premier_lundi,
+            HeuresHebdo.date_lundi <= fin_calcul,
+        )
+    )
+    for uid, bitmap in bitmaps_exercice(param, user_ids).items():
+        candidates.update((uid, lundi) for lundi in bitmap.jours_par_semaine() if lundi <= fin_calcul)
+    return candidates - stockees
+
+
+def rattraper_semaines_echues(param: ParametrageAnnuel, jusqu_a: date | None = None) -> int:
+    """Ajoute à l'allocation RTT les semaines saisies à l'avance dont le lundi est passé.
+
+    Appelé par le job nocturne ``rtt_rattrapage`` et après chaque synchro ERP.
+    Ne commit pas. Retourne le nombre de semaines recalculées.
+    """
+    paires = semaines_echues_a_calculer(param, jusqu_a)
+    if not paires:
+        return 0
+    return recalculer_semaines(param, paires, jusqu_a)
+
+
+def verifier_rtt_semaines(param: ParametrageAnnuel, jusqu_a: date | None = None) -> list[dict]:
+    """Contrôle de cohérence : compare le stocké à un recalcul complet.
+
+    Retourne un écart par salarié dont l'allocation RTT ou les semaines
+    stockées (RttSemaine) diffèrent du calcul de référence
+    (`calculer_rtt_hebdo_lot`). Liste vide = tout est cohérent. N'écrit rien ;
+    la correction est `maj_rtt_allocations_hebdo(param)`.
+    """
+    if not param:
+        return []
+    allocations = AllocationConge.query.filter_by(parametrage_id=param.id).all()
+    attendus = calculer_rtt_hebdo_lot(param, [a.user_id for a in allocations], jusqu_a=jusqu_a)
+    stockees: dict[int, dict] = {}
+    for r in RttSemaine.query.filter_by(parametrage_id=param.id):
+        stockees.setdefault(r.user_id, {})[r.date_lundi] = r.rtt
+
+    ecarts = []
+    for alloc in allocations:
+        res = attendus[alloc.user_id]
+        semaines_attendues = {d["lundi"]: d["rtt"] for d in res.detail}
+        semaines_stockees = stockees.get(alloc.user_id, {})
+        divergentes = sorted(
+            l for l in set(semaines_attendues) | set(semaines_stockees)
+            if semaines_attendues.get(l) != semaines_stockees.get(l)
+        )
+        alloue = round(alloc.rtt_heures_allouees or 0, 2)
+        if alloue != res.rtt_calculee or divergentes:
+            ecarts.append({
+                "user_id": alloc.user_id,
+                "rtt_alloue": alloue,
+                "rtt_attendu": res.rtt_calculee,
+                "semaines_divergentes": divergentes,
+            })
+    return ecarts
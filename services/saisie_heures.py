@@ -0,0 +1,176 @@
+"""Saisie manuelle des heures hebdomadaires (écran RH « heures hebdo »).
+
+Les saisies existantes des cellules envoyées sont lues en une requête, puis
+seules les valeurs nouvelles ou modifiées sont écrites en un
+``INSERT ... ON CONFLICT DO UPDATE`` groupé (même principe que l'import ERP,
+services/erp/sync_heures.py) au lieu d'un ``SELECT`` + ``UPDATE`` par salarié.
+
+L'upsert ne passant pas par l'ORM, l'empreinte ERP des semaines où une ligne
+importée devient manuelle est effacée ici (le filet de sécurité de
+services/erp/etat_sync.py ne voit que les écritures ORM).
+
+La grille annuelle (salariés × semaines de l'exercice) est chargée en quelques
+requêtes (`grille_exercice`) et enregistrée par diff JSON des seules cellules
+modifiées (`lire_cellules_grille` puis `enregistrer_heures_manuelles`).
+"""
+from __future__ import annotations
+
+import math
+from datetime import date, timedelta
+
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db
+from models.heures_hebdo import HeuresHebdo
+from services.absences_bitmap import bitmaps_absences
+from services.erp.etat_sync import oublier_empreintes
+from services.rtt_hebdo import jours_absence_semaine_lot
+
+SOURCE_MANUELLE = "manuel"
+
+_LIGNES_PAR_UPSERT = 1000
+
+
+def heures_existantes(cellules) -> dict[tuple[int, date], tuple[str, float]]:
+    """``{(user_id, lundi): (source, heures)}`` des cellules déjà saisies, en une requête."""
+    cellules = set(cellules)
+    if not cellules:
+        return {}
+    user_ids = {u for u, _ in cellules}
+    lundis = [l for _, l in cellules]
+    rows = db.session.query(
+        HeuresHebdo.user_id, HeuresHebdo.date_lundi, HeuresHebdo.source, HeuresHebdo.heures_travaillees,
+    ).filter(
+        HeuresHebdo.user_id.in_(user_ids),
+        HeuresHebdo.date_lundi.between(min(lundis), max(lundis)),
+    )
+    return {
+        (user_id, lundi): (source, heures)
+        for user_id, lundi, source, heures in rows
+        if (user_id, lundi) in cellules
+    }
+
+
+def enregistrer_heures_manuelles(
+    valeurs: dict[tuple[int, date], float],
+    saisi_par_id: int | None,
+) -> list[tuple[int, date]]:
+    """Enregistre les heures saisies ``{(user_id, lundi): heures}`` (source « manuel »).
+
+    Les heures sont arrondies à 2 décimales et ramenées à 0 si négatives. Une
+    cellule identique à la saisie manuelle existante n'est pas réécrite.
+    Renvoie les ``(user_id, lundi)`` écrits, dont le RTT est à recalculer.
+    Ne commit pas.
+    """
+    existantes = heures_existantes(valeurs)
+    lignes = []
+    erp_remplacees = set()
+    for (user_id, lundi), heures in sorted(valeurs.items()):
+        heures = round(max(0.0, float(heures)), 2)
+        avant = existantes.get((user_id, lundi))
+        if avant is not None:
+            source, ancien = avant
+            if source == SOURCE_MANUELLE and round(float(ancien or 0), 2) == heures:
+                continue
+            if source != SOURCE_MANUELLE:
+                erp_remplacees.add(lundi)
+        lignes.append({
+            "user_id": user_id,
+            "date_lundi": lundi,
+            "heures_travaillees": heures,
+            "source": SOURCE_MANUELLE,
+            "saisi_par_id": saisi_par_id,
+        })
+    if not lignes:
+        return []
+
+    table = HeuresHebdo.__table__
+    for i in range(0, len(lignes), _LIGNES_PAR_UPSERT):
+        stmt = sqlite_insert(table).values(lignes[i:i + _LIGNES_PAR_UPSERT])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=["user_id", "date_lundi"],
+            set_={
+                "heures_travaillees": stmt.excluded.heures_travaillees,
+                "source": SOURCE_MANUELLE,
+                "saisi_par_id": stmt.excluded.saisi_par_id,
+            },
+        )
+        db.session.execute(stmt)
+    oublier_empreintes(erp_remplacees)
+    return [(l["user_id"], l["date_lundi"]) for l in lignes]
+
+
+def semaines_exercice(param) -> list[date]:
+    """Lundis des semaines ISO qui chevauchent l'exercice ``param``, dans l'ordre."""
+    lundi = param.debut_exercice - timedelta(days=param.debut_exercice.weekday())
+    semaines = []
+    while lundi <= param.fin_exercice:
+        semaines.append(lundi)
+        lundi += timedelta(days=7)
+    return semaines
+
+
+def grille_exercice(param, user_ids, exclus=()) -> dict:
+    """Données de la grille annuelle salariés × semaines de l'écran heures hebdo.
+
+    ``{"semaines": [lundi, ...], "heures": {(user_id, lundi): (source, heures)},
+    "absences": {(user_id, lundi): jours}}`` (cellules sans absence omises).
+    Une requête pour les heures de l'exercice, une au plus pour les bitmaps
+    d'absence (cache par exercice) et une par semaine à cheval sur l'exercice.
+    """
+    user_ids = list(user_ids)
+    semaines = semaines_exercice(param)
+    if not user_ids:
+        return {"semaines": semaines, "heures": {}, "absences": {}}
+
+    rows = db.session.query(
+        HeuresHebdo.user_id, HeuresHebdo.date_lundi, HeuresHebdo.source, HeuresHebdo.heures_travaillees,
+    ).filter(
+        HeuresHebdo.user_id.in_(user_ids),
+        HeuresHebdo.date_lundi.between(semaines[0], semaines[-1]),
+    )
+    heures = {(user_id, lundi): (source, heures) for user_id, lundi, source, heures in rows}
+
+    absences = {}
+    bitmaps = bitmaps_absences(param.debut_exercice, param.fin_exercice, exclus or (), user_ids)
+    for uid in user_ids:
+        for lundi, jours in bitmaps[uid].jours_par_semaine().items():
+            absences[(uid, lundi)] = jours
+    # Semaines de bord : le bitmap de l'exercice n'en voit qu'une partie.
+    for lundi in {semaines[0], semaines[-1]}:
+        if lundi < param.debut_exercice or lundi + timedelta(days=6) > param.fin_exercice:
+            for uid, jours in jours_absence_semaine_lot(user_ids, lundi, exclus, param).items():
+                if jours:
+                    absences[(uid, lundi)] = jours
+                else:
+                    absences.pop((uid, lundi), None)
+    return {"semaines": semaines, "heures": heures, "absences": absences}
+
+
+def lire_cellules_grille(cellules, user_ids, semaines) -> dict[tuple[int, date], float]:
+    """Valide le diff JSON de la grille : ``[{"user_id", "lundi", "heures"}, ...]``.
+
+    Renvoie ``{(user_id, lundi): heures}`` prêt pour `enregistrer_heures_manuelles`.
+    Lève ``ValueError`` (message affichable) sur une cellule hors de la grille
+    (salarié inactif, semaine hors exercice) ou une valeur non numérique.
+    """
+    if not isinstance(cellules, list):
+        raise ValueError("Format invalide : liste de cellules attendue.")
+    user_ids, semaines = set(user_ids), set(semaines)
+    valeurs = {}
+    for cellule in cellules:
+        try:
+            user_id = int(cellule["user_id"])
+            lundi = date.fromisoformat(cellule["lundi"])
+            heures = cellule["heures"]
+            if isinstance(heures, str):
+                heures = heures.strip().replace(",", ".")
+            heures = float(heures)
+        except (KeyError, TypeError, ValueError):
+            raise ValueError(f"Cellule invalide : {cellule!r}.") from None
+        if user_id not in user_ids or lundi not in semaines:
+            raise ValueError(f"Cellule hors de la grille : salarié {user_id}, semaine du {lundi.isoformat()}.")
+        if not math.isfinite(heures):
+            raise ValueError(f"Valeur invalide : salarié {user_id}, semaine du {lundi.isoformat()}.")
+        valeurs[(user_id, lundi)] = heures
+    return valeurs
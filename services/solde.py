@@ -1,6 +1,13 @@
+from datetime import datetime, timezone
+
+from sqlalchemy import event, insert, inspect as sa_inspect
+
 from models import db
 from models.conge import Conge
+from models.jour_ferie import JourFerie
 from models.parametrage import ParametrageAnnuel, AllocationConge
+from models.solde_snapshot import SoldeSnapshot
+from services.parametrage_actif import get_parametrage, get_parametrage_actif
 from services.consommation import (
     somme_consommation,
     _num,
@@ -11,11 +18,6 @@ from services.consommation import (
 )
 
 
-def get_parametrage_actif():
-    """Retourne le paramétrage annuel actif."""
-    return ParametrageAnnuel.query.filter_by(actif=True).first()
-
-
 def get_allocation(user_id, parametrage_id=None):
     """Retourne l'allocation de congés d'un utilisateur pour le paramétrage donné."""
     if parametrage_id is None:
@@ -32,7 +34,7 @@ def get_allocation(user_id, parametrage_id=None):
 
 def _get_param(parametrage_id):
     if parametrage_id:
-        return ParametrageAnnuel.query.get(parametrage_id)
+        return get_parametrage(parametrage_id)
     return get_parametrage_actif()
 
 
@@ -153,24 +155,81 @@ def _assembler_solde(allocation, cp_consomme, cp_en_attente, rtt_consomme, rtt_e
     }
 
 
+def _consommations_directes(user_id, parametrage_id):
+    """(cp_consomme, cp_en_attente, rtt_consomme, rtt_en_attente) recalculés depuis les congés."""
+    return (
+        calculer_jours_cps_consommes(user_id, parametrage_id),
+        calculer_jours_cps_en_attente(user_id, parametrage_id),
+        calculer_heures_rtt_consommes(user_id, parametrage_id),
+        calculer_heures_rtt_en_attente(user_id, parametrage_id),
+    )
+
+
+# Colonnes lues en tuple (pas d'entité ORM) : la table est aussi purgée par des
+# DELETE bas niveau (cf. événements en fin de module), un objet resté dans la
+# session serait alors périmé.
+_COLONNES_SNAPSHOT = (
+    SoldeSnapshot.cp_consomme,
+    SoldeSnapshot.cp_en_attente,
+    SoldeSnapshot.rtt_consomme,
+    SoldeSnapshot.rtt_en_attente,
+)
+
+
+def _consommations_snapshot(user_ids, parametrage_id):
+    """{user_id: (cp_consomme, cp_en_attente, rtt_consomme, rtt_en_attente)} matérialisés."""
+    rows = db.session.query(SoldeSnapshot.user_id, *_COLONNES_SNAPSHOT).filter(
+        SoldeSnapshot.parametrage_id == parametrage_id,
+        SoldeSnapshot.user_id.in_(tuple(user_ids)),
+    )
+    return {uid: tuple(_num(v) for v in valeurs) for uid, *valeurs in rows}
+
+
 def calculer_solde(user_id, parametrage_id=None):
     """Calcule les soldes restants d'un utilisateur pour CP (jours) et RTT (heures).
 
     Inclut les demandes en attente pour transparence (clés *_en_attente). Le solde
     autorisé peut être négatif : c'est un avertissement, pas un blocage.
+    Les consommations viennent de la table `soldes_snapshot` si elle est à jour
+    pour ce salarié, sinon du calcul direct (`somme_consommation`).
     """
     allocation = get_allocation(user_id, parametrage_id)
     if allocation is None:
         return _solde_zero()
 
     pid = allocation.parametrage_id
-    return _assembler_solde(
-        allocation,
-        calculer_jours_cps_consommes(user_id, pid),
-        calculer_jours_cps_en_attente(user_id, pid),
-        calculer_heures_rtt_consommes(user_id, pid),
-        calculer_heures_rtt_en_attente(user_id, pid),
+    conso = _consommations_snapshot((user_id,), pid).get(user_id)
+    if conso is None:
+        conso = _consommations_directes(user_id, pid)
+    return _assembler_solde(allocation, *conso)
+
+
+def rafraichir_solde_snapshot(user_id, parametrage_id):
+    """Recalcule et enregistre les consommations matérialisées d'un salarié.
+
+    Appelé dans la transaction de chaque changement de congé
+    (services/conge_evenements.py). Ne commit pas : le caller décide.
+    """
+    cp_consomme, cp_attente, rtt_consomme, rtt_attente = _consommations_directes(user_id, parametrage_id)
+    _ecrire_snapshot(user_id, parametrage_id, cp_consomme, cp_attente, rtt_consomme, rtt_attente)
+
+
+def _ecrire_snapshot(user_id, parametrage_id, cp_consomme, cp_attente, rtt_consomme, rtt_attente):
+    valeurs = {
+        "cp_consomme": float(cp_consomme),
+        "cp_en_attente": float(cp_attente),
+        "rtt_consomme": float(rtt_consomme),
+        "rtt_en_attente": float(rtt_attente),
+        "maj_le": datetime.now(timezone.utc),
+    }
+    table = SoldeSnapshot.__table__
+    res = db.session.execute(
+        table.update()
+        .where(table.c.user_id == user_id, table.c.parametrage_id == parametrage_id)
+        .values(**valeurs)
     )
+    if not res.rowcount:
+        db.session.execute(table.insert().values(user_id=user_id, parametrage_id=parametrage_id, **valeurs))
 
 
 def calculer_soldes_lot(user_ids, param=None):
@@ -178,8 +237,9 @@ def calculer_soldes_lot(user_ids, param=None):
 
     Renvoie ``{user_id: dict_solde}`` avec exactement les mêmes clés et valeurs
     que `calculer_solde` appelé individuellement, mais en un nombre **fixe** de
-    requêtes (≈ 1 pour les allocations + 4 sommes de consommation groupées) au
-    lieu de ~5-9 requêtes **par** salarié. Élimine le N+1 du tableau de bord RH.
+    requêtes (≈ 1 pour les allocations + 1 sur `soldes_snapshot`, plus 4 sommes
+    de consommation groupées pour les salariés sans ligne matérialisée) au lieu
+    de ~5-9 requêtes **par** salarié. Élimine le N+1 du tableau de bord RH.
 
     `param` : paramétrage actif (passé par l'appelant pour éviter un re-lookup).
     """
@@ -197,6 +257,25 @@ def calculer_soldes_lot(user_ids, param=None):
         ).all()
     }
 
+    # Consommations matérialisées d'abord ; agrégats groupés pour les manquants.
+    conso = _consommations_snapshot(allocs, param.id)
+    manquants = [uid for uid in allocs if uid not in conso]
+    conso.update(_consommations_groupees(manquants, param))
+
+    resultats = {}
+    for uid in user_ids:
+        allocation = allocs.get(uid)
+        if allocation is None:
+            resultats[uid] = _solde_zero()
+            continue
+        resultats[uid] = _assembler_solde(allocation, *conso[uid])
+    return resultats
+
+
+def _consommations_groupees(user_ids, param):
+    """{user_id: (cp_consomme, cp_en_attente, rtt_consomme, rtt_en_attente)} en 4 agrégats."""
+    if not user_ids:
+        return {}
     debut, fin = param.debut_exercice, param.fin_exercice
     cp_consomme = somme_consommation(
         colonne=Conge.nb_jours_ouvrables, date_debut_min=debut, date_fin_max=fin,
@@ -215,20 +294,44 @@ def calculer_soldes_lot(user_ids, param=None):
         statuts=STATUTS_EN_ATTENTE, types=TYPE_RTT, user_ids=user_ids, group_by="user",
     )
 
-    resultats = {}
-    for uid in user_ids:
-        allocation = allocs.get(uid)
-        if allocation is None:
-            resultats[uid] = _solde_zero()
-            continue
-        resultats[uid] = _assembler_solde(
-            allocation,
-            cp_consomme.get(uid, 0),
-            cp_attente.get(uid, 0),
-            rtt_consomme.get(uid, 0),
-            rtt_attente.get(uid, 0),
+    return {
+        uid: (cp_consomme.get(uid, 0), cp_attente.get(uid, 0), rtt_consomme.get(uid, 0), rtt_attente.get(uid, 0))
+        for uid in user_ids
+    }
+
+
+def reconcilier_soldes_snapshot(param=None, corriger=False):
+    """Compare `soldes_snapshot` aux agrégats directs pour un exercice.
+
+    Retourne la liste des écarts ``{user_id, champ, stocke, attendu}`` sur les
+    lignes existantes (une ligne absente n'est pas un écart : le calcul direct
+    prend le relais). Avec ``corriger=True``, réécrit toutes les lignes des
+    salariés ayant une allocation, y compris les manquantes. Ne commit pas.
+    """
+    if param is None:
+        param = get_parametrage_actif()
+    if param is None:
+        return []
+
+    user_ids = [
+        uid for (uid,) in db.session.query(AllocationConge.user_id).filter(
+            AllocationConge.parametrage_id == param.id
         )
-    return resultats
+    ]
+    attendus = _consommations_groupees(user_ids, param)
+    stockes = _consommations_snapshot(user_ids, param.id)
+    champs = ("cp_consomme", "cp_en_attente", "rtt_consomme", "rtt_en_attente")
+
+    ecarts = []
+    for uid, valeurs in stockes.items():
+        for champ, stocke, attendu in zip(champs, valeurs, attendus[uid]):
+            if stocke != attendu:
+                ecarts.append({"user_id": uid, "champ": champ, "stocke": stocke, "attendu": attendu})
+    if corriger:
+        for uid, valeurs in attendus.items():
+            if stockes.get(uid) != valeurs:
+                _ecrire_snapshot(uid, param.id, *valeurs)
+    return ecarts
 
 
 def salaries_a_risque(jours_min_restants=10, jours_avant_fin=90):
@@ -267,6 +370,43 @@ def salaries_a_risque(jours_min_restants=10, jours_avant_fin=90):
     return a_risque
 
 
+def _allocations_existantes(param: ParametrageAnnuel, user_ids) -> dict:
+    """``{user_id: AllocationConge}`` déjà créées pour l'exercice ``param``, en une requête.
+
+    Les modifications de l'appelant partent au flush en un UPDATE groupé
+    (executemany). Les manquantes sont à créer par `_inserer_allocations`.
+    """
+    if not user_ids:
+        return {}
+    return {
+        a.user_id: a
+        for a in AllocationConge.query.filter(
+            AllocationConge.parametrage_id == param.id,
+            AllocationConge.user_id.in_(tuple(user_ids)),
+        ).all()
+    }
+
+
+def _inserer_allocations(param: ParametrageAnnuel, lignes) -> None:
+    """Crée en un INSERT groupé les allocations ``[{"user_id": ..., <colonnes>}]``.
+
+    Colonnes absentes : CP par défaut de l'exercice, ancienneté / report à 0,
+    RTT à 0 (calculé en hebdomadaire : aucune allocation forfaitaire au départ).
+    Ne commit pas.
+    """
+    if not lignes:
+        return
+    defauts = {
+        "parametrage_id": param.id,
+        "jours_alloues": param.jours_conges_defaut,
+        "jours_anciennete": 0,
+        "jours_report": 0,
+        "rtt_heures_allouees": 0,
+        "rtt_heures_reportees": 0,
+    }
+    db.session.execute(insert(AllocationConge), [{**defauts, **ligne} for ligne in lignes])
+
+
 def cloturer_exercice_et_reporter(
     nouveau_param: ParametrageAnnuel,
     report_max_jours=None,
@@ -275,6 +415,11 @@ def cloturer_exercice_et_reporter(
     """Clôture l'exercice actif courant et crée les allocations du nouveau,
     en reportant le solde restant (CP et RTT) selon les plafonds.
 
+    Nombre fixe de requêtes quel que soit l'effectif : soldes de l'ancien
+    exercice via `calculer_soldes_lot`, allocations du nouveau lues en une
+    requête, mises à jour et créées en lot (`_allocations_existantes`,
+    `_inserer_allocations`).
+
     Args:
         nouveau_param : ParametrageAnnuel déjà persisté pour le prochain exercice
             (actif=True). L'ancien paramétrage actif sera désactivé.
@@ -290,18 +435,20 @@ def cloturer_exercice_et_reporter(
         ParametrageAnnuel.id != nouveau_param.id,
     ).first()
 
-    salaries = User.query.filter_by(actif=True).all()
+    user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.actif == True)]
+    # Solde restant avant clôture (basé sur l'ancien paramétrage si présent,
+    # sinon le calcul retourne 0 ou utilise l'allocation courante).
+    # Un solde négatif (déficit) est désormais reporté tel quel sur l'exercice
+    # suivant (report négatif), au lieu d'être écrêté à 0.
+    soldes = calculer_soldes_lot(user_ids, param=ancien)
+    allocs = _allocations_existantes(nouveau_param, user_ids)
+    nouvelles = []
     total_cp_reporte = 0
     total_rtt_reporte = 0
 
-    for s in salaries:
-        # Solde restant avant clôture (basé sur l'ancien paramétrage si présent,
-        # sinon le calcul retourne 0 ou utilise l'allocation courante).
-        # Un solde négatif (déficit) est désormais reporté tel quel sur l'exercice
-        # suivant (report négatif), au lieu d'être écrêté à 0.
-        solde_info = calculer_solde(s.id, parametrage_id=ancien.id if ancien else None)
-        cp_restant = solde_info.get("solde_restant", 0)
-        rtt_restant = solde_info.get("rtt_solde_restant", 0)
+    for uid in user_ids:
+        cp_restant = soldes[uid].get("solde_restant", 0)
+        rtt_restant = soldes[uid].get("rtt_solde_restant", 0)
 
         # Le plafond ne s'applique qu'au report positif : un déficit passe tel quel.
         cp_a_reporter = (
@@ -313,54 +460,45 @@ def cloturer_exercice_et_reporter(
             else rtt_restant
         )
 
-        alloc = AllocationConge.query.filter_by(
-            user_id=s.id, parametrage_id=nouveau_param.id
-        ).first()
-        if not alloc:
-            alloc = AllocationConge(
-                user_id=s.id,
-                parametrage_id=nouveau_param.id,
-                jours_alloues=nouveau_param.jours_conges_defaut,
-                jours_anciennete=0,
-                # RTT calculé en hebdomadaire : aucune allocation forfaitaire au départ.
-                rtt_heures_allouees=0,
-            )
-            db.session.add(alloc)
-
-        alloc.jours_report = int(cp_a_reporter)
-        # RTT en heures décimales : on ne tronque plus à l'entier (cf. R3).
-        alloc.rtt_heures_reportees = round(float(rtt_a_reporter), 2)
-        total_cp_reporte += int(cp_a_reporter)
-        total_rtt_reporte += round(float(rtt_a_reporter), 2)
+        report = {
+            "jours_report": int(cp_a_reporter),
+            # RTT en heures décimales : on ne tronque plus à l'entier (cf. R3).
+            "rtt_heures_reportees": round(float(rtt_a_reporter), 2),
+        }
+        alloc = allocs.get(uid)
+        if alloc is None:
+            nouvelles.append({"user_id": uid, **report})
+        else:
+            alloc.jours_report = report["jours_report"]
+            alloc.rtt_heures_reportees = report["rtt_heures_reportees"]
+        total_cp_reporte += report["jours_report"]
+        total_rtt_reporte += report["rtt_heures_reportees"]
+
+    _inserer_allocations(nouveau_param, nouvelles)
 
     if ancien:
         ancien.actif = False
     nouveau_param.actif = True
 
     return {
-        "nb_salaries": len(salaries),
+        "nb_salaries": len(user_ids),
         "report_cp_total": total_cp_reporte,
         "report_rtt_total": total_rtt_reporte,
     }
 
 
 def generer_allocations_pour_parametrage(param: ParametrageAnnuel):
-    """Crée ou met à jour les allocations de congés (CP + RTT) pour tous les salariés actifs."""
-    from models.user import User
+    """Crée ou met à jour les allocations de congés (CP + RTT) pour tous les salariés actifs.
 
-    salaries = User.query.filter_by(actif=True).all()
-    for s in salaries:
-        allocation = AllocationConge.query.filter_by(
-            user_id=s.id,
-            parametrage_id=param.id,
-        ).first()
-        if not allocation:
-            allocation = AllocationConge(
-                user_id=s.id,
-                parametrage_id=param.id,
-            )
-            db.session.add(allocation)
+    Allocations existantes lues en une requête, manquantes créées en un INSERT
+    groupé.
+    """
+    from models.user import User
 
+    user_ids = [uid for (uid,) in db.session.query(User.id).filter(User.actif == True)]
+    allocs = _allocations_existantes(param, user_ids)
+    _inserer_allocations(param, [{"user_id": uid} for uid in user_ids if uid not in allocs])
+    for allocation in allocs.values():
         allocation.jours_alloues = param.jours_conges_defaut
         allocation.jours_anciennete = allocation.jours_anciennete or 0
         allocation.jours_report = allocation.jours_report or 0
@@ -376,3 +514,31 @@ def generer_allocations_pour_parametrage(param: ParametrageAnnuel):
     # saisies, pour refléter immédiatement les droits acquis.
     from services.rtt_hebdo import maj_rtt_allocations_hebdo
     maj_rtt_allocations_hebdo(param)
+
+
+# --- Filets de sécurité : toute écriture qui change les consommations hors
+# conge_evenements (scripts, imports, tests) supprime les lignes concernées ;
+# le calcul direct prend alors le relais jusqu'au prochain rafraîchissement. ---
+
+@event.listens_for(Conge, "after_insert")
+@event.listens_for(Conge, "after_update")
+@event.listens_for(Conge, "after_delete")
+def _invalider_snapshot_conge(mapper, connection, target):
+    table = SoldeSnapshot.__table__
+    connection.execute(table.delete().where(table.c.user_id == target.user_id))
+
+
+@event.listens_for(ParametrageAnnuel, "after_update")
+def _invalider_snapshot_parametrage(mapper, connection, target):
+    etat = sa_inspect(target)
+    if etat.attrs.debut_exercice.history.has_changes() or etat.attrs.fin_exercice.history.has_changes():
+        table = SoldeSnapshot.__table__
+        connection.execute(table.delete().where(table.c.parametrage_id == target.id))
+
+
+@event.listens_for(JourFerie, "after_insert")
+@event.listens_for(JourFerie, "after_update")
+@event.listens_for(JourFerie, "after_delete")
+def _invalider_snapshot_feries(mapper, connection, target):
+    # Les fériés changent le prorata des congés à cheval sur deux exercices.
+    connection.execute(SoldeSnapshot.__table__.delete())
@@ -0,0 +1,290 @@
+"""Exécution unique (« single-flight ») entre processus, via la table ``verrous_execution``.
+
+La synchro ERP du vendredi (scheduler), un clic RH et ``flask sync-erp-heures``
+peuvent démarrer en même temps, chacun depuis son processus : le verrou
+``heures_rtt`` les sérialise au lieu de laisser deux imports et deux recalculs
+RTT se disputer la base SQLite.
+
+- acquisition atomique : un UPDATE conditionnel (libre ou bail expiré) ou
+  l'INSERT de la ligne, dans une transaction courte sur sa propre connexion ;
+- bail (``bail`` secondes) prolongé par un battement de cœur dans un thread
+  tant que le bloc s'exécute : un processus arrêté perd le verrou à
+  l'expiration du bail, sans intervention ;
+- un second appelant **rejoint** l'exécution en cours si elle fait le même
+  travail (même ``cle``) : il attend sa fin et ne relance rien si elle a
+  réussi (``dernier_statut`` enregistré à la libération) ; si elle a échoué
+  ou perdu son bail, il retente l'acquisition et s'exécute. Un travail
+  différent attend la libération puis s'exécute. Au-delà de ``attente_max``
+  secondes : `VerrouOccupeError` ;
+- si le bloc échoue, la session est annulée avant la libération (ses
+  écritures en attente bloqueraient l'UPDATE du verrou) ; un échec de la
+  libération est journalisé sans masquer l'erreur du bloc ;
+- les attentes sont journalisées et cumulées (`statistiques_verrous`).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import socket
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+
+from models import db
+from models.verrou_execution import VerrouExecution
+
+logger = logging.getLogger(__name__)
+
+# Synchro ERP (import d'heures + recalcul RTT) et recalcul RTT complet.
+VERROU_HEURES_RTT = "heures_rtt"
+
+# Issue de la dernière exécution, enregistrée à la libération du verrou.
+STATUT_SUCCES = "succes"
+STATUT_ERREUR = "erreur"
+
+_BAIL = 300.0
+_ATTENTE_MAX = 900.0
+_INTERVALLE_ATTENTE = 1.0
+
+_stats_lock = threading.Lock()
+_stats = {
+    "acquisitions": 0,
+    "rejoints": 0,
+    "attentes": 0,
+    "expirations": 0,
+    "echecs": 0,
+    "temps_attente_total": 0.0,
+    "temps_attente_max": 0.0,
+}
+
+
+class VerrouOccupeError(RuntimeError):
+    """Levée si le verrou ne s'est pas libéré dans le délai d'attente."""
+
+
+@dataclass
+class Execution:
+    """Issue de `execution_unique` pour l'appelant.
+
+    ``rejointe`` : une exécution identique tournait déjà et a réussi, l'appelant
+    a attendu sa fin et ne doit rien relancer. ``attente`` : secondes passées à attendre.
+    """
+
+    nom: str
+    cle: str | None
+    rejointe: bool = False
+    attente: float = 0.0
+
+
+def _maintenant() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _nouveau_detenteur() -> str:
+    return f"{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}:{uuid.uuid4().hex[:8]}"
+
+
+def _attendre(secondes: float) -> None:
+    time.sleep(secondes)
+
+
+def _acquerir(nom: str, detenteur: str, cle: str | None, bail: float) -> bool:
+    table = VerrouExecution.__table__
+    maintenant = _maintenant()
+    valeurs = {
+        "detenteur": detenteur,
+        "cle": cle,
+        "acquis_le": maintenant,
+        "expire_le": maintenant + timedelta(seconds=bail),
+        "dernier_statut": None,
+    }
+    with db.engine.begin() as conn:
+        expire = conn.execute(
+            select(table.c.detenteur).where(
+                table.c.nom == nom, table.c.detenteur.is_not(None), table.c.expire_le < maintenant,
+            )
+        ).first()
+        res = conn.execute(
+            table.update()
+            .where(table.c.nom == nom)
+            .where((table.c.detenteur.is_(None)) | (table.c.expire_le < maintenant))
+            .values(generation=table.c.generation + 1, **valeurs)
+        )
+        if res.rowcount:
+            if expire is not None:
+                logger.warning("Verrou %s : bail expiré de %s, verrou repris.", nom, expire[0])
+                with _stats_lock:
+                    _stats["expirations"] += 1
+            return True
+        existe = conn.execute(select(table.c.nom).where(table.c.nom == nom)).first()
+    if existe is not None:
+        return False
+    try:
+        with db.engine.begin() as conn:
+            conn.execute(table.insert().values(nom=nom, generation=1, **valeurs))
+        return True
+    except IntegrityError:
+        # Un autre processus a créé la ligne entre-temps : il détient le verrou.
+        return False
+
+
+def _etat(nom: str):
+    table = VerrouExecution.__table__
+    with db.engine.connect() as conn:
+        return conn.execute(
+            select(
+                table.c.detenteur, table.c.cle, table.c.generation, table.c.expire_le, table.c.dernier_statut,
+            )
+            .where(table.c.nom == nom)
+        ).first()
+
+
+def _prolonger(nom: str, detenteur: str, bail: float) -> bool:
+    table = VerrouExecution.__table__
+    with db.engine.begin() as conn:
+        res = conn.execute(
+            table.update()
+            .where(table.c.nom == nom, table.c.detenteur == detenteur)
+            .values(expire_le=_maintenant() + timedelta(seconds=bail))
+        )
+    return bool(res.rowcount)
+
+
+def _liberer(nom: str, detenteur: str, statut: str) -> None:
+    table = VerrouExecution.__table__
+    with db.engine.begin() as conn:
+        conn.execute(
+            table.update()
+            .where(table.c.nom == nom, table.c.detenteur == detenteur)
+            .values(detenteur=None, cle=None, expire_le=None, dernier_statut=statut)
+        )
+
+
+def _battement(app, nom: str, detenteur: str, bail: float, arret: threading.Event) -> None:
+    with app.app_context():
+        while not arret.wait(bail / 3):
+            try:
+                if not _prolonger(nom, detenteur, bail):
+                    logger.error("Verrou %s : perdu par %s (bail expiré).", nom, detenteur)
+                    return
+            except Exception:
+                # Base momentanément verrouillée : on retente au battement suivant.
+                logger.warning("Verrou %s : prolongation du bail impossible.", nom, exc_info=True)
+
+
+def _noter_attente(nom: str, cle: str | None, attente: float, rejointe: bool) -> None:
+    with _stats_lock:
+        _stats["attentes"] += 1
+        _stats["temps_attente_total"] += attente
+        _stats["temps_attente_max"] = max(_stats["temps_attente_max"], attente)
+        if rejointe:
+            _stats["rejoints"] += 1
+    logger.info(
+        "Verrou %s (%s) : %.1f s d'attente, %s.",
+        nom, cle or "-", attente, "exécution en cours rejointe" if rejointe else "acquis",
+    )
+
+
+@contextmanager
+def execution_unique(
+    nom: str,
+    cle: str | None = None,
+    *,
+    rejoindre: bool = True,
+    attente_max: float = _ATTENTE_MAX,
+    bail: float = _BAIL,
+):
+    """Exécute le bloc seul parmi tous les processus partageant la base.
+
+    Produit une `Execution` : si ``execution.rejointe``, une exécution de même
+    ``cle`` vient de se terminer avec succès pendant l'attente et le bloc ne
+    doit rien refaire ; si elle a échoué, l'appelant s'exécute lui-même
+    (``rejoindre=False`` : attendre puis s'exécuter quand même).
+    Lève `VerrouOccupeError` après ``attente_max`` secondes d'attente.
+
+    À appeler hors transaction d'écriture en cours (le verrou utilise sa
+    propre connexion).
+    """
+    from flask import current_app
+
+    detenteur = _nouveau_detenteur()
+    execution = Execution(nom=nom, cle=cle)
+    debut = time.monotonic()
+    attendu = False
+    cible = None  # génération de l'exécution identique en cours, à rejoindre
+    while True:
+        if cible is not None:
+            etat = _etat(nom)
+            if etat is None or etat.detenteur is None or etat.generation != cible:
+                # Rejointe seulement si c'est bien cette exécution qui s'est terminée avec succès.
+                if etat is not None and etat.generation == cible and etat.dernier_statut == STATUT_SUCCES:
+                    execution.rejointe = True
+                    execution.attente = time.monotonic() - debut
+                    _noter_attente(nom, cle, execution.attente, rejointe=True)
+                    yield execution
+                    return
+                logger.warning("Verrou %s : l'exécution rejointe (%s) n'a pas abouti, relance.", nom, cle)
+                cible = None
+        if _acquerir(nom, detenteur, cle, bail):
+            break
+        attendu = True
+        if cible is None and rejoindre and cle is not None:
+            etat = _etat(nom)
+            if etat is not None and etat.detenteur is not None and etat.cle == cle:
+                cible = etat.generation
+                logger.info("Verrou %s : exécution identique (%s) en cours, rejointe.", nom, cle)
+        ecoule = time.monotonic() - debut
+        if ecoule >= attente_max:
+            with _stats_lock:
+                _stats["echecs"] += 1
+            raise VerrouOccupeError(
+                f"Traitement « {nom} » déjà en cours ailleurs : verrou non libéré après {attente_max:g} s."
+            )
+        _attendre(min(_INTERVALLE_ATTENTE, attente_max - ecoule))
+
+    with _stats_lock:
+        _stats["acquisitions"] += 1
+    if attendu:
+        execution.attente = time.monotonic() - debut
+        _noter_attente(nom, cle, execution.attente, rejointe=False)
+    arret = threading.Event()
+    battement = threading.Thread(
+        target=_battement,
+        args=(current_app._get_current_object(), nom, detenteur, bail, arret),
+        name=f"verrou-{nom}",
+        daemon=True,
+    )
+    battement.start()
+    statut = STATUT_ERREUR
+    try:
+        yield execution
+        statut = STATUT_SUCCES
+    finally:
+        arret.set()
+        battement.join()
+        if statut == STATUT_SUCCES:
+            _liberer(nom, detenteur, statut)
+        else:
+            # Écritures du bloc non commitées : elles tiennent le verrou d'écriture
+            # SQLite et bloqueraient la libération, faite sur une autre connexion.
+            db.session.rollback()
+            try:
+                _liberer(nom, detenteur, statut)
+            except Exception:
+                # L'erreur du bloc reste celle remontée ; le bail expirera de lui-même.
+                logger.exception("Verrou %s : libération impossible après l'échec de %s.", nom, detenteur)
+
+
+def statistiques_verrous() -> dict:
+    """Compteurs du processus : acquisitions, exécutions rejointes, temps d'attente."""
+    with _stats_lock:
+        stats = dict(_stats)
+    nb = stats["attentes"]
+    stats["temps_attente_moy"] = stats["temps_attente_total"] / nb if nb else 0.0
+    return stats
@@ -59,6 +59,32 @@ def db_session(app):
         for table in reversed(_db.metadata.sorted_tables):
             _db.session.execute(table.delete())
         _db.session.commit()
+        # Les caches processus ne voient pas les DELETE en masse ci-dessus.
+        from services.absences_bitmap import invalider_absences_bitmap
+        from services.calendrier_feries import invalider_calendrier_feries
+        from services.erp.annuaire import invalider_annuaire_erp
+        from services.parametrage_actif import invalider_parametrage_cache
+        invalider_absences_bitmap()
+        invalider_calendrier_feries()
+        invalider_parametrage_cache()
+        invalider_annuaire_erp()
+
+
+@pytest.fixture()
+def base_fichier(tmp_path):
+    """Base SQLite sur fichier : connexions distinctes, verrou d'écriture réel (délai 1 s)."""
+    from flask import Flask
+
+    app = Flask(__name__)
+    app.config["SQLALCHEMY_DATABASE_URI"] = (
+        "sqlite:///" + str(tmp_path / "base.db").replace("\\", "/") + "?timeout=1"
+    )
+    _db.init_app(app)
+    with app.app_context():
+        _db.create_all()
+        yield _db
+        _db.session.remove()
+        _db.engine.dispose()
 
 
 @pytest.fixture()
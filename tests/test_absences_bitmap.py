@@ -0,0 +1,182 @@
+"""Tests du bitmap d'absences par exercice (services/absences_bitmap.py)."""
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import event
+
+from models import db
+from models.conge import Conge
+from models.jour_ferie import JourFerie
+from services.absences_bitmap import (
+    BitmapAbsences,
+    bitmap_absences,
+    bitmaps_absences,
+    statistiques_absences_bitmap,
+)
+from services.calcul_jours import compter_jours_ouvrables
+
+DEBUT, FIN = date(2026, 1, 1), date(2026, 12, 31)
+
+
+def _conge(user_id, debut, fin, type_conge="CP", statut="valide", demi_debut=None, demi_fin=None):
+    c = Conge(
+        user_id=user_id, date_debut=debut, date_fin=fin, nb_jours_ouvrables=1,
+        type_conge=type_conge, statut=statut,
+        demi_journee_debut=demi_debut, demi_journee_fin=demi_fin,
+    )
+    db.session.add(c)
+    return c
+
+
+def _compter_requetes():
+    requetes = []
+
+    def _compter(conn, cursor, statement, parameters, context, executemany):
+        requetes.append(statement)
+
+    return requetes, _compter
+
+
+def _reference_par_semaine(conges):
+    """Calcul historique : fractions par jour (plafonnées à 1) parcourues jour par jour."""
+    fractions = {}
+    for c in conges:
+        jour = max(c.date_debut, DEBUT)
+        while jour <= min(c.date_fin, FIN):
+            if compter_jours_ouvrables(jour, jour):
+                frac = 1.0
+                if c.date_debut == c.date_fin:
+                    if c.demi_journee_debut or c.demi_journee_fin:
+                        frac = 0.5
+                elif jour == c.date_debut and c.demi_journee_debut == "apres_midi":
+                    frac = 0.5
+                elif jour == c.date_fin and c.demi_journee_fin == "matin":
+                    frac = 0.5
+                fractions[jour] = min(1.0, fractions.get(jour, 0.0) + frac)
+            jour += timedelta(days=1)
+    semaines = {}
+    for jour, frac in fractions.items():
+        lundi = jour - timedelta(days=jour.weekday())
+        semaines[lundi] = semaines.get(lundi, 0.0) + frac
+    return semaines
+
+
+class TestBitmapAbsences:
+    def test_deux_bits_par_jour(self):
+        assert BitmapAbsences(DEBUT, FIN).taille_octets == 92
+        assert len(BitmapAbsences(DEBUT, FIN)) == 365
+
+    def test_regles_de_demi_journee(self, db_session):
+        b = BitmapAbsences(DEBUT, FIN)
+        # Mardi 2 juin, matin seul.
+        b.ajouter_conge(date(2026, 6, 2), date(2026, 6, 2), "matin", None)
+        # Du mercredi après-midi au vendredi matin.
+        b.ajouter_conge(date(2026, 6, 3), date(2026, 6, 5), "apres_midi", "matin")
+        assert [b.demi_journees(date(2026, 6, d)) for d in range(1, 8)] == [0, 1, 1, 2, 1, 0, 0]
+        assert b.jours(date(2026, 6, 1), date(2026, 6, 7)) == 2.5
+        assert b.jours_par_semaine() == {date(2026, 6, 1): 2.5}
+
+    def test_cumul_plafonne_et_feries_ignores(self, db_session):
+        db.session.add(JourFerie(date_ferie=date(2026, 5, 14), libelle="Ascension", annee=2026))
+        db.session.commit()
+        b = BitmapAbsences(DEBUT, FIN)
+        b.ajouter_conge(date(2026, 5, 11), date(2026, 5, 17))
+        b.ajouter_conge(date(2026, 5, 13), date(2026, 5, 13), None, "apres_midi")
+        assert b.jours(date(2026, 5, 11), date(2026, 5, 17)) == 4.0
+        assert b.demi_journees(date(2026, 5, 14)) == 0
+        assert b.demi_journees(date(2025, 12, 31)) == 0
+
+    def test_equivalent_au_calcul_jour_par_jour(self, db_session, users, parametrage):
+        rng = random.Random(22)
+        uid = users["salarie"].id
+        conges = []
+        for _ in range(40):
+            debut = date(2025, 12, 1) + timedelta(days=rng.randrange(0, 400))
+            fin = debut + timedelta(days=rng.choice([0, 0, 1, 3, 9]))
+            conges.append(_conge(
+                uid, debut, fin,
+                demi_debut=rng.choice([None, None, "matin", "apres_midi"]),
+                demi_fin=rng.choice([None, None, "matin", "apres_midi"]),
+            ))
+        db.session.commit()
+        b = bitmap_absences(uid, DEBUT, FIN)
+        assert b.jours_par_semaine() == _reference_par_semaine(conges)
+        assert b.nb_conges == sum(1 for c in conges if c.date_debut <= FIN and c.date_fin >= DEBUT)
+
+
+class TestCache:
+    def test_lecture_suivante_sans_requete(self, db_session, users, parametrage):
+        uid = users["salarie"].id
+        _conge(uid, date(2026, 3, 2), date(2026, 3, 6))
+        db.session.commit()
+        assert bitmap_absences(uid, DEBUT, FIN).jours(date(2026, 3, 2), date(2026, 3, 8)) == 5.0
+
+        requetes, _compter = _compter_requetes()
+        event.listen(db.engine, "before_cursor_execute", _compter)
+        try:
+            b = bitmap_absences(uid, DEBUT, FIN)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _compter)
+        assert requetes == []
+        assert b.jours(date(2026, 3, 2), date(2026, 3, 8)) == 5.0
+        assert statistiques_absences_bitmap()["hits"] >= 1
+
+    def test_invalide_par_un_conge(self, db_session, users, parametrage):
+        uid = users["salarie"].id
+        c = _conge(uid, date(2026, 3, 2), date(2026, 3, 6), statut="en_attente_rh")
+        db.session.commit()
+        assert bitmap_absences(uid, DEBUT, FIN).nb_conges == 0
+
+        c.statut = "valide"
+        db.session.commit()
+        assert bitmap_absences(uid, DEBUT, FIN).jours(DEBUT, FIN) == 5.0
+
+        c.date_fin = date(2026, 3, 3)
+        db.session.commit()
+        assert bitmap_absences(uid, DEBUT, FIN).jours(DEBUT, FIN) == 2.0
+
+        db.session.delete(c)
+        db.session.commit()
+        assert bitmap_absences(uid, DEBUT, FIN).jours(DEBUT, FIN) == 0.0
+
+    def test_rollback_ne_laisse_pas_d_etat_fantome(self, db_session, users, parametrage):
+        uid = users["salarie"].id
+        _conge(uid, date(2026, 3, 2), date(2026, 3, 6))
+        db.session.flush()
+        # Lu dans la transaction en cours, puis annulé.
+        assert bitmap_absences(uid, DEBUT, FIN).jours(DEBUT, FIN) == 5.0
+        db.session.rollback()
+        assert bitmap_absences(uid, DEBUT, FIN).jours(DEBUT, FIN) == 0.0
+
+    def test_invalide_par_un_ferie(self, db_session, users, parametrage):
+        from services.calendrier_feries import invalider_calendrier_feries
+
+        uid = users["salarie"].id
+        _conge(uid, date(2026, 5, 11), date(2026, 5, 15))
+        db.session.commit()
+        assert bitmap_absences(uid, DEBUT, FIN).jours(DEBUT, FIN) == 5.0
+        db.session.add(JourFerie(date_ferie=date(2026, 5, 14), libelle="Ascension", annee=2026))
+        db.session.commit()
+        invalider_calendrier_feries()
+        assert bitmap_absences(uid, DEBUT, FIN).jours(DEBUT, FIN) == 4.0
+
+    def test_types_exclus(self, db_session, users, parametrage):
+        uid = users["salarie"].id
+        _conge(uid, date(2026, 3, 2), date(2026, 3, 3), type_conge="Maladie")
+        _conge(uid, date(2026, 3, 4), date(2026, 3, 4))
+        db.session.commit()
+        assert bitmap_absences(uid, DEBUT, FIN).jours(DEBUT, FIN) == 3.0
+        assert bitmap_absences(uid, DEBUT, FIN, {"Maladie"}).jours(DEBUT, FIN) == 1.0
+
+    def test_exercice_complet_puis_nouveau_salarie(self, db_session, users, parametrage):
+        _conge(users["salarie"].id, date(2026, 3, 2), date(2026, 3, 2))
+        db.session.commit()
+        assert set(bitmaps_absences(DEBUT, FIN)) == {users["salarie"].id}
+
+        _conge(users["responsable"].id, date(2026, 4, 6), date(2026, 4, 7))
+        db.session.commit()
+        bitmaps = bitmaps_absences(DEBUT, FIN)
+        assert set(bitmaps) == {users["salarie"].id, users["responsable"].id}
+        assert bitmaps[users["responsable"].id].jours(DEBUT, FIN) == 2.0
+        # Salarié demandé explicitement sans congé : bitmap vide.
+        assert bitmaps_absences(DEBUT, FIN, user_ids=[users["rh"].id])[users["rh"].id].jours(DEBUT, FIN) == 0.0
@@ -97,3 +97,155 @@ class TestDetecterChevauchement:
 
         result = detecter_chevauchement(users["salarie"].id, date(2026, 6, 5), date(2026, 6, 15))
         assert result is None
+
+
+class TestCalendrierFeries:
+    """Le calendrier des fériés est chargé une fois puis lu sans accès base."""
+
+    @staticmethod
+    def _compter_selects(fn):
+        from sqlalchemy import event
+        from models import db
+
+        nb = []
+
+        def _avant(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                nb.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _avant)
+        try:
+            resultat = fn()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _avant)
+        return resultat, len(nb)
+
+    def test_aucune_requete_apres_chargement(self, db_session):
+        from services.calcul_jours import compter_jours_ouvrables_avec_demi
+
+        db_session.session.add(JourFerie(date_ferie=date(2026, 5, 1), libelle="1er mai", annee=2026))
+        db_session.session.commit()
+        compter_jours_ouvrables(date(2026, 1, 1), date(2026, 1, 2))  # chargement
+
+        resultat, nb = self._compter_selects(lambda: [
+            compter_jours_ouvrables(date(2026, 4, 27), date(2026, 5, 8)),
+            compter_jours_ouvrables_avec_demi(date(2026, 4, 30), date(2026, 5, 4), "apres_midi", "matin"),
+        ])
+        assert resultat == [9, 1.0]
+        assert nb == 0
+
+    def test_periode_multi_annees(self, db_session):
+        db_session.session.add_all([
+            JourFerie(date_ferie=date(2025, 12, 25), libelle="Noël", annee=2025),
+            JourFerie(date_ferie=date(2026, 1, 1), libelle="Jour de l'An", annee=2026),
+            # Férié un dimanche : ne retire aucun jour ouvrable.
+            JourFerie(date_ferie=date(2026, 11, 1), libelle="Toussaint", annee=2026),
+        ])
+        db_session.session.commit()
+        # 22/12/2025 (lun) → 02/01/2026 (ven) : 10 jours de semaine - 2 fériés.
+        assert compter_jours_ouvrables(date(2025, 12, 22), date(2026, 1, 2)) == 8
+        assert compter_jours_ouvrables(date(2026, 10, 26), date(2026, 11, 6)) == 10
+
+    def test_invalide_par_ajout_ferie_rh(self, client, db_session, users):
+        from tests.conftest import login
+
+        assert compter_jours_ouvrables(date(2026, 3, 16), date(2026, 3, 20)) == 5
+        login(client, "rh1", "rh123")
+        from models.parametrage import ParametrageAnnuel
+        db_session.session.add(ParametrageAnnuel(
+            debut_exercice=date(2026, 1, 1), fin_exercice=date(2026, 12, 31), actif=True,
+        ))
+        db_session.session.commit()
+        client.post("/rh/parametrage", data={
+            "action": "ajouter_ferie", "date_ferie": "2026-03-18", "libelle_ferie": "Pont",
+        })
+        assert compter_jours_ouvrables(date(2026, 3, 16), date(2026, 3, 20)) == 4
+
+        jf = JourFerie.query.filter_by(date_ferie=date(2026, 3, 18)).first()
+        client.post("/rh/parametrage", data={"action": "supprimer_ferie", "ferie_id": str(jf.id)})
+        assert compter_jours_ouvrables(date(2026, 3, 16), date(2026, 3, 20)) == 5
+
+
+def _compter_par_boucle(debut, fin, feries, demi_debut=None, demi_fin=None):
+    """Implémentation de référence : parcours jour par jour (ancien algorithme)."""
+    from datetime import timedelta
+
+    def ouvre(d):
+        return d.weekday() < 5 and d not in feries
+
+    if fin < debut:
+        return 0.0
+    if debut == fin:
+        if not ouvre(debut):
+            return 0.0
+        return 0.5 if (demi_debut or demi_fin) else 1.0
+    total = 0.0
+    j = debut
+    while j <= fin:
+        total += ouvre(j)
+        j += timedelta(days=1)
+    if demi_debut == "apres_midi" and ouvre(debut):
+        total -= 0.5
+    if demi_fin == "matin" and ouvre(fin):
+        total -= 0.5
+    return max(0.0, total)
+
+
+class TestWorkingDayIndex:
+    def test_propriete_identique_a_la_boucle(self, db_session):
+        """Sur des périodes aléatoires (multi-années, fériés en semaine et week-end)."""
+        import random
+        from datetime import timedelta
+        from services.calendrier_feries import index_jours_ouvres
+        from services.jours_feries import get_jours_feries
+
+        feries = set()
+        for annee in (2024, 2025, 2026, 2027):
+            for d, libelle in get_jours_feries(annee):
+                feries.add(d)
+                db_session.session.add(JourFerie(date_ferie=d, libelle=libelle, annee=annee))
+        db_session.session.commit()
+
+        index = index_jours_ouvres()
+        rng = random.Random(20261018)
+        origine = date(2024, 1, 1)
+        demis = (None, "matin", "apres_midi")
+        for _ in range(500):
+            debut = origine + timedelta(days=rng.randrange(4 * 366))
+            fin = debut + timedelta(days=rng.randrange(-3, 500))
+            demi_debut, demi_fin = rng.choice(demis), rng.choice(demis)
+            attendu = _compter_par_boucle(debut, fin, feries)
+            assert index.compter(debut, fin) == attendu, (debut, fin)
+            assert index.compter_avec_demi(debut, fin, demi_debut, demi_fin) == _compter_par_boucle(
+                debut, fin, feries, demi_debut, demi_fin
+            ), (debut, fin, demi_debut, demi_fin)
+            assert index.est_ouvre(debut) == (debut.weekday() < 5 and debut not in feries)
+
+    def test_invalide_avec_le_calendrier(self, db_session):
+        from services.calendrier_feries import index_jours_ouvres
+
+        assert index_jours_ouvres().compter(date(2026, 7, 13), date(2026, 7, 17)) == 5
+        db_session.session.add(JourFerie(date_ferie=date(2026, 7, 14), libelle="Fête Nationale", annee=2026))
+        db_session.session.commit()
+        assert index_jours_ouvres().compter(date(2026, 7, 13), date(2026, 7, 17)) == 4
+
+    def test_invalidation_pendant_la_construction(self, db_session, monkeypatch):
+        """Un index construit sur le calendrier d'avant une invalidation n'est pas installé."""
+        from services import calendrier_feries
+
+        construire = calendrier_feries.WorkingDayIndex
+        appels = []
+
+        def _construire_puis_ecrire(feries):
+            index = construire(feries)
+            if not appels:
+                # Un férié est ajouté entre la lecture du calendrier et l'installation.
+                db_session.session.add(JourFerie(date_ferie=date(2026, 7, 14), libelle="Fête Nationale", annee=2026))
+                db_session.session.commit()
+            appels.append(index)
+            return index
+
+        calendrier_feries.invalider_calendrier_feries()
+        monkeypatch.setattr(calendrier_feries, "WorkingDayIndex", _construire_puis_ecrire)
+        assert calendrier_feries.index_jours_ouvres().compter(date(2026, 7, 13), date(2026, 7, 17)) == 4
+        assert len(appels) == 2
@@ -147,6 +147,41 @@ class TestClotureExercice:
         assert alloc.jours_report == -73
 
 
+    def test_nombre_de_requetes_fixe(self, db_session, users, parametrage, allocations):
+        from sqlalchemy import event
+        from models.user import User
+
+        def _cloturer(annee):
+            nouveau = ParametrageAnnuel(
+                debut_exercice=date(annee, 1, 1), fin_exercice=date(annee, 12, 31),
+                jours_conges_defaut=25, actif=False,
+            )
+            db.session.add(nouveau)
+            db.session.flush()
+            requetes = []
+
+            def _compter(conn, cursor, statement, parameters, context, executemany):
+                requetes.append(statement)
+
+            event.listen(db.engine, "before_cursor_execute", _compter)
+            try:
+                cloturer_exercice_et_reporter(nouveau)
+                db.session.flush()
+            finally:
+                event.remove(db.engine, "before_cursor_execute", _compter)
+            db.session.commit()
+            return len(requetes)
+
+        avant = _cloturer(2027)
+        db.session.add_all(
+            User(nom=f"Nom{i}", prenom="P", identifiant=f"u{i}", mot_de_passe_hash="x", role="salarie", actif=True)
+            for i in range(20)
+        )
+        db.session.commit()
+        assert _cloturer(2028) <= avant
+        assert AllocationConge.query.filter_by(parametrage_id=ParametrageAnnuel.query.filter_by(actif=True).one().id).count() == 24
+
+
 class TestClotureProrataFrontiere:
     def test_conge_a_cheval_compte_au_prorata(self, db_session, users, parametrage, allocations):
         """À la clôture, un congé à cheval ne consomme que sa part dans l'exercice."""
@@ -1,9 +1,12 @@
 """Tests de la détection de conflits affichée lors de la validation."""
-from datetime import date
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import event
 
 from models import db
 from models.conge import Conge
-from services.calcul_jours import conges_chevauchant
+from services.calcul_jours import conflits_par_demande, conges_chevauchant
 from tests.conftest import login
 
 
@@ -46,6 +49,65 @@ class TestConflitsService:
         assert rows == []
 
 
+class TestConflitsParDemande:
+    def _seed(self, users, graine=10, nb=80):
+        rng = random.Random(graine)
+        ids = [u.id for u in users.values()]
+        statuts = ["valide", "en_attente_responsable", "en_attente_rh", "refuse", "annule"]
+        conges = []
+        for _ in range(nb):
+            debut = date(2026, 3, 1) + timedelta(days=rng.randrange(0, 120))
+            conges.append(Conge(
+                user_id=rng.choice(ids), date_debut=debut,
+                date_fin=debut + timedelta(days=rng.randrange(0, 15)),
+                nb_jours_ouvrables=1, type_conge="CP", statut=rng.choice(statuts),
+            ))
+        db.session.add_all(conges)
+        db.session.commit()
+        return conges
+
+    def test_equivalent_a_conges_chevauchant(self, db_session, users, parametrage):
+        conges = self._seed(users)
+        demandes = [c for c in conges if c.statut.startswith("en_attente")]
+        resultat = conflits_par_demande(demandes)
+        assert set(resultat) == {d.id for d in demandes}
+        for d in demandes:
+            attendu = conges_chevauchant(d.date_debut, d.date_fin, exclure_user_id=d.user_id)
+            assert [c.id for c in resultat[d.id]] == [
+                c.id for c in sorted(attendu, key=lambda c: (c.date_debut, c.id))
+            ]
+
+    def test_perimetre_user_ids(self, db_session, users, parametrage):
+        conges = self._seed(users, graine=11)
+        demandes = [c for c in conges if c.statut == "en_attente_responsable"]
+        equipe = {users["salarie"].id, users["salarie_sans_resp"].id}
+        resultat = conflits_par_demande(demandes, user_ids=equipe)
+        tous = conflits_par_demande(demandes)
+        for d in demandes:
+            assert resultat[d.id] == [c for c in tous[d.id] if c.user_id in equipe]
+        assert conflits_par_demande(demandes, user_ids=[]) == {d.id: [] for d in demandes}
+
+    def test_nombre_de_requetes_constant(self, db_session, users, parametrage):
+        conges = self._seed(users, graine=12)
+        demandes = [c for c in conges if c.statut.startswith("en_attente")]
+        ids = [d.id for d in demandes]
+        demandes = Conge.query.filter(Conge.id.in_(ids)).all()
+        requetes = []
+
+        def _compter(conn, cursor, statement, parameters, context, executemany):
+            requetes.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _compter)
+        try:
+            resultat = conflits_par_demande(demandes)
+            noms = {c.utilisateur.nom for lst in resultat.values() for c in lst}
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _compter)
+        assert noms
+        # Congés actifs + salariés (selectinload), quel que soit le nombre de demandes.
+        assert len(requetes) == 2
+
+
 class TestDashboardAffiche:
     def test_dashboard_rh_montre_conflits(self, client, db_session, users, parametrage, allocations):
         # Un autre congé validé qui chevauche la demande.
@@ -75,3 +137,23 @@ class TestDashboardAffiche:
         # Le nom du collègue absent apparaît dans la section conflits.
         assert "absent".encode("utf-8") in resp.data
         assert users["salarie_sans_resp"].nom.encode("utf-8") in resp.data
+
+    def test_dashboard_responsable_limite_a_l_equipe(self, client, db_session, users, parametrage, allocations):
+        # Absence d'un salarié hors équipe : pas un conflit pour le responsable.
+        hors_equipe = Conge(
+            user_id=users["salarie_sans_resp"].id,
+            date_debut=date(2026, 6, 4), date_fin=date(2026, 6, 6),
+            nb_jours_ouvrables=3, type_conge="CP", statut="valide",
+        )
+        demande = Conge(
+            user_id=users["salarie"].id,
+            date_debut=date(2026, 6, 1), date_fin=date(2026, 6, 10),
+            nb_jours_ouvrables=8, type_conge="CP", statut="en_attente_responsable",
+        )
+        db.session.add_all([hors_equipe, demande])
+        db.session.commit()
+
+        login(client, "resp1", "resp123")
+        resp = client.get("/responsable/dashboard")
+        assert resp.status_code == 200
+        assert users["salarie_sans_resp"].nom.encode("utf-8") not in resp.data
@@ -0,0 +1,239 @@
+"""Tests du pool de connexions ERP (services/erp/pool.py).
+
+Un pilote DB-API factice remplace pyodbc / SQL Server : il compte les
+connexions ouvertes et fermées et permet de simuler une connexion coupée.
+"""
+import threading
+
+import pytest
+
+from services.erp import connexion as erp
+from services.erp.pool import PoolConnexions, PoolFermeError, PoolSatureError
+
+
+class PiloteFactice:
+    """Module DB-API minimal : connect(), Error, connexions/curseurs."""
+
+    class Error(Exception):
+        pass
+
+    def __init__(self):
+        self.ouvertes = []
+        self.echec = None
+
+    def connect(self, *args, **kwargs):
+        if self.echec is not None:
+            raise self.echec
+        conn = ConnexionFactice(self)
+        self.ouvertes.append(conn)
+        return conn
+
+    def drivers(self):
+        return ["ODBC Driver 17 for SQL Server"]
+
+
+class ConnexionFactice:
+    def __init__(self, pilote):
+        self.pilote = pilote
+        self.fermee = False
+        self.coupee = False
+
+    def cursor(self):
+        if self.coupee or self.fermee:
+            raise self.pilote.Error("08S01", "Communication link failure")
+        return CurseurFactice()
+
+    def execute(self, sql, *params):
+        return self.cursor().execute(sql, *params)
+
+    def close(self):
+        self.fermee = True
+
+
+class CurseurFactice:
+    def execute(self, sql, *params):
+        return self
+
+    def fetchone(self):
+        return (1,)
+
+    def fetchall(self):
+        return [(1,)]
+
+    def close(self):
+        pass
+
+
+class Horloge:
+    def __init__(self):
+        self.t = 1000.0
+
+    def __call__(self):
+        return self.t
+
+
+@pytest.fixture
+def pilote():
+    return PiloteFactice()
+
+
+def _pool(pilote, **kwargs):
+    kwargs.setdefault("erreurs", (PiloteFactice.Error,))
+    return PoolConnexions(pilote.connect, **kwargs)
+
+
+class TestPoolConnexions:
+    def test_reutilise_la_connexion(self, pilote):
+        pool = _pool(pilote)
+        with pool.connexion() as c1:
+            pass
+        with pool.connexion() as c2:
+            pass
+        assert c1 is c2
+        assert len(pilote.ouvertes) == 1
+        stats = pool.statistiques()
+        assert (stats["emprunts"], stats["reutilisations"], stats["connexions"]) == (2, 1, 1)
+        assert stats["ouvertes"] == stats["inactives"] == 1
+
+    def test_borne_et_attente(self, pilote):
+        pool = _pool(pilote, taille_max=1, attente_max=0.05)
+        with pool.connexion():
+            with pytest.raises(PoolSatureError):
+                with pool.connexion():
+                    pass
+        assert pool.statistiques()["saturations"] == 1
+        assert len(pilote.ouvertes) == 1
+
+    def test_attente_servie_a_la_liberation(self, pilote):
+        pool = _pool(pilote, taille_max=1, attente_max=5)
+        liberer = threading.Event()
+        emprunte = threading.Event()
+
+        def _tenir():
+            with pool.connexion():
+                emprunte.set()
+                liberer.wait(5)
+
+        t = threading.Thread(target=_tenir)
+        t.start()
+        emprunte.wait(5)
+        threading.Timer(0.05, liberer.set).start()
+        with pool.connexion() as conn:
+            assert conn is pilote.ouvertes[0]
+        t.join()
+        assert len(pilote.ouvertes) == 1
+
+    def test_connexion_morte_remplacee(self, pilote):
+        pool = _pool(pilote)
+        with pool.connexion() as c1:
+            pass
+        c1.coupee = True
+        with pool.connexion() as c2:
+            pass
+        assert c2 is not c1 and c1.fermee
+        stats = pool.statistiques()
+        assert stats["connexions_mortes"] == 1
+        assert stats["ouvertes"] == 1
+
+    def test_eviction_inactivite_et_duree_de_vie(self, pilote):
+        horloge = Horloge()
+        pool = _pool(pilote, inactivite_max=60, duree_vie_max=600, horloge=horloge)
+        with pool.connexion() as c1:
+            pass
+        horloge.t += 61
+        with pool.connexion() as c2:
+            pass
+        assert c1.fermee and c2 is not c1
+
+        # Utilisée régulièrement mais trop vieille : renouvelée.
+        for _ in range(12):
+            horloge.t += 50
+            with pool.connexion() as c3:
+                pass
+        assert c2.fermee and c3 is not c2
+        assert pool.statistiques()["evictions"] + pool.statistiques()["ouvertes"] == 3
+
+    def test_erreur_pilote_ferme_la_connexion(self, pilote):
+        pool = _pool(pilote)
+        with pytest.raises(PiloteFactice.Error):
+            with pool.connexion() as c1:
+                raise PiloteFactice.Error("42000", "Syntax error")
+        assert c1.fermee
+        assert pool.statistiques()["ouvertes"] == 0
+
+        # Une erreur applicative ne condamne pas la connexion.
+        with pytest.raises(ValueError):
+            with pool.connexion() as c2:
+                raise ValueError("ligne invalide")
+        assert not c2.fermee
+        assert pool.statistiques()["inactives"] == 1
+
+    def test_echec_de_connexion_libere_la_place(self, pilote):
+        pool = _pool(pilote, taille_max=1, attente_max=0.05)
+        pilote.echec = PiloteFactice.Error("08001", "Server not found")
+        with pytest.raises(PiloteFactice.Error):
+            with pool.connexion():
+                pass
+        pilote.echec = None
+        with pool.connexion():
+            pass
+        stats = pool.statistiques()
+        assert stats["echecs_connexion"] == 1
+        assert stats["connexions"] == 1
+        assert stats["latence_connexion_moy"] >= 0
+
+    def test_fermer(self, pilote):
+        pool = _pool(pilote)
+        with pool.connexion() as c1:
+            pass
+        pool.fermer()
+        assert c1.fermee
+        assert pool.statistiques()["ouvertes"] == 0
+        with pytest.raises(PoolFermeError):
+            with pool.connexion():
+                pass
+
+
+class TestErpConnexion:
+    @pytest.fixture
+    def erp_factice(self, pilote, monkeypatch):
+        monkeypatch.setattr(erp, "pyodbc", pilote)
+        monkeypatch.setenv("ERP_DB_ENABLED", "true")
+        erp.fermer_pool_erp()
+        yield pilote
+        erp.fermer_pool_erp()
+
+    def test_erp_connexion_passe_par_le_pool(self, erp_factice):
+        for _ in range(3):
+            with erp.erp_connexion() as conn:
+                assert conn.execute("SELECT 1").fetchone() == (1,)
+        assert len(erp_factice.ouvertes) == 1
+        assert erp.statistiques_pool_erp()["reutilisations"] == 2
+
+    def test_pilote_introuvable(self, erp_factice):
+        erp_factice.echec = PiloteFactice.Error("IM002", "Data source name not found")
+        with pytest.raises(erp.ErpNonConfigureError, match="Pilote ODBC introuvable"):
+            with erp.erp_connexion():
+                pass
+        assert erp.statistiques_pool_erp()["echecs_connexion"] == 1
+
+    def test_erp_desactive(self, monkeypatch):
+        monkeypatch.delenv("ERP_DB_ENABLED", raising=False)
+        with pytest.raises(erp.ErpNonConfigureError):
+            with erp.erp_connexion():
+                pass
+
+    def test_connexion_pretee_fermee_au_retour(self, erp_factice):
+        with erp.erp_connexion() as conn:
+            ancien = erp.pool_erp()
+            erp.fermer_pool_erp()
+            assert not conn.fermee
+        assert conn.fermee
+        assert ancien.statistiques()["ouvertes"] == 0
+        with pytest.raises(PoolFermeError):
+            with ancien.connexion():
+                pass
+
+        # Le pool suivant ouvre une nouvelle connexion.
+        with erp.erp_connexion() as conn2:
+            assert conn2 is not conn and not conn2.fermee
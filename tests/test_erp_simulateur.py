@@ -0,0 +1,67 @@
+"""Tests de l'ERP de substitution (services/erp/simulateur.py).
+
+Les requêtes de services/erp/requetes.py s'exécutent telles quelles sur une
+base SQLite au format TEMPAS / SALARIES ; la synchro complète tourne dessus
+via ERP_DB_SIMULATEUR.
+"""
+import sqlite3
+from datetime import date
+
+import pytest
+
+from models import db
+from models.heures_hebdo import HeuresHebdo
+from services.erp import connexion as erp
+from services.erp.requetes import empreintes_semaines, heures_periode, heures_semaine, salaries_erp
+from services.erp.simulateur import connecter_simulateur, generer_base_simulateur
+from services.erp.sync_heures import synchroniser_exercice
+
+
+@pytest.fixture
+def base_erp(tmp_path):
+    chemin = str(tmp_path / "erp.sqlite")
+    generer_base_simulateur(chemin, nb_salaries=4, nb_semaines=6, premier_lundi=date(2025, 12, 29))
+    return chemin
+
+
+def test_requetes_erp_sur_le_simulateur(base_erp):
+    brut = sqlite3.connect(base_erp)
+    attendu = brut.execute(
+        "SELECT SUM(BECNREALIS) FROM TEMPAS WHERE BECSSAREAL = '202602' AND BECTMATRI1 LIKE '000002%' "
+        "AND BECTUNCONS = 'H'"
+    ).fetchone()[0]
+    brut.close()
+    conn = connecter_simulateur(base_erp)
+
+    lignes = {l.matricule: l.heures for l in heures_semaine(conn, "202602")}
+    assert lignes["000002"] == pytest.approx(attendu)
+    assert len(heures_periode(conn, ["202601", "202602", "202603"])) <= 12
+    assert [s.matricule for s in salaries_erp(conn)] == ["000001", "000002", "000003", "000004"]
+
+    empreintes = empreintes_semaines(conn, "202601", "202606")
+    assert set(empreintes) == {f"2026{n:02d}" for n in range(1, 7)}
+    assert empreintes == empreintes_semaines(conn, "202601", "202606")
+
+
+def test_like_classe_de_caracteres(base_erp):
+    conn = connecter_simulateur(base_erp)
+    assert conn.execute("SELECT 'AB12' LIKE '%[^0-9]%', '0012' LIKE '%[^0-9]%'").fetchone() == (1, 0)
+
+
+def test_synchro_complete_sur_le_simulateur(base_erp, monkeypatch, db_session, users, parametrage):
+    monkeypatch.setenv("ERP_DB_ENABLED", "true")
+    monkeypatch.setenv("ERP_DB_SIMULATEUR", base_erp)
+    erp.fermer_pool_erp()
+    users["salarie"].matricule = "000002"
+    db.session.commit()
+    try:
+        rapport = synchroniser_exercice(recalculer_rtt=False, jusqu_a=date(2026, 2, 8))
+        relance = synchroniser_exercice(recalculer_rtt=False, jusqu_a=date(2026, 2, 8))
+    finally:
+        erp.fermer_pool_erp()
+
+    assert rapport.semaines_modifiees == rapport.semaines
+    assert rapport.nb_importes == HeuresHebdo.query.filter_by(user_id=users["salarie"].id).count() > 0
+    assert rapport.nb_skipped_sans_user > 0
+    assert any("(ERP : SALARIE00000 Bench)" in w for w in rapport.avertissements)
+    assert relance.semaines_modifiees == []
@@ -5,17 +5,30 @@ La connexion SQL Server n'est pas disponible en test : on mocke
 (mapping matricule, upsert, préservation manuelle, mode aperçu).
 """
 from datetime import date
-from unittest.mock import patch
+from unittest.mock import MagicMock, patch
 
 import pytest
+from sqlalchemy import event
 
 from models import db
 from models.heures_hebdo import HeuresHebdo
+from models.parametrage import AllocationConge
 from models.user import User
-from services.erp.requetes import HeuresSemaine, SalarieErp, normaliser_matricule_erp
+from models.sync_erp_semaine import SyncErpSemaine
+from services.erp.requetes import (
+    EmpreinteSemaine,
+    HeuresSemaine,
+    SalarieErp,
+    iter_heures_periode,
+    normaliser_matricule_erp,
+)
 from services.erp.sync_heures import (
+    RapportSyncExercice,
+    reprendre_heures,
     synchroniser_exercice,
     synchroniser_semaine,
+    _ecrire_heures_erp,
+    _importer_lignes_erp,
     _lundi_depuis_semaine_erp,
     _semaine_precedente,
     _semaines_erp_exercice,
@@ -31,6 +44,13 @@ def _ligne(matricule: str, semaine_erp: str, heures: float) -> HeuresSemaine:
     )
 
 
+def _empreintes(valeurs: dict[str, tuple[int, float]]) -> dict[str, EmpreinteSemaine]:
+    return {
+        s: EmpreinteSemaine(semaine_erp=s, nb_lignes=n, total_heures=h, signature=n * 7)
+        for s, (n, h) in valeurs.items()
+    }
+
+
 @patch("services.erp.sync_heures.erp_connexion")
 @patch("services.erp.sync_heures.heures_semaine")
 def test_import_creheures_pour_matricule_connenu(mock_heures, mock_conn, db_session, users, parametrage):
@@ -55,7 +75,7 @@ def test_import_creheures_pour_matricule_connenu(mock_heures, mock_conn, db_sess
 
 @patch("services.erp.sync_heures.erp_connexion")
 @patch("services.erp.sync_heures.heures_semaine")
-@patch("services.erp.sync_heures.salaries_erp")
+@patch("services.erp.annuaire.salaries_erp")
 def test_import_matricule_inconnu_avertit(mock_salaries, mock_heures, mock_conn, db_session, users, parametrage):
     """Un matricule absent de l'app est signalé, pas bloquant."""
     mock_salaries.return_value = []
@@ -70,7 +90,7 @@ def test_import_matricule_inconnu_avertit(mock_salaries, mock_heures, mock_conn,
 
 @patch("services.erp.sync_heures.erp_connexion")
 @patch("services.erp.sync_heures.heures_semaine")
-@patch("services.erp.sync_heures.salaries_erp")
+@patch("services.erp.annuaire.salaries_erp")
 def test_auto_rattache_matricule_par_nom_unique(
     mock_salaries, mock_heures, mock_conn, db_session, users, parametrage
 ):
@@ -90,7 +110,7 @@ def test_auto_rattache_matricule_par_nom_unique(
 
 @patch("services.erp.sync_heures.erp_connexion")
 @patch("services.erp.sync_heures.heures_semaine")
-@patch("services.erp.sync_heures.salaries_erp")
+@patch("services.erp.annuaire.salaries_erp")
 def test_auto_rattache_pas_si_nom_ambigu(
     mock_salaries, mock_heures, mock_conn, db_session, users, parametrage
 ):
@@ -165,6 +185,31 @@ def test_valeur_erp_reimportee_ecrase(mock_heures, mock_conn, db_session, users,
     assert row.heures_travaillees == 38.5
 
 
+@patch("services.erp.sync_heures.erp_connexion")
+@patch("services.erp.sync_heures.heures_semaine")
+def test_import_recalcule_seulement_les_semaines_importees(
+    mock_heures, mock_conn, db_session, users, parametrage, allocations
+):
+    """Le recalcul RTT post-import ne porte que sur les (salarié, semaine) écrits."""
+    from services.rtt_hebdo import maj_rtt_allocations_hebdo, verifier_rtt_semaines
+
+    users["salarie"].matricule = "000011"
+    db.session.add(HeuresHebdo(
+        user_id=users["salarie"].id, date_lundi=date(2026, 5, 25), heures_travaillees=39.0, source="manuel",
+    ))
+    db.session.commit()
+    maj_rtt_allocations_hebdo(parametrage)
+
+    mock_heures.return_value = [_ligne("000011", "202623", 38.0)]
+    rapport = synchroniser_semaine(semaine_erp="202623", recalculer_rtt=True)
+
+    assert rapport.rtt_recalcule
+    assert rapport.semaines_importees == [(users["salarie"].id, date(2026, 6, 1))]
+    alloc = AllocationConge.query.filter_by(user_id=users["salarie"].id, parametrage_id=parametrage.id).first()
+    assert alloc.rtt_heures_allouees == 7.7  # 4,35 + 3,35
+    assert verifier_rtt_semaines(parametrage) == []
+
+
 @patch("services.erp.sync_heures.erp_connexion")
 @patch("services.erp.sync_heures.heures_semaine")
 def test_dry_run_n_ecrit_rien(mock_heures, mock_conn, db_session, users, parametrage):
@@ -240,7 +285,7 @@ class TestNormaliserMatricule:
         assert normaliser_matricule_erp("  11  ") == "000011"
 
 
-@patch("services.erp.sync_heures.salaries_erp")
+@patch("services.erp.annuaire.salaries_erp")
 @patch("services.erp.sync_heures.erp_connexion")
 @patch("services.erp.sync_heures.heures_semaine")
 def test_import_matricule_format_erp_avec_zeros(
@@ -258,7 +303,7 @@ def test_import_matricule_format_erp_avec_zeros(
     assert rapport.nb_skipped_sans_user == 0
 
 
-@patch("services.erp.sync_heures.salaries_erp")
+@patch("services.erp.annuaire.salaries_erp")
 @patch("services.erp.sync_heures.erp_connexion")
 @patch("services.erp.sync_heures.heures_semaine")
 def test_import_matricule_format_erp_sans_zeros(
@@ -277,15 +322,17 @@ def test_import_matricule_format_erp_sans_zeros(
 
 
 @patch("services.erp.sync_heures.erp_connexion")
+@patch("services.erp.sync_heures.empreintes_semaines")
 @patch("services.erp.sync_heures.heures_periode")
-@patch("services.erp.sync_heures.salaries_erp")
+@patch("services.erp.annuaire.salaries_erp")
 def test_import_exercice_plusieurs_semaines(
-    mock_salaries, mock_heures_periode, mock_conn, db_session, users, parametrage
+    mock_salaries, mock_heures_periode, mock_empreintes, mock_conn, db_session, users, parametrage
 ):
     """L'import exercice récupère toutes les semaines depuis le début de l'exercice."""
     users["salarie"].matricule = "000011"
     db.session.commit()
     mock_salaries.return_value = []
+    mock_empreintes.return_value = _empreintes({"202601": (1, 38.0), "202602": (1, 40.0)})
     mock_heures_periode.return_value = [
         _ligne("000011", "202601", 38.0),
         _ligne("000011", "202602", 40.0),
@@ -303,3 +350,364 @@ def test_semaines_erp_exercice_couvre_debut_a_aujourdhui(parametrage):
     assert semaines[0] == "202601"
     assert "202603" in semaines
     assert "202604" not in semaines
+
+
+class TestSynchroIncrementale:
+    """Seules les semaines dont l'empreinte TEMPAS a changé sont relues."""
+
+    SEMAINES = {"202601": (1, 38.0), "202602": (1, 40.0)}
+
+    def _synchro(self, empreintes, lignes, **kwargs):
+        with patch("services.erp.sync_heures.erp_connexion"), \
+                patch("services.erp.annuaire.salaries_erp", return_value=[]), \
+                patch("services.erp.sync_heures.empreintes_semaines", return_value=_empreintes(empreintes)), \
+                patch("services.erp.sync_heures.heures_periode", return_value=lignes) as mock_periode:
+            rapport = synchroniser_exercice(recalculer_rtt=False, jusqu_a=date(2026, 1, 25), **kwargs)
+        semaines_lues = mock_periode.call_args[0][1] if mock_periode.called else None
+        return rapport, semaines_lues
+
+    def _premier_import(self, users):
+        users["salarie"].matricule = "000011"
+        db.session.commit()
+        rapport, lues = self._synchro(self.SEMAINES, [
+            _ligne("000011", "202601", 38.0), _ligne("000011", "202602", 40.0),
+        ])
+        assert lues == ["202601", "202602"]
+        assert rapport.nb_importes == 2
+        return rapport
+
+    def test_empreintes_enregistrees(self, db_session, users, parametrage):
+        self._premier_import(users)
+        etat = {e.semaine_erp: (e.nb_lignes, e.total_heures) for e in SyncErpSemaine.query}
+        assert etat == self.SEMAINES
+
+    def test_sans_changement_aucune_relecture(self, db_session, users, parametrage):
+        self._premier_import(users)
+        rapport, lues = self._synchro(self.SEMAINES, [])
+        assert lues is None
+        assert rapport.semaines_modifiees == []
+        assert rapport.nb_importes == 0
+
+    def test_seule_la_semaine_modifiee_est_relue(self, db_session, users, parametrage):
+        self._premier_import(users)
+        rapport, lues = self._synchro(
+            {"202601": (1, 38.0), "202602": (2, 42.5), "202603": (1, 35.0)},
+            [_ligne("000011", "202602", 42.5), _ligne("000011", "202603", 35.0)],
+        )
+        assert lues == ["202602", "202603"]
+        assert rapport.nb_importes == 2
+        row = HeuresHebdo.query.filter_by(user_id=users["salarie"].id, date_lundi=date(2026, 1, 5)).one()
+        assert row.heures_travaillees == 42.5
+
+    def test_complet_relit_tout(self, db_session, users, parametrage):
+        self._premier_import(users)
+        rapport, lues = self._synchro(self.SEMAINES, [], complet=True)
+        assert lues == rapport.semaines
+
+    def test_apercu_n_enregistre_pas(self, db_session, users, parametrage):
+        users["salarie"].matricule = "000011"
+        db.session.commit()
+        self._synchro(self.SEMAINES, [_ligne("000011", "202601", 38.0)], dry_run=True)
+        assert SyncErpSemaine.query.count() == 0
+
+    def test_matricule_modifie_invalide_les_empreintes(self, db_session, users, parametrage):
+        self._premier_import(users)
+        users["salarie_sans_resp"].matricule = "000024"
+        db.session.commit()
+        assert SyncErpSemaine.query.count() == 0
+        _, lues = self._synchro(self.SEMAINES, [])
+        assert lues == ["202601", "202602"]
+
+    def test_suppression_heures_invalide_la_semaine(self, db_session, users, parametrage):
+        self._premier_import(users)
+        db.session.delete(
+            HeuresHebdo.query.filter_by(user_id=users["salarie"].id, date_lundi=date(2025, 12, 29)).one()
+        )
+        db.session.commit()
+        _, lues = self._synchro(self.SEMAINES, [_ligne("000011", "202601", 38.0)])
+        assert lues == ["202601"]
+
+    @patch("services.erp.sync_heures.erp_connexion")
+    @patch("services.erp.sync_heures.heures_semaine")
+    @patch("services.erp.sync_heures.empreintes_semaines")
+    def test_synchro_semaine_enregistre_l_empreinte(
+        self, mock_empreintes, mock_heures, mock_conn, db_session, users, parametrage
+    ):
+        users["salarie"].matricule = "000011"
+        db.session.commit()
+        mock_heures.return_value = [_ligne("000011", "202602", 40.0)]
+        mock_empreintes.return_value = _empreintes({"202602": (1, 40.0)})
+
+        synchroniser_semaine(semaine_erp="202602", recalculer_rtt=False)
+
+        etat = SyncErpSemaine.query.one()
+        assert (etat.semaine_erp, etat.nb_lignes, etat.total_heures) == ("202602", 1, 40.0)
+
+
+class TestImportGroupe:
+    """Lecture des saisies existantes en une requête, écriture en un upsert."""
+
+    def _seed(self, users):
+        users["salarie"].matricule = "000011"
+        users["salarie_sans_resp"].matricule = "000024"
+        db.session.add_all([
+            HeuresHebdo(user_id=users["salarie"].id, date_lundi=_lundi_depuis_semaine_erp("202602"),
+                        heures_travaillees=30.0, source="erp"),
+            HeuresHebdo(user_id=users["salarie"].id, date_lundi=_lundi_depuis_semaine_erp("202603"),
+                        heures_travaillees=40.0, source="manuel"),
+        ])
+        db.session.commit()
+        lignes = [
+            _ligne(mat, s, h)
+            for mat, h in (("000011", 38.0), ("000024", 35.5))
+            for s in ("202601", "202602", "202603", "202604")
+        ]
+        index = {"000011": users["salarie"].id, "000024": users["salarie_sans_resp"].id}
+        return lignes, index
+
+    def _importer(self, lignes, index, dry_run=False):
+        rapport = RapportSyncExercice(dry_run=dry_run)
+        _importer_lignes_erp(
+            lignes, users_par_matricule=index, noms_erp_par_matricule={}, rapport=rapport, dry_run=dry_run,
+        )
+        return rapport
+
+    def test_deux_requetes_quel_que_soit_le_volume(self, db_session, users, parametrage):
+        lignes, index = self._seed(users)
+        requetes = []
+
+        def _compter(conn, cursor, statement, parameters, context, executemany):
+            requetes.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _compter)
+        try:
+            rapport = self._importer(lignes, index)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _compter)
+        db.session.commit()
+
+        # Lecture des existants + un INSERT ... ON CONFLICT.
+        assert len(requetes) == 2
+        assert "ON CONFLICT" in requetes[1]
+        assert rapport.nb_importes == 7
+        heures = {
+            (h.user_id, h.date_lundi): (h.heures_travaillees, h.source)
+            for h in HeuresHebdo.query
+        }
+        assert len(heures) == 8
+        assert heures[(users["salarie"].id, _lundi_depuis_semaine_erp("202602"))] == (38.0, "erp")
+        assert heures[(users["salarie"].id, _lundi_depuis_semaine_erp("202603"))] == (40.0, "manuel")
+
+    def test_apercu_inchange(self, db_session, users, parametrage):
+        lignes, index = self._seed(users)
+        rapport = self._importer(lignes, index, dry_run=True)
+
+        par_cle = {(p["matricule"], p["semaine_erp"]): p for p in rapport.preview}
+        assert len(par_cle) == 8
+        assert par_cle[("000011", "202601")]["action"] == "import"
+        assert par_cle[("000011", "202601")]["ancienne_valeur"] is None
+        assert par_cle[("000011", "202602")]["ancienne_valeur"] == 30.0
+        assert par_cle[("000011", "202603")]["action"] == "skip_manuel"
+        assert par_cle[("000011", "202603")]["ancienne_valeur"] is None
+        assert rapport.nb_importes == 7
+        assert sum("manuelle conservée" in w for w in rapport.avertissements) == 1
+        assert HeuresHebdo.query.count() == 2
+
+    def test_upsert_ne_touche_pas_une_saisie_manuelle(self, db_session, users, parametrage):
+        """Saisie manuelle arrivée entre la lecture et l'écriture : conservée."""
+        lundi = _lundi_depuis_semaine_erp("202605")
+        db.session.add(HeuresHebdo(
+            user_id=users["salarie"].id, date_lundi=lundi, heures_travaillees=41.0, source="manuel",
+        ))
+        db.session.commit()
+
+        _ecrire_heures_erp({(users["salarie"].id, lundi): 35.0})
+        db.session.commit()
+
+        row = HeuresHebdo.query.filter_by(user_id=users["salarie"].id, date_lundi=lundi).one()
+        assert (row.heures_travaillees, row.source) == (41.0, "manuel")
+
+
+def test_iter_heures_periode_lit_par_lots():
+    """Le lecteur en flux pagine par fetchmany et ferme son curseur."""
+    cur = MagicMock()
+    cur.fetchmany.side_effect = [
+        [("11", "202601 ", 38.0), ("24", "202601", 35.0)],
+        [("11", "202602", 40.0)],
+        [],
+    ]
+    conn = MagicMock()
+    conn.cursor.return_value = cur
+
+    lots = list(iter_heures_periode(conn, ["202601", "202602"], taille_lot=2))
+
+    assert [len(lot) for lot in lots] == [2, 1]
+    assert lots[0][0].matricule == "000011" and lots[0][0].semaine_erp == "202601"
+    assert cur.execute.call_args[0][1] == ("100", "202601", "202602")
+    cur.fetchmany.assert_called_with(2)
+    cur.close.assert_called_once()
+    assert not hasattr(lots[0][0], "__dict__")
+
+
+class TestRepriseHeures:
+    """Reprise multi-exercices : lecture en flux, commit par page, relançable."""
+
+    SEMAINES = {"202550": (1, 30.0), "202551": (1, 31.0), "202552": (1, 32.0), "202601": (1, 38.0)}
+
+    def _reprendre(self, echec_sur=None, **kwargs):
+        pages = []
+
+        def _iter(conn, semaines, taille_lot=1000):
+            pages.append(list(semaines))
+            if echec_sur in semaines:
+                raise RuntimeError("connexion ERP perdue")
+            for s in semaines:
+                yield [_ligne("000011", s, self.SEMAINES[s][1])]
+
+        with patch("services.erp.sync_heures.erp_connexion"), \
+                patch("services.erp.annuaire.salaries_erp", return_value=[]), \
+                patch("services.erp.sync_heures.empreintes_semaines", return_value=_empreintes(self.SEMAINES)), \
+                patch("services.erp.sync_heures.iter_heures_periode", side_effect=_iter):
+            rapport = reprendre_heures("202550", "202601", semaines_par_page=2, **kwargs)
+        return rapport, pages
+
+    def test_commit_par_page_et_reprise(self, db_session, users, parametrage):
+        users["salarie"].matricule = "000011"
+        db.session.commit()
+
+        with pytest.raises(RuntimeError):
+            self._reprendre(echec_sur="202552", recalculer_rtt=False)
+        db.session.rollback()
+        # La première page est validée, la seconde non.
+        assert {e.semaine_erp for e in SyncErpSemaine.query} == {"202550", "202551"}
+        assert HeuresHebdo.query.filter_by(user_id=users["salarie"].id).count() == 2
+
+        rapport, pages = self._reprendre(recalculer_rtt=False)
+        assert pages == [["202552", "202601"]]
+        assert rapport.nb_importes == 2
+        assert HeuresHebdo.query.filter_by(user_id=users["salarie"].id).count() == 4
+
+    def test_complet_et_rtt_limite_a_l_exercice_actif(self, db_session, users, parametrage):
+        users["salarie"].matricule = "000011"
+        db.session.commit()
+        self._reprendre(recalculer_rtt=False)
+
+        with patch("services.erp.sync_heures.recalculer_semaines") as mock_rtt:
+            rapport, pages = self._reprendre(complet=True)
+
+        assert pages == [["202550", "202551"], ["202552", "202601"]]
+        # Exercice actif 2026 : seule la semaine 202601 (lundi 29/12/2025) le chevauche.
+        assert mock_rtt.call_args[0][1] == [(users["salarie"].id, date(2025, 12, 29))]
+        assert rapport.rtt_recalcule
+
+    def test_avertissements_dedupliques(self, db_session, users, parametrage):
+        rapport, _ = self._reprendre(recalculer_rtt=False)
+        assert rapport.nb_skipped_sans_user == 4
+        assert sum("absent de l'app" in w for w in rapport.avertissements) == 1
+
+
+class TestExtractionParallele:
+    """Lecture TEMPAS par tranches concurrentes : même rapport qu'en série."""
+
+    def _lignes(self, conn, semaines):
+        return [
+            _ligne(mat, s, h)
+            for s in semaines
+            for mat, h in (("000011", 35.0 + int(s[-2:]) / 2), ("000099", 20.0))
+        ]
+
+    def _synchro(self, paralleles, progression=None, taille_pool=4):
+        pool = MagicMock(taille_max=taille_pool)
+        with patch("services.erp.sync_heures.erp_connexion"), \
+                patch("services.erp.sync_heures.pool_erp", return_value=pool), \
+                patch("services.erp.annuaire.salaries_erp", return_value=[]), \
+                patch("services.erp.sync_heures.empreintes_semaines", return_value={}), \
+                patch("services.erp.sync_heures.heures_periode", side_effect=self._lignes) as mock_periode:
+            rapport = synchroniser_exercice(
+                recalculer_rtt=False, dry_run=True, jusqu_a=date(2026, 5, 31), complet=True,
+                paralleles=paralleles, progression=progression,
+            )
+        return rapport, [c[0][1] for c in mock_periode.call_args_list]
+
+    def test_rapport_identique_au_mode_serie(self, db_session, users, parametrage):
+        users["salarie"].matricule = "000011"
+        db.session.commit()
+        avancement = []
+
+        serie, appels_serie = self._synchro(paralleles=1)
+        parallele, appels = self._synchro(paralleles=3, progression=lambda n, t: avancement.append((n, t)))
+
+        assert len(appels_serie) == 1
+        assert len(appels) == 2  # 22 semaines → tranches de 13 + 9
+        assert sorted(s for a in appels for s in a) == appels_serie[0]
+        assert parallele == serie
+        assert serie.nb_importes == 22 and len(serie.preview) == 22
+        assert avancement == [(1, 2), (2, 2)]
+
+    def test_borne_par_le_pool(self, db_session, users, parametrage):
+        # Pool de 2 : une connexion pour la synchro, une seule pour l'extraction → série.
+        _, appels = self._synchro(paralleles=8, taille_pool=2)
+        assert len(appels) == 1
+
+    def test_erreur_d_une_tranche_remontee(self, db_session, users, parametrage):
+        def _echec(conn, semaines):
+            if "202610" in semaines:
+                raise RuntimeError("TEMPAS indisponible")
+            return []
+
+        with patch("services.erp.sync_heures.erp_connexion"), \
+                patch("services.erp.sync_heures.pool_erp", return_value=MagicMock(taille_max=4)), \
+                patch("services.erp.sync_heures.empreintes_semaines", return_value={}), \
+                patch("services.erp.sync_heures.heures_periode", side_effect=_echec):
+            with pytest.raises(RuntimeError, match="TEMPAS indisponible"):
+                synchroniser_exercice(
+                    recalculer_rtt=False, jusqu_a=date(2026, 5, 31), complet=True, paralleles=2,
+                )
+
+
+class TestAnnuaireErp:
+    """dbo.SALARIES n'est lu que pour un matricule inconnu, puis gardé en cache."""
+
+    def _synchro(self, matricule):
+        with patch("services.erp.sync_heures.erp_connexion"), \
+                patch("services.erp.sync_heures.heures_semaine", return_value=[_ligne(matricule, "202623", 35.0)]), \
+                patch("services.erp.sync_heures.empreintes_semaines", return_value={}):
+            return synchroniser_semaine(semaine_erp="202623", recalculer_rtt=False)
+
+    @patch("services.erp.annuaire.salaries_erp")
+    def test_matricules_connus_sans_lecture_erp(self, mock_salaries, db_session, users, parametrage):
+        users["salarie"].matricule = "000011"
+        db.session.commit()
+        rapport = self._synchro("000011")
+        assert rapport.nb_importes == 1
+        mock_salaries.assert_not_called()
+
+    @patch("services.erp.annuaire.salaries_erp")
+    def test_instantane_reutilise(self, mock_salaries, db_session, users, parametrage):
+        mock_salaries.return_value = [SalarieErp(matricule="999999", nom_complet="INCONNU Jean")]
+        for _ in range(3):
+            rapport = self._synchro("999999")
+        assert mock_salaries.call_count == 1
+        assert any("(ERP : INCONNU Jean)" in w for w in rapport.avertissements)
+
+    @patch("services.erp.annuaire.salaries_erp")
+    def test_matricule_absent_recharge_apres_delai(self, mock_salaries, db_session, users, parametrage):
+        from services.erp import annuaire
+
+        mock_salaries.return_value = []
+        horloge = [1000.0]
+        with patch.object(annuaire.time, "monotonic", side_effect=lambda: horloge[0]):
+            self._synchro("000077")
+            self._synchro("000077")
+            assert mock_salaries.call_count == 1
+            horloge[0] += annuaire._DELAI_MIN_RECHARGEMENT
+            self._synchro("000077")
+        assert mock_salaries.call_count == 2
+
+    @patch("services.erp.annuaire.salaries_erp")
+    def test_ttl_expire(self, mock_salaries, db_session, users, parametrage, monkeypatch):
+        monkeypatch.setenv("ERP_ANNUAIRE_TTL", "0")
+        mock_salaries.return_value = [SalarieErp(matricule="999999", nom_complet="INCONNU Jean")]
+        self._synchro("999999")
+        self._synchro("999999")
+        assert mock_salaries.call_count == 2
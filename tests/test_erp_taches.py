@@ -0,0 +1,132 @@
+"""Tests de la file des synchros ERP en arrière-plan (services/erp/taches.py).
+
+La route enfile la tâche et redirige vers la page de suivi ; sans
+planificateur (tests, flask run) elle l'exécute aussitôt.
+"""
+from datetime import date
+from unittest.mock import patch
+
+import pytest
+
+from models import db
+from models.tache_sync_erp import TacheSyncErp
+from services.erp.sync_heures import RapportSync, RapportSyncExercice
+from services.erp.taches import (
+    STATUT_EN_ATTENTE,
+    STATUT_ERREUR,
+    STATUT_TERMINEE,
+    creer_tache,
+    executer_taches_en_attente,
+    reprendre_taches_interrompues,
+)
+from tests.conftest import login
+
+
+@pytest.fixture
+def erp_actif(monkeypatch):
+    monkeypatch.setenv("ERP_DB_ENABLED", "true")
+
+
+def _rapport_semaine(**kwargs):
+    rapport = RapportSync(semaine_erp="202623", date_lundi=date(2026, 6, 1), nb_importes=3, **kwargs)
+    rapport.avertissements.append("Matricule ERP '999999' absent de l'app.")
+    return rapport
+
+
+class TestRouteSyncErp:
+    @patch("services.erp.sync_heures.synchroniser_semaine")
+    def test_sans_planificateur_execution_immediate(self, mock_sync, client, users, erp_actif):
+        mock_sync.return_value = _rapport_semaine()
+        login(client, "rh1", "rh123")
+
+        resp = client.post("/rh/sync-erp-heures", data={"semaine_erp": "202623", "recalculer_rtt": "0"})
+
+        tache = TacheSyncErp.query.one()
+        assert resp.status_code == 302
+        assert resp.headers["Location"].endswith(f"/rh/sync-erp-heures/taches/{tache.id}")
+        assert tache.statut == STATUT_TERMINEE
+        assert tache.demande_par_id == users["rh"].id
+        mock_sync.assert_called_once_with(semaine_erp="202623", recalculer_rtt=False, dry_run=False)
+
+        page = client.get(f"/rh/sync-erp-heures/taches/{tache.id}")
+        assert "ERP semaine 202623 : 3 lignes importées." in page.get_data(as_text=True)
+        assert "999999" in page.get_data(as_text=True)
+
+        etat = client.get(f"/rh/sync-erp-heures/taches/{tache.id}/etat").get_json()
+        assert etat["termine"] and etat["statut"] == STATUT_TERMINEE
+        assert etat["rapport"]["nb_importes"] == 3
+        assert etat["rapport"]["date_lundi"] == "2026-06-01"
+
+    @patch("services.erp.sync_heures.synchroniser_exercice")
+    def test_avec_planificateur_la_route_rend_la_main(self, mock_sync, client, users, erp_actif):
+        login(client, "rh1", "rh123")
+        with patch("services.erp.scheduler.reveiller_taches_erp", return_value=True):
+            client.post("/rh/sync-erp-heures", data={"depuis_debut_exercice": "1", "complet": "1"})
+            client.post("/rh/sync-erp-heures", data={"depuis_debut_exercice": "1", "complet": "1"})
+
+        tache = TacheSyncErp.query.one()  # la seconde demande réutilise la première
+        assert tache.statut == STATUT_EN_ATTENTE
+        mock_sync.assert_not_called()
+        etat = client.get(f"/rh/sync-erp-heures/taches/{tache.id}/etat").get_json()
+        assert not etat["termine"] and etat["rapport"] is None
+        page = client.get(f"/rh/sync-erp-heures/taches/{tache.id}")
+        assert "En attente" in page.get_data(as_text=True)
+
+    def test_erp_inactif(self, client, users, monkeypatch):
+        monkeypatch.delenv("ERP_DB_ENABLED", raising=False)
+        login(client, "rh1", "rh123")
+        resp = client.post("/rh/sync-erp-heures", data={})
+        assert resp.status_code == 302
+        assert TacheSyncErp.query.count() == 0
+
+    def test_tache_inconnue(self, client, users):
+        login(client, "rh1", "rh123")
+        assert client.get("/rh/sync-erp-heures/taches/999/etat").status_code == 404
+
+    def test_reserve_aux_rh(self, client, users):
+        tache = creer_tache("semaine", {"semaine_erp": "202623"})
+        login(client, "jean1", "jean123")
+        assert client.get(f"/rh/sync-erp-heures/taches/{tache.id}/etat").status_code in (302, 403)
+
+
+class TestExecutionFile:
+    def test_progression_et_rapport_exercice(self, users, parametrage):
+        tache = creer_tache("exercice", {"recalculer_rtt": True, "dry_run": False, "complet": False})
+        vu = []
+
+        def _sync(recalculer_rtt, dry_run, complet, progression):
+            progression(1, 4)
+            vu.append(db.session.query(TacheSyncErp.progression_faite).filter_by(id=tache.id).scalar())
+            return RapportSyncExercice(semaines=["202601", "202602"], nb_importes=5)
+
+        with patch("services.erp.sync_heures.synchroniser_exercice", side_effect=_sync):
+            assert executer_taches_en_attente() == 1
+
+        db.session.refresh(tache)
+        assert vu == [1]
+        assert tache.statut == STATUT_TERMINEE
+        assert (tache.progression_faite, tache.progression_totale) == (4, 4)
+        assert tache.debut_le is not None and tache.fin_le is not None
+        assert executer_taches_en_attente() == 0
+
+    def test_erreur_enregistree(self, users, parametrage):
+        tache = creer_tache("semaine", {"semaine_erp": "202623"})
+        with patch("services.erp.sync_heures.synchroniser_semaine", side_effect=RuntimeError("SQL Server injoignable")):
+            executer_taches_en_attente()
+        db.session.refresh(tache)
+        assert tache.statut == STATUT_ERREUR
+        assert tache.message == "SQL Server injoignable"
+        # Une tâche en erreur ne bloque pas une nouvelle demande identique.
+        assert creer_tache("semaine", {"semaine_erp": "202623"}).id != tache.id
+
+    def test_taches_interrompues_remises_en_file(self, users):
+        tache = creer_tache("semaine", {"semaine_erp": "202623"})
+        tache.statut = "en_cours"
+        db.session.commit()
+        assert reprendre_taches_interrompues() == 1
+        db.session.refresh(tache)
+        assert tache.statut == STATUT_EN_ATTENTE
+
+    def test_type_inconnu(self):
+        with pytest.raises(ValueError):
+            creer_tache("annee", {})
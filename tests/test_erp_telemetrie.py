@@ -0,0 +1,162 @@
+"""Tests de la télémétrie des synchros ERP (services/erp/telemetrie.py).
+
+Comme pour tests/test_erp_sync.py, la connexion ERP et les requêtes TEMPAS
+sont mockées ; on vérifie l'historique enregistré, pas les durées mesurées.
+"""
+from datetime import date, datetime, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from models import db
+from models.execution_sync_erp import ExecutionSyncErp
+from services.erp.requetes import HeuresSemaine
+from services.erp.sync_heures import _lundi_depuis_semaine_erp, synchroniser_semaine
+from services.erp.telemetrie import PHASES, Chronometre, tendances_sync_erp
+from tests.conftest import login
+
+
+def _ligne(matricule, semaine_erp, heures):
+    return HeuresSemaine(
+        matricule=matricule, semaine_erp=semaine_erp, heures=heures,
+        date_lundi=_lundi_depuis_semaine_erp(semaine_erp),
+    )
+
+
+def _execution(type_sync, duree_tempas, nb_lignes, il_y_a_jours, **kwargs):
+    valeurs = dict(
+        type_sync=type_sync, semaines="202623", statut="ok", dry_run=False,
+        debut_le=datetime(2026, 10, 1) - timedelta(days=il_y_a_jours),
+        duree_totale=duree_tempas + 1, nb_lignes_erp=nb_lignes,
+        **{f"duree_{p}": 0.0 for p in PHASES},
+    )
+    valeurs["duree_tempas"] = duree_tempas
+    valeurs.update(kwargs)
+    return ExecutionSyncErp(**valeurs)
+
+
+class TestChronometre:
+    def test_phases_exclusives(self):
+        chrono = Chronometre()
+        with patch("services.erp.telemetrie.time.perf_counter", side_effect=[0.0, 1.0, 3.0, 10.0]):
+            with chrono.phase("rapprochement"):
+                with chrono.phase("salaries"):
+                    pass
+        assert chrono.durees["salaries"] == 2.0
+        # 10 s au total dont 2 s passées dans la phase imbriquée.
+        assert chrono.durees["rapprochement"] == 8.0
+
+    def test_duree_ajoutee_retiree_de_la_phase_englobante(self):
+        chrono = Chronometre()
+        with patch("services.erp.telemetrie.time.perf_counter", side_effect=[0.0, 5.0]):
+            with chrono.phase("tempas"):
+                chrono.ajouter("connexion", 1.5)
+        assert (chrono.durees["connexion"], chrono.durees["tempas"]) == (1.5, 3.5)
+
+
+class TestHistorique:
+    @patch("services.erp.sync_heures.erp_connexion")
+    @patch("services.erp.sync_heures.heures_semaine")
+    def test_synchro_enregistree(self, mock_heures, mock_conn, users, parametrage):
+        users["salarie"].matricule = "000011"
+        db.session.commit()
+        mock_heures.return_value = [_ligne("000011", "202623", 39.0), _ligne("000099", "202623", 35.0)]
+
+        rapport = synchroniser_semaine(semaine_erp="202623")
+
+        execution = ExecutionSyncErp.query.one()
+        assert (execution.type_sync, execution.semaines, execution.statut) == ("semaine", "202623", "ok")
+        assert not execution.dry_run
+        assert execution.nb_lignes_erp == rapport.nb_lignes_erp == 2
+        assert execution.nb_importes == 1 and execution.nb_semaines_lues == 1
+        assert execution.nb_avertissements == len(rapport.avertissements) == 1
+        assert set(rapport.durees) == set(PHASES)
+        assert sum(rapport.durees.values()) <= execution.duree_totale + 1e-3
+        assert execution.duree_tempas == pytest.approx(rapport.durees["tempas"], abs=1e-4)
+
+    @patch("services.erp.sync_heures.erp_connexion")
+    @patch("services.erp.sync_heures.heures_semaine", side_effect=RuntimeError("Timeout TEMPAS"))
+    def test_erreur_enregistree(self, mock_heures, mock_conn, users, parametrage):
+        with pytest.raises(RuntimeError):
+            synchroniser_semaine(semaine_erp="202623", dry_run=True)
+        execution = ExecutionSyncErp.query.one()
+        assert execution.statut == "erreur" and execution.dry_run
+        assert execution.message == "Timeout TEMPAS"
+
+    @patch("services.erp.sync_heures.enregistrer_empreintes", side_effect=RuntimeError("Empreintes"))
+    @patch("services.erp.sync_heures.erp_connexion")
+    @patch("services.erp.sync_heures.heures_semaine")
+    def test_erreur_apres_upsert_enregistree(self, mock_heures, mock_conn, mock_empreintes, base_fichier):
+        from models.heures_hebdo import HeuresHebdo
+        from models.user import User
+
+        db.session.add(User(
+            nom="Dupont", prenom="Jean", identifiant="jean1", mot_de_passe_hash="x",
+            role="salarie", actif=True, matricule="000011",
+        ))
+        db.session.commit()
+        mock_heures.return_value = [_ligne("000011", "202623", 39.0)]
+
+        with pytest.raises(RuntimeError, match="Empreintes"):
+            synchroniser_semaine(semaine_erp="202623")
+        execution = ExecutionSyncErp.query.one()
+        assert (execution.statut, execution.message) == ("erreur", "Empreintes")
+        assert HeuresHebdo.query.count() == 0
+
+    def test_erreur_avec_ecritures_en_attente(self, base_fichier):
+        from types import SimpleNamespace
+        from models.jour_ferie import JourFerie
+        from services.erp.telemetrie import suivre_execution
+
+        rapport = SimpleNamespace(dry_run=False, execution_rejointe=False, nb_importes=0, avertissements=[])
+        with pytest.raises(RuntimeError):
+            with suivre_execution("semaine", ["202623"], rapport):
+                db.session.add(JourFerie(date_ferie=date(2026, 7, 14), libelle="Fête Nationale", annee=2026))
+                db.session.flush()
+                raise RuntimeError("boum")
+        assert ExecutionSyncErp.query.one().statut == "erreur"
+        assert JourFerie.query.count() == 0
+
+    def test_tendances(self):
+        # 3 dernières synchros de semaine : TEMPAS 2 s ; 3 précédentes : 1 s (même volume).
+        db.session.add_all(
+            [_execution("semaine", 2.0, 1000, j) for j in range(3)]
+            + [_execution("semaine", 1.0, 1000, j) for j in range(3, 6)]
+            + [_execution("semaine", 50.0, 1000, 0, dry_run=True)]
+            + [_execution("exercice", 4.0, 8000, 0)]
+        )
+        db.session.commit()
+
+        tendances = tendances_sync_erp(nb=3)
+
+        semaine = tendances["semaine"]
+        assert semaine["nb"] == 3
+        assert semaine["moyennes"]["tempas"] == pytest.approx(2.0)
+        assert semaine["moyennes"]["tempas_ms_par_1000_lignes"] == pytest.approx(2000.0)
+        assert semaine["evolution"]["tempas"] == 100.0
+        assert tendances["exercice"]["precedentes"] is None
+        assert tendances["exercice"]["evolution"]["tempas"] is None
+        assert "reprise" not in tendances
+
+
+class TestAffichage:
+    def test_cli(self, app):
+        db.session.add_all([_execution("exercice", 2.0, 500, j) for j in range(4)])
+        db.session.commit()
+        resultat = app.test_cli_runner().invoke(args=["erp-sync-stats", "--nb", "2"])
+        assert resultat.exit_code == 0, resultat.output
+        assert "Dernières synchros ERP (2)" in resultat.output
+        assert "Tendance exercice" in resultat.output
+        assert "tempas 2.00 s (+0.0 %)" in resultat.output
+
+    def test_cli_sans_historique(self, app):
+        resultat = app.test_cli_runner().invoke(args=["erp-sync-stats"])
+        assert "Aucune synchro ERP enregistrée." in resultat.output
+
+    def test_panneau_heures_hebdo(self, client, users, parametrage):
+        db.session.add(_execution("semaine", 2.5, 1200, 0, statut="erreur", message="Timeout"))
+        db.session.commit()
+        login(client, "rh1", "rh123")
+        html = client.get("/rh/heures-hebdo?lundi=2026-06-01").get_data(as_text=True)
+        assert "Dernières synchros ERP" in html
+        assert "Erreur" in html and "1200" in html
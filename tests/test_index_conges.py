@@ -0,0 +1,142 @@
+"""Non-régression des plans d'exécution sur la table conges.
+
+Chaque service « chaud » doit interroger `conges` via un index composite
+(cf. models/conge.py) : sans index, un calcul de solde devient un parcours
+complet de l'historique. On capture le SQL réellement émis par le service puis
+on le rejoue sous ``EXPLAIN QUERY PLAN`` (SQLite).
+"""
+from contextlib import contextmanager
+from datetime import date
+
+from sqlalchemy import event
+
+from models import db
+from models.conge import Conge
+from models.parametrage import ParametrageAnnuel
+from services.calcul_jours import conflits_par_demande, conges_chevauchant, detecter_chevauchement
+from services.consommation import STATUT_VALIDE, TYPES_CP, somme_consommation
+from services.rtt_hebdo import _absence_fraction_par_jour
+
+
+@contextmanager
+def _capturer_requetes_conges():
+    """Collecte (sql, params) des SELECT émis sur la table conges."""
+    requetes = []
+    engine = db.engine
+
+    def _avant(conn, cursor, statement, parameters, context, executemany):
+        sql = statement.lstrip().upper()
+        if sql.startswith("SELECT") and "FROM CONGES" in sql:
+            requetes.append((statement, parameters))
+
+    event.listen(engine, "before_cursor_execute", _avant)
+    try:
+        yield requetes
+    finally:
+        event.remove(engine, "before_cursor_execute", _avant)
+
+
+def _plan(statement, parameters):
+    with db.engine.connect() as conn:
+        rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+    return [r[-1] for r in rows]
+
+
+def _assert_index_utilise(requetes):
+    assert requetes, "aucune requête sur conges capturée"
+    for statement, parameters in requetes:
+        details = [d for d in _plan(statement, parameters) if "conges" in d]
+        assert details, statement
+        for d in details:
+            assert "ix_conges_" in d, f"parcours sans index : {d}\n{statement}"
+
+
+def _seed(users):
+    uid = users["salarie"].id
+    db.session.add_all([
+        Conge(user_id=uid, date_debut=date(2026, 3, 2), date_fin=date(2026, 3, 6),
+              nb_jours_ouvrables=5, type_conge="CP", statut="valide"),
+        Conge(user_id=uid, date_debut=date(2025, 12, 29), date_fin=date(2026, 1, 2),
+              nb_jours_ouvrables=4, type_conge="CP", statut="valide"),
+        Conge(user_id=users["salarie_sans_resp"].id, date_debut=date(2026, 3, 4),
+              date_fin=date(2026, 3, 4), nb_jours_ouvrables=1, type_conge="RTT",
+              nb_heures_rtt=7, statut="en_attente_rh"),
+    ])
+    db.session.commit()
+
+
+def test_index_declares_sur_le_modele():
+    noms = {i.name for i in Conge.__table__.indexes}
+    assert {"ix_conges_user_statut_type_dates", "ix_conges_statut_dates"} <= noms
+
+
+def test_somme_consommation_utilise_index(db_session, users, parametrage):
+    _seed(users)
+    with _capturer_requetes_conges() as requetes:
+        somme_consommation(
+            colonne=Conge.nb_jours_ouvrables,
+            date_debut_min=parametrage.debut_exercice,
+            date_fin_max=parametrage.fin_exercice,
+            statuts=STATUT_VALIDE,
+            types=TYPES_CP,
+            user_id=users["salarie"].id,
+        )
+    _assert_index_utilise(requetes)
+
+
+def test_somme_consommation_groupee_utilise_index(db_session, users, parametrage):
+    _seed(users)
+    with _capturer_requetes_conges() as requetes:
+        somme_consommation(
+            colonne=Conge.nb_jours_ouvrables,
+            date_debut_min=parametrage.debut_exercice,
+            date_fin_max=parametrage.fin_exercice,
+            statuts=STATUT_VALIDE,
+            types=TYPES_CP,
+            user_ids=[users["salarie"].id, users["salarie_sans_resp"].id],
+            group_by="user",
+        )
+    _assert_index_utilise(requetes)
+
+
+def test_detecter_chevauchement_utilise_index(db_session, users, parametrage):
+    _seed(users)
+    with _capturer_requetes_conges() as requetes:
+        detecter_chevauchement(users["salarie"].id, date(2026, 3, 1), date(2026, 3, 10))
+    _assert_index_utilise(requetes)
+
+
+def test_conges_chevauchant_utilise_index(db_session, users, parametrage):
+    _seed(users)
+    with _capturer_requetes_conges() as requetes:
+        conges_chevauchant(date(2026, 3, 1), date(2026, 3, 10), exclure_user_id=users["salarie"].id)
+    _assert_index_utilise(requetes)
+
+
+def test_conflits_par_demande_utilise_index(db_session, users, parametrage):
+    _seed(users)
+    demandes = Conge.query.filter(Conge.statut == "en_attente_rh").all()
+    with _capturer_requetes_conges() as requetes:
+        conflits_par_demande(demandes, user_ids=[users["salarie"].id])
+    _assert_index_utilise(requetes)
+
+
+def test_calendrier_dashboard_rh_utilise_index(db_session, users, parametrage):
+    _seed(users)
+    with _capturer_requetes_conges() as requetes:
+        Conge.query.filter(
+            Conge.statut == "valide",
+            Conge.date_debut <= parametrage.fin_exercice,
+            Conge.date_fin >= parametrage.debut_exercice,
+        ).all()
+    _assert_index_utilise(requetes)
+
+
+def test_absences_rtt_utilise_index(db_session, users, parametrage):
+    _seed(users)
+    parametrage.rtt_types_absence_exclus = "Maladie"
+    db.session.commit()
+    param = db.session.get(ParametrageAnnuel, parametrage.id)
+    with _capturer_requetes_conges() as requetes:
+        _absence_fraction_par_jour(users["salarie"].id, param)
+    _assert_index_utilise(requetes)
@@ -1,5 +1,5 @@
 """Tests du service de reporting d'absentéisme (Phase 3a)."""
-from datetime import date
+from datetime import date, timedelta
 
 from models import db
 from models.conge import Conge
@@ -140,3 +140,267 @@ class TestRapportAvecConges:
             date(2026, 6, 1), date(2026, 6, 30), include_inactifs=True
         )
         assert len(r_tous.par_type) == 1
+
+
+class TestMoteurUnePasse:
+    def test_par_mois_compte_les_jours_du_dernier_mois(self, db_session, users, parametrage):
+        # Congé du 28 mai au 3 juin 2026 : 2 jours en mai (jeu, ven), 3 en juin.
+        db.session.add(Conge(
+            user_id=users["salarie"].id,
+            date_debut=date(2026, 5, 28), date_fin=date(2026, 6, 3),
+            nb_jours_ouvrables=5, type_conge="CP", statut="valide",
+        ))
+        db.session.commit()
+
+        r = generer_rapport(date(2026, 5, 1), date(2026, 6, 30))
+        assert [(m["mois"], m["nb_conges"], m["nb_jours"]) for m in r.par_mois] == [
+            ("2026-05", 1, 2.0),
+            ("2026-06", 1, 3.0),
+        ]
+        assert sum(m["nb_jours"] for m in r.par_mois) == r.par_type[0].nb_jours
+
+    def test_heures_rtt_au_prorata_de_la_periode(self, db_session, users, parametrage):
+        # RTT du 29 mai (ven) au 2 juin (mar) : 3 jours ouvrables dont 2 en juin.
+        db.session.add(Conge(
+            user_id=users["salarie"].id,
+            date_debut=date(2026, 5, 29), date_fin=date(2026, 6, 2),
+            nb_jours_ouvrables=3, type_conge="RTT", nb_heures_rtt=21, statut="valide",
+        ))
+        db.session.commit()
+
+        r = generer_rapport(date(2026, 6, 1), date(2026, 6, 30))
+        assert r.par_type[0].nb_jours == 2.0
+        assert r.par_type[0].nb_heures_rtt == 14.0
+
+    def test_service_avec_responsable_inactif(self, db_session, users, parametrage):
+        users["responsable"].actif = False
+        db.session.add(Conge(
+            user_id=users["salarie"].id,
+            date_debut=date(2026, 6, 2), date_fin=date(2026, 6, 2),
+            nb_jours_ouvrables=1, type_conge="CP", statut="valide",
+        ))
+        db.session.commit()
+
+        r = generer_rapport(date(2026, 6, 1), date(2026, 6, 30))
+        assert [s.cle for s in r.par_service] == ["Service Resp Chef"]
+
+    def test_nombre_de_requetes_constant(self, db_session, users, parametrage):
+        from sqlalchemy import event
+
+        for i in range(20):
+            db.session.add(Conge(
+                user_id=users["salarie"].id if i % 2 else users["salarie_sans_resp"].id,
+                date_debut=date(2026, 1, 5) + timedelta(days=7 * i),
+                date_fin=date(2026, 1, 7) + timedelta(days=7 * i),
+                nb_jours_ouvrables=3, type_conge="CP", statut="valide",
+            ))
+        db.session.commit()
+        generer_rapport(date(2026, 1, 1), date(2026, 12, 31))  # charge le calendrier
+
+        requetes = []
+
+        def _compter(conn, cursor, statement, parameters, context, executemany):
+            requetes.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _compter)
+        try:
+            generer_rapport(date(2026, 1, 1), date(2026, 12, 31))
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _compter)
+        # Salariés + couverture du cube + congés, quel que soit le nombre de congés.
+        assert len(requetes) == 3
+
+    def test_equivalent_au_calcul_jour_par_jour(self, db_session, users, parametrage):
+        import random
+
+        from services.calcul_jours import compter_jours_ouvrables
+
+        rng = random.Random(8)
+        ids = [users["salarie"].id, users["salarie_sans_resp"].id, users["responsable"].id]
+        types = ["CP", "RTT", "Maladie", "Anciennete"]
+        conges = []
+        for _ in range(40):
+            debut = date(2025, 11, 1) + timedelta(days=rng.randrange(0, 400))
+            conges.append(Conge(
+                user_id=rng.choice(ids), date_debut=debut,
+                date_fin=debut + timedelta(days=rng.randrange(0, 25)),
+                nb_jours_ouvrables=1, type_conge=rng.choice(types),
+                nb_heures_rtt=7, statut="valide",
+            ))
+        db.session.add_all(conges)
+        db.session.commit()
+
+        debut_p, fin_p = date(2026, 1, 1), date(2026, 12, 31)
+        r = generer_rapport(debut_p, fin_p)
+
+        attendu_type: dict[str, float] = {}
+        attendu_mois: dict[str, float] = {}
+        for c in conges:
+            a, b = max(c.date_debut, debut_p), min(c.date_fin, fin_p)
+            if a > b:
+                continue
+            attendu_type[c.type_conge] = attendu_type.get(c.type_conge, 0.0) + compter_jours_ouvrables(a, b)
+            j = a
+            while j <= b:
+                if compter_jours_ouvrables(j, j):
+                    cle = j.strftime("%Y-%m")
+                    attendu_mois[cle] = attendu_mois.get(cle, 0.0) + 1
+                j += timedelta(days=1)
+
+        assert {s.cle: s.nb_jours for s in r.par_type} == attendu_type
+        assert {m["mois"]: m["nb_jours"] for m in r.par_mois if m["nb_jours"]} == attendu_mois
+
+
+def _conges_aleatoires(users, graine, nb=60):
+    import random
+
+    rng = random.Random(graine)
+    ids = [users["salarie"].id, users["salarie_sans_resp"].id, users["responsable"].id]
+    conges = []
+    for _ in range(nb):
+        debut = date(2025, 11, 1) + timedelta(days=rng.randrange(0, 420))
+        conges.append(Conge(
+            user_id=rng.choice(ids), date_debut=debut,
+            date_fin=debut + timedelta(days=rng.randrange(0, 40)),
+            nb_jours_ouvrables=1, type_conge=rng.choice(["CP", "RTT", "Maladie", "Anciennete"]),
+            nb_heures_rtt=7, statut="valide",
+        ))
+    db.session.add_all(conges)
+    db.session.commit()
+    return conges
+
+
+def _resume(r):
+    return (
+        r.nb_salaries_actifs,
+        sorted((s.cle, s.nb_conges, s.nb_jours, round(s.nb_heures_rtt, 6)) for s in r.par_type),
+        sorted((s.cle, s.nb_conges, s.nb_jours) for s in r.par_service),
+        [(m["mois"], m["nb_conges"], m["nb_jours"]) for m in r.par_mois],
+        r.taux_absenteisme_global,
+        [(t["user"].id, t["nb_jours"]) for t in r.top_consommateurs_cp],
+    )
+
+
+class TestCubeMensuel:
+    PERIODES = [
+        (date(2026, 1, 1), date(2026, 12, 31)),   # mois entiers
+        (date(2026, 1, 15), date(2026, 9, 10)),   # mois partiels aux bords
+        (date(2026, 3, 3), date(2026, 3, 20)),    # un seul mois partiel
+        (date(2025, 11, 1), date(2027, 1, 31)),
+    ]
+
+    def test_cube_equivalent_au_calcul_brut(self, db_session, users, parametrage):
+        from services.absences_mensuelles import reconstruire_absences_mensuelles
+
+        _conges_aleatoires(users, 9)
+        nb = reconstruire_absences_mensuelles(date(2025, 11, 1), date(2027, 2, 28))
+        db.session.commit()
+        assert nb == 16
+
+        for debut, fin in self.PERIODES:
+            assert _resume(generer_rapport(debut, fin)) == _resume(
+                generer_rapport(debut, fin, utiliser_cube=False)
+            ), (debut, fin)
+
+    def test_mois_non_couvert_au_milieu(self, db_session, users, parametrage):
+        from models.absence_mensuelle import AbsenceMoisCalcule
+        from services.absences_mensuelles import reconstruire_absences_mensuelles
+
+        _conges_aleatoires(users, 10)
+        reconstruire_absences_mensuelles(date(2026, 1, 1), date(2026, 12, 31))
+        db.session.query(AbsenceMoisCalcule).filter(
+            AbsenceMoisCalcule.mois.in_([date(2026, 4, 1), date(2026, 8, 1)])
+        ).delete(synchronize_session=False)
+        db.session.commit()
+
+        for debut, fin in self.PERIODES[:2]:
+            assert _resume(generer_rapport(debut, fin)) == _resume(
+                generer_rapport(debut, fin, utiliser_cube=False)
+            ), (debut, fin)
+
+    def test_validation_met_a_jour_le_cube(self, db_session, users, parametrage):
+        from models.absence_mensuelle import AbsenceMensuelle
+        from services.absences_mensuelles import mois_couverts, reconstruire_absences_mensuelles
+        from services.conge_evenements import conge_modifie, etat_conge
+
+        reconstruire_absences_mensuelles(date(2026, 1, 1), date(2026, 12, 31))
+        db.session.commit()
+
+        conge = Conge(
+            user_id=users["salarie"].id,
+            date_debut=date(2026, 5, 28), date_fin=date(2026, 6, 3),
+            nb_jours_ouvrables=5, type_conge="CP", statut="en_attente_rh",
+        )
+        db.session.add(conge)
+        conge_modifie(None, conge)
+        db.session.commit()
+        assert db.session.query(AbsenceMensuelle).count() == 0
+
+        avant = etat_conge(conge)
+        conge.statut = "valide"
+        conge_modifie(avant, conge)
+        db.session.commit()
+
+        lignes = {
+            (a.mois, a.nb_conges, a.nb_debutes, a.nb_jours)
+            for a in db.session.query(AbsenceMensuelle)
+        }
+        assert lignes == {(date(2026, 5, 1), 1, 1, 2.0), (date(2026, 6, 1), 1, 0, 3.0)}
+        assert {date(2026, 5, 1), date(2026, 6, 1)} <= mois_couverts(date(2026, 1, 1), date(2026, 12, 31))
+
+        r = generer_rapport(date(2026, 5, 1), date(2026, 6, 30))
+        assert r.par_type[0].nb_conges == 1
+        assert r.par_type[0].nb_jours == 5.0
+
+        avant = etat_conge(conge)
+        conge.statut = "annule"
+        conge_modifie(avant, conge)
+        db.session.commit()
+        assert db.session.query(AbsenceMensuelle).count() == 0
+        assert generer_rapport(date(2026, 5, 1), date(2026, 6, 30)).par_type == []
+
+    def test_ecriture_hors_routes_retire_la_couverture(self, db_session, users, parametrage):
+        from models.jour_ferie import JourFerie
+        from services.absences_mensuelles import mois_couverts, reconstruire_absences_mensuelles
+
+        reconstruire_absences_mensuelles(date(2026, 1, 1), date(2026, 12, 31))
+        db.session.commit()
+
+        db.session.add(Conge(
+            user_id=users["salarie"].id,
+            date_debut=date(2026, 3, 30), date_fin=date(2026, 4, 2),
+            nb_jours_ouvrables=4, type_conge="CP", statut="valide",
+        ))
+        db.session.add(JourFerie(date_ferie=date(2026, 9, 7), libelle="Test", annee=2026))
+        db.session.commit()
+
+        couverts = mois_couverts(date(2026, 1, 1), date(2026, 12, 31))
+        assert not {date(2026, 3, 1), date(2026, 4, 1), date(2026, 9, 1)} & couverts
+        assert len(couverts) == 9
+        # Les mois retirés sont relus depuis les congés.
+        r = generer_rapport(date(2026, 1, 1), date(2026, 12, 31))
+        assert r.par_type[0].nb_jours == 4.0
+
+        assert reconstruire_absences_mensuelles(date(2026, 1, 1), date(2026, 12, 31)) == 3
+
+    def test_periode_alignee_sans_lecture_des_conges(self, db_session, users, parametrage):
+        from sqlalchemy import event
+
+        from services.absences_mensuelles import reconstruire_absences_mensuelles
+
+        _conges_aleatoires(users, 11)
+        reconstruire_absences_mensuelles(date(2026, 1, 1), date(2026, 12, 31))
+        db.session.commit()
+        generer_rapport(date(2026, 1, 1), date(2026, 12, 31))  # charge le calendrier
+
+        requetes = []
+
+        def _compter(conn, cursor, statement, parameters, context, executemany):
+            requetes.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _compter)
+        try:
+            generer_rapport(date(2026, 1, 1), date(2026, 12, 31))
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _compter)
+        assert not [q for q in requetes if "FROM conges" in q]
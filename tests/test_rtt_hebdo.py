@@ -1,13 +1,26 @@
 """Tests du calcul RTT hebdomadaire tenant compte des absences (points 7 + 9)."""
-from datetime import date
+import random
+from datetime import date, timedelta
+
+import pytest
+
+from sqlalchemy import event
 
 from models import db
 from models.conge import Conge
 from models.heures_hebdo import HeuresHebdo
 from models.parametrage import AllocationConge
+from models.rtt_semaine import RttSemaine
+from services.conge_evenements import conge_modifie, etat_conge
 from services.rtt_hebdo import (
     calculer_rtt_semaine,
+    calculer_rtt_semaines_lot,
+    calculer_rtt_hebdo,
+    calculer_rtt_hebdo_lot,
     maj_rtt_allocations_hebdo,
+    rattraper_semaines_echues,
+    recalculer_semaines,
+    verifier_rtt_semaines,
     jours_absence_semaine,
     seuil_hebdo_param,
     heures_par_jour_absence_param,
@@ -15,6 +28,8 @@ from services.rtt_hebdo import (
     HEURES_PAR_JOUR_DEFAUT,
 )
 
+from tests.conftest import login
+
 SEUIL = 34.65
 
 
@@ -42,6 +57,46 @@ class TestCalculRttSemaine:
         assert calculer_rtt_semaine(24, 2, seuil_hebdo=SEUIL, heures_par_jour=7, coef=1.0) == 3.35
 
 
+def _rtt_scalaire_historique(heures, jours_absence, seuil, heures_par_jour, coef):
+    """Règle d'origine (avant le noyau en lot), pour comparaison exacte."""
+    seuil_ajuste = max(0.0, float(seuil) - float(jours_absence) * float(heures_par_jour))
+    return round(max(0.0, float(heures) - seuil_ajuste) * float(coef), 2)
+
+
+class TestCalculRttSemainesLot:
+    def test_identique_a_la_regle_semaine_par_semaine(self):
+        rng = random.Random(7)
+        heures = [rng.choice([0, 12.5, 28, 34.65, 35, 39, 41.75, rng.uniform(0, 50)]) for _ in range(2000)]
+        absences = [rng.choice([0.0, 0.5, 1.0, 2.5, 5.0]) for _ in heures]
+        for coef in (1.0, 0.5, 1.25):
+            lot = calculer_rtt_semaines_lot(heures, absences, SEUIL, 7.0, coef)
+            assert lot.rtt == [
+                _rtt_scalaire_historique(h, j, SEUIL, 7.0, coef) for h, j in zip(heures, absences)
+            ]
+
+    def test_parametres_par_semaine(self):
+        lot = calculer_rtt_semaines_lot(
+            [39, 39, 28], [0, 0, 1], seuil_hebdo=[SEUIL, 35, SEUIL], heures_par_jour=7, coef=[1.0, 1.0, 0.5],
+        )
+        assert lot.rtt == [4.35, 4.0, 0.18]
+
+    def test_totaux_par_salarie(self):
+        lot = calculer_rtt_semaines_lot(
+            [35, 35, 35, 39, 30], [0, 0, 0, 0, 0], SEUIL, 7, 1.0, user_ids=[1, 1, 1, 2, 2],
+        )
+        # 3 × 0,35 = 1.0499999999999998 en flottant : arrondi comme calculer_rtt_hebdo.
+        assert lot.totaux == {1: 1.05, 2: 4.35}
+        assert calculer_rtt_semaines_lot([], [], user_ids=[]).rtt == []
+
+    def test_tailles_incoherentes(self):
+        with pytest.raises(ValueError):
+            calculer_rtt_semaines_lot([35, 36], [0])
+        with pytest.raises(ValueError):
+            calculer_rtt_semaines_lot([35, 36], [0, 0], seuil_hebdo=[SEUIL])
+        with pytest.raises(ValueError):
+            calculer_rtt_semaines_lot([35], [0], user_ids=[1, 2])
+
+
 class TestJoursAbsenceSemaine:
     def test_un_jour_de_conge(self, db_session, users, parametrage):
         c = Conge(
@@ -173,3 +228,231 @@ class TestTypesAbsenceExclus:
             user_id=users["salarie"].id, parametrage_id=parametrage.id
         ).first()
         assert alloc.rtt_heures_allouees == 3.35
+
+
+class TestCalculRttHebdoLot:
+    """Le moteur ensembliste doit reproduire exactement le calcul individuel."""
+
+    def _seed_aleatoire(self, users, parametrage):
+        rng = random.Random(2026)
+        lundi0 = parametrage.debut_exercice - timedelta(days=parametrage.debut_exercice.weekday())
+        for cle in ("salarie", "salarie_sans_resp", "responsable"):
+            uid = users[cle].id
+            for k in range(52):
+                if rng.random() < 0.7:
+                    db.session.add(HeuresHebdo(
+                        user_id=uid,
+                        date_lundi=lundi0 + timedelta(weeks=k),
+                        heures_travaillees=rng.choice([None, 28, 35, 37.5, 39, 42]),
+                    ))
+            for _ in range(12):
+                debut = parametrage.debut_exercice - timedelta(days=10) + timedelta(days=rng.randrange(380))
+                fin = debut + timedelta(days=rng.choice([0, 0, 1, 3, 6, 13]))
+                db.session.add(Conge(
+                    user_id=uid,
+                    date_debut=debut,
+                    date_fin=fin,
+                    demi_journee_debut=rng.choice([None, None, "matin", "apres_midi"]),
+                    demi_journee_fin=rng.choice([None, None, "matin", "apres_midi"]),
+                    nb_jours_ouvrables=1,
+                    type_conge=rng.choice(["CP", "RTT", "Maladie", "Sans solde"]),
+                    statut=rng.choice(["valide", "valide", "en_attente_rh", "refuse"]),
+                ))
+        db.session.commit()
+
+    def test_equivalence_avec_calcul_individuel(self, db_session, users, parametrage):
+        parametrage.rtt_seuil_hebdo = SEUIL
+        parametrage.rtt_types_absence_exclus = "Maladie"
+        db.session.commit()
+        self._seed_aleatoire(users, parametrage)
+
+        fin = parametrage.fin_exercice
+        lot = calculer_rtt_hebdo_lot(parametrage, jusqu_a=fin)
+        uids = [users[c].id for c in ("salarie", "salarie_sans_resp", "responsable", "rh")]
+        assert set(lot) == {users[c].id for c in ("salarie", "salarie_sans_resp", "responsable")}
+        for uid in uids:
+            attendu = calculer_rtt_hebdo(uid, parametrage, jusqu_a=fin)
+            assert lot.get(uid, attendu) == attendu
+
+        cibles = calculer_rtt_hebdo_lot(parametrage, user_ids=uids, jusqu_a=fin)
+        assert set(cibles) == set(uids)
+        for uid in uids:
+            assert cibles[uid] == calculer_rtt_hebdo(uid, parametrage, jusqu_a=fin)
+
+    def test_nombre_de_requetes_constant(self, db_session, users, parametrage, allocations):
+        self._seed_aleatoire(users, parametrage)
+        uids = [a.user_id for a in allocations.values()]
+        parametrage.fin_exercice  # recharge l'objet expiré par le commit
+        requetes = []
+
+        def _compter(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT"):
+                requetes.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _compter)
+        try:
+            calculer_rtt_hebdo_lot(parametrage, user_ids=uids)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _compter)
+        # Une passe sur heures_hebdo + une sur conges (le calendrier férié est en cache).
+        assert len([r for r in requetes if "jours_feries" not in r]) == 2
+
+    def test_user_ids_vide(self, db_session, parametrage):
+        assert calculer_rtt_hebdo_lot(parametrage, user_ids=[]) == {}
+
+
+class TestRecalculIncremental:
+    """Recalcul des seules semaines touchées, cohérent avec le recalcul complet."""
+
+    def _alloc(self, user_id, parametrage):
+        return AllocationConge.query.filter_by(user_id=user_id, parametrage_id=parametrage.id).first()
+
+    def test_recalcul_complet_alimente_les_semaines(self, db_session, users, parametrage, allocations):
+        parametrage.rtt_seuil_hebdo = SEUIL
+        db.session.commit()
+        uid = users["salarie"].id
+        db.session.add(HeuresHebdo(user_id=uid, date_lundi=date(2026, 6, 1), heures_travaillees=39))
+        db.session.commit()
+
+        maj_rtt_allocations_hebdo(parametrage)
+        lignes = RttSemaine.query.filter_by(user_id=uid, parametrage_id=parametrage.id).all()
+        assert [(l.date_lundi, l.heures, l.rtt) for l in lignes] == [(date(2026, 6, 1), 39, 4.35)]
+        assert verifier_rtt_semaines(parametrage) == []
+
+    def test_premier_recalcul_incremental_initialise_le_salarie(self, db_session, users, parametrage, allocations):
+        parametrage.rtt_seuil_hebdo = SEUIL
+        db.session.commit()
+        uid = users["salarie"].id
+        db.session.add(HeuresHebdo(user_id=uid, date_lundi=date(2026, 6, 1), heures_travaillees=39))
+        db.session.add(HeuresHebdo(user_id=uid, date_lundi=date(2026, 6, 8), heures_travaillees=36))
+        db.session.commit()
+
+        # Aucune semaine stockée : l'allocation forfaitaire (14 h) ne sert pas de base.
+        recalculer_semaines(parametrage, [(uid, date(2026, 6, 8))])
+        db.session.commit()
+        assert self._alloc(uid, parametrage).rtt_heures_allouees == 5.7
+        # L'autre salarié, jamais recalculé, garde son allocation forfaitaire.
+        assert [e["user_id"] for e in verifier_rtt_semaines(parametrage)] == [users["salarie_sans_resp"].id]
+
+    def test_incremental_equivalent_au_complet(self, db_session, users, parametrage, allocations):
+        parametrage.rtt_seuil_hebdo = SEUIL
+        parametrage.rtt_types_absence_exclus = "Maladie"
+        db.session.commit()
+        TestCalculRttHebdoLot()._seed_aleatoire(users, parametrage)
+        maj_rtt_allocations_hebdo(parametrage)
+
+        rng = random.Random(7)
+        uid = users["salarie"].id
+        touchees = set()
+        for row in HeuresHebdo.query.filter_by(user_id=uid).all():
+            if rng.random() < 0.3:
+                row.heures_travaillees = rng.choice([30, 38, 41.5])
+                touchees.add((uid, row.date_lundi))
+        db.session.add(HeuresHebdo(
+            user_id=users["salarie_sans_resp"].id, date_lundi=date(2026, 12, 28), heures_travaillees=40
+        ))
+        # Semaine future : ignorée, comme dans le recalcul complet.
+        touchees.add((users["salarie_sans_resp"].id, date(2026, 12, 28)))
+        recalculer_semaines(parametrage, touchees)
+
+        for c in Conge.query.filter_by(user_id=uid).limit(4).all():
+            avant = etat_conge(c)
+            c.statut = "valide" if c.statut != "valide" else "annule"
+            conge_modifie(avant, c)
+        db.session.commit()
+
+        assert verifier_rtt_semaines(parametrage) == []
+        for key in ("salarie", "salarie_sans_resp"):
+            attendu = calculer_rtt_hebdo(users[key].id, parametrage)
+            assert self._alloc(users[key].id, parametrage).rtt_heures_allouees == attendu.rtt_calculee
+
+    def test_validation_rh_recalcule_la_semaine(self, client, db_session, users, parametrage, allocations):
+        parametrage.rtt_seuil_hebdo = SEUIL
+        db.session.commit()
+        uid = users["salarie"].id
+        db.session.add(HeuresHebdo(user_id=uid, date_lundi=date(2026, 6, 1), heures_travaillees=39))
+        conge = Conge(
+            user_id=uid, date_debut=date(2026, 6, 3), date_fin=date(2026, 6, 3),
+            nb_jours_ouvrables=1, type_conge="CP", statut="en_attente_rh",
+        )
+        db.session.add(conge)
+        db.session.commit()
+        maj_rtt_allocations_hebdo(parametrage)
+        assert self._alloc(uid, parametrage).rtt_heures_allouees == 4.35
+
+        login(client, "rh1", "rh123")
+        client.post(f"/rh/conge/{conge.id}/valider")
+        # Seuil réduit d'un jour d'absence : 39 - (34,65 - 7) = 11,35 h.
+        assert self._alloc(uid, parametrage).rtt_heures_allouees == 11.35
+
+        client.post(f"/rh/conge/{conge.id}/supprimer")
+        assert self._alloc(uid, parametrage).rtt_heures_allouees == 4.35
+        assert verifier_rtt_semaines(parametrage) == []
+
+    def test_saisie_heures_recalcule_la_semaine(self, client, db_session, users, parametrage, allocations):
+        parametrage.rtt_seuil_hebdo = SEUIL
+        db.session.commit()
+        uid = users["salarie"].id
+        db.session.add(HeuresHebdo(user_id=uid, date_lundi=date(2026, 6, 1), heures_travaillees=39))
+        db.session.commit()
+        maj_rtt_allocations_hebdo(parametrage)
+
+        login(client, "rh1", "rh123")
+        client.post("/rh/heures-hebdo", data={"lundi": "2026-06-08", f"u{uid}_heures": "37,65", "action": "save"})
+        assert self._alloc(uid, parametrage).rtt_heures_allouees == 7.35
+        assert verifier_rtt_semaines(parametrage) == []
+
+    def test_allocation_recalculee_depuis_les_semaines(self, db_session, users, parametrage, allocations):
+        parametrage.rtt_seuil_hebdo = SEUIL
+        db.session.commit()
+        uid = users["salarie"].id
+        db.session.add(HeuresHebdo(user_id=uid, date_lundi=date(2026, 6, 1), heures_travaillees=39))
+        db.session.commit()
+        maj_rtt_allocations_hebdo(parametrage)
+
+        # Écriture concurrente perdue : l'allocation ne reflète plus les semaines stockées.
+        self._alloc(uid, parametrage).rtt_heures_allouees = 0
+        db.session.add(HeuresHebdo(user_id=uid, date_lundi=date(2026, 6, 8), heures_travaillees=37.65))
+        db.session.commit()
+        recalculer_semaines(parametrage, [(uid, date(2026, 6, 8))])
+        db.session.commit()
+        # Somme des semaines (4,35 + 3) et non ancienne valeur + écart (0 + 3).
+        assert self._alloc(uid, parametrage).rtt_heures_allouees == 7.35
+        assert verifier_rtt_semaines(parametrage) == []
+
+    def test_semaine_future_comptee_une_fois_echue(self, db_session, users, parametrage, allocations):
+        parametrage.rtt_seuil_hebdo = SEUIL
+        db.session.commit()
+        uid = users["salarie"].id
+        db.session.add(HeuresHebdo(user_id=uid, date_lundi=date(2026, 6, 1), heures_travaillees=39))
+        db.session.commit()
+        maj_rtt_allocations_hebdo(parametrage)
+        assert self._alloc(uid, parametrage).rtt_heures_allouees == 4.35
+
+        # Saisie à l'avance (heures + congé d'une semaine sans heures) au 10 juin.
+        aujourd_hui = date(2026, 6, 10)
+        db.session.add(HeuresHebdo(user_id=uid, date_lundi=date(2026, 6, 22), heures_travaillees=38))
+        db.session.add(Conge(
+            user_id=uid, date_debut=date(2026, 7, 6), date_fin=date(2026, 7, 7),
+            nb_jours_ouvrables=2, type_conge="CP", statut="valide",
+        ))
+        recalculer_semaines(parametrage, [(uid, date(2026, 6, 22)), (uid, date(2026, 7, 6))], jusqu_a=aujourd_hui)
+        db.session.commit()
+        assert self._alloc(uid, parametrage).rtt_heures_allouees == 4.35
+        assert rattraper_semaines_echues(parametrage, jusqu_a=aujourd_hui) == 0
+
+        # Le 22 juin est passé : la semaine est ajoutée ; le 6 juillet pas encore.
+        assert rattraper_semaines_echues(parametrage, jusqu_a=date(2026, 6, 30)) == 1
+        db.session.commit()
+        assert self._alloc(uid, parametrage).rtt_heures_allouees == 7.7
+        assert verifier_rtt_semaines(parametrage, jusqu_a=date(2026, 6, 30)) == []
+
+        jusqu_a = date(2026, 7, 31)
+        assert rattraper_semaines_echues(parametrage, jusqu_a=jusqu_a) == 1
+        db.session.commit()
+        attendu = calculer_rtt_hebdo_lot(parametrage, [uid], jusqu_a=jusqu_a)[uid]
+        assert self._alloc(uid, parametrage).rtt_heures_allouees == attendu.rtt_calculee
+        assert {(r.date_lundi, r.jours_absence) for r in RttSemaine.query.filter_by(user_id=uid)} == {
+            (date(2026, 6, 1), 0), (date(2026, 6, 22), 0), (date(2026, 7, 6), 2),
+        }
+        assert rattraper_semaines_echues(parametrage, jusqu_a=jusqu_a) == 0
@@ -0,0 +1,193 @@
+"""Tests de la saisie hebdomadaire groupée (services/saisie_heures.py, écran RH heures hebdo)."""
+from datetime import date
+
+import pytest
+from sqlalchemy import event
+
+from models import db
+from models.conge import Conge
+from models.heures_hebdo import HeuresHebdo
+from models.sync_erp_semaine import SyncErpSemaine
+from services.absences_bitmap import invalider_absences_bitmap
+from services.rtt_hebdo import jours_absence_semaine, jours_absence_semaine_lot
+from services.saisie_heures import (
+    enregistrer_heures_manuelles,
+    grille_exercice,
+    lire_cellules_grille,
+    semaines_exercice,
+)
+from tests.conftest import login
+
+LUNDI = date(2026, 6, 1)
+
+
+def _requetes(fonction):
+    requetes = []
+
+    def _compter(conn, cursor, statement, parameters, context, executemany):
+        requetes.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", _compter)
+    try:
+        resultat = fonction()
+    finally:
+        event.remove(db.engine, "before_cursor_execute", _compter)
+    return resultat, requetes
+
+
+class TestJoursAbsenceSemaineLot:
+    def test_une_requete_pour_tous_les_salaries(self, db_session, users, parametrage):
+        ids = [u.id for u in users.values()]
+        for i, uid in enumerate(ids):
+            db.session.add(Conge(
+                user_id=uid, date_debut=LUNDI, date_fin=date(2026, 6, 1 + i),
+                nb_jours_ouvrables=i + 1, type_conge="CP", statut="valide",
+            ))
+        db.session.commit()
+        jours_absence_semaine(ids[0], LUNDI, param=parametrage)  # charge le calendrier
+        invalider_absences_bitmap()
+
+        absences, requetes = _requetes(lambda: jours_absence_semaine_lot(ids, LUNDI, param=parametrage))
+        assert absences == {uid: float(i + 1) for i, uid in enumerate(ids)}
+        assert len([r for r in requetes if "FROM conges" in r]) == 1
+        assert not [r for r in requetes if "jours_feries" in r]
+
+    def test_semaine_a_cheval_sur_l_exercice(self, db_session, users, parametrage):
+        uid = users["salarie"].id
+        db.session.add(Conge(
+            user_id=uid, date_debut=date(2025, 12, 29), date_fin=date(2026, 1, 2),
+            nb_jours_ouvrables=5, type_conge="CP", statut="valide",
+        ))
+        db.session.commit()
+        assert jours_absence_semaine_lot([uid], date(2025, 12, 31), param=parametrage) == {uid: 5.0}
+
+
+class TestEnregistrerHeuresManuelles:
+    def test_upsert_et_cellules_inchangees(self, db_session, users, parametrage):
+        a, b = users["salarie"].id, users["salarie_sans_resp"].id
+        db.session.add(HeuresHebdo(user_id=a, date_lundi=LUNDI, heures_travaillees=35, source="manuel"))
+        db.session.commit()
+
+        ecrites = enregistrer_heures_manuelles({(a, LUNDI): 35, (b, LUNDI): 36.456}, users["rh"].id)
+        db.session.commit()
+        assert ecrites == [(b, LUNDI)]
+        ligne = HeuresHebdo.query.filter_by(user_id=b, date_lundi=LUNDI).one()
+        assert (ligne.heures_travaillees, ligne.source, ligne.saisi_par_id) == (36.46, "manuel", users["rh"].id)
+
+        assert enregistrer_heures_manuelles({(a, LUNDI): -2}, None) == [(a, LUNDI)]
+        db.session.commit()
+        assert HeuresHebdo.query.filter_by(user_id=a, date_lundi=LUNDI).one().heures_travaillees == 0
+
+    def test_heures_erp_remplacees_oublient_l_empreinte(self, db_session, users, parametrage):
+        uid = users["salarie"].id
+        db.session.add(HeuresHebdo(user_id=uid, date_lundi=LUNDI, heures_travaillees=35, source="erp"))
+        db.session.add(SyncErpSemaine(semaine_erp="202623", nb_lignes=5, total_heures=35))
+        db.session.add(SyncErpSemaine(semaine_erp="202624", nb_lignes=5, total_heures=35))
+        db.session.commit()
+
+        enregistrer_heures_manuelles({(uid, LUNDI): 35}, None)
+        db.session.commit()
+        assert HeuresHebdo.query.filter_by(user_id=uid).one().source == "manuel"
+        assert [s.semaine_erp for s in SyncErpSemaine.query.all()] == ["202624"]
+
+
+class TestEcranHeuresHebdo:
+    def test_post_nombre_de_requetes_constant(self, client, db_session, users, parametrage, allocations):
+        login(client, "rh1", "rh123")
+        data = {"lundi": LUNDI.isoformat(), "action": "save"}
+        data.update({f"u{u.id}_heures": "36" for u in users.values()})
+
+        _, requetes = _requetes(lambda: client.post("/rh/heures-hebdo", data=data))
+        lectures = [r for r in requetes if r.lstrip().upper().startswith("SELECT") and "heures_hebdo" in r]
+        ecritures = [r for r in requetes if "INSERT INTO heures_hebdo" in r]
+        assert len(ecritures) == 1
+        assert HeuresHebdo.query.filter_by(date_lundi=LUNDI).count() == len(users)
+        nb_lectures = len(lectures)
+
+        # Toutes les lignes existent et changent : toujours une lecture groupée et un upsert.
+        data.update({f"u{u.id}_heures": "37" for u in users.values()})
+        _, requetes = _requetes(lambda: client.post("/rh/heures-hebdo", data=data))
+        assert len([r for r in requetes if r.lstrip().upper().startswith("SELECT") and "heures_hebdo" in r]) == nb_lectures
+        assert len([r for r in requetes if "INSERT INTO heures_hebdo" in r]) == 1
+        assert {h.heures_travaillees for h in HeuresHebdo.query.filter_by(date_lundi=LUNDI)} == {37}
+
+    def test_get_affiche_les_absences(self, client, db_session, users, parametrage):
+        db.session.add(Conge(
+            user_id=users["salarie"].id, date_debut=LUNDI, date_fin=date(2026, 6, 2),
+            nb_jours_ouvrables=2, type_conge="CP", statut="valide",
+        ))
+        db.session.commit()
+        login(client, "rh1", "rh123")
+        html = client.get(f"/rh/heures-hebdo?lundi={LUNDI.isoformat()}").get_data(as_text=True)
+        assert "Absence détectée" in html
+
+
+class TestGrilleExercice:
+    def test_chargement_en_quelques_requetes(self, db_session, users, parametrage):
+        a, b = users["salarie"].id, users["salarie_sans_resp"].id
+        db.session.add(HeuresHebdo(user_id=a, date_lundi=LUNDI, heures_travaillees=35, source="erp"))
+        db.session.add(HeuresHebdo(user_id=b, date_lundi=date(2025, 12, 29), heures_travaillees=20, source="manuel"))
+        db.session.add(Conge(
+            user_id=a, date_debut=date(2025, 12, 29), date_fin=date(2026, 1, 2),
+            nb_jours_ouvrables=5, type_conge="CP", statut="valide",
+        ))
+        db.session.add(Conge(
+            user_id=b, date_debut=LUNDI, date_fin=date(2026, 6, 2),
+            nb_jours_ouvrables=2, type_conge="CP", statut="valide",
+        ))
+        db.session.commit()
+        jours_absence_semaine(a, LUNDI, param=parametrage)  # charge le calendrier
+        invalider_absences_bitmap()
+
+        grille, requetes = _requetes(lambda: grille_exercice(parametrage, [a, b]))
+        assert len(requetes) <= 4
+        assert len(grille["semaines"]) == 53
+        assert (grille["semaines"][0], grille["semaines"][-1]) == (date(2025, 12, 29), date(2026, 12, 28))
+        assert grille["heures"] == {(a, LUNDI): ("erp", 35), (b, date(2025, 12, 29)): ("manuel", 20)}
+        assert grille["absences"] == {
+            (a, date(2025, 12, 29)): jours_absence_semaine(a, date(2025, 12, 29), param=parametrage),
+            (b, LUNDI): 2.0,
+        }
+
+    def test_cellules_hors_grille_refusees(self, db_session, users, parametrage):
+        uid = users["salarie"].id
+        semaines = semaines_exercice(parametrage)
+        assert lire_cellules_grille(
+            [{"user_id": uid, "lundi": "2026-06-01", "heures": "35,5"}], [uid], semaines,
+        ) == {(uid, LUNDI): 35.5}
+        for cellules in (
+            None,
+            [{"user_id": uid, "lundi": "2026-06-02", "heures": 35}],  # pas un lundi
+            [{"user_id": uid, "lundi": "2027-01-04", "heures": 35}],  # hors exercice
+            [{"user_id": uid + 999, "lundi": "2026-06-01", "heures": 35}],
+            [{"user_id": uid, "lundi": "2026-06-01", "heures": "abc"}],
+            [{"user_id": uid, "lundi": "2026-06-01", "heures": "nan"}],
+            [{"user_id": uid, "lundi": "2026-06-01"}],
+        ):
+            with pytest.raises(ValueError):
+                lire_cellules_grille(cellules, [uid], semaines)
+
+    def test_ecran_diff_json(self, client, db_session, users, parametrage, allocations):
+        a, b = users["salarie"].id, users["salarie_sans_resp"].id
+        login(client, "rh1", "rh123")
+        assert "Grille de l" in client.get("/rh/heures-hebdo").get_data(as_text=True)
+        assert client.get("/rh/heures-hebdo/exercice").status_code == 200
+
+        cellules = [
+            {"user_id": a, "lundi": "2026-01-05", "heures": 38},
+            {"user_id": b, "lundi": "2026-01-12", "heures": "36"},
+        ]
+        r = client.post("/rh/heures-hebdo/exercice", json={"cellules": cellules})
+        assert r.status_code == 200
+        assert r.get_json()["enregistrees"] == [
+            {"user_id": a, "lundi": "2026-01-05"}, {"user_id": b, "lundi": "2026-01-12"},
+        ]
+        assert {(h.user_id, h.date_lundi, h.heures_travaillees) for h in HeuresHebdo.query} == {
+            (a, date(2026, 1, 5), 38), (b, date(2026, 1, 12), 36),
+        }
+
+        # Une cellule invalide fait rejeter tout le diff.
+        cellules = [{"user_id": a, "lundi": "2026-01-05", "heures": 40}, {"user_id": a, "lundi": "2027-01-04", "heures": 1}]
+        r = client.post("/rh/heures-hebdo/exercice", json={"cellules": cellules})
+        assert r.status_code == 400 and "hors de la grille" in r.get_json()["error"]
+        assert HeuresHebdo.query.filter_by(user_id=a).one().heures_travaillees == 38
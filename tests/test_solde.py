@@ -247,6 +247,198 @@ class TestSoldesLot:
         assert res[uid]["solde_restant"] == 0
 
 
+class TestSoldeSnapshot:
+    """Consommations matérialisées (soldes_snapshot) tenues à jour à l'écriture."""
+
+    def _snapshot(self, uid, parametrage):
+        from models import db
+        from models.solde_snapshot import SoldeSnapshot
+        return db.session.query(
+            SoldeSnapshot.cp_consomme, SoldeSnapshot.cp_en_attente,
+            SoldeSnapshot.rtt_consomme, SoldeSnapshot.rtt_en_attente,
+        ).filter_by(user_id=uid, parametrage_id=parametrage.id).first()
+
+    def test_workflow_maintient_le_snapshot(self, client, db_session, users, parametrage, allocations):
+        from tests.conftest import login
+        uid = users["salarie_sans_resp"].id
+        login(client, "paul1", "paul123")
+        client.post("/salarie/demander-conge", data={
+            "date_debut": "2026-06-01", "date_fin": "2026-06-05", "type_conge": "CP",
+        })
+        assert tuple(self._snapshot(uid, parametrage)) == (0, 5, 0, 0)
+
+        conge = Conge.query.filter_by(user_id=uid).first()
+        client.get("/logout")
+        login(client, "rh1", "rh123")
+        client.post(f"/rh/conge/{conge.id}/valider")
+        assert tuple(self._snapshot(uid, parametrage)) == (5, 0, 0, 0)
+        assert calculer_solde(uid)["solde_restant"] == 22
+
+    def test_lecture_sans_requete_sur_conges(self, client, db_session, users, parametrage, allocations):
+        from sqlalchemy import event
+        from models import db
+        from services.conge_evenements import conge_modifie
+        uid = users["salarie"].id
+        conge = Conge(user_id=uid, date_debut=date(2026, 6, 1), date_fin=date(2026, 6, 5),
+                      nb_jours_ouvrables=5, type_conge="CP", statut="valide")
+        db.session.add(conge)
+        conge_modifie(None, conge)
+        db.session.commit()
+
+        requetes = []
+
+        def _capturer(conn, cursor, statement, parameters, context, executemany):
+            requetes.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _capturer)
+        try:
+            solde = calculer_solde(uid)
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _capturer)
+        assert solde["total_consomme"] == 5
+        assert not [r for r in requetes if "FROM conges" in r]
+
+    def test_ecriture_hors_service_purge_le_snapshot(self, db_session, users, parametrage, allocations):
+        from models import db
+        from services.conge_evenements import conge_modifie
+        uid = users["salarie"].id
+        conge = Conge(user_id=uid, date_debut=date(2026, 6, 1), date_fin=date(2026, 6, 5),
+                      nb_jours_ouvrables=5, type_conge="CP", statut="valide")
+        db.session.add(conge)
+        conge_modifie(None, conge)
+        db.session.commit()
+        assert self._snapshot(uid, parametrage) is not None
+
+        # Écriture directe (script, import) : la ligne disparaît, le calcul direct prend le relais.
+        db.session.add(Conge(user_id=uid, date_debut=date(2026, 7, 1), date_fin=date(2026, 7, 2),
+                             nb_jours_ouvrables=2, type_conge="CP", statut="valide"))
+        db.session.commit()
+        assert self._snapshot(uid, parametrage) is None
+        assert calculer_solde(uid)["total_consomme"] == 7
+
+    def test_reconciliation(self, db_session, users, parametrage, allocations):
+        from models import db
+        from models.solde_snapshot import SoldeSnapshot
+        from services.solde import calculer_soldes_lot, reconcilier_soldes_snapshot
+        s1, s2 = users["salarie"].id, users["salarie_sans_resp"].id
+        TestSoldesLot()._seed_conges(db_session, s1)
+
+        assert reconcilier_soldes_snapshot(parametrage) == []
+        assert reconcilier_soldes_snapshot(parametrage, corriger=True) == []
+        db.session.commit()
+        assert self._snapshot(s1, parametrage) is not None
+        assert self._snapshot(s2, parametrage) is not None
+
+        table = SoldeSnapshot.__table__
+        db.session.execute(table.update().where(table.c.user_id == s1).values(cp_consomme=99))
+        db.session.commit()
+        ecarts = reconcilier_soldes_snapshot(parametrage, corriger=True)
+        assert [(e["user_id"], e["champ"], e["stocke"]) for e in ecarts] == [(s1, "cp_consomme", 99)]
+        db.session.commit()
+        assert reconcilier_soldes_snapshot(parametrage) == []
+
+        lot = calculer_soldes_lot([s1, s2], parametrage)
+        assert lot[s1] == calculer_solde(s1)
+        assert lot[s1]["cp_en_attente"] == 2
+
+
+class TestCacheParametrage:
+    """Le paramétrage est relu au plus une fois par processus tant qu'il ne change pas."""
+
+    def _selects_parametrage(self, fn):
+        from sqlalchemy import event
+        from models import db
+        requetes = []
+
+        def _capturer(conn, cursor, statement, parameters, context, executemany):
+            if statement.lstrip().upper().startswith("SELECT") and "FROM parametrage_annuel" in statement:
+                requetes.append(statement)
+
+        event.listen(db.engine, "before_cursor_execute", _capturer)
+        try:
+            resultat = fn()
+        finally:
+            event.remove(db.engine, "before_cursor_execute", _capturer)
+        return resultat, requetes
+
+    def test_une_seule_lecture_entre_requetes(self, db_session, users, parametrage, allocations):
+        from models import db
+        from services.parametrage_actif import get_parametrage_actif, statistiques_parametrage_cache
+        uid, pid = users["salarie"].id, parametrage.id
+        db.session.remove()
+
+        avant = statistiques_parametrage_cache()
+        param, requetes = self._selects_parametrage(get_parametrage_actif)
+        assert param.id == pid
+        assert len(requetes) == 1
+
+        # « Requête » suivante : nouvelle session, aucune relecture.
+        db.session.remove()
+        solde, requetes = self._selects_parametrage(lambda: calculer_solde(uid))
+        assert solde["total_alloue"] == 27
+        assert requetes == []
+        apres = statistiques_parametrage_cache()
+        assert apres["misses"] - avant["misses"] == 1
+        assert apres["hits"] - avant["hits"] >= 1
+
+    def test_instance_modifiable_et_invalidation(self, db_session, parametrage):
+        from models import db
+        from services.parametrage_actif import get_parametrage, get_parametrage_actif
+        pid = parametrage.id
+        get_parametrage_actif()
+        db.session.remove()
+
+        param = get_parametrage_actif()
+        assert param in db.session
+        param.jours_conges_defaut = 30
+        db.session.commit()
+        db.session.remove()
+
+        assert get_parametrage_actif().jours_conges_defaut == 30
+        assert get_parametrage(pid).jours_conges_defaut == 30
+
+    def test_invalidation_pendant_la_lecture(self, db_session, parametrage, monkeypatch):
+        """Une lecture faite avant une invalidation n'est pas mise en cache."""
+        from models import db
+        from models.parametrage import ParametrageAnnuel
+        from services import parametrage_actif
+        pid = parametrage.id
+        lire = parametrage_actif._lire
+
+        def _lire_puis_ecrire(clause):
+            valeurs = lire(clause)
+            # Le paramétrage est modifié entre la lecture et la mise en cache.
+            db.session.execute(
+                ParametrageAnnuel.__table__.update().where(ParametrageAnnuel.__table__.c.id == pid)
+                .values(jours_conges_defaut=valeurs["jours_conges_defaut"] + 1)
+            )
+            db.session.commit()
+            parametrage_actif.invalider_parametrage_cache()
+            return valeurs
+
+        for lecture in (parametrage_actif.get_parametrage_actif, lambda: parametrage_actif.get_parametrage(pid)):
+            parametrage_actif.invalider_parametrage_cache()
+            db.session.remove()
+            with monkeypatch.context() as m:
+                m.setattr(parametrage_actif, "_lire", _lire_puis_ecrire)
+                avant = lecture().jours_conges_defaut
+            db.session.remove()
+            assert lecture().jours_conges_defaut == avant + 1
+
+    def test_route_parametrage_invalide_le_cache(self, client, db_session, users, parametrage):
+        from tests.conftest import login
+        from services.parametrage_actif import get_parametrage_actif
+        assert get_parametrage_actif().jours_conges_defaut == 25
+        login(client, "rh1", "rh123")
+        client.post("/rh/parametrage", data={
+            "action": "save_parametrage",
+            "debut_exercice": "2026-01-01",
+            "fin_exercice": "2026-12-31",
+            "jours_conges_defaut": "27",
+        })
+        assert get_parametrage_actif().jours_conges_defaut == 27
+
+
 class TestGenerationAllocations:
     def test_generer_allocations(self, db_session, users, parametrage):
         """generer_allocations_pour_parametrage doit créer une allocation par salarié actif."""
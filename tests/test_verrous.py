@@ -0,0 +1,226 @@
+"""Tests de l'exécution unique entre processus (services/verrous.py).
+
+L'autre processus est simulé par une ligne ``verrous_execution`` détenue par
+un autre détenteur ; l'attente (`_attendre`) est remplacée pour libérer ou
+non le verrou sans dormir.
+"""
+from datetime import date, timedelta
+from unittest.mock import patch
+
+import pytest
+
+from models import db
+from models.verrou_execution import VerrouExecution
+from services import verrous
+from services.verrous import (
+    VERROU_HEURES_RTT,
+    VerrouOccupeError,
+    execution_unique,
+    statistiques_verrous,
+)
+
+
+def _detenu_ailleurs(cle, expire_dans=300, generation=1):
+    db.session.add(VerrouExecution(
+        nom=VERROU_HEURES_RTT,
+        detenteur="autre-hote:4242:1:abcd",
+        cle=cle,
+        generation=generation,
+        acquis_le=verrous._maintenant(),
+        expire_le=verrous._maintenant() + timedelta(seconds=expire_dans),
+    ))
+    db.session.commit()
+
+
+def _ligne():
+    db.session.expire_all()
+    return db.session.get(VerrouExecution, VERROU_HEURES_RTT)
+
+
+def _liberation_a_l_attente(monkeypatch, statut):
+    appels = []
+
+    def _attendre(secondes):
+        appels.append(secondes)
+        table = VerrouExecution.__table__
+        with db.engine.begin() as conn:
+            conn.execute(table.update().values(detenteur=None, cle=None, expire_le=None, dernier_statut=statut))
+
+    monkeypatch.setattr(verrous, "_attendre", _attendre)
+    return appels
+
+
+@pytest.fixture
+def liberation_a_l_attente(monkeypatch):
+    """Au premier passage dans l'attente, « l'autre processus » termine avec succès."""
+    return _liberation_a_l_attente(monkeypatch, verrous.STATUT_SUCCES)
+
+
+@pytest.fixture
+def echec_a_l_attente(monkeypatch):
+    """Au premier passage dans l'attente, « l'autre processus » échoue et libère le verrou."""
+    return _liberation_a_l_attente(monkeypatch, verrous.STATUT_ERREUR)
+
+
+class TestExecutionUnique:
+    def test_acquis_puis_libere(self):
+        avant = statistiques_verrous()["acquisitions"]
+        with execution_unique(VERROU_HEURES_RTT, "rtt_complet") as execution:
+            ligne = _ligne()
+            assert ligne.detenteur and ligne.cle == "rtt_complet"
+            assert ligne.expire_le > verrous._maintenant()
+            assert not execution.rejointe and execution.attente == 0
+        ligne = _ligne()
+        assert ligne.detenteur is None and ligne.generation == 1
+        assert statistiques_verrous()["acquisitions"] == avant + 1
+
+        with execution_unique(VERROU_HEURES_RTT, "rtt_complet"):
+            pass
+        assert _ligne().generation == 2
+
+    def test_libere_meme_en_cas_d_erreur(self):
+        with pytest.raises(ValueError):
+            with execution_unique(VERROU_HEURES_RTT, "rtt_complet"):
+                raise ValueError("boum")
+        assert _ligne().detenteur is None
+
+    def test_execution_identique_rejointe(self, liberation_a_l_attente):
+        _detenu_ailleurs("rtt_complet")
+        avant = statistiques_verrous()
+        with execution_unique(VERROU_HEURES_RTT, "rtt_complet") as execution:
+            assert execution.rejointe
+            # Pas de verrou pris pour un appel rejoint.
+            assert _ligne().detenteur is None
+        apres = statistiques_verrous()
+        assert liberation_a_l_attente
+        assert apres["rejoints"] == avant["rejoints"] + 1
+        assert apres["attentes"] == avant["attentes"] + 1
+        assert apres["acquisitions"] == avant["acquisitions"]
+
+    def test_echec_de_l_execution_rejointe_relance(self, echec_a_l_attente):
+        _detenu_ailleurs("rtt_complet")
+        avant = statistiques_verrous()
+        with execution_unique(VERROU_HEURES_RTT, "rtt_complet") as execution:
+            assert not execution.rejointe
+            assert _ligne().cle == "rtt_complet" and _ligne().generation == 2
+        assert _ligne().dernier_statut == verrous.STATUT_SUCCES
+        apres = statistiques_verrous()
+        assert apres["rejoints"] == avant["rejoints"]
+        assert apres["acquisitions"] == avant["acquisitions"] + 1
+
+    def test_statut_enregistre_a_la_liberation(self):
+        with pytest.raises(ValueError):
+            with execution_unique(VERROU_HEURES_RTT, "rtt_complet"):
+                assert _ligne().dernier_statut is None
+                raise ValueError("boum")
+        assert _ligne().dernier_statut == verrous.STATUT_ERREUR
+
+    def test_echec_avec_ecritures_en_attente(self, base_fichier):
+        """Les écritures non commitées du bloc sont annulées avant la libération du verrou."""
+        from models.jour_ferie import JourFerie
+
+        with pytest.raises(ValueError, match="boum"):
+            with execution_unique(VERROU_HEURES_RTT, "rtt_complet"):
+                db.session.add(JourFerie(date_ferie=date(2026, 7, 14), libelle="Fête Nationale", annee=2026))
+                db.session.flush()
+                raise ValueError("boum")
+        ligne = _ligne()
+        assert ligne.detenteur is None and ligne.dernier_statut == verrous.STATUT_ERREUR
+        assert db.session.query(JourFerie).count() == 0
+
+    def test_liberation_impossible_garde_l_erreur_d_origine(self, monkeypatch, caplog):
+        def _liberer(*args):
+            raise RuntimeError("database is locked")
+
+        monkeypatch.setattr(verrous, "_liberer", _liberer)
+        with pytest.raises(ValueError, match="boum"):
+            with execution_unique(VERROU_HEURES_RTT, "rtt_complet"):
+                raise ValueError("boum")
+        assert "libération impossible" in caplog.text
+
+    def test_travail_different_attend_puis_s_execute(self, liberation_a_l_attente):
+        _detenu_ailleurs("semaine:202623:rtt=1")
+        with execution_unique(VERROU_HEURES_RTT, "rtt_complet") as execution:
+            assert not execution.rejointe
+            assert execution.attente >= 0
+            assert _ligne().cle == "rtt_complet"
+        assert len(liberation_a_l_attente) == 1
+
+    def test_sans_rejoindre_attend_puis_s_execute(self, liberation_a_l_attente):
+        _detenu_ailleurs("rtt_complet")
+        with execution_unique(VERROU_HEURES_RTT, "rtt_complet", rejoindre=False) as execution:
+            assert not execution.rejointe
+            assert _ligne().cle == "rtt_complet"
+
+    def test_bail_expire_repris(self):
+        _detenu_ailleurs("rtt_complet", expire_dans=-5)
+        avant = statistiques_verrous()["expirations"]
+        with execution_unique(VERROU_HEURES_RTT, "rtt_complet") as execution:
+            # Le détenteur est mort : son exécution n'a pas abouti, on ne la rejoint pas.
+            assert not execution.rejointe
+            assert _ligne().generation == 2
+        assert statistiques_verrous()["expirations"] == avant + 1
+
+    def test_delai_depasse(self, monkeypatch):
+        _detenu_ailleurs("semaine:202623:rtt=1")
+        monkeypatch.setattr(verrous, "_attendre", lambda s: None)
+        avant = statistiques_verrous()["echecs"]
+        with pytest.raises(VerrouOccupeError, match="heures_rtt"):
+            with execution_unique(VERROU_HEURES_RTT, "rtt_complet", attente_max=0):
+                pytest.fail("ne doit pas s'exécuter")
+        assert statistiques_verrous()["echecs"] == avant + 1
+        assert _ligne().detenteur == "autre-hote:4242:1:abcd"
+
+    def test_battement_prolonge_le_bail(self):
+        with execution_unique(VERROU_HEURES_RTT, "rtt_complet", bail=60):
+            ligne = _ligne()
+            expire = ligne.expire_le
+            assert verrous._prolonger(VERROU_HEURES_RTT, ligne.detenteur, 600)
+            assert _ligne().expire_le > expire
+            assert not verrous._prolonger(VERROU_HEURES_RTT, "autre", 600)
+
+
+class TestSynchroExclusive:
+    @patch("services.erp.sync_heures.erp_connexion", side_effect=AssertionError("ERP relu"))
+    def test_synchro_identique_en_cours_rejointe(self, _conn, users, liberation_a_l_attente):
+        from services.erp.sync_heures import synchroniser_semaine
+
+        _detenu_ailleurs("semaine:202623:rtt=1")
+        rapport = synchroniser_semaine(semaine_erp="202623")
+        assert rapport.execution_rejointe
+        assert rapport.date_lundi == date(2026, 6, 1) and rapport.nb_importes == 0
+        assert "non relancée" in rapport.avertissements[0]
+
+    def test_synchro_rejointe_en_echec_relancee(self, users, echec_a_l_attente):
+        from services.erp.sync_heures import synchroniser_semaine
+
+        _detenu_ailleurs("semaine:202623:rtt=1")
+        with patch("services.erp.sync_heures.erp_connexion") as conn, \
+                patch("services.erp.sync_heures.heures_semaine", return_value=[]):
+            rapport = synchroniser_semaine(semaine_erp="202623")
+        conn.assert_called_once()
+        assert not rapport.execution_rejointe
+        assert _ligne().dernier_statut == verrous.STATUT_SUCCES
+
+    def test_apercu_sans_verrou(self, users):
+        from services.erp.sync_heures import synchroniser_semaine
+
+        _detenu_ailleurs("semaine:202623:rtt=1")
+        with patch("services.erp.sync_heures.erp_connexion") as conn, \
+                patch("services.erp.sync_heures.heures_semaine", return_value=[]):
+            rapport = synchroniser_semaine(semaine_erp="202623", dry_run=True)
+        conn.assert_called_once()
+        assert not rapport.execution_rejointe
+
+    def test_recalcul_complet_rejoint(self, client, users, parametrage, liberation_a_l_attente):
+        from tests.conftest import login
+
+        _detenu_ailleurs("rtt_complet")
+        login(client, "rh1", "rh123")
+        with patch("services.rtt_hebdo.maj_rtt_allocations_hebdo") as maj:
+            resp = client.post(
+                "/rh/heures-hebdo", data={"lundi": "2026-06-08", "action": "save_recalc"},
+                follow_redirects=True,
+            )
+        maj.assert_not_called()
+        assert "déjà en cours : terminé pendant l&#39;attente" in resp.get_data(as_text=True)